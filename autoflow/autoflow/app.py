@@ -15,7 +15,7 @@ from get_secret_or_env_var import getenv
 
 from autoflow.model import init_db
 from autoflow.parser import parse_workflows_yaml
-from autoflow.sensor import available_dates_sensor
+from autoflow.sensor import available_dates_sensor, get_executor
 
 
 def main(run_on_schedule: bool = True):
@@ -65,11 +65,14 @@ def main(run_on_schedule: bool = True):
     workflow_storage, sensor_config = parse_workflows_yaml("workflows.yml", inputs_dir)
 
     # Run available dates sensor
-    logger.info("Running available dates sensor.")
+    logger.info(
+        f"Running available dates sensor, with up to {sensor_config['max_concurrent_runs']} concurrent workflow runs."
+    )
     available_dates_sensor.schedule = sensor_config["schedule"]
     available_dates_sensor.run(
         workflow_configs=sensor_config["workflows"],
         cdr_types=sensor_config["cdr_types"],
         workflow_storage=workflow_storage,
         run_on_schedule=run_on_schedule,
+        executor=get_executor(sensor_config["max_concurrent_runs"]),
     )
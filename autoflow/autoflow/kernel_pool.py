@@ -0,0 +1,311 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Contains a pool of running Jupyter kernels, and a papermill engine which
+executes notebooks using kernels from the pool, so that notebooks can be
+executed without starting a new kernel (and re-importing packages) each time.
+"""
+
+import atexit
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import DefaultDict, Iterator, List, Optional
+
+import nbformat
+from jupyter_client.manager import KernelManager
+from papermill.engines import Engine, papermill_engines
+from papermill.log import logger
+
+# Name under which the pooled kernel engine is registered with papermill
+POOLED_KERNEL_ENGINE = "autoflow_pooled_kernel"
+
+# Number of notebooks a kernel will execute before it is replaced
+MAX_KERNEL_USES = 20
+
+# Code run in a kernel after each notebook, to remove everything the notebook
+# defined while keeping the imported modules loaded. Nothing is left in the
+# user namespace afterwards.
+RESET_NAMESPACE_CODE = (
+    "get_ipython().reset(new_session=True)\n__import__('gc').collect()"
+)
+
+
+class PooledKernel:
+    """
+    A running Jupyter kernel, with a client connected to it.
+
+    Parameters
+    ----------
+    kernel_name : str
+        Name of the kernel spec to start
+    start_timeout : int, default 60
+        Number of seconds to wait for the kernel to be ready
+    """
+
+    def __init__(self, kernel_name: str, start_timeout: int = 60):
+        self.kernel_name = kernel_name
+        self.uses = 0
+        self.km = KernelManager(kernel_name=kernel_name)
+        self.km.start_kernel()
+        self.kc = self.km.client()
+        self.kc.start_channels()
+        try:
+            self.kc.wait_for_ready(timeout=start_timeout)
+        except RuntimeError:
+            self.shutdown()
+            raise
+
+    def is_alive(self) -> bool:
+        return self.km.is_alive()
+
+    def reset_namespace(self, timeout: Optional[int] = 60) -> bool:
+        """
+        Remove all variables from the kernel's namespace.
+
+        Parameters
+        ----------
+        timeout : int, optional
+            Number of seconds to wait for the reset to finish
+
+        Returns
+        -------
+        bool
+            True if the namespace was reset successfully
+        """
+        try:
+            reply = self.kc.execute_interactive(
+                RESET_NAMESPACE_CODE,
+                silent=True,
+                store_history=False,
+                allow_stdin=False,
+                timeout=timeout,
+                output_hook=lambda msg: None,
+            )
+        except TimeoutError:
+            return False
+        return reply["content"]["status"] == "ok"
+
+    def shutdown(self) -> None:
+        self.kc.stop_channels()
+        self.km.shutdown_kernel(now=True)
+
+
+class KernelPool:
+    """
+    Pool of running Jupyter kernels, which can be used in turn to execute notebooks.
+
+    A kernel is only used by one notebook at a time. Kernels are started as
+    they are needed, and returned to the pool with an empty namespace when
+    a notebook finishes. Kernels which fail, or which have been used for
+    `max_uses` notebooks, are shut down rather than returned to the pool.
+
+    Parameters
+    ----------
+    max_uses : int, default MAX_KERNEL_USES
+        Number of notebooks a kernel will execute before it is replaced
+    """
+
+    def __init__(self, max_uses: int = MAX_KERNEL_USES):
+        self.max_uses = max_uses
+        self._idle_kernels: DefaultDict[str, List[PooledKernel]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def acquire(self, kernel_name: str, start_timeout: int = 60) -> PooledKernel:
+        """
+        Take a kernel from the pool, starting a new kernel if there is no
+        idle kernel with this name.
+
+        Parameters
+        ----------
+        kernel_name : str
+            Name of the kernel spec
+        start_timeout : int, default 60
+            Number of seconds to wait for a new kernel to be ready
+
+        Returns
+        -------
+        PooledKernel
+        """
+        while True:
+            with self._lock:
+                try:
+                    kernel = self._idle_kernels[kernel_name].pop()
+                except IndexError:
+                    break
+            if kernel.is_alive():
+                logger.debug(f"Reusing '{kernel_name}' kernel.")
+                return kernel
+            kernel.shutdown()
+        logger.debug(f"Starting new '{kernel_name}' kernel for the pool.")
+        return PooledKernel(kernel_name, start_timeout=start_timeout)
+
+    def release(self, kernel: PooledKernel, healthy: bool = True) -> None:
+        """
+        Return a kernel to the pool after resetting its namespace, or shut it
+        down if it can't be reused.
+
+        Parameters
+        ----------
+        kernel : PooledKernel
+            Kernel previously taken from this pool
+        healthy : bool, default True
+            Set to False to shut the kernel down, e.g. if a notebook timed out
+        """
+        kernel.uses += 1
+        if (
+            healthy
+            and kernel.uses < self.max_uses
+            and kernel.is_alive()
+            and kernel.reset_namespace()
+        ):
+            with self._lock:
+                self._idle_kernels[kernel.kernel_name].append(kernel)
+        else:
+            logger.debug(f"Shutting down '{kernel.kernel_name}' kernel.")
+            kernel.shutdown()
+
+    @contextmanager
+    def kernel(
+        self, kernel_name: str, start_timeout: int = 60
+    ) -> Iterator[PooledKernel]:
+        """
+        Context manager which takes a kernel from the pool, and releases it on exit.
+        The kernel is shut down if an exception is raised.
+
+        Parameters
+        ----------
+        kernel_name : str
+            Name of the kernel spec
+        start_timeout : int, default 60
+            Number of seconds to wait for a new kernel to be ready
+
+        Yields
+        ------
+        PooledKernel
+        """
+        kernel = self.acquire(kernel_name, start_timeout=start_timeout)
+        try:
+            yield kernel
+        except BaseException:
+            self.release(kernel, healthy=False)
+            raise
+        else:
+            self.release(kernel)
+
+    def shutdown(self) -> None:
+        """
+        Shut down all of the idle kernels in the pool.
+        """
+        with self._lock:
+            kernels = [k for kernels in self._idle_kernels.values() for k in kernels]
+            self._idle_kernels.clear()
+        for kernel in kernels:
+            kernel.shutdown()
+
+
+kernel_pool = KernelPool()
+atexit.register(kernel_pool.shutdown)
+
+
+class PooledKernelEngine(Engine):
+    """
+    Papermill engine which executes notebooks using kernels from the kernel pool.
+
+    Cells are executed in order until a cell raises an error, in the same way
+    as papermill's default engine. If a cell raises an error, the kernel is
+    shut down rather than returned to the pool. Notebooks executed with this engine share
+    the state of the kernel process (e.g. imported modules and environment
+    variables), but not the variables defined in other notebooks.
+    """
+
+    @classmethod
+    def execute_managed_notebook(
+        cls,
+        nb_man,
+        kernel_name: Optional[str],
+        log_output: bool = False,
+        start_timeout: int = 60,
+        execution_timeout: Optional[int] = None,
+        **kwargs,
+    ):
+        if kernel_name is None:
+            kernel_name = nb_man.nb.metadata.get("kernelspec", {}).get(
+                "name", "python3"
+            )
+        kernel = kernel_pool.acquire(kernel_name, start_timeout=start_timeout)
+        # The kernel is replaced if the notebook fails, in case it was left in a bad state
+        healthy = False
+        try:
+            for index, cell in enumerate(nb_man.nb.cells):
+                try:
+                    nb_man.cell_start(cell, index)
+                    if cell.cell_type == "code" and cell.source.strip():
+                        reply = cls.execute_cell(
+                            kernel,
+                            cell,
+                            log_output=log_output,
+                            timeout=execution_timeout,
+                        )
+                        if reply["content"]["status"] == "error":
+                            nb_man.cell_exception(cell, cell_index=index)
+                            break
+                finally:
+                    nb_man.cell_complete(cell, cell_index=index)
+            else:
+                healthy = True
+        finally:
+            kernel_pool.release(kernel, healthy=healthy)
+
+    @staticmethod
+    def execute_cell(
+        kernel: PooledKernel,
+        cell: nbformat.NotebookNode,
+        log_output: bool = False,
+        timeout: Optional[int] = None,
+    ) -> dict:
+        """
+        Execute a code cell, and record its outputs in the cell.
+
+        Parameters
+        ----------
+        kernel : PooledKernel
+            Kernel to execute the cell with
+        cell : NotebookNode
+            Code cell to execute
+        log_output : bool, default False
+            Log stream outputs from the cell
+        timeout : int, optional
+            Number of seconds to wait for the cell to finish
+
+        Returns
+        -------
+        dict
+            Execute reply message from the kernel
+        """
+        cell.outputs = []
+
+        def output_hook(msg):
+            msg_type = msg["header"]["msg_type"]
+            if msg_type == "execute_input":
+                cell.execution_count = msg["content"]["execution_count"]
+            elif msg_type == "clear_output":
+                cell.outputs = []
+            elif msg_type in {"stream", "display_data", "execute_result", "error"}:
+                output = nbformat.v4.output_from_msg(msg)
+                if log_output and msg_type == "stream":
+                    logger.info(output.text)
+                cell.outputs.append(output)
+
+        return kernel.kc.execute_interactive(
+            cell.source,
+            allow_stdin=False,
+            stop_on_error=True,
+            timeout=timeout,
+            output_hook=output_hook,
+        )
+
+
+papermill_engines.register(POOLED_KERNEL_ENGINE, PooledKernelEngine)
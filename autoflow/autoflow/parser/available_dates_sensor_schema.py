@@ -30,6 +30,9 @@ class AvailableDatesSensorSchema(Schema):
         If not provided, defaults to None.
     workflows : list of Nested(WorkflowConfigSchema)
         List of workflows (and associated parameters) that the sensor should run.
+    max_concurrent_runs : int, optional
+        Maximum number of workflow runs that the sensor should run at the same time.
+        If not provided, defaults to 1 (i.e. workflow runs will run one at a time).
     """
 
     schedule = ScheduleField(required=True, allow_none=True)
@@ -38,3 +41,4 @@ class AvailableDatesSensorSchema(Schema):
         missing=None,
     )
     workflows = fields.List(fields.Nested(WorkflowConfigSchema), required=True)
+    max_concurrent_runs = fields.Integer(validate=validate.Range(min=1), missing=1)
@@ -34,6 +34,8 @@ class WorkflowConfigSchema(Schema):
         Earliest date of CDR data for which the workflow should run.
     date_stencil : list of int, date and/or pairs of int/date, optional
         Date stencil describing a pattern of dates that must be available for the workflow to run.
+    max_concurrent_runs : int, optional
+        Maximum number of runs of the workflow that may run at the same time.
     """
 
     # Parameter names that will always be passed to the workflow by the available dates sensor.
@@ -47,6 +49,7 @@ class WorkflowConfigSchema(Schema):
     )
     earliest_date = DateField(required=False)
     date_stencil = DateStencilField(required=False)
+    max_concurrent_runs = fields.Integer(validate=validate.Range(min=1), required=False)
 
     @validates("workflow_name")
     def validate_workflow(self, value):
@@ -11,6 +11,7 @@ from marshmallow import (
     Schema,
     post_load,
     validates_schema,
+    validate,
     ValidationError,
 )
 from prefect.environments import storage
@@ -29,10 +30,17 @@ class WorkflowSchema(Schema):
         Name of the prefect flow.
     notebooks : dict
         Dictionary of notebook task specifications.
+    kernel_mode : str, optional
+        Either "fresh" (default), to execute each notebook in a new kernel,
+        or "pooled", to execute notebooks in kernels which are reused
+        (with their namespaces reset) between notebooks.
     """
 
     name = fields.String(required=True)
     notebooks = NotebooksField(required=True)
+    kernel_mode = fields.String(
+        validate=validate.OneOf(["fresh", "pooled"]), missing="fresh"
+    )
 
     @validates_schema(pass_many=True)
     def check_for_duplicate_names(self, data, many, **kwargs):
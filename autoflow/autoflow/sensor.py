@@ -6,14 +6,27 @@
 Defines 'available_dates_sensor' prefect flow.
 """
 
+import threading
 import warnings
-from typing import Any, Dict, List, NamedTuple, NoReturn, Optional, Sequence, Tuple
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    NoReturn,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import pendulum
 import prefect
 from get_secret_or_env_var import environ, getenv
 from prefect import Flow, Parameter, task, unmapped
 from prefect.engine import signals
+from prefect.engine.executors import Executor, LocalDaskExecutor, LocalExecutor
 from prefect.schedules import CronSchedule
 from prefect.triggers import all_successful, any_failed
 
@@ -39,12 +52,77 @@ class WorkflowConfig(NamedTuple):
     date_stencil : DateStencil
         Date stencil defining date intervals required by the workflow.
         The default is DateStencil([0]) (i.e. a stencil that contains only the reference date).
+    max_concurrent_runs : int, optional
+        Maximum number of runs of the workflow that may run at the same time.
+        If several configs for the same workflow set this, the smallest limit applies.
+        The default is None (i.e. limited only by the sensor's executor).
     """
 
     workflow_name: str
     parameters: Optional[Dict[str, Any]] = None
     earliest_date: Optional["datetime.date"] = None
     date_stencil: DateStencil = DateStencil([0])
+    max_concurrent_runs: Optional[int] = None
+
+
+# Semaphores limiting the number of concurrent runs of each workflow, by workflow name and limit
+_workflow_run_slots: Dict[Tuple[str, int], threading.BoundedSemaphore] = {}
+_workflow_run_slots_lock = threading.Lock()
+
+
+def get_executor(max_concurrent_runs: int = 1) -> Executor:
+    """
+    Get a prefect executor for running the available dates sensor, which
+    runs at most max_concurrent_runs workflow runs at the same time.
+
+    Parameters
+    ----------
+    max_concurrent_runs : int, default 1
+        Maximum number of workflow runs to run at the same time.
+
+    Returns
+    -------
+    Executor
+        A LocalExecutor if max_concurrent_runs is 1, otherwise a thread-based
+        LocalDaskExecutor with max_concurrent_runs workers.
+
+    Notes
+    -----
+    Workflow runs are run in threads rather than processes, because the notebooks
+    in a workflow are executed in their own kernel processes, and so that limits
+    on concurrent runs of each workflow can be shared between runs.
+    """
+    if max_concurrent_runs < 1:
+        raise ValueError("max_concurrent_runs must be at least 1.")
+    if max_concurrent_runs == 1:
+        return LocalExecutor()
+    return LocalDaskExecutor(scheduler="threads", num_workers=max_concurrent_runs)
+
+
+@contextmanager
+def workflow_run_slot(
+    workflow_name: str, limit: Optional[int] = None
+) -> Iterator[None]:
+    """
+    Context manager which waits until fewer than `limit` runs of the named
+    workflow are in progress in this process, and holds a slot until exited.
+
+    Parameters
+    ----------
+    workflow_name : str
+        Name of the workflow
+    limit : int, optional
+        Maximum number of concurrent runs of the workflow. If None, runs are not limited.
+    """
+    if limit is None:
+        yield
+        return
+    with _workflow_run_slots_lock:
+        slots = _workflow_run_slots.setdefault(
+            (workflow_name, limit), threading.BoundedSemaphore(limit)
+        )
+    with slots:
+        yield
 
 
 # Tasks -----------------------------------------------------------------------
@@ -197,6 +275,34 @@ def get_parametrised_workflows(
     ]
 
 
+@task
+def get_concurrency_limits(workflow_configs: List[WorkflowConfig]) -> Dict[str, int]:
+    """
+    Get the maximum number of concurrent runs of each workflow which sets a limit.
+
+    Parameters
+    ----------
+    workflow_configs : list of WorkflowConfig
+        List of workflow configs.
+
+    Returns
+    -------
+    dict
+        Mapping from workflow names to the smallest limit set for that workflow.
+    """
+    limits = {}
+    for workflow_config in workflow_configs:
+        if workflow_config.max_concurrent_runs is not None:
+            limits[workflow_config.workflow_name] = min(
+                workflow_config.max_concurrent_runs,
+                limits.get(
+                    workflow_config.workflow_name, workflow_config.max_concurrent_runs
+                ),
+            )
+    prefect.context.logger.debug(f"Workflow concurrency limits: {limits}")
+    return limits
+
+
 @task
 def skip_if_already_run(parametrised_workflow: Tuple[Flow, Dict[str, Any]]) -> None:
     """
@@ -271,7 +377,10 @@ def record_workflow_run_state(
 
 
 @task
-def run_workflow(parametrised_workflow: Tuple[Flow, Dict[str, Any]]) -> None:
+def run_workflow(
+    parametrised_workflow: Tuple[Flow, Dict[str, Any]],
+    concurrency_limits: Optional[Dict[str, int]] = None,
+) -> None:
     """
     Run a workflow.
 
@@ -279,18 +388,28 @@ def run_workflow(parametrised_workflow: Tuple[Flow, Dict[str, Any]]) -> None:
     ----------
     parametrised_workflow : tuple (prefect.Flow, dict)
         Workflow to run, and parameters to run it with.
+    concurrency_limits : dict, optional
+        Mapping from workflow names to the maximum number of concurrent runs
+        of that workflow.
     
     Notes
     -----
     
-    The workflow will run once, starting immediately. If the workflow has a
-    schedule, the schedule will be ignored.
+    The workflow will run once, starting immediately (or as soon as fewer
+    than the maximum number of runs of the workflow are in progress). If the
+    workflow has a schedule, the schedule will be ignored.
     """
     workflow, parameters = parametrised_workflow
-    prefect.context.logger.info(
-        f"Running workflow '{workflow.name}' with parameters {parameters}."
-    )
-    state = workflow.run(parameters=parameters, run_on_schedule=False)
+    limit = (concurrency_limits or {}).get(workflow.name)
+    if limit is not None:
+        prefect.context.logger.debug(
+            f"Waiting until fewer than {limit} runs of workflow '{workflow.name}' are in progress."
+        )
+    with workflow_run_slot(workflow.name, limit):
+        prefect.context.logger.info(
+            f"Running workflow '{workflow.name}' with parameters {parameters}."
+        )
+        state = workflow.run(parameters=parameters, run_on_schedule=False)
     if state.is_successful():
         prefect.context.logger.info(
             f"Workflow '{workflow.name}' ran successfully with parameters {parameters}."
@@ -327,7 +446,11 @@ with Flow(name="Available dates sensor") as available_dates_sensor:
         ],
     )
     workflow_runs = run_workflow.map(
-        parametrised_workflow=parametrised_workflows, upstream_tasks=[running]
+        parametrised_workflow=parametrised_workflows,
+        concurrency_limits=unmapped(
+            get_concurrency_limits(workflow_configs=workflow_configs)
+        ),
+        upstream_tasks=[running],
     )
     success = record_workflow_run_state.map(
         parametrised_workflow=parametrised_workflows,
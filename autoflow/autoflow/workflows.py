@@ -12,6 +12,7 @@ from typing import Any, Dict, Optional, OrderedDict
 import papermill
 import prefect
 
+from autoflow.kernel_pool import POOLED_KERNEL_ENGINE
 from autoflow.utils import (
     asciidoc_to_pdf,
     get_additional_parameter_names_for_notebooks,
@@ -66,6 +67,7 @@ def papermill_execute_notebook(
     input_filename: str,
     output_tag: str,
     parameters: Optional[Dict[str, Any]] = None,
+    kernel_mode: str = "fresh",
     **kwargs,
 ) -> str:
     """
@@ -79,6 +81,10 @@ def papermill_execute_notebook(
         Tag to append to output filename
     parameters : dict, optional
         Parameters to pass to the notebook
+    kernel_mode : {"fresh", "pooled"}, default "fresh"
+        Whether to execute the notebook in a new kernel ("fresh"), or in a
+        kernel from the kernel pool, which is reused by later notebooks
+        after its namespace is reset ("pooled").
     **kwargs
         Additional keyword arguments to pass to papermill.execute_notebook
     
@@ -104,6 +110,13 @@ def papermill_execute_notebook(
 
     prefect.context.logger.debug(f"Output notebook will be '{output_path}'.")
 
+    if kernel_mode == "pooled":
+        kwargs.setdefault("engine_name", POOLED_KERNEL_ENGINE)
+    elif kernel_mode != "fresh":
+        raise ValueError(
+            f"Unknown kernel mode '{kernel_mode}'. Expected 'fresh' or 'pooled'."
+        )
+
     papermill.execute_notebook(
         input_path, output_path, parameters=safe_params, **kwargs
     )
@@ -174,7 +187,7 @@ def convert_notebook_to_pdf(
 
 
 def make_notebooks_workflow(
-    name: str, notebooks: OrderedDict[str, Dict[str, Any]]
+    name: str, notebooks: OrderedDict[str, Dict[str, Any]], kernel_mode: str = "fresh"
 ) -> prefect.Flow:
     """
     Build a prefect flow that runs a set of interdependent Jupyter notebooks.
@@ -187,6 +200,9 @@ def make_notebooks_workflow(
     notebooks : OrderedDict
         Ordered dictionary of dictionaries describing notebook tasks.
         Each should have keys 'filename' and 'parameters', and optionally 'output'.
+    kernel_mode : {"fresh", "pooled"}, default "fresh"
+        Whether to execute each notebook in a new kernel ("fresh"), or in
+        kernels from the kernel pool ("pooled").
     
     Returns
     -------
@@ -226,6 +242,7 @@ def make_notebooks_workflow(
                     k: parameter_tasks[v]
                     for k, v in notebook.get("parameters", {}).items()
                 },
+                kernel_mode=kernel_mode,
             )
             if "output" in notebook:
                 # Create PDF report from notebook
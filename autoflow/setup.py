@@ -29,6 +29,7 @@ setup(
         "flowclient",
         "get-secret-or-env-var",
         "ipykernel",
+        "jupyter-client",
         "marshmallow >= 3.0.0",
         "networkx",
         "nteract-scrapbook",
@@ -75,6 +75,31 @@ def test_available_dates_sensor_schema_missing_cdr_types():
     assert sensor_config["cdr_types"] is None
 
 
+def test_available_dates_sensor_schema_max_concurrent_runs():
+    """
+    Test that AvailableDatesSensorSchema 'max_concurrent_runs' field loads 1 if
+    the input 'max_concurrent_runs' field is missing, and the given value otherwise.
+    """
+    input_dict = dict(schedule="0 0 * * *", workflows=[])
+    sensor_config = AvailableDatesSensorSchema().load(input_dict)
+    assert sensor_config["max_concurrent_runs"] == 1
+    sensor_config = AvailableDatesSensorSchema().load(
+        dict(input_dict, max_concurrent_runs=4)
+    )
+    assert sensor_config["max_concurrent_runs"] == 4
+
+
+def test_available_dates_sensor_schema_invalid_max_concurrent_runs():
+    """
+    Test that AvailableDatesSensorSchema raises a ValidationError if
+    'max_concurrent_runs' is less than 1.
+    """
+    input_dict = dict(schedule="0 0 * * *", workflows=[], max_concurrent_runs=0)
+    with pytest.raises(ValidationError) as exc_info:
+        AvailableDatesSensorSchema().load(input_dict)
+    assert "max_concurrent_runs" in exc_info.value.messages
+
+
 def test_available_dates_sensor_schema_invalid_cdr_types():
     """
     Test that AvailableDatesSensorSchema raises a ValidationError if the
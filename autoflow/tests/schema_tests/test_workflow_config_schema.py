@@ -31,6 +31,7 @@ def test_workflow_config_schema():
         parameters={"DUMMY_PARAM": "DUMMY_VALUE"},
         earliest_date=datetime.date(2016, 1, 1),
         date_stencil=[-1, 0],
+        max_concurrent_runs=2,
     )
     workflow_config = WorkflowConfigSchema(
         context={"workflow_storage": workflow_storage}
@@ -40,6 +41,7 @@ def test_workflow_config_schema():
     assert workflow_config.parameters == input_dict["parameters"]
     assert workflow_config.earliest_date == input_dict["earliest_date"]
     assert workflow_config.date_stencil == DateStencil(input_dict["date_stencil"])
+    assert workflow_config.max_concurrent_runs == 2
 
 
 def test_workflow_config_schema_defaults():
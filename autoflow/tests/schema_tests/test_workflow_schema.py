@@ -4,7 +4,10 @@
 
 import pytest
 
+from unittest.mock import Mock
+
 from marshmallow import ValidationError
+from prefect import Flow
 from prefect.environments import storage
 
 from autoflow.parser.workflow_schema import WorkflowSchema
@@ -119,3 +122,56 @@ def test_workflow_schema_duplicate_name(monkeypatch):
         ).load(workflows)
     assert "Duplicate workflow name." in exc_info.value.messages[1]["name"]
     assert "Duplicate workflow name." in exc_info.value.messages[2]["name"]
+
+
+@pytest.mark.parametrize("kernel_mode", ["fresh", "pooled"])
+def test_workflow_schema_kernel_mode(monkeypatch, kernel_mode):
+    """
+    Test that WorkflowSchema passes the 'kernel_mode' field to make_notebooks_workflow.
+    """
+    monkeypatch.setattr("pathlib.Path.exists", lambda self: True)
+    make_notebooks_workflow_mock = Mock(return_value=Flow(name="DUMMY_WORKFLOW"))
+    monkeypatch.setattr(
+        "autoflow.parser.workflow_schema.make_notebooks_workflow",
+        make_notebooks_workflow_mock,
+    )
+    workflow = {
+        "name": "DUMMY_WORKFLOW",
+        "notebooks": {"notebook1": {"filename": "NOTEBOOK1.ipynb"}},
+        "kernel_mode": kernel_mode,
+    }
+    WorkflowSchema(context={"inputs_dir": "DUMMY_INPUTS_DIR"}).load(workflow)
+    assert make_notebooks_workflow_mock.call_args[1]["kernel_mode"] == kernel_mode
+
+
+def test_workflow_schema_default_kernel_mode(monkeypatch):
+    """
+    Test that WorkflowSchema executes notebooks in fresh kernels if 'kernel_mode' is not specified.
+    """
+    monkeypatch.setattr("pathlib.Path.exists", lambda self: True)
+    make_notebooks_workflow_mock = Mock(return_value=Flow(name="DUMMY_WORKFLOW"))
+    monkeypatch.setattr(
+        "autoflow.parser.workflow_schema.make_notebooks_workflow",
+        make_notebooks_workflow_mock,
+    )
+    workflow = {
+        "name": "DUMMY_WORKFLOW",
+        "notebooks": {"notebook1": {"filename": "NOTEBOOK1.ipynb"}},
+    }
+    WorkflowSchema(context={"inputs_dir": "DUMMY_INPUTS_DIR"}).load(workflow)
+    assert make_notebooks_workflow_mock.call_args[1]["kernel_mode"] == "fresh"
+
+
+def test_workflow_schema_invalid_kernel_mode(monkeypatch):
+    """
+    Test that WorkflowSchema raises a ValidationError if the 'kernel_mode' field is not valid.
+    """
+    monkeypatch.setattr("pathlib.Path.exists", lambda self: True)
+    workflow = {
+        "name": "DUMMY_WORKFLOW",
+        "notebooks": {"notebook1": {"filename": "NOTEBOOK1.ipynb"}},
+        "kernel_mode": "DUMMY_MODE",
+    }
+    with pytest.raises(ValidationError) as exc_info:
+        WorkflowSchema(context={"inputs_dir": "DUMMY_INPUTS_DIR"}).load(workflow)
+    assert "kernel_mode" in exc_info.value.messages
@@ -0,0 +1,235 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import pytest
+
+from unittest.mock import MagicMock, Mock
+
+import nbformat
+import papermill
+
+from autoflow.kernel_pool import (
+    KernelPool,
+    PooledKernelEngine,
+    POOLED_KERNEL_ENGINE,
+    kernel_pool,
+)
+
+
+@pytest.fixture
+def dummy_kernel_class(monkeypatch):
+    """
+    Replace PooledKernel with a mock that doesn't start a kernel.
+    """
+
+    def make_kernel(kernel_name, start_timeout=60):
+        kernel = Mock(kernel_name=kernel_name, uses=0)
+        kernel.is_alive.return_value = True
+        kernel.reset_namespace.return_value = True
+        return kernel
+
+    kernel_class_mock = Mock(side_effect=make_kernel)
+    monkeypatch.setattr("autoflow.kernel_pool.PooledKernel", kernel_class_mock)
+    return kernel_class_mock
+
+
+def test_kernel_pool_reuses_kernel(dummy_kernel_class):
+    """
+    Test that KernelPool returns a released kernel, after resetting its namespace.
+    """
+    pool = KernelPool()
+    with pool.kernel("DUMMY_KERNEL") as kernel:
+        pass
+    kernel.reset_namespace.assert_called_once()
+    with pool.kernel("DUMMY_KERNEL") as second_kernel:
+        pass
+    assert second_kernel is kernel
+    dummy_kernel_class.assert_called_once_with("DUMMY_KERNEL", start_timeout=60)
+
+
+def test_kernel_pool_starts_kernel_per_name(dummy_kernel_class):
+    """
+    Test that KernelPool doesn't reuse kernels with a different kernel name.
+    """
+    pool = KernelPool()
+    with pool.kernel("DUMMY_KERNEL_1") as kernel:
+        pass
+    with pool.kernel("DUMMY_KERNEL_2") as second_kernel:
+        pass
+    assert second_kernel is not kernel
+    assert dummy_kernel_class.call_count == 2
+
+
+def test_kernel_pool_concurrent_kernels(dummy_kernel_class):
+    """
+    Test that KernelPool doesn't give a kernel to two users at once.
+    """
+    pool = KernelPool()
+    with pool.kernel("DUMMY_KERNEL") as kernel, pool.kernel(
+        "DUMMY_KERNEL"
+    ) as second_kernel:
+        assert second_kernel is not kernel
+
+
+def test_kernel_pool_shuts_down_kernel_on_error(dummy_kernel_class):
+    """
+    Test that KernelPool shuts down a kernel if an error is raised while it is in use.
+    """
+    pool = KernelPool()
+    with pytest.raises(TimeoutError):
+        with pool.kernel("DUMMY_KERNEL") as kernel:
+            raise TimeoutError("DUMMY_ERROR")
+    kernel.shutdown.assert_called_once()
+    with pool.kernel("DUMMY_KERNEL") as second_kernel:
+        pass
+    assert second_kernel is not kernel
+
+
+def test_kernel_pool_shuts_down_kernel_if_reset_fails(dummy_kernel_class):
+    """
+    Test that KernelPool shuts down a kernel, rather than reusing it, if resetting its namespace fails.
+    """
+    pool = KernelPool()
+    kernel = pool.acquire("DUMMY_KERNEL")
+    kernel.reset_namespace.return_value = False
+    pool.release(kernel)
+    kernel.shutdown.assert_called_once()
+    assert pool.acquire("DUMMY_KERNEL") is not kernel
+
+
+def test_kernel_pool_replaces_dead_kernel(dummy_kernel_class):
+    """
+    Test that KernelPool starts a new kernel if an idle kernel has died.
+    """
+    pool = KernelPool()
+    with pool.kernel("DUMMY_KERNEL") as kernel:
+        pass
+    kernel.is_alive.return_value = False
+    with pool.kernel("DUMMY_KERNEL") as second_kernel:
+        pass
+    assert second_kernel is not kernel
+    kernel.shutdown.assert_called_once()
+
+
+def test_kernel_pool_max_uses(dummy_kernel_class):
+    """
+    Test that KernelPool replaces a kernel after it has been used max_uses times.
+    """
+    pool = KernelPool(max_uses=2)
+    with pool.kernel("DUMMY_KERNEL") as kernel:
+        pass
+    with pool.kernel("DUMMY_KERNEL") as second_kernel:
+        pass
+    assert second_kernel is kernel
+    kernel.shutdown.assert_called_once()
+    with pool.kernel("DUMMY_KERNEL") as third_kernel:
+        pass
+    assert third_kernel is not kernel
+
+
+def test_kernel_pool_shutdown(dummy_kernel_class):
+    """
+    Test that KernelPool.shutdown shuts down idle kernels.
+    """
+    pool = KernelPool()
+    with pool.kernel("DUMMY_KERNEL_1") as kernel_1, pool.kernel(
+        "DUMMY_KERNEL_2"
+    ) as kernel_2:
+        pass
+    pool.shutdown()
+    kernel_1.shutdown.assert_called_once()
+    kernel_2.shutdown.assert_called_once()
+
+
+def test_pooled_kernel_engine_stops_on_error(monkeypatch):
+    """
+    Test that PooledKernelEngine stops executing cells after a cell raises an error.
+    """
+    nb = nbformat.v4.new_notebook(
+        cells=[
+            nbformat.v4.new_markdown_cell("DUMMY_MARKDOWN"),
+            nbformat.v4.new_code_cell("raise Exception()"),
+            nbformat.v4.new_code_cell("x = 1"),
+        ]
+    )
+    nb_man = Mock(nb=nb)
+    execute_cell_mock = Mock(return_value={"content": {"status": "error"}})
+    monkeypatch.setattr(PooledKernelEngine, "execute_cell", execute_cell_mock)
+    pool_mock = MagicMock()
+    monkeypatch.setattr("autoflow.kernel_pool.kernel_pool", pool_mock)
+
+    PooledKernelEngine.execute_managed_notebook(nb_man, "DUMMY_KERNEL")
+
+    assert execute_cell_mock.call_count == 1
+    assert execute_cell_mock.call_args[0][1] is nb.cells[1]
+    nb_man.cell_exception.assert_called_once_with(nb.cells[1], cell_index=1)
+    assert nb_man.cell_complete.call_count == 2
+    # The kernel shouldn't be reused after the notebook failed
+    pool_mock.release.assert_called_once_with(
+        pool_mock.acquire.return_value, healthy=False
+    )
+
+
+@pytest.mark.parametrize(
+    "reply, healthy",
+    [({"content": {"status": "ok"}}, True), ({"content": {"status": "error"}}, False),],
+)
+def test_pooled_kernel_engine_replaces_kernel_after_error(
+    reply, healthy, monkeypatch, dummy_kernel_class
+):
+    """
+    Test that the kernel is returned to the pool after a notebook succeeds, and replaced after it fails.
+    """
+    nb = nbformat.v4.new_notebook(cells=[nbformat.v4.new_code_cell("x = 1")])
+    monkeypatch.setattr(PooledKernelEngine, "execute_cell", Mock(return_value=reply))
+    pool = KernelPool()
+    monkeypatch.setattr("autoflow.kernel_pool.kernel_pool", pool)
+
+    PooledKernelEngine.execute_managed_notebook(Mock(nb=nb), "DUMMY_KERNEL")
+    with pool.kernel("DUMMY_KERNEL"):
+        pass
+    # A new kernel is only started if the first was shut down
+    assert dummy_kernel_class.call_count == (1 if healthy else 2)
+
+
+def test_pooled_kernel_engine(tmp_path):
+    """
+    Test that notebooks executed with the pooled kernel engine share a kernel,
+    but not variables.
+    """
+    first_nb = nbformat.v4.new_notebook(
+        cells=[nbformat.v4.new_code_cell("import os\nx = 1\nprint(os.getpid())"),]
+    )
+    second_nb = nbformat.v4.new_notebook(
+        cells=[
+            nbformat.v4.new_code_cell("import os\nprint(os.getpid())"),
+            nbformat.v4.new_code_cell("'x' in globals()"),
+        ]
+    )
+    for filename, nb in [("first.ipynb", first_nb), ("second.ipynb", second_nb)]:
+        nb.metadata["kernelspec"] = {
+            "name": "python3",
+            "display_name": "Python 3",
+            "language": "python",
+        }
+        nbformat.write(nb, str(tmp_path / filename))
+
+    try:
+        first_output = papermill.execute_notebook(
+            str(tmp_path / "first.ipynb"),
+            str(tmp_path / "first_output.ipynb"),
+            engine_name=POOLED_KERNEL_ENGINE,
+        )
+        second_output = papermill.execute_notebook(
+            str(tmp_path / "second.ipynb"),
+            str(tmp_path / "second_output.ipynb"),
+            engine_name=POOLED_KERNEL_ENGINE,
+        )
+    finally:
+        kernel_pool.shutdown()
+
+    first_pid = first_output.cells[0].outputs[0].text
+    second_pid = second_output.cells[0].outputs[0].text
+    assert first_pid == second_pid
+    assert second_output.cells[1].outputs[0].data["text/plain"] == "False"
@@ -2,6 +2,9 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import threading
+import time
+
 import pytest
 
 from unittest.mock import call, create_autospec, Mock
@@ -10,6 +13,7 @@ import pendulum
 import prefect
 from prefect.core import Edge
 from prefect.engine import TaskRunner
+from prefect.engine.executors import LocalDaskExecutor, LocalExecutor
 from prefect.engine.state import Failed, Success
 from prefect.environments.storage import Memory
 from prefect.schedules import CronSchedule
@@ -22,10 +26,13 @@ from autoflow.sensor import (
     available_dates_sensor,
     filter_dates,
     get_available_dates,
+    get_concurrency_limits,
+    get_executor,
     get_parametrised_workflows,
     record_workflow_run_state,
     run_workflow,
     skip_if_already_run,
+    workflow_run_slot,
     WorkflowConfig,
 )
 
@@ -38,6 +45,7 @@ def test_workflow_config_defaults():
     assert workflow_config.parameters is None
     assert workflow_config.earliest_date is None
     assert workflow_config.date_stencil._intervals == ((0, 1),)
+    assert workflow_config.max_concurrent_runs is None
 
 
 def test_get_available_dates(monkeypatch, test_logger):
@@ -427,6 +435,96 @@ def test_run_workflow_ignores_schedule(test_logger):
     function_mock.assert_called_once_with(dummy_param="DUMMY_VALUE")
 
 
+def test_get_executor():
+    """
+    Test that get_executor returns a local executor for sequential runs, and a
+    thread-based dask executor for concurrent runs.
+    """
+    assert isinstance(get_executor(), LocalExecutor)
+    executor = get_executor(4)
+    assert isinstance(executor, LocalDaskExecutor)
+    assert executor.scheduler == "threads"
+    assert executor.kwargs == dict(num_workers=4)
+
+
+def test_get_executor_invalid():
+    """
+    Test that get_executor raises an error if max_concurrent_runs is less than 1.
+    """
+    with pytest.raises(ValueError, match="at least 1"):
+        get_executor(0)
+
+
+def test_get_concurrency_limits(test_logger):
+    """
+    Test that get_concurrency_limits returns the smallest limit set for each workflow.
+    """
+    workflow_configs = [
+        WorkflowConfig(workflow_name="WORKFLOW_1", max_concurrent_runs=3),
+        WorkflowConfig(workflow_name="WORKFLOW_1", max_concurrent_runs=2),
+        WorkflowConfig(workflow_name="WORKFLOW_1"),
+        WorkflowConfig(workflow_name="WORKFLOW_2"),
+        WorkflowConfig(workflow_name="WORKFLOW_3", max_concurrent_runs=1),
+    ]
+    with prefect.context(logger=test_logger):
+        limits = get_concurrency_limits.run(workflow_configs=workflow_configs)
+    assert limits == {"WORKFLOW_1": 2, "WORKFLOW_3": 1}
+
+
+@pytest.mark.parametrize("limit, expected_max_running", [(None, 4), (2, 2), (1, 1)])
+def test_workflow_run_slot(limit, expected_max_running):
+    """
+    Test that workflow_run_slot limits the number of concurrent runs of a workflow.
+    """
+    running = []
+    max_running = []
+    lock = threading.Lock()
+
+    def run():
+        with workflow_run_slot("DUMMY_WORKFLOW", limit):
+            with lock:
+                running.append(1)
+                max_running.append(len(running))
+            time.sleep(0.1)
+            with lock:
+                running.pop()
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(max_running) == expected_max_running
+
+
+def test_run_workflow_respects_concurrency_limit(test_logger):
+    """
+    Test that run_workflow waits for a free slot before running a workflow
+    which has reached its concurrency limit.
+    """
+    function_mock = create_autospec(lambda dummy_param: None)
+
+    with prefect.Flow("Dummy_workflow") as dummy_workflow:
+        dummy_param = prefect.Parameter("dummy_param")
+        FunctionTask(function_mock)(dummy_param=dummy_param)
+
+    def run():
+        with prefect.context(logger=test_logger):
+            run_workflow.run(
+                parametrised_workflow=(dummy_workflow, dict(dummy_param="DUMMY_VALUE")),
+                concurrency_limits={"Dummy_workflow": 1},
+            )
+
+    with workflow_run_slot("Dummy_workflow", 1):
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join(timeout=0.5)
+        assert thread.is_alive()
+        function_mock.assert_not_called()
+    thread.join()
+    function_mock.assert_called_once_with(dummy_param="DUMMY_VALUE")
+
+
 def test_available_dates_sensor(monkeypatch, postgres_test_db):
     """
     Test that the available_dates_sensor flow runs the specified workflows with
@@ -11,6 +11,7 @@ import pendulum
 import prefect
 from prefect.utilities.configuration import set_temporary_config
 
+from autoflow.kernel_pool import POOLED_KERNEL_ENGINE
 from autoflow.workflows import (
     convert_notebook_to_pdf,
     get_flowapi_url,
@@ -91,6 +92,51 @@ def test_papermill_execute_notebook(monkeypatch, test_logger):
     )
 
 
+def test_papermill_execute_notebook_pooled_kernel(monkeypatch, test_logger):
+    """
+    Test that the papermill_execute_notebook task executes the notebook using
+    the pooled kernel engine if kernel_mode is "pooled".
+    """
+    execute_notebook_mock = Mock()
+    monkeypatch.setattr("papermill.execute_notebook", execute_notebook_mock)
+
+    with set_temporary_config(
+        {
+            "inputs.inputs_dir": "DUMMY_INPUTS_DIR",
+            "outputs.notebooks_dir": "DUMMY_NOTEBOOKS_DIR",
+        }
+    ), prefect.context(logger=test_logger):
+        papermill_execute_notebook.run(
+            input_filename="DUMMY_INPUT_FILENAME.ipynb",
+            output_tag="DUMMY_TAG",
+            kernel_mode="pooled",
+        )
+
+    assert execute_notebook_mock.call_args[1]["engine_name"] == POOLED_KERNEL_ENGINE
+
+
+def test_papermill_execute_notebook_invalid_kernel_mode(monkeypatch, test_logger):
+    """
+    Test that the papermill_execute_notebook task raises a ValueError for an unknown kernel mode.
+    """
+    execute_notebook_mock = Mock()
+    monkeypatch.setattr("papermill.execute_notebook", execute_notebook_mock)
+
+    with set_temporary_config(
+        {
+            "inputs.inputs_dir": "DUMMY_INPUTS_DIR",
+            "outputs.notebooks_dir": "DUMMY_NOTEBOOKS_DIR",
+        }
+    ), prefect.context(logger=test_logger):
+        with pytest.raises(ValueError, match="Unknown kernel mode"):
+            papermill_execute_notebook.run(
+                input_filename="DUMMY_INPUT_FILENAME.ipynb",
+                output_tag="DUMMY_TAG",
+                kernel_mode="DUMMY_MODE",
+            )
+    execute_notebook_mock.assert_not_called()
+
+
 def test_convert_notebook_to_pdf(monkeypatch, test_logger):
     """
     Test that the convert_notebook_to_pdf task calls notebook_to_asciidoc
@@ -276,6 +322,7 @@ def test_make_notebooks_workflow(monkeypatch):
                     "param2": "DUMMY_URL",
                     "param3": "DUMMY_VALUE",
                 },
+                kernel_mode="fresh",
             ),
             call(
                 input_filename="DUMMY_NOTEBOOK2.ipynb",
@@ -284,6 +331,7 @@ def test_make_notebooks_workflow(monkeypatch):
                     "param1": [(pendulum.date(2016, 1, 1), pendulum.date(2016, 1, 1))],
                     "param2": "DUMMY_OUTPUT_1.ipynb",
                 },
+                kernel_mode="fresh",
             ),
         ]
     )
@@ -304,6 +352,40 @@ def test_make_notebooks_workflow_default_parameters():
     assert workflow_parameter_names == {"reference_date", "date_ranges"}
 
 
+def test_make_notebooks_workflow_pooled_kernel(monkeypatch):
+    """
+    Test that a workflow returned by make_notebooks_workflow with kernel_mode "pooled"
+    executes its notebooks in pooled kernels.
+    """
+    monkeypatch.setattr(
+        "autoflow.workflows.get_tag.run", Mock(return_value="DUMMY_TAG")
+    )
+    execute_notebook_mock = Mock(return_value="DUMMY_OUTPUT.ipynb")
+    monkeypatch.setattr(
+        "autoflow.workflows.papermill_execute_notebook.run", execute_notebook_mock
+    )
+
+    notebooks = OrderedDict(
+        [
+            ("notebook1", dict(filename="DUMMY_NOTEBOOK1.ipynb")),
+            ("notebook2", dict(filename="DUMMY_NOTEBOOK2.ipynb")),
+        ]
+    )
+    dummy_workflow = make_notebooks_workflow(
+        name="DUMMY_WORKFLOW", notebooks=notebooks, kernel_mode="pooled"
+    )
+    with set_temporary_config({"flowapi_url": "DUMMY_URL"}):
+        flow_state = dummy_workflow.run(
+            reference_date=pendulum.date(2016, 1, 1),
+            date_ranges=[(pendulum.date(2016, 1, 1), pendulum.date(2016, 1, 1))],
+        )
+
+    assert flow_state.is_successful
+    assert execute_notebook_mock.call_count == 2
+    for c in execute_notebook_mock.call_args_list:
+        assert c[1]["kernel_mode"] == "pooled"
+
+
 def test_notebooks_workflow_fails(monkeypatch):
     """
     Test that a workflow returned by make_notebooks_workflow ends in a failed state
@@ -59,6 +59,12 @@ def get_config():
         flowdb_password = environ["FLOWAPI_FLOWDB_PASSWORD"]
         flowdb_host = environ["FLOWDB_HOST"]
         flowdb_port = environ["FLOWDB_PORT"]
+        # Replicas are given as "host" or "host:port", defaulting to the primary's port
+        flowdb_replica_hosts = [
+            host.strip() if ":" in host else f"{host.strip()}:{flowdb_port}"
+            for host in getenv("FLOWDB_REPLICA_HOSTS", "").split(",")
+            if host.strip() != ""
+        ]
         flowapi_server_id = environ["FLOWAPI_IDENTIFIER"]
     except KeyError as e:
         raise UndefinedConfigOption(
@@ -72,5 +78,9 @@ def get_config():
         FLOWMACHINE_HOST=flowmachine_host,
         FLOWMACHINE_PORT=flowmachine_port,
         FLOWDB_DSN=f"postgres://{flowdb_user}:{flowdb_password}@{flowdb_host}:{flowdb_port}/flowdb",
+        FLOWDB_REPLICA_DSNS=[
+            f"postgres://{flowdb_user}:{flowdb_password}@{replica_host}/flowdb"
+            for replica_host in flowdb_replica_hosts
+        ],
         JWT_DECODE_AUDIENCE=flowapi_server_id,
     )
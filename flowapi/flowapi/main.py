@@ -3,6 +3,7 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 import rapidjson
 
+import itertools
 import uuid
 import sys
 
@@ -104,6 +105,14 @@ def close_zmq(exc):
 async def create_db():
     dsn = current_app.config["FLOWDB_DSN"]
     current_app.db_conn_pool = await asyncpg.create_pool(dsn, max_size=20)
+    # Pools for read replicas, which query results are streamed from when they have caught up
+    current_app.db_replica_pools = [
+        await asyncpg.create_pool(replica_dsn, max_size=20)
+        for replica_dsn in current_app.config["FLOWDB_REPLICA_DSNS"]
+    ]
+    current_app.db_replica_turn = itertools.cycle(
+        range(len(current_app.db_replica_pools))
+    )
 
 
 def create_app():
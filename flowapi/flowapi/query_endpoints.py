@@ -2,8 +2,21 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+from urllib.parse import urlencode
+
 from quart_jwt_extended import jwt_required, current_user
 from quart import Blueprint, current_app, request, url_for, stream_with_context
+from .result_pages import (
+    ResultSubset,
+    ResultSubsetError,
+    etag_matches,
+    fetch_next_cursor,
+    fetch_row_count,
+    get_result_column_types,
+    make_etag,
+    parse_result_subset_args,
+    parse_rows_range,
+)
 from .stream_results import stream_result_as_json, stream_result_as_csv
 
 blueprint = Blueprint("query", __name__)
@@ -230,6 +243,41 @@ async def get_query_result(query_id, filetype="json"):
               - json
               - geojson
               - csv
+        - in: query
+          name: columns
+          required: false
+          description: Comma-separated names of the columns to return (json and csv only).
+          schema:
+            type: string
+        - in: query
+          name: filter
+          required: false
+          description: Only return rows where a column has this value, given as <column>:<value>. Repeat to allow several values, or to filter on several columns (json and csv only).
+          schema:
+            type: array
+            items:
+              type: string
+          style: form
+          explode: true
+        - in: query
+          name: limit
+          required: false
+          description: Maximum number of rows to return. Results are returned in pages of this size, with a cursor for the next page (json and csv only).
+          schema:
+            type: integer
+            minimum: 1
+        - in: query
+          name: after
+          required: false
+          description: Cursor of the page to return, as given by the previous page.
+          schema:
+            type: string
+        - in: header
+          name: Range
+          required: false
+          description: Range of rows to return, of the form rows=<first>-[<last>] (json and csv only).
+          schema:
+            type: string
       responses:
         '200':
           content:
@@ -243,12 +291,43 @@ async def get_query_result(query_id, filetype="json"):
               schema:
                 type: string
           description: Results returning.
+          headers:
+            ETag:
+              description: Entity tag of the result
+              schema:
+                type: string
+            Link:
+              description: URL of the next page of results, if there is one
+              schema:
+                type: string
         '202':
           content:
             application/json:
               schema:
                 type: object
           description: Request accepted.
+        '206':
+          content:
+            application/json:
+              schema:
+                type: object
+            text/csv:
+              schema:
+                type: string
+          description: Range of results returning.
+          headers:
+            Content-Range:
+              description: Range of rows returned, and total number of rows
+              schema:
+                type: string
+        '304':
+          description: Results not modified.
+        '400':
+          content:
+            application/json:
+              schema:
+                type: object
+          description: Invalid columns, filters, page or range.
         '401':
           description: Unauthorized.
         '403':
@@ -259,6 +338,8 @@ async def get_query_result(query_id, filetype="json"):
           description: Token does not grant results access to this query or spatial aggregation unit.
         '404':
           description: Unknown ID
+        '416':
+          description: Range not satisfiable.
         '500':
           description: Server error.
       summary: Get the output of query
@@ -302,13 +383,104 @@ async def get_query_result(query_id, filetype="json"):
             return {"status": "error", "msg": reply["msg"]}, 500
     else:
         sql = reply["payload"]["sql"]
+        headers = {"Accept-Ranges": "rows"}
+        status_code = 200
+        additional_elements = {"query_id": query_id}
+        sql_args = ()
+        try:
+            subset_args = parse_result_subset_args(request.args)
+            rows_range = parse_rows_range(request.headers.get("Range", None))
+        except ResultSubsetError as exc:
+            return {"status": "Error", "msg": str(exc)}, 400
+        selecting = any(
+            (
+                subset_args["columns"] is not None,
+                len(subset_args["filters"]) > 0,
+                subset_args["limit"] is not None,
+                subset_args["after"] is not None,
+            )
+        )
+        if filetype == "geojson":
+            if selecting:
+                return (
+                    {
+                        "status": "Error",
+                        "msg": "Columns, filters and pages are only available for json and csv results.",
+                    },
+                    400,
+                )
+            rows_range = None
+        if rows_range is not None and subset_args["limit"] is not None:
+            return (
+                {"status": "Error", "msg": "Use either a limit or a range, not both."},
+                400,
+            )
+        # Selected parts of a result are returned in key order, so the same request
+        # always gets the same bytes. Whole results are streamed in whatever order
+        # the database returns them, so only get a weak entity tag.
+        ordered = selecting or rows_range is not None
+        etag = make_etag(query_id, filetype, request.args)
+        if not ordered:
+            etag = f"W/{etag}"
+        headers["ETag"] = etag
+        if etag_matches(etag, request.headers.get("If-None-Match", None)):
+            return "", 304, headers
+        if_range = request.headers.get("If-Range", None)
+        if rows_range is not None and if_range is not None and if_range != etag:
+            # The result has changed since the client got its earlier rows
+            rows_range = None
+        if ordered:
+            try:
+                subset = ResultSubset(
+                    sql,
+                    column_types=await get_result_column_types(sql),
+                    index_columns=reply["payload"].get("index_columns", []),
+                    columns=subset_args["columns"],
+                    filters=subset_args["filters"],
+                    after=subset_args["after"],
+                )
+            except ResultSubsetError as exc:
+                return {"status": "Error", "msg": str(exc)}, 400
+            sql_args = subset.args
+            if rows_range is not None:
+                first, last = rows_range
+                total = await fetch_row_count(subset)
+                if first >= total:
+                    headers["Content-Range"] = f"rows */{total}"
+                    return (
+                        {"status": "Error", "msg": "Range not satisfiable."},
+                        416,
+                        headers,
+                    )
+                last = total - 1 if last is None else min(last, total - 1)
+                sql = subset.rows_sql(offset=first, limit=last - first + 1)
+                status_code = 206
+                headers["Content-Range"] = f"rows {first}-{last}/{total}"
+            else:
+                limit = subset_args["limit"]
+                sql = subset.rows_sql(limit=limit)
+                if limit is not None:
+                    next_cursor = await fetch_next_cursor(subset, limit=limit)
+                    additional_elements["next"] = next_cursor
+                    if next_cursor is not None:
+                        args = [
+                            (key, value)
+                            for key in request.args.keys()
+                            for value in request.args.getlist(key)
+                            if key != "after"
+                        ] + [("after", next_cursor)]
+                        next_url = f"{request.path}?{urlencode(args)}"
+                        headers["Link"] = f'<{next_url}>; rel="next"'
+
         if filetype == "json":
             results_streamer = stream_with_context(stream_result_as_json)(
-                sql, additional_elements={"query_id": query_id}
+                sql, additional_elements=additional_elements, sql_args=sql_args
             )
             mimetype = "application/json"
         elif filetype == "csv":
-            results_streamer = stream_with_context(stream_result_as_csv)(sql)
+            results_streamer = stream_with_context(stream_result_as_csv)(
+                sql, sql_args=sql_args
+            )
             mimetype = "text/csv"
         elif filetype == "geojson":
             current_user.can_get_geography(
@@ -328,15 +500,76 @@ async def get_query_result(query_id, filetype="json"):
         )
         return (
             results_streamer,
-            200,
+            status_code,
             {
                 "Transfer-Encoding": "chunked",
                 "Content-Disposition": f"attachment;filename={query_id}.{filetype}",
                 "Content-type": mimetype,
+                **headers,
             },
         )
 
 
+@blueprint.route("/profile/<query_id>")
+@jwt_required
+async def get_query_profile(query_id):
+    """
+    Get the execution profile of a query.
+    ---
+    get:
+      parameters:
+        - in: path
+          name: query_id
+          required: true
+          schema:
+            type: string
+      responses:
+        '200':
+          description: Most recent execution profile of the query.
+          content:
+            application/json:
+              schema:
+                type: object
+                properties:
+                  query_id:
+                    type: string
+                  profile:
+                    type: object
+        '401':
+          description: Unauthorized.
+        '403':
+          content:
+            application/json:
+              schema:
+                type: object
+          description: Token does not grant access to query profiles.
+        '404':
+          description: Unknown ID, or the query has not been profiled.
+        '500':
+          description: Server error.
+      summary: Get the execution profile of a query
+    """
+    current_user.can_get_query_profiles()
+    request.socket.send_json(
+        {
+            "request_id": request.request_id,
+            "action": "get_query_profile",
+            "params": {"query_id": query_id},
+        }
+    )
+    reply = await request.socket.recv_json()
+    current_app.flowapi_logger.debug(
+        f"Received reply {reply}", request_id=request.request_id
+    )
+
+    if reply["status"] == "success":
+        return reply["payload"], 200
+    elif "query_state" in reply.get("payload", {}):
+        return {"status": "Error", "msg": reply["msg"]}, 404
+    else:
+        return {"status": "Error", "msg": reply["msg"]}, 500
+
+
 @blueprint.route("/available_dates")
 @jwt_required
 async def get_available_dates():
@@ -0,0 +1,532 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Selecting parts of a query result: columns, filtered rows, pages and ranges.
+
+Pages and ranges of rows are taken in order of the result's key, which is
+the query's index columns followed by the rest of its (orderable) columns,
+so every request for the same part of a result gets the same rows in the
+same order. Rows with the same key are told apart by their position among
+those rows, ordered by the text of their other columns. Pages are continued
+using a cursor holding the key and position of the last row of the previous
+page, so each page is found from the index rather than by skipping over all
+the earlier rows.
+"""
+import base64
+import hashlib
+import re
+from typing import Dict, List, Optional, Tuple
+
+import rapidjson as json
+from quart import current_app
+
+# Types which can't be (usefully) ordered by
+UNORDERABLE_TYPES = {"json", "geometry", "geography"}
+
+# Column holding each row's position among the rows with the same key
+POSITION_COLUMN = "__key_position"
+
+_ROWS_RANGE = re.compile(r"^rows=(\d+)-(\d*)$")
+
+
+class ResultSubsetError(Exception):
+    """
+    Raised when the requested part of a query result can't be selected.
+    """
+
+
+def parse_result_subset_args(args: "MultiDict") -> dict:
+    """
+    Read the columns, filters, page size and cursor from a request's
+    query string arguments.
+
+    Parameters
+    ----------
+    args : MultiDict
+        Query string arguments of the request
+
+    Returns
+    -------
+    dict
+        Dictionary with keys 'columns' (list of column names, or None for all
+        columns), 'filters' (dict mapping column names to lists of allowed
+        values), 'limit' (int or None) and 'after' (list of key values, or None)
+
+    Raises
+    ------
+    ResultSubsetError
+        If any of the arguments are invalid
+    """
+    columns = args.get("columns", None)
+    if columns is not None:
+        columns = [column.strip() for column in columns.split(",") if column.strip()]
+        if len(columns) == 0:
+            raise ResultSubsetError("At least one column must be selected.")
+    filters = {}
+    for column_filter in args.getlist("filter"):
+        column, sep, value = column_filter.partition(":")
+        if sep == "" or column == "":
+            raise ResultSubsetError(
+                f"Invalid filter '{column_filter}'. Filters must be of the form <column>:<value>."
+            )
+        filters.setdefault(column, []).append(value)
+    limit = args.get("limit", None)
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise ResultSubsetError("Limit must be a positive integer.")
+    after = args.get("after", None)
+    if after is not None:
+        after = decode_cursor(after)
+    return dict(columns=columns, filters=filters, limit=limit, after=after)
+
+
+def parse_rows_range(range_header: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    Read a range of rows from a Range header.
+
+    Parameters
+    ----------
+    range_header : str or None
+        Value of the Range header, e.g. 'rows=0-999' or 'rows=1000-'
+
+    Returns
+    -------
+    tuple of int, int or None
+        Index of the first row, and of the last row (or None for all remaining
+        rows). None if there is no range, or it isn't a range of rows.
+
+    Raises
+    ------
+    ResultSubsetError
+        If the range is a range of rows, but not a single valid one
+    """
+    if range_header is None or not range_header.strip().startswith("rows="):
+        return None
+    match = _ROWS_RANGE.match(range_header.replace(" ", ""))
+    if match is None:
+        raise ResultSubsetError(
+            f"Invalid range '{range_header}'. Ranges must be of the form rows=<first>-[<last>]."
+        )
+    first, last = match.groups()
+    first, last = int(first), (int(last) if last != "" else None)
+    if last is not None and last < first:
+        raise ResultSubsetError(f"Invalid range '{range_header}'.")
+    return first, last
+
+
+def encode_cursor(key: List) -> str:
+    """
+    Make a cursor pointing after the row with this key and position.
+
+    Parameters
+    ----------
+    key : list
+        Values of the key columns of the last row of a page, followed by
+        its position among the rows with the same key
+
+    Returns
+    -------
+    str
+        URL-safe cursor
+    """
+    key = [None if value is None else str(value) for value in key]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> List[Optional[str]]:
+    """
+    Get the key and position of the row a cursor points after.
+
+    Parameters
+    ----------
+    cursor : str
+        Cursor, as made by `encode_cursor`
+
+    Returns
+    -------
+    list of str or None
+        Values of the key columns and the position, as strings
+
+    Raises
+    ------
+    ResultSubsetError
+        If the cursor is invalid
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except Exception:
+        raise ResultSubsetError(f"Invalid cursor '{cursor}'.")
+    if not isinstance(key, list) or not all(
+        value is None or isinstance(value, str) for value in key
+    ):
+        raise ResultSubsetError(f"Invalid cursor '{cursor}'.")
+    return key
+
+
+def make_etag(query_id: str, filetype: str, args: "MultiDict") -> str:
+    """
+    Make the entity tag of a query result. Query ids are unique to the query
+    and the data it ran on, so the tag only depends on the query id, the file
+    type and the arguments selecting a part of the result.
+
+    Parameters
+    ----------
+    query_id : str
+    filetype : str
+    args : MultiDict
+        Query string arguments of the request
+
+    Returns
+    -------
+    str
+        Quoted entity tag
+    """
+    arguments = sorted(
+        (key, value)
+        for key in args.keys()
+        for value in args.getlist(key)
+        if key in ("columns", "filter", "limit", "after")
+    )
+    digest = hashlib.md5(
+        json.dumps([query_id, filetype, arguments]).encode()
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(etag: str, header: Optional[str]) -> bool:
+    """
+    Check whether an entity tag matches any of those in an If-None-Match
+    header, using weak comparison.
+
+    Parameters
+    ----------
+    etag : str
+        Quoted entity tag, optionally prefixed 'W/'
+    header : str or None
+        Value of the If-None-Match header
+
+    Returns
+    -------
+    bool
+    """
+    if header is None:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag.replace("W/", "") in [
+        tag.replace("W/", "") for tag in tags
+    ]
+
+
+async def get_result_column_types(sql_query: str) -> Dict[str, "asyncpg.types.Type"]:
+    """
+    Get the columns of a query result, and their types.
+
+    Parameters
+    ----------
+    sql_query : str
+        SQL query for the result
+
+    Returns
+    -------
+    dict
+        Mapping from column names to their types, in column order
+    """
+    async with current_app.db_conn_pool.acquire() as connection:
+        statement = await connection.prepare(sql_query)
+        return {
+            attribute.name: attribute.type for attribute in statement.get_attributes()
+        }
+
+
+def get_key_columns(
+    column_types: Dict[str, "asyncpg.types.Type"], index_columns: List[str]
+) -> List[str]:
+    """
+    Get the columns to order a result by: the index columns, then the rest of
+    the orderable columns.
+
+    Parameters
+    ----------
+    column_types : dict
+        Mapping from column names to their types
+    index_columns : list of str
+        Index columns of the result's cache table
+
+    Returns
+    -------
+    list of str
+    """
+    orderable = [
+        column
+        for column, column_type in column_types.items()
+        if column_type.name not in UNORDERABLE_TYPES
+    ]
+    return [column for column in index_columns if column in orderable] + [
+        column for column in orderable if column not in index_columns
+    ]
+
+
+def _quote(column: str) -> str:
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _cast(column_type: "asyncpg.types.Type") -> str:
+    return f"{_quote(column_type.schema)}.{_quote(column_type.name)}"
+
+
+class ResultSubset:
+    """
+    A part of a query result - some of its columns, and the rows matching
+    some filters - for which SQL can be made to get a page or a range of
+    its rows, or to count them.
+
+    Parameters
+    ----------
+    sql_query : str
+        SQL query for the whole result
+    column_types : dict
+        Mapping from column names of the result to their types
+    index_columns : list of str
+        Index columns of the result's cache table
+    columns : list of str, optional
+        Columns to select. Defaults to all columns.
+    filters : dict, optional
+        Mapping from column names to lists of values, selecting only the rows
+        where each column has one of its values
+    after : list, optional
+        Select only rows after the one with this key and position, as
+        decoded from a cursor
+
+    Raises
+    ------
+    ResultSubsetError
+        If any of the columns aren't in the result, or the cursor doesn't
+        match the result's key
+    """
+
+    def __init__(
+        self,
+        sql_query: str,
+        *,
+        column_types: Dict[str, "asyncpg.types.Type"],
+        index_columns: List[str],
+        columns: Optional[List[str]] = None,
+        filters: Optional[Dict[str, List[str]]] = None,
+        after: Optional[List[Optional[str]]] = None,
+    ):
+        if columns is None:
+            columns = list(column_types.keys())
+        if filters is None:
+            filters = {}
+        unknown_columns = [
+            column
+            for column in list(columns) + list(filters.keys())
+            if column not in column_types
+        ]
+        if len(unknown_columns) > 0:
+            raise ResultSubsetError(
+                f"Unknown columns {unknown_columns}. Columns are {list(column_types.keys())}."
+            )
+        self.key_columns = get_key_columns(column_types, index_columns)
+        if after is not None and (
+            len(after) != len(self.key_columns) + 1
+            or after[-1] is None
+            or not after[-1].isdigit()
+        ):
+            raise ResultSubsetError("Cursor doesn't match the query result.")
+
+        self.columns = columns
+        self.args = []
+        conditions = []
+        for column, values in filters.items():
+            self.args.append(values)
+            conditions.append(
+                f"{_quote(column)} = ANY((${len(self.args)}::text[])::{_cast(column_types[column])}[])"
+            )
+        position_conditions = []
+        if after is not None:
+            at_or_after, after_position = self._make_after_conditions(
+                column_types, after
+            )
+            if at_or_after is not None:
+                conditions.append(at_or_after)
+            position_conditions.append(after_position)
+        where = f" WHERE {' AND '.join(conditions)}" if len(conditions) > 0 else ""
+        window = []
+        if len(self.key_columns) > 0:
+            window.append(f"PARTITION BY {', '.join(map(_quote, self.key_columns))}")
+        tie_columns = [
+            column for column in column_types if column not in self.key_columns
+        ]
+        if len(tie_columns) > 0:
+            window.append(
+                f"ORDER BY {', '.join(f'{_quote(column)}::text' for column in tie_columns)}"
+            )
+        position_where = (
+            f" WHERE {position_conditions[0]}" if len(position_conditions) > 0 else ""
+        )
+        self.from_clause = (
+            f"FROM (SELECT *, row_number() OVER ({' '.join(window)}) AS {_quote(POSITION_COLUMN)} "
+            f"FROM ({sql_query.strip().rstrip(';')}) AS query_result{where}) AS query_result"
+            f"{position_where}"
+        )
+
+    def _make_after_conditions(
+        self, column_types: Dict[str, "asyncpg.types.Type"], after: List[Optional[str]],
+    ) -> Tuple[Optional[str], str]:
+        """
+        Make the conditions selecting the rows after a cursor's, adding the
+        cursor's values to the args.
+
+        The first selects the rows whose key is the same as or after the
+        cursor's, and so can be used from the index before the rows are
+        numbered. It is None if every row's key is. The second selects, from
+        those, the rows with a different key or a later position.
+
+        Key columns may have nulls, which sort after every other value, so
+        the first is spelled out column by column: a row is after the cursor
+        if its key matches the cursor's up to some column, and is after it in
+        that column. Comparing the keys as rows would give null (and so drop
+        the row) wherever either has a null.
+        """
+        *key, position = after
+        matches_so_far = []
+        cursor_values = []
+        alternatives = []
+        for column, value in zip(self.key_columns, key):
+            quoted = _quote(column)
+            if value is None:
+                # Nothing sorts after null
+                matches_so_far.append(f"{quoted} IS NULL")
+                cursor_values.append(f"NULL::{_cast(column_types[column])}")
+                continue
+            self.args.append(value)
+            placeholder = f"(${len(self.args)}::text)::{_cast(column_types[column])}"
+            alternatives.append(
+                "("
+                + " AND ".join(
+                    matches_so_far + [f"({quoted} > {placeholder} OR {quoted} IS NULL)"]
+                )
+                + ")"
+            )
+            matches_so_far.append(f"{quoted} = {placeholder}")
+            cursor_values.append(placeholder)
+        self.args.append(position)
+        after_position = (
+            f"{_quote(POSITION_COLUMN)} > (${len(self.args)}::text)::bigint"
+        )
+        if len(self.key_columns) == 0:
+            return None, after_position
+        alternatives.append(f"({' AND '.join(matches_so_far)})")
+        different_key = (
+            f"ROW({', '.join(map(_quote, self.key_columns))}) "
+            f"IS DISTINCT FROM ROW({', '.join(cursor_values)})"
+        )
+        return (
+            f"({' OR '.join(alternatives)})",
+            f"({different_key} OR {after_position})",
+        )
+
+    @property
+    def order_by(self) -> str:
+        # Ascending order puts nulls last, as _make_after_conditions expects
+        return (
+            f" ORDER BY {', '.join(map(_quote, self.key_columns + [POSITION_COLUMN]))}"
+        )
+
+    def rows_sql(self, *, offset: int = 0, limit: Optional[int] = None) -> str:
+        """
+        SQL to get rows of the subset, in key order.
+
+        Parameters
+        ----------
+        offset : int, default 0
+            Number of rows to skip
+        limit : int, optional
+            Maximum number of rows to get
+
+        Returns
+        -------
+        str
+        """
+        sql = f"SELECT {', '.join(map(_quote, self.columns))} {self.from_clause}{self.order_by}"
+        if offset > 0:
+            sql += f" OFFSET {int(offset)}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return sql
+
+    def count_sql(self) -> str:
+        """
+        SQL to count the rows of the subset.
+
+        Returns
+        -------
+        str
+        """
+        return f"SELECT count(*) {self.from_clause}"
+
+    def next_key_sql(self, *, limit: int) -> str:
+        """
+        SQL to get the key and position of the last row of a page, which has
+        a row (and so there is a next page) only if there are more rows after it.
+
+        Parameters
+        ----------
+        limit : int
+            Number of rows in the page
+
+        Returns
+        -------
+        str
+        """
+        return (
+            f"SELECT {', '.join(map(_quote, self.key_columns + [POSITION_COLUMN]))} "
+            f"{self.from_clause}{self.order_by}"
+            f" OFFSET {int(limit) - 1} LIMIT 2"
+        )
+
+
+async def fetch_next_cursor(subset: ResultSubset, *, limit: int) -> Optional[str]:
+    """
+    Get the cursor for the page of a result after the one starting at the
+    beginning of this subset.
+
+    Parameters
+    ----------
+    subset : ResultSubset
+    limit : int
+        Number of rows in a page
+
+    Returns
+    -------
+    str or None
+        The cursor, or None if this is the last page
+    """
+    async with current_app.db_conn_pool.acquire() as connection:
+        rows = await connection.fetch(subset.next_key_sql(limit=limit), *subset.args)
+    if len(rows) < 2:
+        return None
+    return encode_cursor(list(rows[0].values()))
+
+
+async def fetch_row_count(subset: ResultSubset) -> int:
+    """
+    Count the rows in a subset of a query result.
+
+    Parameters
+    ----------
+    subset : ResultSubset
+
+    Returns
+    -------
+    int
+    """
+    async with current_app.db_conn_pool.acquire() as connection:
+        return await connection.fetchval(subset.count_sql(), *subset.args)
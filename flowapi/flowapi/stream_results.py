@@ -4,12 +4,52 @@
 import csv
 from itertools import chain
 
+import asyncpg
 import rapidjson as json
 from quart import current_app, request
 
 
+async def get_read_pool(sql_query):
+    """
+    Get the connection pool to stream the result of a query from. Read replicas
+    are used in turn, but only if they have all the tables the query reads, so
+    results aren't read from a replica which is lagging behind the primary.
+    If no replica can be used, the pool for the primary is returned.
+
+    Parameters
+    ----------
+    sql_query : str
+        SQL query which will be streamed
+
+    Returns
+    -------
+    asyncpg.pool.Pool
+    """
+    logger = current_app.flowapi_logger
+    replica_pools = current_app.db_replica_pools
+    if len(replica_pools) > 0:
+        first = next(current_app.db_replica_turn)
+        for i in range(len(replica_pools)):
+            pool = replica_pools[(first + i) % len(replica_pools)]
+            try:
+                async with pool.acquire() as connection:
+                    # Preparing the query fails if the replica is missing any of its tables
+                    await connection.prepare(sql_query)
+                return pool
+            except asyncpg.UndefinedTableError:
+                logger.debug(
+                    "Replica doesn't have all tables yet.",
+                    request_id=request.request_id,
+                )
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning(
+                    f"Couldn't use replica: {e}", request_id=request.request_id
+                )
+    return current_app.db_conn_pool
+
+
 async def stream_result_as_json(
-    sql_query, result_name="query_result", additional_elements=None
+    sql_query, result_name="query_result", additional_elements=None, sql_args=()
 ):
     """
     Generate a JSON representation of a query result.
@@ -22,6 +62,8 @@ async def stream_result_as_json(
         Name of the JSON item containing the rows of the result
     additional_elements : dict
         Additional JSON elements to include along with the query result
+    sql_args : tuple
+        Arguments for the placeholders in the SQL query
 
     Yields
     ------
@@ -30,7 +72,7 @@ async def stream_result_as_json(
 
     """
     logger = current_app.flowapi_logger
-    db_conn_pool = current_app.db_conn_pool
+    db_conn_pool = await get_read_pool(sql_query)
     prefix = "{"
     if additional_elements:
         for key, value in additional_elements.items():
@@ -49,7 +91,7 @@ async def stream_result_as_json(
             logger.debug("Got transaction.", request_id=request.request_id)
             logger.debug(f"Running {sql_query}", request_id=request.request_id)
             try:
-                async for row in connection.cursor(sql_query):
+                async for row in connection.cursor(sql_query, *sql_args):
                     yield f"{prepend}{json.dumps(dict(row.items()), number_mode=json.NM_DECIMAL, datetime_mode=json.DM_ISO8601)}".encode()
                     prepend = ", "
                 logger.debug("Finishing up.", request_id=request.request_id)
@@ -69,7 +111,9 @@ class Line(object):
         return self._line.encode()
 
 
-async def stream_result_as_csv(sql_query, additional_elements=None, **kwargs):
+async def stream_result_as_csv(
+    sql_query, additional_elements=None, sql_args=(), **kwargs
+):
     """
     Generate a CSV representation of a query result.
 
@@ -79,6 +123,8 @@ async def stream_result_as_csv(sql_query, additional_elements=None, **kwargs):
         SQL query to stream output of
     additional_elements : dict
         Additional columns elements to include along with the query result
+    sql_args : tuple
+        Arguments for the placeholders in the SQL query
 
     Yields
     ------
@@ -87,7 +133,7 @@ async def stream_result_as_csv(sql_query, additional_elements=None, **kwargs):
 
     """
     logger = current_app.flowapi_logger
-    db_conn_pool = current_app.db_conn_pool
+    db_conn_pool = await get_read_pool(sql_query)
     logger.debug("Starting generator.", request_id=request.request_id)
     yield_header = True
     line = Line()
@@ -104,7 +150,7 @@ async def stream_result_as_csv(sql_query, additional_elements=None, **kwargs):
             logger.debug("Got transaction.", request_id=request.request_id)
             logger.debug(f"Running {sql_query}", request_id=request.request_id)
             try:
-                async for row in connection.cursor(sql_query):
+                async for row in connection.cursor(sql_query, *sql_args):
                     if yield_header:
                         writer.writerow(chain(row.keys(), additional_elements.keys()))
                         yield line.read()
@@ -187,6 +187,24 @@ class UserObject:
             actions=["get_result"], query_json=dict(query_kind="available_dates")
         )
 
+    def can_get_query_profiles(self) -> bool:
+        """
+        Returns true if the user can get the execution profiles of queries.
+
+        Returns
+        -------
+        bool
+            True if the user can get query profiles
+
+        Raises
+        ------
+        UserClaimsVerificationError
+            If the user cannot get query profiles
+        """
+        return self.has_access(
+            actions=["get_result"], query_json=dict(query_kind="query_profiles")
+        )
+
 
 def user_loader_callback(identity):
     """
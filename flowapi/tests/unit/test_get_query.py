@@ -2,8 +2,12 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
+import base64
+import itertools
 from json import loads
+from unittest.mock import MagicMock
 
+import asyncpg
 from tests.unit.zmq_helpers import ZMQReply
 
 import pytest
@@ -86,6 +90,64 @@ async def test_get_query(
     )
 
 
+@pytest.mark.parametrize(
+    "prepare_error, expected",
+    [
+        (None, b'{"query_id":"DUMMY_QUERY_ID", "query_result":[{"key":"replica"}]}'),
+        (
+            asyncpg.UndefinedTableError("Not replicated yet"),
+            b'{"query_id":"DUMMY_QUERY_ID", "query_result":[{"key":"primary"}]}',
+        ),
+        (
+            OSError("Replica unreachable"),
+            b'{"query_id":"DUMMY_QUERY_ID", "query_result":[{"key":"primary"}]}',
+        ),
+    ],
+)
+@pytest.mark.asyncio
+async def test_get_query_from_replica(
+    prepare_error, expected, app, access_token_builder, dummy_zmq_server, monkeypatch,
+):
+    """
+    Test that results are streamed from a read replica only if it has the tables the query reads.
+    """
+    replica_connection = MagicMock()
+    replica_connection.set_type_codec = CoroutineMock()
+    replica_connection.prepare = CoroutineMock(side_effect=prepare_error)
+    replica_connection.cursor.return_value.__aiter__.return_value = [{"key": "replica"}]
+    replica_pool = MagicMock()
+    replica_pool.acquire.return_value.__aenter__.return_value = replica_connection
+    monkeypatch.setattr(app.app, "db_replica_pools", [replica_pool])
+    monkeypatch.setattr(app.app, "db_replica_turn", itertools.cycle([0]))
+
+    primary_connection = MagicMock()
+    primary_connection.set_type_codec = CoroutineMock()
+    primary_connection.cursor.return_value.__aiter__.return_value = [{"key": "primary"}]
+    app.db_pool.acquire.return_value.__aenter__.return_value = primary_connection
+
+    monkeypatch.setattr(
+        "flowapi.user_model.UserObject.can_get_results_by_query_id",
+        CoroutineMock(return_value=True),
+    )
+    dummy_zmq_server.return_value = ZMQReply(
+        status="success",
+        payload={
+            "query_id": "DUMMY_QUERY_ID",
+            "query_state": "completed",
+            "sql": "SELECT * FROM cache.xDUMMY_QUERY_ID;",
+        },
+    )
+    response = await app.client.get(
+        f"/api/0/get/DUMMY_QUERY_ID",
+        headers={"Authorization": f"Bearer {access_token_builder({})}"},
+    )
+    reply = await response.get_data()
+    assert expected == reply
+    replica_connection.prepare.assert_called_with(
+        "SELECT * FROM cache.xDUMMY_QUERY_ID;"
+    )
+
+
 # FIXME: this test is very difficult to adjust and debug when things change
 # on the flowmachine side (e.g. in the structure of the zmq reply message).
 # It should probably be turned into an integration test, or we should rethink
@@ -173,3 +235,261 @@ async def test_get_error_message_without_query_state(
     json = await response.get_json()
     assert 500 == response.status_code
     assert "DUMMY_ERROR_MESSAGE" == json["msg"]
+
+
+def _mock_result_connection(rows, next_keys=(), row_count=0):
+    """
+    A mock db connection for a result with pcod (text, indexed) and value (int8) columns.
+    """
+    attributes = [
+        MagicMock(type=MagicMock(schema="pg_catalog")),
+        MagicMock(type=MagicMock(schema="pg_catalog")),
+    ]
+    for attribute, name, type_name in zip(
+        attributes, ["pcod", "value"], ["text", "int8"]
+    ):
+        attribute.name = name
+        attribute.type.name = type_name
+    connection = MagicMock()
+    connection.set_type_codec = CoroutineMock()
+    connection.prepare = CoroutineMock(
+        return_value=MagicMock(get_attributes=MagicMock(return_value=attributes))
+    )
+    connection.fetch = CoroutineMock(return_value=list(next_keys))
+    connection.fetchval = CoroutineMock(return_value=row_count)
+    connection.cursor.return_value.__aiter__.return_value = rows
+    return connection
+
+
+@pytest.fixture
+def result_reply(monkeypatch, dummy_zmq_server):
+    monkeypatch.setattr(
+        "flowapi.user_model.UserObject.can_get_results_by_query_id",
+        CoroutineMock(return_value=True),
+    )
+    dummy_zmq_server.return_value = ZMQReply(
+        status="success",
+        payload={
+            "query_id": "DUMMY_QUERY_ID",
+            "query_state": "completed",
+            "sql": "SELECT * FROM cache.xDUMMY_QUERY_ID",
+            "index_columns": ["pcod"],
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_query_page(app, access_token_builder, result_reply):
+    """
+    Test that a page of selected columns and rows is returned in key order, with a cursor for the next page.
+    """
+    connection = _mock_result_connection(
+        [{"pcod": "a"}, {"pcod": "b"}],
+        next_keys=[{"pcod": "b", "value": 2, "__key_position": 1}, {}],
+    )
+    app.db_pool.acquire.return_value.__aenter__.return_value = connection
+    response = await app.client.get(
+        f"/api/0/get/DUMMY_QUERY_ID?columns=pcod&filter=pcod:a&filter=pcod:b&limit=2",
+        headers={"Authorization": f"Bearer {access_token_builder({})}"},
+    )
+    reply = loads(await response.get_data())
+    assert 200 == response.status_code
+    assert [{"pcod": "a"}, {"pcod": "b"}] == reply["query_result"]
+    assert ["b", "2", "1"] == loads(base64.urlsafe_b64decode(reply["next"]))
+    assert (
+        f'</api/0/get/DUMMY_QUERY_ID?columns=pcod&filter=pcod%3Aa&filter=pcod%3Ab&limit=2&after={reply["next"]}>; rel="next"'
+        == response.headers["Link"]
+    )
+    connection.cursor.assert_called_with(
+        'SELECT "pcod" FROM (SELECT *, row_number() OVER (PARTITION BY "pcod", "value") AS "__key_position" '
+        "FROM (SELECT * FROM cache.xDUMMY_QUERY_ID) AS query_result "
+        'WHERE "pcod" = ANY(($1::text[])::"pg_catalog"."text"[])) AS query_result '
+        'ORDER BY "pcod", "value", "__key_position" LIMIT 2',
+        ["a", "b"],
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_query_page_after_null_key(app, access_token_builder, result_reply):
+    """
+    Test that pages continue past rows whose key has nulls, which sort last.
+    """
+    connection = _mock_result_connection(
+        [{"pcod": "b", "value": None}, {"pcod": None, "value": 1}],
+        next_keys=[
+            {"pcod": None, "value": 1, "__key_position": 1},
+            {"pcod": None, "value": None, "__key_position": 1},
+        ],
+    )
+    app.db_pool.acquire.return_value.__aenter__.return_value = connection
+    after = base64.urlsafe_b64encode(b'["a",null,"1"]').decode()
+    response = await app.client.get(
+        f"/api/0/get/DUMMY_QUERY_ID?limit=2&after={after}",
+        headers={"Authorization": f"Bearer {access_token_builder({})}"},
+    )
+    reply = loads(await response.get_data())
+    assert 200 == response.status_code
+    assert [None, "1", "1"] == loads(base64.urlsafe_b64decode(reply["next"]))
+    connection.cursor.assert_called_with(
+        'SELECT "pcod", "value" FROM (SELECT *, row_number() OVER (PARTITION BY "pcod", "value") AS "__key_position" '
+        "FROM (SELECT * FROM cache.xDUMMY_QUERY_ID) AS query_result "
+        'WHERE ((("pcod" > ($1::text)::"pg_catalog"."text" OR "pcod" IS NULL)) '
+        'OR ("pcod" = ($1::text)::"pg_catalog"."text" AND "value" IS NULL))) AS query_result '
+        'WHERE (ROW("pcod", "value") IS DISTINCT FROM ROW(($1::text)::"pg_catalog"."text", NULL::"pg_catalog"."int8") '
+        'OR "__key_position" > ($2::text)::bigint) '
+        'ORDER BY "pcod", "value", "__key_position" LIMIT 2',
+        "a",
+        "1",
+    )
+    connection.fetch.reset_mock()
+    after = reply["next"]
+    response = await app.client.get(
+        f"/api/0/get/DUMMY_QUERY_ID?limit=2&after={after}",
+        headers={"Authorization": f"Bearer {access_token_builder({})}"},
+    )
+    assert 200 == response.status_code
+    connection.fetch.assert_called_with(
+        'SELECT "pcod", "value", "__key_position" '
+        'FROM (SELECT *, row_number() OVER (PARTITION BY "pcod", "value") AS "__key_position" '
+        "FROM (SELECT * FROM cache.xDUMMY_QUERY_ID) AS query_result "
+        'WHERE (("pcod" IS NULL AND ("value" > ($1::text)::"pg_catalog"."int8" OR "value" IS NULL)) '
+        'OR ("pcod" IS NULL AND "value" = ($1::text)::"pg_catalog"."int8"))) AS query_result '
+        'WHERE (ROW("pcod", "value") IS DISTINCT FROM ROW(NULL::"pg_catalog"."text", ($1::text)::"pg_catalog"."int8") '
+        'OR "__key_position" > ($2::text)::bigint) '
+        'ORDER BY "pcod", "value", "__key_position" OFFSET 1 LIMIT 2',
+        "1",
+        "1",
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_query_page_after_duplicate_key(
+    app, access_token_builder, result_reply
+):
+    """
+    Test that pages split between rows with the same key continue from the last row's position among them.
+    """
+    connection = _mock_result_connection(
+        [{"pcod": "a", "value": 1}],
+        next_keys=[
+            {"pcod": "a", "value": 1, "__key_position": 1},
+            {"pcod": "a", "value": 1, "__key_position": 2},
+        ],
+    )
+    app.db_pool.acquire.return_value.__aenter__.return_value = connection
+    response = await app.client.get(
+        f"/api/0/get/DUMMY_QUERY_ID?limit=1",
+        headers={"Authorization": f"Bearer {access_token_builder({})}"},
+    )
+    reply = loads(await response.get_data())
+    assert 200 == response.status_code
+    assert ["a", "1", "1"] == loads(base64.urlsafe_b64decode(reply["next"]))
+    response = await app.client.get(
+        f"/api/0/get/DUMMY_QUERY_ID?limit=1&after={reply['next']}",
+        headers={"Authorization": f"Bearer {access_token_builder({})}"},
+    )
+    assert 200 == response.status_code
+    connection.cursor.assert_called_with(
+        'SELECT "pcod", "value" FROM (SELECT *, row_number() OVER (PARTITION BY "pcod", "value") AS "__key_position" '
+        "FROM (SELECT * FROM cache.xDUMMY_QUERY_ID) AS query_result "
+        'WHERE ((("pcod" > ($1::text)::"pg_catalog"."text" OR "pcod" IS NULL)) '
+        'OR ("pcod" = ($1::text)::"pg_catalog"."text" AND ("value" > ($2::text)::"pg_catalog"."int8" OR "value" IS NULL)) '
+        'OR ("pcod" = ($1::text)::"pg_catalog"."text" AND "value" = ($2::text)::"pg_catalog"."int8"))) AS query_result '
+        'WHERE (ROW("pcod", "value") IS DISTINCT FROM ROW(($1::text)::"pg_catalog"."text", ($2::text)::"pg_catalog"."int8") '
+        'OR "__key_position" > ($3::text)::bigint) '
+        'ORDER BY "pcod", "value", "__key_position" LIMIT 1',
+        "a",
+        "1",
+        "1",
+    )
+
+
+@pytest.mark.parametrize(
+    "args, msg",
+    [
+        ("columns=NOT_A_COLUMN", "Unknown columns ['NOT_A_COLUMN']"),
+        ("filter=pcod", "Invalid filter 'pcod'"),
+        ("limit=0", "Limit must be a positive integer."),
+        ("after=NOT_A_CURSOR", "Invalid cursor 'NOT_A_CURSOR'."),
+        ("limit=1&after=WyJhIiwiMSJd", "Cursor doesn't match the query result."),
+    ],
+)
+@pytest.mark.asyncio
+async def test_get_query_page_bad_args(
+    args, msg, app, access_token_builder, result_reply
+):
+    """
+    Test that invalid columns, filters or pages are rejected.
+    """
+    app.db_pool.acquire.return_value.__aenter__.return_value = _mock_result_connection(
+        []
+    )
+    response = await app.client.get(
+        f"/api/0/get/DUMMY_QUERY_ID?{args}",
+        headers={"Authorization": f"Bearer {access_token_builder({})}"},
+    )
+    assert 400 == response.status_code
+    assert (await response.get_json())["msg"].startswith(msg)
+
+
+@pytest.mark.parametrize(
+    "range_header, status_code, content_range",
+    [
+        ("rows=1-", 206, "rows 1-2/3"),
+        ("rows=1-10", 206, "rows 1-2/3"),
+        ("rows=3-", 416, "rows */3"),
+    ],
+)
+@pytest.mark.asyncio
+async def test_get_query_range(
+    range_header, status_code, content_range, app, access_token_builder, result_reply
+):
+    """
+    Test that ranges of rows are returned with their position in the whole result.
+    """
+    connection = _mock_result_connection(
+        [{"pcod": "b", "value": 2}, {"pcod": "c", "value": 3}], row_count=3
+    )
+    app.db_pool.acquire.return_value.__aenter__.return_value = connection
+    response = await app.client.get(
+        f"/api/0/get/DUMMY_QUERY_ID.csv",
+        headers={
+            "Authorization": f"Bearer {access_token_builder({})}",
+            "Range": range_header,
+        },
+    )
+    await response.get_data()
+    assert status_code == response.status_code
+    assert content_range == response.headers["Content-Range"]
+    if status_code == 206:
+        connection.cursor.assert_called_with(
+            'SELECT "pcod", "value" FROM (SELECT *, row_number() OVER (PARTITION BY "pcod", "value") AS "__key_position" '
+            "FROM (SELECT * FROM cache.xDUMMY_QUERY_ID) AS query_result) AS query_result "
+            'ORDER BY "pcod", "value", "__key_position" OFFSET 1 LIMIT 2'
+        )
+
+
+@pytest.mark.asyncio
+async def test_get_query_not_modified(app, access_token_builder, result_reply):
+    """
+    Test that a result is not sent again if the client already has it.
+    """
+    app.db_pool.acquire.return_value.__aenter__.return_value = _mock_result_connection(
+        []
+    )
+    token = access_token_builder({})
+    response = await app.client.get(
+        f"/api/0/get/DUMMY_QUERY_ID?limit=5",
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    etag = response.headers["ETag"]
+    response = await app.client.get(
+        f"/api/0/get/DUMMY_QUERY_ID?limit=5",
+        headers={"Authorization": f"Bearer {token}", "If-None-Match": etag},
+    )
+    assert 304 == response.status_code
+    response = await app.client.get(
+        f"/api/0/get/DUMMY_QUERY_ID?limit=6",
+        headers={"Authorization": f"Bearer {token}", "If-None-Match": etag},
+    )
+    assert 200 == response.status_code
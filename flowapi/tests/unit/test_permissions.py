@@ -30,10 +30,15 @@ def test_valid_tree_walks(tree, expected):
 @pytest.mark.parametrize(
     "tree, expected",
     [
-        ({}, ["get_result&available_dates"]),
+        ({}, ["get_result&available_dates", "get_result&query_profiles"]),
         (
             {"properties": {"query_kind": {"enum": ["dummy"]}}},
-            ["get_result&dummy", "run&dummy", "get_result&available_dates"],
+            [
+                "get_result&dummy",
+                "run&dummy",
+                "get_result&available_dates",
+                "get_result&query_profiles",
+            ],
         ),
         (
             {
@@ -48,12 +53,18 @@ def test_valid_tree_walks(tree, expected):
                 "get_result&dummy.aggregation_unit.DUMMY_UNIT_2",
                 "run&dummy.aggregation_unit.DUMMY_UNIT_2",
                 "get_result&available_dates",
+                "get_result&query_profiles",
             ],
         ),
-        ({"oneOf": []}, ["get_result&available_dates"]),
+        ({"oneOf": []}, ["get_result&available_dates", "get_result&query_profiles"]),
         (
             {"oneOf": [{"properties": {"query_kind": {"enum": ["dummy"]}}}]},
-            ["get_result&dummy", "run&dummy", "get_result&available_dates"],
+            [
+                "get_result&dummy",
+                "run&dummy",
+                "get_result&available_dates",
+                "get_result&query_profiles",
+            ],
         ),
         (
             {
@@ -72,6 +83,7 @@ def test_valid_tree_walks(tree, expected):
                 "get_result&dummy.dummy_param.nested_dummy",
                 "run&dummy.dummy_param.nested_dummy",
                 "get_result&available_dates",
+                "get_result&query_profiles",
             ],
         ),
         (
@@ -94,6 +106,7 @@ def test_valid_tree_walks(tree, expected):
                 "get_result&dummy.dummy_param.nested_dummy",
                 "run&dummy.dummy_param.nested_dummy",
                 "get_result&available_dates",
+                "get_result&query_profiles",
             ],
         ),
         (
@@ -132,6 +145,7 @@ def test_valid_tree_walks(tree, expected):
                 "get_result&dummy.dummy_param.nested_dummy.aggregation_unit.DUMMY_UNIT_2&dummy.dummy_param_2.nested_dummy_2.aggregation_unit.DUMMY_UNIT_3",
                 "run&dummy.dummy_param.nested_dummy.aggregation_unit.DUMMY_UNIT_2&dummy.dummy_param_2.nested_dummy_2.aggregation_unit.DUMMY_UNIT_3",
                 "get_result&available_dates",
+                "get_result&query_profiles",
             ],
         ),
     ],
@@ -0,0 +1,64 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import pytest
+from asynctest import return_once
+
+from tests.unit.zmq_helpers import ZMQReply
+
+
+@pytest.mark.asyncio
+async def test_get_query_profile(app, access_token_builder, dummy_zmq_server):
+    """
+    Test that the profile of a query is returned.
+    """
+    token = access_token_builder(["get_result&query_profiles"])
+    payload = {
+        "query_id": "DUMMY_QUERY_ID",
+        "profile": {"query_id": "DUMMY_QUERY_ID", "execution_time": 1.0},
+    }
+    dummy_zmq_server.side_effect = return_once(
+        ZMQReply(status="success", payload=payload)
+    )
+    response = await app.client.get(
+        f"/api/0/profile/DUMMY_QUERY_ID", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+    assert await response.json == payload
+
+
+@pytest.mark.parametrize("query_state", ["awol", "completed"])
+@pytest.mark.asyncio
+async def test_get_query_profile_not_found(
+    query_state, app, access_token_builder, dummy_zmq_server
+):
+    """
+    Test that a 404 is returned for unknown queries, and queries which haven't been profiled.
+    """
+    token = access_token_builder(["get_result&query_profiles"])
+    dummy_zmq_server.side_effect = return_once(
+        ZMQReply(
+            status="error",
+            msg="DUMMY_ERROR",
+            payload={"query_id": "DUMMY_QUERY_ID", "query_state": query_state},
+        )
+    )
+    response = await app.client.get(
+        f"/api/0/profile/DUMMY_QUERY_ID", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_query_profile_needs_access(
+    app, access_token_builder, dummy_zmq_server
+):
+    """
+    Test that query profiles can't be fetched without the query_profiles scope.
+    """
+    token = access_token_builder(["get_result&available_dates"])
+    response = await app.client.get(
+        f"/api/0/profile/DUMMY_QUERY_ID", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 403
@@ -745,6 +745,7 @@ def unique_subscriber_counts_spec(
     geom_table: Optional[str] = None,
     geom_table_join_column: Optional[str] = None,
     event_types: Optional[List[str]] = None,
+    error_bound: Optional[float] = None,
 ) -> dict:
     """
     Return query spec for unique subscriber counts
@@ -760,6 +761,10 @@ def unique_subscriber_counts_spec(
     event_types : list of {"calls", "sms", "mds", "topups"}, optional
         Optionally, include only a subset of event types (for example: ["calls", "sms"]).
         If None, include all event types in the query.
+    error_bound : float, optional
+        If given, count subscribers approximately, with a relative standard
+        error no larger than this (between 0.005 and 0.5). Approximate counts
+        are much faster for long periods. If None, count subscribers exactly.
 
     Returns
     -------
@@ -775,6 +780,7 @@ def unique_subscriber_counts_spec(
         "geom_table": geom_table,
         "geom_table_join_column": geom_table_join_column,
         "event_types": event_types,
+        "error_bound": error_bound,
     }
 
 
@@ -796,6 +802,10 @@ def unique_subscriber_counts(*, connection: Connection, **kwargs) -> APIQuery:
     event_types : list of {"calls", "sms", "mds", "topups"}, optional
         Optionally, include only a subset of event types (for example: ["calls", "sms"]).
         If None, include all event types in the query.
+    error_bound : float, optional
+        If given, count subscribers approximately, with a relative standard
+        error no larger than this (between 0.005 and 0.5). Approximate counts
+        are much faster for long periods. If None, count subscribers exactly.
 
     Returns
     -------
@@ -6,10 +6,9 @@ import logging
 import re
 from asyncio import sleep
 
-import pandas as pd
 import requests
-from typing import Tuple, Union, List, Optional
-from tqdm.auto import tqdm
+from typing import Dict, Tuple, Union, List, Optional
+from urllib.parse import urlencode
 
 
 import flowclient.errors
@@ -170,6 +169,8 @@ async def wait_for_query_to_be_ready(
     )  # Poll the server
 
     if not query_ready:
+        from tqdm.auto import tqdm
+
         progress = reply.json()["progress"]
         total_eligible = progress["eligible"]
         completed = 0
@@ -243,9 +244,57 @@ async def get_result_location_from_id_when_ready(
     )  # strip off the /api/<api_version>/
 
 
+def _make_result_route(
+    location: str,
+    *,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Dict[str, Union[str, List[str]]]] = None,
+    page_size: Optional[int] = None,
+    after: Optional[str] = None,
+) -> str:
+    """
+    Add the arguments selecting part of a query result to a result's route.
+
+    Parameters
+    ----------
+    location : str
+        API endpoint of the result
+    columns : list of str, optional
+        Columns to get
+    filters : dict, optional
+        Mapping from column names to a value, or list of values, to get rows for
+    page_size : int, optional
+        Number of rows to get per request
+    after : str, optional
+        Cursor of the page to get
+
+    Returns
+    -------
+    str
+        Route for the selected part of the result
+    """
+    args = []
+    if columns is not None:
+        args.append(("columns", ",".join(columns)))
+    for column, values in (filters or {}).items():
+        if isinstance(values, str) or not isinstance(values, (list, tuple, set)):
+            values = [values]
+        args += [("filter", f"{column}:{value}") for value in values]
+    if page_size is not None:
+        args.append(("limit", page_size))
+    if after is not None:
+        args.append(("after", after))
+    return location if len(args) == 0 else f"{location}?{urlencode(args)}"
+
+
 async def get_json_dataframe(
-    *, connection: ASyncConnection, location: str
-) -> pd.DataFrame:
+    *,
+    connection: ASyncConnection,
+    location: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Dict[str, Union[str, List[str]]]] = None,
+    page_size: Optional[int] = None,
+) -> "pandas.DataFrame":
     """
     Get a dataframe from a json source.
 
@@ -255,6 +304,15 @@ async def get_json_dataframe(
         API connection  to use
     location : str
         API enpoint to retrieve json from
+    columns : list of str, optional
+        Only get these columns of the result
+    filters : dict, optional
+        Only get the rows of the result where the columns named in the keys
+        have the value (or one of the list of values) given, e.g.
+        `{"pcod": ["524 1 01 04", "524 1 02 09"]}`
+    page_size : int, optional
+        If given, get the result in pages of this many rows, instead of in
+        a single response
 
     Returns
     -------
@@ -262,20 +320,39 @@ async def get_json_dataframe(
         Dataframe containing the result
 
     """
-
-    response = await connection.get_url(route=location)
-    if response.status_code != 200:
-        try:
-            msg = response.json()["msg"]
-            more_info = f" Reason: {msg}"
-        except KeyError:
-            more_info = ""
-        raise flowclient.errors.FlowclientConnectionError(
-            f"Could not get result. API returned with status code: {response.status_code}.{more_info}"
+    route = _make_result_route(
+        location, columns=columns, filters=filters, page_size=page_size
+    )
+    records = []
+    while route is not None:
+        response = await connection.get_url(route=route)
+        if response.status_code != 200:
+            try:
+                msg = response.json()["msg"]
+                more_info = f" Reason: {msg}"
+            except KeyError:
+                more_info = ""
+            raise flowclient.errors.FlowclientConnectionError(
+                f"Could not get result. API returned with status code: {response.status_code}.{more_info}"
+            )
+        result = response.json()
+        logger.info(f"Got {connection.url}/api/{connection.api_version}/{route}")
+        records += result["query_result"]
+        next_page = result.get("next", None)
+        route = (
+            None
+            if next_page is None
+            else _make_result_route(
+                location,
+                columns=columns,
+                filters=filters,
+                page_size=page_size,
+                after=next_page,
+            )
         )
-    result = response.json()
-    logger.info(f"Got {connection.url}/api/{connection.api_version}/{location}")
-    return pd.DataFrame.from_records(result["query_result"])
+    import pandas as pd
+
+    return pd.DataFrame.from_records(records)
 
 
 async def get_geojson_result_by_query_id(
@@ -331,7 +408,10 @@ async def get_result_by_query_id(
     query_id: str,
     poll_interval: int = 1,
     disable_progress: Optional[bool] = None,
-) -> pd.DataFrame:
+    columns: Optional[List[str]] = None,
+    filters: Optional[Dict[str, Union[str, List[str]]]] = None,
+    page_size: Optional[int] = None,
+) -> "pandas.DataFrame":
     """
     Get a query by id, and return it as a dataframe
 
@@ -346,6 +426,14 @@ async def get_result_by_query_id(
     disable_progress : bool, async default None
         Set to True to disable progress bar display entirely, None to disable on
         non-TTY, or False to always enable
+    columns : list of str, optional
+        Only get these columns of the result
+    filters : dict, optional
+        Only get the rows of the result where the columns named in the keys
+        have the value (or one of the list of values) given
+    page_size : int, optional
+        If given, get the result in pages of this many rows, instead of in
+        a single response
 
     Returns
     -------
@@ -359,7 +447,13 @@ async def get_result_by_query_id(
         poll_interval=poll_interval,
         disable_progress=disable_progress,
     )
-    return await get_json_dataframe(connection=connection, location=result_endpoint)
+    return await get_json_dataframe(
+        connection=connection,
+        location=result_endpoint,
+        columns=columns,
+        filters=filters,
+        page_size=page_size,
+    )
 
 
 async def get_geojson_result(
@@ -399,7 +493,7 @@ async def get_result(
     connection: ASyncConnection,
     query_spec: dict,
     disable_progress: Optional[bool] = None,
-) -> pd.DataFrame:
+) -> "pandas.DataFrame":
     """
     Run and retrieve a query of a specified kind with parameters.
 
@@ -223,6 +223,36 @@ async def test_get_json_dataframe():
     ).values.tolist() == [[1]]
 
 
+@pytest.mark.asyncio
+async def test_get_json_dataframe_pages():
+    """ Test that get_json_dataframe follows the pages of a result. """
+    con_mock = AMock()
+    con_mock.get_url = CoroutineMock(
+        side_effect=[
+            Mock(
+                status_code=200,
+                json=Mock(return_value=dict(query_result=[{"0": 1}], next="CURSOR")),
+            ),
+            Mock(
+                status_code=200,
+                json=Mock(return_value=dict(query_result=[{"0": 2}], next=None)),
+            ),
+        ]
+    )
+    df = await get_json_dataframe(
+        connection=con_mock,
+        location="foo",
+        columns=["0"],
+        filters={"pcod": ["a", "b"]},
+        page_size=1,
+    )
+    assert df.values.tolist() == [[1], [2]]
+    assert [kwargs["route"] for _, kwargs in con_mock.get_url.call_args_list] == [
+        "foo?columns=0&filter=pcod%3Aa&filter=pcod%3Ab&limit=1",
+        "foo?columns=0&filter=pcod%3Aa&filter=pcod%3Ab&limit=1&after=CURSOR",
+    ]
+
+
 @pytest.mark.asyncio
 async def test_get_json_dataframe_raises():
     """ Test that get_json_dataframe raises an error. """
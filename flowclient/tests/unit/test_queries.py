@@ -61,6 +61,33 @@ def test_get_result_by_id(token):
     assert "foo" == df.name[0]
 
 
+def test_get_result_by_id_selecting_rows(token):
+    """
+    Test requesting columns and rows of a query by id adds them to the result route.
+    """
+    connection_mock = Mock()
+    connection_mock.get_url.return_value.json.return_value = {
+        "query_id": "99",
+        "query_result": [{"name": "foo"}],
+    }
+    type(connection_mock.get_url.return_value).status_code = PropertyMock(
+        side_effect=(303, 200)
+    )
+    connection_mock.get_url.return_value.headers = {"Location": "/api/0/foo/Test"}
+
+    df = get_result_by_query_id(
+        connection=connection_mock,
+        query_id="99",
+        columns=["name"],
+        filters={"name": "foo"},
+    )
+    assert (
+        call(route="foo/Test?columns=name&filter=name%3Afoo")
+        in connection_mock.get_url.call_args_list
+    )
+    assert "foo" == df.name[0]
+
+
 @pytest.mark.parametrize("http_code", [401, 404, 418, 400])
 def test_get_result_by_id_error(monkeypatch, http_code, token):
     """
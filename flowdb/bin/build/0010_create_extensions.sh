@@ -13,8 +13,8 @@ set -e
 export PGUSER="$POSTGRES_USER"
 EXTENSIONS=('postgis' 'postgis_raster' 'postgis_topology' 'fuzzystrmatch' \
             'file_fdw' 'uuid-ossp' 'plpython3u' \
-            'tsm_system_rows' 'pgrouting' 'pldbgapi' 'pg_median_utils'\
-            'ogr_fdw' 'tds_fdw')
+            'tsm_system_rows' 'pgrouting' 'pldbgapi' 'pg_median_utils' 'btree_gist'\
+            'ogr_fdw' 'tds_fdw' 'hll')
 
 #
 #  Create the 'template_postgis' template db
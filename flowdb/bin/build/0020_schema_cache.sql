@@ -26,6 +26,8 @@ CREATE TABLE IF NOT EXISTS cache.cached
                                 schema CHARACTER VARYING,
                                 tablename CHARACTER VARYING,
                                 obj BYTEA,
+                                access_history TIMESTAMP WITH TIME ZONE[] DEFAULT '{}',
+                                gdsf_inflation NUMERIC DEFAULT 0,
                                 CONSTRAINT cache_pkey PRIMARY KEY (query_id)
                             );
 /* Sequence counting total number of retrievals from cache */
@@ -45,7 +47,42 @@ CREATE TABLE IF NOT EXISTS cache.dependencies
                                     ON DELETE CASCADE
                             );
 
+/* Profiles of query execution, recorded when flowmachine query profiling is enabled.
+   Times are in milliseconds. */
+CREATE TABLE IF NOT EXISTS cache.query_profiles
+                            (
+                                query_id CHARACTER(32) NOT NULL,
+                                class CHARACTER VARYING,
+                                profiled_at TIMESTAMP WITH TIME ZONE NOT NULL,
+                                queued_time NUMERIC,
+                                sql_generation_time NUMERIC,
+                                execution_time NUMERIC,
+                                planning_time NUMERIC,
+                                plan_execution_time NUMERIC,
+                                rows BIGINT,
+                                shared_blocks_hit BIGINT,
+                                shared_blocks_read BIGINT,
+                                temp_blocks_written BIGINT,
+                                temp_bytes_written BIGINT,
+                                plans JSONB
+                            );
+CREATE INDEX IF NOT EXISTS query_profiles_query_id_idx ON cache.query_profiles (query_id, profiled_at);
+
+/* History of the queries requested through the flowmachine server, used to choose
+   queries to compute ahead of demand. Unlike the cache metadata, this is kept
+   when the cache is reset. compute_time is in milliseconds. */
+CREATE TABLE IF NOT EXISTS cache.query_history
+                            (
+                                query_id CHARACTER(32) PRIMARY KEY,
+                                query_params JSONB NOT NULL,
+                                request_count BIGINT NOT NULL DEFAULT 1,
+                                first_requested TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+                                last_requested TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+                                compute_time NUMERIC
+                            );
+
 CREATE TABLE cache.cache_config (key text, value text);
 INSERT INTO cache.cache_config (key, value) VALUES ('half_life', NULL);
 INSERT INTO cache.cache_config (key, value) VALUES ('cache_size', NULL);
-INSERT INTO cache.cache_config (key, value) VALUES ('cache_protected_period', NULL);
\ No newline at end of file
+INSERT INTO cache.cache_config (key, value) VALUES ('cache_protected_period', NULL);
+INSERT INTO cache.cache_config (key, value) VALUES ('gdsf_inflation', '0');
\ No newline at end of file
@@ -0,0 +1,42 @@
+/*
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+*/
+
+/*
+CUBES -----------------------------------------------------
+
+This schema holds pre-aggregated summaries of the events
+tables, which FlowETL can build for each ingested day, and
+which flowmachine uses to answer aggregate queries without
+reading the events.
+
+  - location_events:        the number of events, and a
+                            HyperLogLog sketch of the
+                            subscribers, for each cdr type,
+                            hour, cell and direction.
+                            Each day's cube for a cdr type
+                            is a child table, named
+                            location_events_<cdr type>_<YYYYMMDD>.
+
+-----------------------------------------------------------
+*/
+CREATE SCHEMA IF NOT EXISTS cubes;
+
+    CREATE TABLE IF NOT EXISTS cubes.location_events(
+
+        cdr_type TEXT NOT NULL,
+        datetime TIMESTAMPTZ NOT NULL,
+        location_id TEXT,
+        outgoing BOOLEAN,
+
+        event_count BIGINT NOT NULL,
+        subscribers HLL
+
+        );
+
+    COMMENT ON TABLE cubes.location_events
+            IS 'Hourly event counts and subscriber sketches per cell, with one child table '
+               'per cdr type and ingested day. datetime is the start of the hour, and outgoing '
+               'is null for cdr types without a direction.';
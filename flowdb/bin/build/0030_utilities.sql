@@ -283,7 +283,8 @@ $$
   UPDATE cache.cached SET last_accessed = NOW(), access_count = access_count + 1,
         cache_score_multiplier = CASE WHEN class='Table' THEN 0 ELSE
           cache_score_multiplier+POWER(1 + ln(2) / cache_half_life(), nextval('cache.cache_touches') - 2)
-        END
+        END,
+        gdsf_inflation = cache_gdsf_inflation()
         WHERE query_id=cached_query_id
         RETURNING cache_score(cache_score_multiplier, compute_time, greatest(table_size(tablename, schema), 0.00001)) INTO score;
         IF NOT FOUND THEN RAISE EXCEPTION 'Cache record % not found', cached_query_id;
@@ -311,6 +312,114 @@ $$ LANGUAGE plpgsql
 SECURITY DEFINER
 SET search_path = public, pg_temp;
 
+/*********************************
+### record_cache_access ###
+
+Record a batch of accesses to a cached query, updating the access count, most recent access time,
+history of recent access times (keeping at most history_length of them) and cache score as if
+touch_cache had been called once per access. Returns the new cache score, or NULL if no cached
+query with that id exists (e.g. because it was removed after the accesses were made).
+
+***********************************/
+
+CREATE OR REPLACE FUNCTION record_cache_access(IN cached_query_id TEXT, IN times_accessed INTEGER,
+                                               IN accessed_at TIMESTAMP WITH TIME ZONE[], IN history_length INTEGER)
+	RETURNS float AS
+$$
+  DECLARE score float;
+  DECLARE cached_class TEXT;
+  DECLARE touch_weight float;
+  BEGIN
+  SELECT class INTO cached_class FROM cache.cached WHERE query_id=cached_query_id;
+  IF NOT FOUND THEN RETURN NULL;
+  END IF;
+  IF cached_class = 'Table' THEN
+    touch_weight := 0;
+  ELSE
+    SELECT SUM(POWER(1 + ln(2) / cache_half_life(), nextval('cache.cache_touches') - 2)) INTO touch_weight
+        FROM generate_series(1, times_accessed);
+  END IF;
+  UPDATE cache.cached SET last_accessed = GREATEST(last_accessed, (SELECT max(t) FROM unnest(accessed_at) t)),
+        access_count = access_count + times_accessed,
+        access_history = ARRAY(
+          SELECT t FROM unnest(accessed_at || access_history) t ORDER BY t DESC LIMIT history_length
+        ),
+        cache_score_multiplier = CASE WHEN class='Table' THEN 0 ELSE
+          cache_score_multiplier + COALESCE(touch_weight, 0)
+        END,
+        gdsf_inflation = cache_gdsf_inflation()
+        WHERE query_id=cached_query_id
+        RETURNING cache_score(cache_score_multiplier, compute_time, greatest(table_size(tablename, schema), 0.00001)) INTO score;
+  RETURN score;
+  END
+$$ LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, pg_temp;
+
+/*********************************
+### recompute_time ###
+
+Estimate the time in ms needed to recompute a cached query from scratch, as the sum of its own
+compute time and the compute times of every cached query it depends on, directly or transitively.
+
+***********************************/
+
+CREATE OR REPLACE FUNCTION recompute_time(IN cached_query_id TEXT)
+	RETURNS numeric AS
+$$
+  DECLARE total_time numeric;
+  BEGIN
+  WITH RECURSIVE upstream(query_id) AS (
+      SELECT cached_query_id::CHARACTER(32)
+    UNION
+      SELECT dependencies.depends_on FROM cache.dependencies
+        JOIN upstream ON dependencies.query_id = upstream.query_id
+  )
+  SELECT COALESCE(SUM(compute_time), 0) INTO total_time
+      FROM cache.cached JOIN upstream USING (query_id);
+  RETURN total_time;
+  END
+$$ LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, pg_temp;
+
+/*********************************
+### gdsf_score ###
+
+Calculate a Greedy-Dual-Size-Frequency priority from the inflation value at the most recent access,
+the access count, recompute time in ms and the size of the table.
+
+***********************************/
+
+CREATE OR REPLACE FUNCTION gdsf_score(IN inflation numeric, IN access_count numeric, IN recompute_time numeric, IN tablesize double precision)
+	RETURNS float AS
+$$
+  BEGIN
+  RETURN inflation + access_count*((recompute_time/1000)/greatest(tablesize, 0.00001));
+  END
+$$ LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, pg_temp;
+
+/*
+cache_gdsf_inflation
+
+Returns the current Greedy-Dual-Size-Frequency inflation value, which is the priority of the
+most recent cache entry removed under that policy.
+ */
+
+CREATE OR REPLACE FUNCTION cache_gdsf_inflation()
+	RETURNS numeric AS
+$$
+  DECLARE inflation numeric;
+  BEGIN
+  SELECT value INTO inflation FROM cache.cache_config WHERE key='gdsf_inflation';
+  RETURN COALESCE(inflation, 0);
+  END
+$$ LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public, pg_temp;
+
 /*
 cache_protected_period
 
@@ -16,6 +16,8 @@ with placeholder fields:
 - `gendate` (Run time stamp of this script)
 - `stats_target` (default_statistics_target)
 - `use_jit` (enable/disable jit)
+- `enable_outdb_rasters` (allow rasters stored outside the database, e.g. loaded with `raster2pgsql -R`)
+- `gdal_enabled_drivers` (GDAL drivers PostGIS may use to read out-db rasters)
 """
 
 import datetime
@@ -66,6 +68,11 @@ effective_cache_size = os.getenv(
     "EFFECTIVE_CACHE_SIZE", _humansize(ceil(0.75 * total_mem))
 )
 use_jit = "off" if bool_env("NO_USE_JIT") else "on"
+enable_outdb_rasters = "on" if bool_env("POSTGIS_ENABLE_OUTDB_RASTERS") else "off"
+gdal_enabled_drivers = os.getenv(
+    "POSTGIS_GDAL_ENABLED_DRIVERS",
+    "ENABLE_ALL" if enable_outdb_rasters == "on" else "DISABLE_ALL",
+)
 stats_target = int(
     os.getenv("STATS_TARGET", 10000)
 )  # Default to higher than pg default
@@ -89,6 +96,8 @@ with open("/docker-entrypoint-initdb.d/pg_config_template.conf") as fin:
         gendate=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         stats_target=stats_target,
         use_jit=use_jit,
+        enable_outdb_rasters=enable_outdb_rasters,
+        gdal_enabled_drivers=gdal_enabled_drivers,
     )
 
 print("Writing config file to", config_path)
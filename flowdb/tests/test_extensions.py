@@ -21,8 +21,10 @@ import pytest
         "pgrouting",
         "pldbgapi",
         "pg_median_utils",
+        "btree_gist",
         "ogr_fdw",
         "tds_fdw",
+        "hll",
     ],
 )
 def test_extension_available(pg_available_extensions, extension):
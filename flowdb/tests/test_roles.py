@@ -33,6 +33,11 @@ def test_tables(env):
                 events.calls_20160101 ()
                 INHERITS (events.calls)
             """,
+        "cubes.location_events_calls_20160101": """
+            CREATE TABLE IF NOT EXISTS
+                cubes.location_events_calls_20160101 ()
+                INHERITS (cubes.location_events)
+            """,
         "routing.foo": """
             CREATE TABLE IF NOT EXISTS
                 routing.foo ()
@@ -101,6 +106,22 @@ def test_select_new_events(cursor, user):
     cursor.execute("SELECT * FROM events.calls_20160101;")
 
 
+@pytest.mark.skip_usrs(["flowapi"])
+def test_select_cubes(cursor, user):
+    """Role can read the daily cubes."""
+    cursor.execute("SELECT * FROM cubes.location_events_calls_20160101;")
+
+
+def test_cannot_create_cubes(cursor):
+    """Role cannot create tables in the cubes schema."""
+    with pytest.raises(pg.ProgrammingError):
+        cursor.execute(
+            """
+            CREATE TABLE cubes.location_events_calls_20160102 () INHERITS (cubes.location_events)
+        """
+        )
+
+
 @pytest.mark.skip_usrs(["flowmachine"])
 def test_cannot_select_events(cursor, user):
     """Role cannot do SELECT on events.calls."""
@@ -0,0 +1,25 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from flowetl.mixins.fixed_sql_mixin import fixed_sql_operator
+
+# Sketches use the same parameters as flowmachine's subscriber sketches (log2m=11), so they can be combined
+CreateLocationEventCubeOperator = fixed_sql_operator(
+    class_name="CreateLocationEventCubeOperator",
+    sql="""
+        DROP TABLE IF EXISTS cubes.location_events_{{ table_name }};
+        CREATE TABLE cubes.location_events_{{ table_name }} (
+            CHECK (cdr_type = '{{ params.cdr_type }}')
+        ) INHERITS (cubes.location_events);
+        INSERT INTO cubes.location_events_{{ table_name }}
+            (cdr_type, datetime, location_id, outgoing, event_count, subscribers)
+        SELECT '{{ params.cdr_type }}', date_trunc('hour', datetime), location_id,
+            {% if params.cdr_type in ['calls', 'sms'] %}outgoing{% else %}NULL::BOOLEAN{% endif %},
+            count(*), hll_add_agg(hll_hash_text(msisdn::text), 11, 5, 128, 1)
+        FROM {{ final_table }}
+        GROUP BY 1, 2, 3, 4;
+        CREATE INDEX ON cubes.location_events_{{ table_name }} (datetime);
+        ANALYZE cubes.location_events_{{ table_name }};
+        """,
+)
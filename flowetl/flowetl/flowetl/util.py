@@ -94,6 +94,7 @@ def create_dag(
     quote: str = '"',
     escape: str = '"',
     encoding: Optional[str] = None,
+    build_location_event_cube: bool = False,
 ) -> "DAG":
     """
     Create an ETL DAG that will load data from files, or a table within the database.
@@ -160,6 +161,10 @@ def create_dag(
         When loading from files, you may specify the escape character
     encoding : str or None
         Optionally specify file encoding when loading from files.
+    build_location_event_cube : bool, default False
+        Set to True to build a cube of the hourly event counts and subscriber sketches at each cell from each
+        ingested day, after it is attached. Flowmachine answers some aggregate queries from the cubes, rather than
+        from the events tables, when there is a cube for every ingested day they cover.
 
     Returns
     -------
@@ -177,6 +182,9 @@ def create_dag(
         CreateForeignStagingTableOperator,
     )
     from flowetl.operators.create_indexes_operator import CreateIndexesOperator
+    from flowetl.operators.create_location_event_cube_operator import (
+        CreateLocationEventCubeOperator,
+    )
     from flowetl.operators.create_staging_view_operator import CreateStagingViewOperator
     from flowetl.operators.extract_from_foreign_table_operator import (
         ExtractFromForeignTableOperator,
@@ -289,5 +297,10 @@ def create_dag(
             add_indexes,
         ] >> analyze >> attach >> latest_only >> analyze_parent
         attach >> [update_records, *get_qa_checks()]
+        if build_location_event_cube:
+            build_cube = CreateLocationEventCubeOperator(
+                task_id="build_location_event_cube", pool="postgres_etl"
+            )
+            attach >> build_cube
     globals()[dag_id] = dag
     return dag
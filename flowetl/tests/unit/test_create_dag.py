@@ -97,3 +97,28 @@ def test_cluster_set_when_field_given():
         cluster_field="DUMMY_FIELD",
     )
     assert "cluster" in dag.task_dict
+
+
+def test_no_location_event_cube_by_default():
+    dag = create_dag(
+        dag_id="TEST",
+        cdr_type="TEST",
+        start_date=datetime.now(),
+        extract_sql="DUMMY SQL",
+        staging_view_sql="DUMMY STAGING SQL",
+        source_table="DUMMY_SOURCE_TABLE",
+    )
+    assert "build_location_event_cube" not in dag.task_dict
+
+
+def test_location_event_cube_built_after_attach():
+    dag = create_dag(
+        dag_id="TEST",
+        cdr_type="TEST",
+        start_date=datetime.now(),
+        extract_sql="DUMMY SQL",
+        staging_view_sql="DUMMY STAGING SQL",
+        source_table="DUMMY_SOURCE_TABLE",
+        build_location_event_cube=True,
+    )
+    assert dag.task_dict["build_location_event_cube"].upstream_task_ids == {"attach"}
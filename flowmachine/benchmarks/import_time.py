@@ -0,0 +1,100 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Benchmark of the time taken to import flowmachine (and flowclient), each
+in a fresh interpreter.
+
+Usage:
+
+    python benchmarks/import_time.py [--repeats N] [module ...]
+
+For each module, prints the median wall-clock time to import it over the
+repeats, and the heavy dependencies the import pulled in. For a breakdown
+by module, use `python -X importtime -c "import flowmachine"`.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+DEFAULT_MODULES = [
+    "flowmachine",
+    "flowmachine.core",
+    "flowmachine.features",
+    "flowmachine.core.server.server",
+    "flowclient",
+]
+
+HEAVY_DEPENDENCIES = [
+    "pandas",
+    "numpy",
+    "sqlalchemy",
+    "networkx",
+    "redis",
+    "marshmallow",
+    "apispec",
+    "tqdm",
+]
+
+_TIMING_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def time_import(module: str) -> dict:
+    """
+    Import a module in a fresh interpreter, and time it.
+
+    Parameters
+    ----------
+    module : str
+        Name of the module to import
+
+    Returns
+    -------
+    dict
+        The time taken in seconds under "elapsed", and the heavy dependencies
+        which were imported under "loaded"
+    """
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            _TIMING_SCRIPT.format(module=module, heavy=HEAVY_DEPENDENCIES),
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        check=True,
+    )
+    return json.loads(result.stdout.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'module':<35} {'median (s)':>10}  heavy dependencies imported")
+    for module in args.modules:
+        try:
+            timings = [time_import(module) for _ in range(args.repeats)]
+        except subprocess.CalledProcessError:
+            print(f"{module:<35} {'failed':>10}")
+            continue
+        median = statistics.median(timing["elapsed"] for timing in timings)
+        print(
+            f"{module:<35} {median:>10.3f}  {', '.join(timings[-1]['loaded']) or '-'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
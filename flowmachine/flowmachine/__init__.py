@@ -18,19 +18,36 @@ and inherit from FlowMachine's main `Query()` class.
 
 """
 
+from importlib import import_module
+
 from .versions import __version__
-from .core.init import connect, connections
-from .features.utilities import GroupValues, feature_collection
 from flowmachine.core.logging import init_logging
-import flowmachine.models
-import flowmachine.features
-import flowmachine.utils
-import flowmachine.core
 
-methods = ["GroupValues", "feature_collection", "connect", "connections"]
+# The sub-modules, and the methods available from the top level, are only
+# imported when first used, so that importing flowmachine is fast.
+_lazy_methods = {
+    "GroupValues": "flowmachine.features.utilities",
+    "feature_collection": "flowmachine.features.utilities",
+    "connect": "flowmachine.core.init",
+    "connections": "flowmachine.core.init",
+}
+methods = list(_lazy_methods)
 sub_modules = ["core", "features", "utils", "models"]
 __all__ = methods + sub_modules
 
+
+def __getattr__(name):
+    if name in _lazy_methods:
+        return getattr(import_module(_lazy_methods[name]), name)
+    if name in sub_modules:
+        return import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
 # Initialise loggers when flowmachine is imported
 init_logging()
 
@@ -7,16 +7,25 @@ Definition of the main Abstract Base Class of flowmachine the Query class
 and associated code.
 """
 
-from .connection import Connection
-from .query import Query
-from .table import Table
-from .geotable import GeoTable
-from .init import connect
-from .logging import init_logging, set_log_level
-from .spatial_unit import make_spatial_unit
-from .join_to_location import JoinToLocation, location_joined_query
-from .custom_query import CustomQuery
-from .grid import Grid
+from importlib import import_module
+
+# Each of these is only imported when first used, so that importing
+# flowmachine.core doesn't import sqlalchemy, pandas, redis and networkx
+# unless they are needed.
+_lazy_methods = {
+    "Query": ".query",
+    "Table": ".table",
+    "GeoTable": ".geotable",
+    "Connection": ".connection",
+    "connect": ".init",
+    "init_logging": ".logging",
+    "set_log_level": ".logging",
+    "make_spatial_unit": ".spatial_unit",
+    "JoinToLocation": ".join_to_location",
+    "location_joined_query": ".join_to_location",
+    "CustomQuery": ".custom_query",
+    "Grid": ".grid",
+}
 
 sub_modules = ["errors", "mixins", "api"]
 
@@ -34,3 +43,19 @@ methods = [
 ]
 
 __all__ = methods + sub_modules
+
+
+def __getattr__(name):
+    if name in _lazy_methods:
+        return getattr(import_module(_lazy_methods[name], __name__), name)
+    if name in sub_modules:
+        try:
+            return import_module(f"{__name__}.{name}")
+        except ModuleNotFoundError as exc:
+            if exc.name != f"{__name__}.{name}":
+                raise
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
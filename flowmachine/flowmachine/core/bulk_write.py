@@ -0,0 +1,231 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Utilities for writing pandas DataFrames to FlowDB using COPY, rather than
+row-by-row INSERTs.
+"""
+import csv
+import io
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, Optional, Union
+
+import pandas as pd
+from pandas.api import types
+from sqlalchemy.engine import Connection, Engine
+
+import structlog
+
+logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
+
+# Marker written for missing values, so that empty strings are kept as empty strings
+COPY_NULL = r"\N"
+
+
+def get_column_types(
+    df: pd.DataFrame, column_types: Optional[Dict[str, str]] = None
+) -> Dict[str, str]:
+    """
+    Get the postgres types to use for the columns of a dataframe.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Dataframe to get column types for
+    column_types : dict, optional
+        Mapping from column names to postgres types, which overrides the
+        type inferred from the dtype of those columns
+
+    Returns
+    -------
+    dict
+        Mapping from each column name, in order, to a postgres type
+    """
+    column_types = {} if column_types is None else column_types
+    unknown_columns = set(column_types) - set(df.columns)
+    if unknown_columns:
+        raise ValueError(
+            f"Column types given for columns not in the dataframe: {', '.join(sorted(unknown_columns))}"
+        )
+    inferred = {}
+    for column, dtype in df.dtypes.items():
+        if types.is_datetime64tz_dtype(dtype):
+            pg_type = "TIMESTAMPTZ"
+        elif types.is_datetime64_dtype(dtype):
+            pg_type = "TIMESTAMP"
+        elif types.is_timedelta64_dtype(dtype):
+            pg_type = "INTERVAL"
+        elif types.is_bool_dtype(dtype):
+            pg_type = "BOOLEAN"
+        elif types.is_integer_dtype(dtype):
+            pg_type = "BIGINT"
+        elif types.is_float_dtype(dtype):
+            pg_type = "DOUBLE PRECISION"
+        else:
+            pg_type = "TEXT"
+        inferred[column] = column_types.get(column, pg_type)
+    return inferred
+
+
+def copy_dataframe(cursor, df: pd.DataFrame, table: str) -> None:
+    """
+    Append the rows of a dataframe to an existing table using COPY.
+
+    Parameters
+    ----------
+    cursor : psycopg2.extensions.cursor
+        Cursor to run the COPY with
+    df : pandas.DataFrame
+        Dataframe to copy. The index is not written.
+    table : str
+        Name of the table to copy to, which must have columns with the
+        same names as the dataframe.
+    """
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False, na_rep=COPY_NULL)
+    buf.seek(0)
+    columns = ", ".join(f'"{column}"' for column in df.columns)
+    cursor.copy_expert(
+        f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+        buf,
+    )
+
+
+def _sql_literal(text: Optional[str], pg_type: str) -> str:
+    if text is None:
+        return f"NULL::{pg_type}"
+    escaped = text.replace("'", "''")
+    return f"'{escaped}'::{pg_type}"
+
+
+def dataframe_to_values_sql(
+    df: pd.DataFrame, column_types: Optional[Dict[str, str]] = None
+) -> str:
+    """
+    Get a query which selects the rows of a dataframe, rendered as a VALUES list.
+
+    Values are written as they would be by `copy_dataframe`, and cast to
+    the column types.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Dataframe to render. The index is not included.
+    column_types : dict, optional
+        Mapping from column names to postgres types, which overrides the
+        type inferred from the dtype of those columns
+
+    Returns
+    -------
+    str
+        SQL query selecting the rows of the dataframe
+    """
+    column_types = get_column_types(df, column_types)
+    columns = ", ".join(f'"{column}"' for column in column_types)
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False, na_rep=COPY_NULL)
+    buf.seek(0)
+    rows = [
+        "({})".format(
+            ", ".join(
+                _sql_literal(None if text == COPY_NULL else text, pg_type)
+                for text, pg_type in zip(row, column_types.values())
+            )
+        )
+        for row in csv.reader(buf)
+    ]
+    if len(rows) == 0:
+        nulls = ", ".join(
+            f'NULL::{pg_type} AS "{column}"' for column, pg_type in column_types.items()
+        )
+        return f"SELECT {nulls} WHERE FALSE"
+    return f"SELECT {columns} FROM (VALUES {', '.join(rows)}) AS t({columns})"
+
+
+@contextmanager
+def _transaction(connection: Union[Engine, Connection]) -> Iterator[Connection]:
+    if isinstance(connection, Engine):
+        with connection.begin() as conn:
+            yield conn
+    else:
+        with connection.begin():
+            yield connection
+
+
+def _iter_chunks(df: pd.DataFrame, chunk_size: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start : start + chunk_size]
+
+
+def write_dataframe(
+    df: pd.DataFrame,
+    name: str,
+    connection: Union[Engine, Connection],
+    *,
+    schema: Optional[str] = None,
+    column_types: Optional[Dict[str, str]] = None,
+    chunk_size: int = 100000,
+    n_jobs: int = 1,
+) -> None:
+    """
+    Create a table and write the rows of a dataframe to it, streaming them
+    to postgres with COPY in chunks.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Dataframe to write. The index is not written.
+    name : str
+        Name of the table to create
+    connection : Engine or Connection
+        SQLAlchemy engine or connection to write with
+    schema : str, optional
+        Schema to create the table in. If not given, the postgres default is used.
+    column_types : dict, optional
+        Mapping from column names to postgres types, which overrides the
+        type inferred from the dtype of those columns
+    chunk_size : int, default 100000
+        Number of rows to send to postgres in each COPY
+    n_jobs : int, default 1
+        Number of chunks to copy at once, each on a separate connection.
+        Requires `connection` to be an Engine.
+
+    Notes
+    -----
+    With `n_jobs` greater than one, the table is created, and each chunk
+    copied, in separate transactions. If any chunk fails, the table is dropped.
+    """
+    full_name = name if schema is None else f"{schema}.{name}"
+    columns = ", ".join(
+        f'"{column}" {pg_type}'
+        for column, pg_type in get_column_types(df, column_types).items()
+    )
+    create_table = f"CREATE TABLE {full_name} ({columns})"
+
+    if n_jobs > 1 and len(df) > chunk_size:
+        if not isinstance(connection, Engine):
+            raise ValueError("Copying chunks in parallel requires an Engine.")
+
+        def copy_chunk(chunk: pd.DataFrame) -> None:
+            with connection.begin() as conn:
+                copy_dataframe(conn.connection.cursor(), chunk, full_name)
+
+        with _transaction(connection) as conn:
+            conn.execute(create_table)
+        try:
+            with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+                for _ in pool.map(copy_chunk, _iter_chunks(df, chunk_size)):
+                    pass
+        except Exception:
+            with _transaction(connection) as conn:
+                conn.execute(f"DROP TABLE IF EXISTS {full_name}")
+            raise
+    else:
+        with _transaction(connection) as conn:
+            conn.execute(create_table)
+            cursor = conn.connection.cursor()
+            for chunk in _iter_chunks(df, chunk_size):
+                copy_dataframe(cursor, chunk, full_name)
+    logger.debug(f"Wrote {len(df)} rows to {full_name}.")
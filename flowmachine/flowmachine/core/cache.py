@@ -8,12 +8,17 @@
 Functions which deal with inspecting and managing the query cache.
 """
 import asyncio
+import atexit
+import datetime
 import pickle
+import re
+import threading
 from contextvars import copy_context
 from concurrent.futures import Executor, TimeoutError
 from functools import partial
+from time import monotonic, time
 
-from typing import TYPE_CHECKING, Tuple, List, Callable, Optional
+from typing import TYPE_CHECKING, Tuple, List, Callable, Optional, Dict
 
 import psycopg2
 
@@ -21,11 +26,13 @@ from redis import StrictRedis
 import psycopg2
 from sqlalchemy.engine import Engine
 
+from flowmachine.core.context import query_profiling_enabled
 from flowmachine.core.errors.flowmachine_errors import (
     QueryCancelledException,
     QueryErroredException,
     StoreFailedException,
 )
+from flowmachine.core.query_profile import collect_query_plans, write_query_profile
 from flowmachine.core.query_state import QueryStateMachine, QueryEvent
 from flowmachine import __version__
 
@@ -37,6 +44,28 @@ import structlog
 
 logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
 
+# Number of recent access times kept for each cache record, which bounds the K usable with LRU-K
+ACCESS_HISTORY_LENGTH = 8
+# Pending accesses are written to flowdb in the background once there are this many of them,
+# or when an access is recorded this many seconds after the last write
+ACCESS_FLUSH_THRESHOLD = 100
+ACCESS_FLUSH_INTERVAL = 10
+
+# SQL expressions over cache.cached used to order cache records for removal, lowest first
+CACHE_POLICIES = {
+    "score": "cache_score(cache_score_multiplier, compute_time, table_size(tablename, schema))",
+    "recompute": "cache_score(cache_score_multiplier, recompute_time(query_id), table_size(tablename, schema))",
+    "gdsf": "gdsf_score(gdsf_inflation, access_count, recompute_time(query_id), table_size(tablename, schema))",
+}
+
+_pending_accesses_lock = threading.Lock()
+# Accesses not yet written to flowdb, by connection id and then query id, as the number
+# of accesses and the most recent access times
+_pending_accesses: Dict[str, Dict[str, Tuple[int, List[datetime.datetime]]]] = {}
+_pending_access_counts: Dict[str, int] = {}
+_pending_access_connections: Dict[str, "Connection"] = {}
+_last_access_flush: Dict[str, float] = {}
+
 
 def write_query_to_cache(
     *,
@@ -48,6 +77,7 @@ def write_query_to_cache(
     write_func: Callable[[List[str], Engine], float],
     schema: Optional[str] = "cache",
     sleep_duration: Optional[int] = 1,
+    enqueued_at: Optional[float] = None,
 ) -> "Query":
     """
     Write a Query object into a postgres table and update the cache metadata about it.
@@ -76,6 +106,9 @@ def write_query_to_cache(
         Name of the schema to write to
     sleep_duration : int, default 1
         Number of seconds to wait between polls when monitoring a query being written from elsewhere
+    enqueued_at : float, optional
+        Time (as given by `time.time`) at which the query was queued, used to record how long
+        it was queued for when profiling
 
     Returns
     -------
@@ -96,12 +129,15 @@ def write_query_to_cache(
     -----
     This is a _blocking function_, and will not return until the query is no longer in an executing state.
 
+    If query profiling is enabled in this context, a profile of the write is recorded in
+    the cache.query_profiles table.
     """
     logger.debug(f"Trying to switch '{query.query_id}' to executing state.")
     q_state_machine = QueryStateMachine(redis, query.query_id, connection.conn_id)
     current_state, this_thread_is_owner = q_state_machine.execute()
     if this_thread_is_owner:
         logger.debug(f"In charge of executing '{query.query_id}'.")
+        started_at = time()
         try:
             query_ddl_ops = ddl_ops_func(name, schema)
         except Exception as exc:
@@ -109,11 +145,13 @@ def write_query_to_cache(
             logger.error(f"Error generating SQL. Error was {exc}")
             raise exc
         logger.debug("Made SQL.")
+        sql_generated_at = time()
         con = connection.engine
-        with con.begin():
+        with con.begin(), collect_query_plans() as plans:
             try:
                 plan_time = write_func(query_ddl_ops, con)
                 logger.debug("Executed queries.")
+                executed_at = time()
             except Exception as exc:
                 q_state_machine.raise_error()
                 logger.error(f"Error executing SQL. Error was {exc}")
@@ -125,6 +163,20 @@ def write_query_to_cache(
                     q_state_machine.raise_error()
                     logger.error(f"Error writing cache metadata. Error was {exc}")
                     raise exc
+        if schema == "cache" and query_profiling_enabled():
+            try:
+                write_query_profile(
+                    connection,
+                    query,
+                    plans=plans,
+                    queued_time=None
+                    if enqueued_at is None
+                    else 1000 * (started_at - enqueued_at),
+                    sql_generation_time=1000 * (sql_generated_at - started_at),
+                    execution_time=1000 * (executed_at - sql_generated_at),
+                )
+            except Exception as exc:
+                logger.error(f"Error writing query profile. Error was {exc}")
         q_state_machine.finish()
 
     q_state_machine.wait_until_complete(sleep_duration=sleep_duration)
@@ -234,6 +286,99 @@ def touch_cache(connection: "Connection", query_id: str) -> float:
         raise ValueError(f"Query id '{query_id}' is not in cache on this connection.")
 
 
+def record_access(connection: "Connection", query_id: str) -> None:
+    """
+    Record an access to a cache record. Accesses are held in memory and written
+    to flowdb in batches by `flush_access_records`, which is triggered in a background
+    thread once enough accesses are pending or enough time has passed since the last write.
+
+    Parameters
+    ----------
+    connection : Connection
+    query_id : str
+        Unique id of the query which was accessed
+    """
+    accessed_at = datetime.datetime.now(datetime.timezone.utc)
+    conn_id = connection.conn_id
+    with _pending_accesses_lock:
+        accesses = _pending_accesses.setdefault(conn_id, {})
+        times_accessed, access_times = accesses.get(query_id, (0, []))
+        accesses[query_id] = (
+            times_accessed + 1,
+            (access_times + [accessed_at])[-ACCESS_HISTORY_LENGTH:],
+        )
+        _pending_access_connections[conn_id] = connection
+        pending = _pending_access_counts.get(conn_id, 0) + 1
+        _pending_access_counts[conn_id] = pending
+        last_flush = _last_access_flush.setdefault(conn_id, monotonic())
+        flush_due = (
+            pending >= ACCESS_FLUSH_THRESHOLD
+            or monotonic() - last_flush >= ACCESS_FLUSH_INTERVAL
+        )
+        if flush_due:
+            # Reset here so that only one background flush is started
+            _last_access_flush[conn_id] = monotonic()
+    if flush_due:
+        threading.Thread(
+            target=_flush_access_records_in_background, args=(connection,), daemon=True
+        ).start()
+
+
+def flush_access_records(connection: "Connection") -> int:
+    """
+    Write any pending cache record accesses for this connection to flowdb,
+    in a single statement.
+
+    Parameters
+    ----------
+    connection : Connection
+
+    Returns
+    -------
+    int
+        Number of cache records which had accesses written
+    """
+    conn_id = connection.conn_id
+    with _pending_accesses_lock:
+        accesses = _pending_accesses.pop(conn_id, {})
+        _pending_access_counts.pop(conn_id, None)
+        _last_access_flush[conn_id] = monotonic()
+    if not accesses:
+        return 0
+    # Sorted, so that concurrent flushes lock the records in the same order
+    params = [
+        param
+        for query_id, (times_accessed, access_times) in sorted(accesses.items())
+        for param in (query_id, times_accessed, access_times)
+    ]
+    values = ", ".join(["(%s, %s, %s::timestamptz[])"] * len(accesses))
+    with connection.engine.begin() as trans:
+        trans.execute(
+            f"""SELECT record_cache_access(query_id, times_accessed, access_times, {ACCESS_HISTORY_LENGTH})
+            FROM (VALUES {values}) AS accesses(query_id, times_accessed, access_times)""",
+            tuple(params),
+        )
+    logger.debug("Recorded cache accesses.", n_records=len(accesses))
+    return len(accesses)
+
+
+def _flush_access_records_in_background(connection: "Connection") -> None:
+    try:
+        flush_access_records(connection)
+    except Exception as exc:
+        logger.error(f"Failed to record cache accesses. Error was {exc}")
+
+
+@atexit.register
+def _flush_all_access_records() -> None:
+    with _pending_accesses_lock:
+        connections = [
+            _pending_access_connections[conn_id] for conn_id in _pending_accesses
+        ]
+    for connection in connections:
+        _flush_access_records_in_background(connection)
+
+
 def reset_cache(
     connection: "Connection", redis: StrictRedis, protect_table_objects: bool = True
 ) -> None:
@@ -266,8 +411,14 @@ def reset_cache(
         qry = f"SELECT tablename FROM cache.cached WHERE schema='cache'"
         tables = trans.execute(qry).fetchall()
 
+    with _pending_accesses_lock:
+        _pending_accesses.pop(connection.conn_id, None)
+        _pending_access_counts.pop(connection.conn_id, None)
     with connection.engine.begin() as trans:
         trans.execute("SELECT setval('cache.cache_touches', 1)")
+        trans.execute(
+            "UPDATE cache.cache_config SET value='0' WHERE key='gdsf_inflation'"
+        )
     for table in tables:
         with connection.engine.begin() as trans:
             trans.execute(f"DROP TABLE IF EXISTS cache.{table[0]} CASCADE")
@@ -371,11 +522,73 @@ def get_query_object_by_id(connection: "Connection", query_id: str) -> "Query":
         raise ValueError(f"Query id '{query_id}' is not in cache on this connection.")
 
 
+def register_cache_policy(name: str, order_by: str) -> None:
+    """
+    Add a policy for choosing which queries to remove from cache when shrinking it.
+
+    Parameters
+    ----------
+    name : str
+        Name to refer to the policy by
+    order_by : str
+        SQL ORDER BY expression over the columns of cache.cached. Cache records are
+        removed in ascending order of this expression.
+    """
+    CACHE_POLICIES[name] = order_by
+
+
+def get_cache_policy_order(policy: str) -> str:
+    """
+    Get the SQL expression used to order cache records for removal under a policy.
+
+    Available policies are
+
+    - "score", the cache score based on recency and frequency of access, compute time and size
+    - "recompute", the cache score with the compute time replaced by the time to recompute
+      the query and every cached query it depends on
+    - "gdsf", Greedy-Dual-Size-Frequency, using the time to recompute the query and its
+      dependencies as the cost
+    - "lru-<k>" (e.g. "lru-2"), LRU-K, which removes the query whose k-th most recent access
+      was longest ago first. Queries accessed fewer than k times are removed first, least
+      recently accessed first.
+
+    and any added with `register_cache_policy`.
+
+    Parameters
+    ----------
+    policy : str
+        Name of the policy
+
+    Returns
+    -------
+    str
+        SQL ORDER BY expression
+
+    Raises
+    ------
+    ValueError
+        If the policy is not known
+    """
+    try:
+        return CACHE_POLICIES[policy]
+    except KeyError:
+        pass
+    lru_k = re.fullmatch(r"lru-(\d+)", policy)
+    if lru_k is not None and 1 <= int(lru_k.group(1)) <= ACCESS_HISTORY_LENGTH:
+        return f"COALESCE(access_history[{int(lru_k.group(1))}], '-infinity'), last_accessed"
+    raise ValueError(
+        f"Unknown cache policy '{policy}'. Must be one of {', '.join(CACHE_POLICIES)} or lru-<k>, with k between 1 and {ACCESS_HISTORY_LENGTH}."
+    )
+
+
 def get_cached_query_objects_ordered_by_score(
-    connection: "Connection", protected_period: Optional[int] = None,
+    connection: "Connection",
+    protected_period: Optional[int] = None,
+    policy: str = "score",
 ) -> List[Tuple["Query", int]]:
     """
-    Get all cached query objects in ascending cache score order.
+    Get all cached query objects in ascending cache score order, or in the order
+    they would be removed under another cache policy.
 
     Parameters
     ----------
@@ -384,6 +597,8 @@ def get_cached_query_objects_ordered_by_score(
         Optionally specify a number of seconds within which cache entries are excluded. If None,
         the value stored in cache.cache_config will be used.Set to a negative number to ignore cache protection
         completely.
+    policy : str, default "score"
+        Policy to order the queries by. See `get_cache_policy_order` for the available policies.
 
     Returns
     -------
@@ -391,6 +606,8 @@ def get_cached_query_objects_ordered_by_score(
         Returns a list of cached Query objects with their on disk sizes
 
     """
+    order_by = get_cache_policy_order(policy)
+    flush_access_records(connection)
     protected_period_clause = (
         (f" AND NOW()-created > INTERVAL '{protected_period} seconds'")
         if protected_period is not None
@@ -400,7 +617,7 @@ def get_cached_query_objects_ordered_by_score(
         FROM cache.cached
         WHERE cached.class!='Table' AND cached.class!='GeoTable'
         {protected_period_clause}
-        ORDER BY cache_score(cache_score_multiplier, compute_time, table_size(tablename, schema)) ASC
+        ORDER BY {order_by} ASC
         """
     cache_queries = connection.fetch(qry)
     return [(pickle.loads(obj), table_size) for obj, table_size in cache_queries]
@@ -410,6 +627,7 @@ def shrink_one(
     connection: "Connection",
     dry_run: bool = False,
     protected_period: Optional[int] = None,
+    policy: str = "score",
 ) -> "Query":
     """
     Remove the lowest scoring cached query from cache and return it and size of it
@@ -424,6 +642,8 @@ def shrink_one(
         Optionally specify a number of seconds within which cache entries are excluded. If None,
         the value stored in cache.cache_config will be used.Set to a negative number to ignore cache protection
         completely.
+    policy : str, default "score"
+        Policy to choose the query to remove by. See `get_cache_policy_order` for the available policies.
 
     Returns
     -------
@@ -431,7 +651,7 @@ def shrink_one(
         The "Query" object that was removed from cache and the size of it
     """
     obj_to_remove, obj_size = get_cached_query_objects_ordered_by_score(
-        connection, protected_period=protected_period
+        connection, protected_period=protected_period, policy=policy
     )[0]
 
     logger.info(
@@ -442,6 +662,15 @@ def shrink_one(
     )
 
     if not dry_run:
+        if policy == "gdsf":
+            # Age the remaining records by raising the inflation value to the removed record's priority
+            with connection.engine.begin() as trans:
+                trans.execute(
+                    f"""UPDATE cache.cache_config SET value=(
+                        SELECT {CACHE_POLICIES['gdsf']} FROM cache.cached WHERE query_id=%s
+                    ) WHERE key='gdsf_inflation'""",
+                    (obj_to_remove.query_id,),
+                )
         obj_to_remove.invalidate_db_cache(cascade=False, drop=True)
     return obj_to_remove, obj_size
 
@@ -451,6 +680,7 @@ def shrink_below_size(
     size_threshold: int = None,
     dry_run: bool = False,
     protected_period: Optional[int] = None,
+    policy: str = "score",
 ) -> "Query":
     """
     Remove queries from the cache until it is below a specified size threshold.
@@ -466,12 +696,15 @@ def shrink_below_size(
         Optionally specify a number of seconds within which cache entries are excluded. If None,
         the value stored in cache.cache_config will be used.Set to a negative number to ignore cache protection
         completely.
+    policy : str, default "score"
+        Policy to choose the queries to remove by. See `get_cache_policy_order` for the available policies.
 
     Returns
     -------
     list of "Query"
         List of the queries that were removed
     """
+    get_cache_policy_order(policy)  # Check the policy exists before doing anything
     initial_cache_size = get_size_of_cache(connection)
     if size_threshold is None:
         size_threshold = get_max_size_of_cache(connection)
@@ -486,11 +719,11 @@ def shrink_below_size(
     if dry_run:
         cached_queries = iter(
             get_cached_query_objects_ordered_by_score(
-                connection, protected_period=protected_period
+                connection, protected_period=protected_period, policy=policy
             )
         )
 
-        def dry_run_shrink(connection, protected_period):
+        def dry_run_shrink(connection, protected_period, policy):
             obj, obj_size = cached_queries.__next__()
             logger.info(
                 f"Would remove cache record for {obj.query_id} of type {obj.__class__}"
@@ -508,7 +741,7 @@ def shrink_below_size(
     try:
         while current_cache_size > size_threshold:
             obj_removed, cache_reduction = shrink(
-                connection, protected_period=protected_period
+                connection, protected_period=protected_period, policy=policy
             )
             removed.append(obj_removed)
             current_cache_size -= cache_reduction
@@ -716,6 +949,28 @@ def get_compute_time(connection: "Connection", query_id: str) -> float:
         raise ValueError(f"Query id '{query_id}' is not in cache on this connection.")
 
 
+def get_recompute_time(connection: "Connection", query_id: str) -> float:
+    """
+    Get the time in seconds it would take to recompute a cached query, if none
+    of the cached queries it depends on (directly or indirectly) were in cache.
+
+    Parameters
+    ----------
+    connection : "Connection"
+    query_id : str
+        Unique id of the query
+
+    Returns
+    -------
+    float
+        Number of seconds the query and its cached dependencies took to compute
+
+    """
+    if not connection.fetch(f"SELECT 1 FROM cache.cached WHERE query_id='{query_id}'"):
+        raise ValueError(f"Query id '{query_id}' is not in cache on this connection.")
+    return float(connection.fetch(f"SELECT recompute_time('{query_id}')")[0][0] / 1000)
+
+
 def get_score(connection: "Connection", query_id: str) -> float:
     """
     Get the current cache score for a cached query.
@@ -775,6 +1030,7 @@ async def watch_and_shrink_cache(
     size_threshold: int = None,
     dry_run: bool = False,
     protected_period: Optional[int] = None,
+    policy: str = "score",
 ) -> None:
     """
     Background task to periodically trigger a shrink of the cache.
@@ -799,6 +1055,8 @@ async def watch_and_shrink_cache(
         Optionally specify a number of seconds within which cache entries are excluded. If None,
         the value stored in cache.cache_config will be used.Set to a negative number to ignore cache protection
         completely.
+    policy : str, default "score"
+        Policy to choose the queries to remove by. See `get_cache_policy_order` for the available policies.
 
     Returns
     -------
@@ -811,6 +1069,7 @@ async def watch_and_shrink_cache(
         size_threshold=size_threshold,
         dry_run=dry_run,
         protected_period=protected_period,
+        policy=policy,
     )
     while True:
         logger.debug("Checking if cache should be shrunk.")
@@ -9,11 +9,13 @@ regarding the database.
 """
 import os
 import datetime
+import itertools
 import warnings
 from _md5 import md5
 from collections import defaultdict
+from copy import copy
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence
 
 import sqlalchemy
 
@@ -41,6 +43,11 @@ class Connection:
         Number of connections to the db to use
     overflow : int, optional
         Number of connections to the db to open temporarily
+    replica_hosts : list of str, optional
+        Hosts of read replicas of the database, as "host" or "host:port".
+        The same user, password and database are used as for the primary,
+        and the primary's port if none is given. Read-only queries are sent
+        to the replicas where possible.
 
     Notes
     -----
@@ -48,6 +55,10 @@ class Connection:
     and requests for more will time out rapidly. sqlalchemy will not immediately
     open `pool_size` connections, but will always keep that many open once they
     have been. You will, ordinarily be OK to ignore this setting.
+
+    Each replica has its own pool of up to `pool_size+overflow` connections.
+    Anything which writes to the database (storing queries, and the cache metadata)
+    always uses the primary.
     """
 
     def __init__(
@@ -61,6 +72,7 @@ class Connection:
         pool_size: int = 5,
         overflow: int = 10,
         conn_str: Optional[str] = None,
+        replica_hosts: Optional[Sequence[str]] = None,
     ) -> None:
         if conn_str is None:
             if any(arg is None for arg in (port, user, password, host, database)):
@@ -101,6 +113,24 @@ class Connection:
         conn_id.update(str(self.engine.url.database).encode())
         self.conn_id = conn_id.hexdigest()
 
+        self.replica_engines = []
+        for replica_host in [] if replica_hosts is None else replica_hosts:
+            replica_url = copy(self.engine.url)
+            replica_url.host, _, replica_port = replica_host.partition(":")
+            if replica_port != "":
+                replica_url.port = int(replica_port)
+            self.replica_engines.append(
+                sqlalchemy.create_engine(
+                    replica_url,
+                    echo=False,
+                    pool_size=pool_size,
+                    max_overflow=overflow,
+                    pool_timeout=None,
+                    connect_args=connect_args,
+                )
+            )
+        self._next_replica = itertools.cycle(range(len(self.replica_engines)))
+
         self.max_connections = pool_size + overflow
         if self.max_connections > os.cpu_count():
             warnings.warn(
@@ -125,19 +155,22 @@ class Connection:
                 f"Flowdb {__min_flowdb_version__} or higher."
             )
 
-    def fetch(self, query: str):
+    def fetch(self, query: str, *, engine: Optional[sqlalchemy.engine.Engine] = None):
         """
         Parameters
         ----------
         query : str
             SQL query string.
+        engine : sqlalchemy.engine.Engine, optional
+            Engine to fetch the query with, e.g. one returned by `read_engine`.
+            Defaults to the primary.
 
         Fetches a query from the database and return as a list of lists
         """
         # We actually bypass sqlalachemy here and use the raw dbapi
         # connection, because sqlalchemy will silently truncate/coerce to
         # strings output from explain (format XXXX).
-        con = self.engine
+        con = self.engine if engine is None else engine
         with con.connect() as c2:
             with c2.begin():
                 curs = c2.connection.cursor()
@@ -174,6 +207,64 @@ class Connection:
         with self.engine.begin():
             return self.engine.execute(exists_query).fetchall()[0][0]
 
+    def read_engine(
+        self, required_tables: Sequence[str] = ()
+    ) -> sqlalchemy.engine.Engine:
+        """
+        Get an engine to use for a read-only query. Replicas are used in
+        turn, but only if they have all the tables the query reads, so a
+        replica which is lagging behind the primary is not used for a query
+        which reads a newly stored cache table. If no replica can be used,
+        the primary engine is returned.
+
+        Parameters
+        ----------
+        required_tables : list of str
+            Schema qualified names of the tables the query will read
+
+        Returns
+        -------
+        sqlalchemy.engine.Engine
+        """
+        if len(self.replica_engines) == 0:
+            return self.engine
+        first = next(self._next_replica)
+        for i in range(len(self.replica_engines)):
+            replica_engine = self.replica_engines[
+                (first + i) % len(self.replica_engines)
+            ]
+            try:
+                if self._has_tables(replica_engine, required_tables):
+                    return replica_engine
+                logger.debug(
+                    "Replica doesn't have all required tables yet.",
+                    replica=str(replica_engine.url.host),
+                    required_tables=list(required_tables),
+                )
+            except sqlalchemy.exc.SQLAlchemyError as exc:
+                logger.warning(
+                    "Couldn't check replica.",
+                    replica=str(replica_engine.url.host),
+                    error=str(exc),
+                )
+        return self.engine
+
+    def _has_tables(
+        self, engine: sqlalchemy.engine.Engine, tables: Sequence[str]
+    ) -> bool:
+        """
+        Check whether all of some schema qualified tables exist, using a specific engine.
+        """
+        if len(tables) == 0:
+            # Still check the replica is reachable
+            self.fetch("SELECT 1", engine=engine)
+            return True
+        table_list = ", ".join(f"'{table}'" for table in tables)
+        return self.fetch(
+            f"SELECT bool_and(to_regclass(t) IS NOT NULL) FROM unnest(ARRAY[{table_list}]) AS t",
+            engine=engine,
+        )[0][0]
+
     @property
     def available_dates(self) -> Dict[str, List[datetime.date]]:
         """
@@ -201,7 +292,47 @@ class Connection:
         return defaultdict(
             list,
             self.fetch(
-                "SELECT cdr_type, array_agg(distinct cdr_date) FROM etl.etl_records WHERE state='ingested' GROUP BY cdr_type"
+                "SELECT cdr_type, array_agg(distinct cdr_date) FROM etl.etl_records WHERE state='ingested' GROUP BY cdr_type",
+                engine=self.read_engine(),
+            ),
+        )
+
+    @property
+    def child_tables(self) -> Dict[str, List[str]]:
+        """
+        Returns
+        -------
+        defaultdict of lists
+            Dict with schema qualified table names as keys, containing lists of the
+            schema qualified names of the tables which inherit from (or are partitions of) them
+
+        """
+        return self._child_tables()
+
+    @cached(TTLCache(256, 120))
+    def _child_tables(self) -> Dict[str, List[str]]:
+        """
+        Returns
+        -------
+        defaultdict of lists
+            Dict with schema qualified table names as keys, containing lists of the
+            schema qualified names of the tables which inherit from (or are partitions of) them
+
+        """
+
+        return defaultdict(
+            list,
+            self.fetch(
+                """
+                SELECT parent_ns.nspname || '.' || parent.relname,
+                       array_agg(child_ns.nspname || '.' || child.relname)
+                FROM pg_inherits
+                JOIN pg_class AS parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_namespace AS parent_ns ON parent_ns.oid = parent.relnamespace
+                JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+                JOIN pg_namespace AS child_ns ON child_ns.oid = child.relnamespace
+                GROUP BY parent_ns.nspname, parent.relname
+                """
             ),
         )
 
@@ -277,3 +408,5 @@ class Connection:
         Close the connection
         """
         self.engine.close()
+        for replica_engine in self.replica_engines:
+            replica_engine.dispose()
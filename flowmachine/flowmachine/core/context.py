@@ -10,7 +10,7 @@ managing queries.
 from contextvars import ContextVar, copy_context
 from concurrent.futures import Executor, Future
 from contextlib import contextmanager
-from typing import Callable
+from typing import Callable, Dict, Optional
 
 from redis import StrictRedis
 
@@ -30,6 +30,14 @@ try:
     executor
 except NameError:
     executor = ContextVar("executor")
+try:
+    shared_scan_sql
+except NameError:
+    shared_scan_sql = ContextVar("shared_scan_sql", default={})
+try:
+    profile_queries
+except NameError:
+    profile_queries = ContextVar("profile_queries", default=False)
 
 _jupyter_context = (
     dict()
@@ -137,6 +145,75 @@ def submit_to_executor(func: Callable, *args, **kwargs) -> Future:
     return get_executor().submit(current_context.run, func, *args, **kwargs)
 
 
+def get_shared_scan_sql(query_id: str) -> Optional[str]:
+    """
+    Get the SQL which reads the result of a query from a shared scan in this
+    context, if there is one.
+
+    Parameters
+    ----------
+    query_id : str
+        Query id of the query
+
+    Returns
+    -------
+    str or None
+        SQL selecting the query's result from a shared scan, or None if this
+        query is not being read from a shared scan
+    """
+    return shared_scan_sql.get().get(query_id)
+
+
+@contextmanager
+def shared_scans(sql: Dict[str, str]):
+    """
+    Context manager within which the queries with the given query ids are
+    read using the given SQL (typically selecting from a temporary table)
+    rather than computed, so that queries which depend on them can share a
+    single scan.
+
+    Parameters
+    ----------
+    sql : dict
+        Mapping from query id to SQL which selects its result
+    """
+    token = shared_scan_sql.set({**shared_scan_sql.get(), **sql})
+    try:
+        yield
+    finally:
+        shared_scan_sql.reset(token)
+
+
+def query_profiling_enabled() -> bool:
+    """
+    Check whether queries stored in this context are profiled.
+
+    Returns
+    -------
+    bool
+        True if queries stored in this context are profiled
+    """
+    return profile_queries.get()
+
+
+@contextmanager
+def query_profiling(enabled: bool = True):
+    """
+    Context manager within which queries are profiled when they are stored,
+    and their profiles written to the cache.query_profiles table.
+
+    Parameters
+    ----------
+    enabled : bool, default True
+        Set to False to turn profiling off within the context
+    """
+    token = profile_queries.set(enabled)
+    try:
+        yield
+    finally:
+        profile_queries.reset(token)
+
+
 def bind_context(
     connection: Connection, executor_pool: Executor, redis_conn: StrictRedis
 ):
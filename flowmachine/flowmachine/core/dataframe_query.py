@@ -0,0 +1,132 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+# -*- coding: utf-8 -*-
+"""
+Query backed by a pandas DataFrame, which allows data held in python
+to be used as part of other queries.
+"""
+from concurrent.futures import Future
+from hashlib import md5
+from typing import Dict, List, Optional, Union
+
+import pandas as pd
+from sqlalchemy.engine import Engine
+
+from flowmachine.core.bulk_write import (
+    dataframe_to_values_sql,
+    get_column_types,
+    write_dataframe,
+)
+from flowmachine.core.cache import write_query_to_cache
+from flowmachine.core.context import get_db, get_redis, submit_to_executor
+from flowmachine.core.query import Query
+from flowmachine.core.query_state import QueryStateMachine
+
+import structlog
+
+logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
+
+
+class DataFrameQuery(Query):
+    """
+    Query whose rows are those of a pandas DataFrame. When the query is
+    stored, the dataframe is written to the cache with COPY, so that queries
+    which use it select from that table. Until then, the rows are rendered
+    into the SQL as a VALUES list.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Dataframe to use. The index is ignored.
+    column_types : dict, optional
+        Mapping from column names to postgres types, which overrides the
+        type inferred from the dtype of those columns
+
+    Examples
+    --------
+    >>> rates = DataFrameQuery(pd.DataFrame([{"site_id": "0xqNDj", "rate": 0.9}]))
+    >>> rates.get_query()
+    'SELECT "site_id", "rate" FROM (VALUES (\'0xqNDj\'::TEXT, \'0.9\'::DOUBLE PRECISION)) AS t("site_id", "rate")'
+    >>> _ = rates.store().result()
+    >>> rates.get_query()
+    'SELECT * FROM cache.x4b9a4f2c...'
+    """
+
+    def __init__(self, df: pd.DataFrame, column_types: Optional[Dict[str, str]] = None):
+        self._data = df.reset_index(drop=True)
+        self.column_types = get_column_types(self._data, column_types)
+        self.data_hash = md5(
+            pd.util.hash_pandas_object(self._data, index=False).values.tobytes()
+        ).hexdigest()
+        super().__init__()
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        try:
+            del state["_data"]
+        except KeyError:
+            pass
+        return state
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self.column_types)
+
+    def _write_to_cache(self, name: str, schema: Union[str, None]) -> Query:
+        def write_func(query_ddl_ops: List[str], connection: Engine) -> float:
+            try:
+                data = self._data
+            except AttributeError:
+                raise ValueError("Dataframe is not available to write.")
+            write_dataframe(
+                data, name, connection, schema=schema, column_types=self.column_types,
+            )
+            return 0
+
+        return write_query_to_cache(
+            name=name,
+            schema=schema,
+            query=self,
+            connection=get_db(),
+            redis=get_redis(),
+            ddl_ops_func=lambda *x: [],
+            write_func=write_func,
+        )
+
+    def to_sql(
+        self,
+        name: str,
+        schema: Union[str, None] = None,
+        store_dependencies: bool = False,
+    ) -> Future:
+        """
+        Write the dataframe into the database.
+
+        Parameters
+        ----------
+        name : str
+            name of the table
+        schema : str, default None
+            Name of an existing schema. If none will use the postgres default,
+            see postgres docs for more info.
+        store_dependencies : bool, default False
+            Ignored, because this query has no dependencies.
+
+        Returns
+        -------
+        Future
+            Future object, containing this query and any result information.
+        """
+        QueryStateMachine(get_redis(), self.query_id, get_db().conn_id).enqueue()
+        return submit_to_executor(self._write_to_cache, name, schema)
+
+    def _make_query(self):
+        try:
+            data = self._data
+        except AttributeError:
+            raise ValueError(
+                f"Query '{self.query_id}' is not stored, and its dataframe is not available."
+            )
+        return dataframe_to_values_sql(data, self.column_types)
@@ -3,7 +3,6 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 
-import networkx as nx
 import sys
 import structlog
 from io import BytesIO
@@ -56,7 +55,7 @@ def print_dependency_tree(
 def _assemble_dependency_graph(
     dependencies: Sequence[Tuple[Union["Query", None], "Query"]],
     attrs_func: Callable[["Query"], Dict[str, Any]],
-) -> nx.DiGraph:
+) -> "networkx.DiGraph":
     """
     Helper function to assemble a dependency graph from a list of dependencies.
 
@@ -71,6 +70,8 @@ def _assemble_dependency_graph(
     -------
     networkx.DiGraph
     """
+    import networkx as nx
+
     g = nx.DiGraph()
 
     if dependencies:
@@ -116,7 +117,9 @@ def _get_query_attrs_for_dependency_graph(
     return attrs
 
 
-def calculate_dependency_graph(query_obj: "Query", analyse: bool = False) -> nx.DiGraph:
+def calculate_dependency_graph(
+    query_obj: "Query", analyse: bool = False
+) -> "networkx.DiGraph":
     """
     Produce a graph of all the queries that go into producing this one, with their estimated
     run costs, and whether they are stored as node attributes.
@@ -201,7 +204,7 @@ def get_dependency_links(
     return deps
 
 
-def unstored_dependencies_graph(query_obj: "Query") -> nx.DiGraph:
+def unstored_dependencies_graph(query_obj: "Query") -> "networkx.DiGraph":
     """
     Produce a dependency graph of the unstored queries on which this query depends.
 
@@ -302,6 +305,8 @@ def plot_dependency_graph(
         raise ValueError(f"Unsupported output format: '{format}'")
 
     G = calculate_dependency_graph(query_obj, analyse=analyse)
+    import networkx as nx
+
     A = nx.nx_agraph.to_agraph(G)
     s = BytesIO()
     A.draw(s, format=format, prog="dot")
@@ -320,7 +325,7 @@ def plot_dependency_graph(
     return result
 
 
-def store_queries_in_order(dependency_graph: nx.DiGraph) -> Dict[str, "Future"]:
+def store_queries_in_order(dependency_graph: "networkx.DiGraph") -> Dict[str, "Future"]:
     """
     Execute queries in an order that ensures each query store is triggered after its dependencies.
 
@@ -334,6 +339,8 @@ def store_queries_in_order(dependency_graph: nx.DiGraph) -> Dict[str, "Future"]:
     dict
         Mapping from query nodes to Future objects representing the store tasks
     """
+    import networkx as nx
+
     ordered_list_of_queries = list(nx.topological_sort(dependency_graph))[::-1]
     logger.debug(f"Storing queries with IDs: {ordered_list_of_queries}")
     store_futures = {}
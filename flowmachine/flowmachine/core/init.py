@@ -16,7 +16,7 @@ from contextlib import contextmanager
 import redis
 import structlog
 from concurrent.futures import ThreadPoolExecutor
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
 
 from redis import StrictRedis
 
@@ -40,6 +40,7 @@ def connections(
     flowdb_host: Optional[str] = None,
     flowdb_connection_pool_size: Optional[int] = None,
     flowdb_connection_pool_overflow: Optional[int] = None,
+    flowdb_replica_hosts: Optional[List[str]] = None,
     redis_host: Optional[str] = None,
     redis_port: Optional[int] = None,
     redis_password: Optional[str] = None,
@@ -70,6 +71,9 @@ def connections(
         Default number of database connections to use
     flowdb_connection_pool_overflow : int, default 1
         Number of extra database connections to allow
+    flowdb_replica_hosts : list of str, optional
+        Hosts ("host" or "host:port") of read replicas of flowdb, to send read-only
+        queries to. Set as a comma separated list in the FLOWDB_REPLICA_HOSTS environment variable.
     redis_host : str, default "localhost"
         Hostname for redis server.
     redis_port : int, default 6379
@@ -100,6 +104,7 @@ def connections(
             flowdb_host=flowdb_host,
             flowdb_connection_pool_size=flowdb_connection_pool_size,
             flowdb_connection_pool_overflow=flowdb_connection_pool_overflow,
+            flowdb_replica_hosts=flowdb_replica_hosts,
             redis_host=redis_host,
             redis_port=redis_port,
             redis_password=redis_password,
@@ -118,6 +123,7 @@ def connect(
     flowdb_host: Optional[str] = None,
     flowdb_connection_pool_size: Optional[int] = None,
     flowdb_connection_pool_overflow: Optional[int] = None,
+    flowdb_replica_hosts: Optional[List[str]] = None,
     redis_host: Optional[str] = None,
     redis_port: Optional[int] = None,
     redis_password: Optional[str] = None,
@@ -148,6 +154,9 @@ def connect(
         Default number of database connections to use
     flowdb_connection_pool_overflow : int, default 1
         Number of extra database connections to allow
+    flowdb_replica_hosts : list of str, optional
+        Hosts ("host" or "host:port") of read replicas of flowdb, to send read-only
+        queries to. Set as a comma separated list in the FLOWDB_REPLICA_HOSTS environment variable.
     redis_host : str, default "localhost"
         Hostname for redis server.
     redis_port : int, default 6379
@@ -183,6 +192,7 @@ def connect(
             flowdb_host=flowdb_host,
             flowdb_connection_pool_size=flowdb_connection_pool_size,
             flowdb_connection_pool_overflow=flowdb_connection_pool_overflow,
+            flowdb_replica_hosts=flowdb_replica_hosts,
             redis_host=redis_host,
             redis_port=redis_port,
             redis_password=redis_password,
@@ -200,6 +210,7 @@ def _do_connect(
     flowdb_host: Optional[str] = None,
     flowdb_connection_pool_size: Optional[int] = None,
     flowdb_connection_pool_overflow: Optional[int] = None,
+    flowdb_replica_hosts: Optional[List[str]] = None,
     redis_host: Optional[str] = None,
     redis_port: Optional[int] = None,
     redis_password: Optional[str] = None,
@@ -226,6 +237,9 @@ def _do_connect(
         Default number of database connections to use
     flowdb_connection_pool_overflow : int, default 1
         Number of extra database connections to allow
+    flowdb_replica_hosts : list of str, optional
+        Hosts ("host" or "host:port") of read replicas of flowdb, to send read-only
+        queries to. Set as a comma separated list in the FLOWDB_REPLICA_HOSTS environment variable.
     redis_host : str, default "localhost"
         Hostname for redis server.
     redis_port : int, default 6379
@@ -282,6 +296,15 @@ def _do_connect(
             if flowdb_connection_pool_overflow is None
             else flowdb_connection_pool_overflow
         )
+        flowdb_replica_hosts = (
+            [
+                host.strip()
+                for host in getenv("FLOWDB_REPLICA_HOSTS", "").split(",")
+                if host.strip() != ""
+            ]
+            if flowdb_replica_hosts is None
+            else flowdb_replica_hosts
+        )
 
         redis_host = (
             getenv("REDIS_HOST", "localhost") if redis_host is None else redis_host
@@ -308,6 +331,7 @@ def _do_connect(
             database="flowdb",
             pool_size=flowdb_connection_pool_size,
             overflow=flowdb_connection_pool_overflow,
+            replica_hosts=flowdb_replica_hosts,
         )
 
     redis_connection = redis.StrictRedis(
@@ -321,4 +345,6 @@ def _do_connect(
     print(
         f"Flowdb running on: {flowdb_host}:{flowdb_port}/flowdb (connecting user: {flowdb_user})"
     )
+    if len(flowdb_replica_hosts) > 0:
+        print(f"Flowdb read replicas: {', '.join(flowdb_replica_hosts)}")
     return conn, thread_pool, redis_connection
@@ -16,6 +16,7 @@ from typing import List, Union
 
 from .query import Query
 from .spatial_unit import SpatialUnitMixin, AnySpatialUnit, GeomSpatialUnit
+from .spatial_unit_mapping import SpatialUnitMapping
 from .errors import InvalidSpatialUnitError
 
 
@@ -42,6 +43,15 @@ class JoinToLocation(Query):
         The name of the column that identifies the time in the source table
         e.g. 'time', 'date', 'start_time' etc.
 
+    Notes
+    -----
+    The location ID to spatial unit mapping is materialised (as a
+    `SpatialUnitMapping`) the first time a join to the spatial unit is
+    stored, and joins created after that use the stored mapping and its GiST
+    index instead of recomputing the spatial unit. Whether a join uses the
+    stored mapping is decided the first time its SQL is generated, so the SQL
+    of a query object never changes.
+
     See Also
     --------
 
@@ -85,6 +95,41 @@ class JoinToLocation(Query):
                 left_columns.remove(column)
         return left_columns + right_columns
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        # The mapping depends on the infrastructure version rather than the query
+        for k in ("_spatial_unit_mapping", "_use_mapping"):
+            try:
+                del state[k]
+            except KeyError:
+                pass
+        return state
+
+    @property
+    def spatial_unit_mapping(self) -> SpatialUnitMapping:
+        """
+        The materialised mapping from location IDs to this query's spatial
+        unit, for the version of the infrastructure when it was first needed.
+
+        This is deliberately not part of the query state, so it forms no part of
+        this query's id.
+        """
+        try:
+            return self._spatial_unit_mapping
+        except AttributeError:
+            self._spatial_unit_mapping = SpatialUnitMapping(
+                spatial_unit=self.spatial_unit
+            )
+            return self._spatial_unit_mapping
+
+    def _make_sql(self, name: str, schema: Union[str, None] = None) -> List[str]:
+        queries = super()._make_sql(name, schema=schema)
+        mapping = self.spatial_unit_mapping
+        if queries and not mapping.is_stored:
+            # Materialise the mapping in the background, for later joins to use
+            mapping.store()
+        return queries
+
     def _make_query(self):
         right_columns = self.spatial_unit.location_id_columns
         left_columns = self.left.column_names
@@ -95,6 +140,25 @@ class JoinToLocation(Query):
         right_columns_str = ", ".join([f"sites.{c}" for c in right_columns])
         left_columns_str = ", ".join([f"l.{c}" for c in left_columns])
 
+        try:
+            use_mapping = self._use_mapping
+        except AttributeError:
+            use_mapping = self._use_mapping = self.spatial_unit_mapping.is_stored
+        if use_mapping:
+            return f"""
+            SELECT
+                {left_columns_str},
+                {right_columns_str}
+            FROM
+                ({self.left.get_query()}) AS l
+            INNER JOIN
+                ({self.spatial_unit_mapping.get_query()}) AS sites
+            ON
+                l.location_id = sites.location_id
+              AND
+                sites.validity @> l.{self.time_col}::date
+            """
+
         sql = f"""
         SELECT
             {left_columns_str},
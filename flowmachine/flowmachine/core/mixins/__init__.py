@@ -10,5 +10,12 @@ from the Query class.
 """
 from .graph_mixin import GraphMixin
 from .geodata_mixin import GeoDataMixin
+from .spatial_rollup_mixin import SpatialRollupMixin
+from .multi_statistic_mixin import MultiStatisticMixin
 
-__all__ = ["GraphMixin", "GeoDataMixin"]
+__all__ = [
+    "GraphMixin",
+    "GeoDataMixin",
+    "SpatialRollupMixin",
+    "MultiStatisticMixin",
+]
@@ -0,0 +1,188 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Mixin for features which aggregate a quantity using a statistic, allowing
+several statistics to be calculated from a single aggregation.
+"""
+import pickle
+from typing import Callable, Iterable, List, Optional, Union
+
+from flowmachine.core.context import get_db
+
+import structlog
+
+logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
+
+
+class MultiStatisticMixin:
+    """
+    Mixin for features which aggregate a quantity using a `statistic`, which
+    allows a list of statistics to be calculated in a single aggregation.
+
+    With a single statistic, the feature has a 'value' column as usual. With
+    a list of statistics, it instead has a 'value_<statistic>' column for
+    each statistic, so that (for example) the average, median and maximum of
+    a quantity can be calculated with one pass over the events. The list is
+    sorted, so the order the statistics are given in does not affect the
+    query id or the order of the columns.
+
+    When a single-statistic query is not stored, but a query differing from
+    it only in calculating that statistic alongside others has been stored
+    by the time it is first used, the single statistic is read from the
+    stored query's table rather than being recomputed, and the stored query
+    is one of its dependencies.
+
+    Classes using this mixin must call `_set_statistic` in `__init__`, use
+    `_make_statistic_columns` to make the aggregate column(s) and
+    `_statistic_column_names` for the names of those columns, and should
+    start `_make_query` by checking `_get_stored_statistics_source`.
+    """
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        try:
+            del state["_stored_statistics_source"]
+        except KeyError:
+            pass
+        return state
+
+    def _set_statistic(
+        self, statistic: Union[str, Iterable[str]], valid_stats: Iterable[str]
+    ) -> None:
+        """
+        Validate the statistic or statistics, and set the `statistic` attribute.
+
+        Parameters
+        ----------
+        statistic : str or list of str
+            Statistic, or list of statistics, to calculate
+        valid_stats : iterable of str
+            Statistics which the feature supports
+
+        Raises
+        ------
+        ValueError
+            If any of the statistics is not valid, or the list is empty
+        """
+        if isinstance(statistic, str):
+            statistics = [statistic.lower()]
+        else:
+            statistics = sorted({stat.lower() for stat in statistic})
+            if len(statistics) == 0:
+                raise ValueError(
+                    f"At least one statistic is required. Use any of {valid_stats}"
+                )
+        for stat in statistics:
+            if stat not in valid_stats:
+                raise ValueError(
+                    "{} is not a valid statistic. Use one of {}".format(
+                        stat, valid_stats
+                    )
+                )
+        self.statistic = statistics[0] if isinstance(statistic, str) else statistics
+
+    @property
+    def statistics(self) -> List[str]:
+        """
+        The statistics this query calculates, as a list.
+        """
+        if isinstance(self.statistic, str):
+            return [self.statistic]
+        return list(self.statistic)
+
+    @property
+    def _statistic_column_names(self) -> List[str]:
+        """
+        Names of the columns holding the statistics.
+        """
+        if isinstance(self.statistic, str):
+            return ["value"]
+        return [f"value_{stat}" for stat in self.statistic]
+
+    def _make_statistic_columns(self, make_aggregate: Callable[[str], str]) -> str:
+        """
+        Make the SQL for the aggregate column of each statistic.
+
+        Parameters
+        ----------
+        make_aggregate : callable
+            Function which takes the name of a statistic, and returns the SQL
+            expression to calculate it
+
+        Returns
+        -------
+        str
+            Comma separated aggregate expressions, aliased to the column names
+        """
+        return ", ".join(
+            f"{make_aggregate(stat)} AS {column}"
+            for stat, column in zip(self.statistics, self._statistic_column_names)
+        )
+
+    def _with_statistic(self, statistic: Optional[List[str]]) -> "Query":
+        """
+        Get a copy of this query, which calculates different statistics. The
+        copy is only suitable for getting the query id it would have.
+        """
+        query = object.__new__(type(self))
+        query.__dict__.update(self.__getstate__())
+        query.statistic = statistic
+        return query
+
+    def _get_stored_statistics_source(self) -> Optional["Query"]:
+        """
+        Get the stored query which calculates this query's statistic alongside
+        others, if there is one. If several are stored, the one calculating
+        the fewest statistics is returned.
+
+        This is only looked up the first time, so every use of this object is
+        computed the same way. The source is kept as an attribute, so when it
+        is used it is one of this query's dependencies.
+        """
+        try:
+            return self._stored_statistics_source
+        except AttributeError:
+            pass
+        source = None
+        if isinstance(self.statistic, str):
+            # Stored queries of this class which differ from this one only in their statistics
+            without_statistic = self._with_statistic(None).query_id
+            with get_db().engine.begin() as trans:
+                stored = trans.execute(
+                    "SELECT obj FROM cache.cached WHERE class=%s AND obj IS NOT NULL",
+                    (type(self).__name__,),
+                ).fetchall()
+            candidates = []
+            for (obj,) in stored:
+                try:
+                    candidate = pickle.loads(obj)
+                except Exception as exc:
+                    logger.debug(f"Can't unpickle cached query ({exc}).")
+                    continue
+                if (
+                    isinstance(candidate, type(self))
+                    and not isinstance(candidate.statistic, str)
+                    and self.statistic in candidate.statistic
+                    and candidate._with_statistic(None).query_id == without_statistic
+                ):
+                    candidates.append(candidate)
+            if len(candidates) > 0:
+                source = min(candidates, key=lambda query: len(query.statistic))
+                logger.debug(
+                    f"Reading query '{self.query_id}' from stored statistics '{source.query_id}'."
+                )
+        self._stored_statistics_source = source
+        return source
+
+    def _make_statistics_projection_query(self, source: "Query") -> str:
+        """
+        SQL which reads this query's statistic from a query calculating it
+        alongside others.
+        """
+        columns = ", ".join(
+            f"value_{self.statistic} AS value" if column == "value" else column
+            for column in self.column_names
+        )
+        return f"SELECT {columns} FROM ({source.get_query()}) AS statistics"
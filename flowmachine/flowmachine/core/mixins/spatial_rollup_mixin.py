@@ -0,0 +1,109 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Mixin for spatial aggregates which can be 'rolled up' from the same
+data at cell level, rather than being recomputed from the events tables
+for each spatial unit.
+"""
+from concurrent.futures import Future
+from typing import Optional, Union
+
+from flowmachine.core.context import get_db, get_redis
+from flowmachine.core.query_state import QueryStateMachine
+
+import structlog
+
+logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
+
+
+class SpatialRollupMixin:
+    """
+    Mixin for aggregates whose values at any spatial unit with geography
+    can be derived exactly from a cell-level query (the 'rollup source'),
+    by joining it to the spatial unit and re-aggregating.
+
+    When the rollup source has been stored by the time the aggregate is first
+    used, the aggregate is computed from it rather than from the events
+    tables, so an indicator can be produced at several spatial units (e.g.
+    admin1, admin2, admin3 and a grid) for the cost of one pass over the
+    events. The source is then one of the aggregate's dependencies. Storing
+    the aggregate with `store_dependencies=True` queues the rollup source
+    ahead of it.
+
+    The rollup source is derived from the query's parameters, and forms no
+    part of its query id, so the result is the same whichever way it is computed.
+
+    Classes using this mixin must have a `spatial_unit` attribute, and
+    implement `_make_rollup_source`, which returns the cell-level query,
+    and `_make_rollup_query`, which returns SQL re-aggregating it.
+    """
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        for k in ("_rollup_source_kwargs", "_stored_rollup_source"):
+            try:
+                del state[k]
+            except KeyError:
+                pass
+        return state
+
+    @property
+    def rollup_source(self) -> Optional["Query"]:
+        """
+        The cell-level query this query can be rolled up from, or None if the
+        query's spatial unit has no geography (so there is nothing to roll up).
+        """
+        if not self.spatial_unit.has_geography:
+            return None
+        try:
+            return self._make_rollup_source()
+        except AttributeError:
+            # Queries loaded from the cache don't keep the parameters
+            # needed to make the rollup source
+            return None
+
+    def _get_stored_rollup_source(self) -> Optional["Query"]:
+        """
+        Get the rollup source if it has finished being stored. This is only
+        checked the first time, so every use of this object is computed the
+        same way.
+
+        The source is kept as an attribute, so when it is used it is one of
+        this query's dependencies.
+        """
+        try:
+            return self._stored_rollup_source
+        except AttributeError:
+            pass
+        source = self.rollup_source
+        if (
+            source is not None
+            and QueryStateMachine(
+                get_redis(), source.query_id, get_db().conn_id
+            ).is_completed
+            and source.is_stored
+        ):
+            logger.debug(
+                f"Rolling up query '{self.query_id}' from '{source.query_id}'."
+            )
+        else:
+            source = None
+        self._stored_rollup_source = source
+        return source
+
+    def to_sql(
+        self,
+        name: str,
+        schema: Union[str, None] = None,
+        store_dependencies: bool = False,
+    ) -> Future:
+        if store_dependencies:
+            source = self.rollup_source
+            if source is not None and not source.is_stored:
+                # Queue the source ahead of this query, so that this query is rolled up from it
+                source.store()
+        return super().to_sql(
+            name, schema=schema, store_dependencies=store_dependencies
+        )
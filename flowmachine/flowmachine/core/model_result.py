@@ -20,6 +20,7 @@ from typing import List, Union, Any, Optional, Dict
 import pandas as pd
 from sqlalchemy.engine import Engine
 
+from flowmachine.core.bulk_write import write_dataframe
 from flowmachine.core.cache import write_query_to_cache
 from flowmachine.core.context import get_db, get_redis, submit_to_executor
 from flowmachine.core.errors.flowmachine_errors import (
@@ -180,7 +181,7 @@ class ModelResult(Query):
         def write_model_result(query_ddl_ops: List[str], connection: Engine) -> float:
             if store_dependencies:
                 store_all_unstored_dependencies(self)
-            self._df.to_sql(name, connection, schema=schema, index=False)
+            write_dataframe(self._df, name, connection, schema=schema)
             QueryStateMachine(get_redis(), self.query_id, get_db().conn_id).finish()
             return self._runtime
 
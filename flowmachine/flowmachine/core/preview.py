@@ -0,0 +1,273 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Quick previews of queries, computed from a sample of subscribers.
+
+A preview rebuilds a query so that every read of the events tables keeps
+only a deterministic, hash-based sample of subscribers, and computes that
+instead. Counts are scaled up by the sampling fraction, so the preview is an
+estimate of the full result, while the full query runs in the background.
+"""
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Union
+
+import structlog
+
+from flowmachine.core.errors import UnstorableQueryError
+from flowmachine.core.query import Query
+from flowmachine.core.subscriber_subsetter import SubscriberSubsetterForHashSample
+
+logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
+
+
+def sample_subscribers(
+    query: Query, fraction: float, seed: Optional[Union[str, float]] = None
+) -> Query:
+    """
+    Rebuild a query so that it is computed from a sample of subscribers.
+
+    Every `EventTableSubset` the query depends on is replaced with one which
+    only reads the events of subscribers in the sample (see
+    `SubscriberSubsetterForHashSample`), and the queries which depend on them
+    are rebuilt to use the replacements. Queries which don't read the events
+    tables are unchanged. Since the sample depends only on the subscribers,
+    any queries sampled with the same fraction and seed use the same
+    subscribers.
+
+    Parameters
+    ----------
+    query : Query
+        Query to sample
+    fraction : float
+        Fraction of subscribers to sample, greater than 0 and at most 1
+    seed : str or float, optional
+        Seed for the hash, to draw a different sample of subscribers
+
+    Returns
+    -------
+    Query
+        Query of the same class as `query`, with a different query id
+
+    Examples
+    --------
+    >>> rog = RadiusOfGyration("2016-01-01", "2016-02-01")
+    >>> sample_subscribers(rog, fraction=0.01).get_dataframe()  # Radius of gyration of 1% of subscribers
+    """
+    # Check the fraction before rebuilding anything
+    SubscriberSubsetterForHashSample(fraction, seed=seed)
+    return _sample_subscribers(query, fraction, seed, {})
+
+
+def _sample_subscribers(
+    query: Query,
+    fraction: float,
+    seed: Optional[Union[str, float]],
+    sampled: Dict[str, Query],
+) -> Query:
+    """
+    Rebuild a query, and its dependencies, to read sampled events. `sampled`
+    holds the queries already rebuilt, by the query id of the original.
+    """
+    from flowmachine.features.utilities.event_table_subset import EventTableSubset
+
+    try:
+        return sampled[query.query_id]
+    except KeyError:
+        pass
+
+    # Keep attributes which subclasses leave out of the query id, but not the
+    # parameters for rolling up from an unsampled query, or for reading the
+    # location event cubes, which count every subscriber's events
+    state = Query.__getstate__(query)
+    state.pop("_rollup_source_kwargs", None)
+    state.pop("_cube_kwargs", None)
+    if isinstance(query, EventTableSubset):
+        state["subscriber_subsetter"] = SubscriberSubsetterForHashSample(
+            fraction, seed=seed, subset=query.subscriber_subsetter
+        )
+    else:
+        changed = False
+
+        def sample(value):
+            nonlocal changed
+            if isinstance(value, Query):
+                sampled_value = _sample_subscribers(value, fraction, seed, sampled)
+                changed = changed or sampled_value is not value
+                return sampled_value
+            return value
+
+        for key, value in state.items():
+            if isinstance(value, list):
+                state[key] = [sample(x) for x in value]
+            elif isinstance(value, tuple):
+                state[key] = tuple(sample(x) for x in value)
+            else:
+                state[key] = sample(value)
+        if not changed:
+            # Doesn't read the events tables
+            sampled[query.query_id] = query
+            return query
+
+    sampled_query = object.__new__(type(query))
+    sampled_query.__dict__.update(state)
+    sampled_query._cache = getattr(query, "_cache", True)
+    pooled = Query._QueryPool.get(sampled_query.query_id)
+    if pooled is None:
+        Query._QueryPool[sampled_query.query_id] = sampled_query
+    else:
+        sampled_query.__dict__ = pooled.__dict__
+    sampled[query.query_id] = sampled_query
+    return sampled_query
+
+
+def _default_scale_columns(query: Query) -> List[str]:
+    """
+    Columns of a query which are counts of subscribers or events, and so
+    should be scaled up when the query is computed from a sample.
+    """
+    from flowmachine.features.location.consecutive_trips_od_matrix import (
+        ConsecutiveTripsODMatrix,
+    )
+    from flowmachine.features.location.flows import Flows
+    from flowmachine.features.location.spatial_aggregate import SpatialAggregate
+    from flowmachine.features.location.total_events import TotalLocationEvents
+    from flowmachine.features.location.unique_subscriber_counts import (
+        UniqueSubscriberCounts,
+    )
+
+    count_queries = (
+        ConsecutiveTripsODMatrix,
+        Flows,
+        SpatialAggregate,
+        TotalLocationEvents,
+        UniqueSubscriberCounts,
+    )
+    if isinstance(query, count_queries) and "value" in query.column_names:
+        return ["value"]
+    return []
+
+
+class PreviewResult:
+    """
+    Estimated result of a query from a sample of subscribers, returned by
+    `preview`, and the future of the exact query.
+
+    Parameters
+    ----------
+    query : Query
+        The query previewed
+    sampled_query : Query
+        The query rebuilt to read a sample of subscribers
+    estimate : pandas.DataFrame
+        Result of the sampled query, with counts scaled up
+    fraction : float
+        Fraction of subscribers sampled
+    scaled_columns : list of str
+        Columns of `estimate` which were scaled up
+    exact : Future, optional
+        Future of storing the exact query, if it was started
+    """
+
+    is_estimate = True
+
+    def __init__(
+        self,
+        query: Query,
+        sampled_query: Query,
+        estimate: "pandas.DataFrame",
+        fraction: float,
+        scaled_columns: List[str],
+        exact: Optional[Future] = None,
+    ):
+        self.query = query
+        self.sampled_query = sampled_query
+        self.estimate = estimate
+        self.fraction = fraction
+        self.scaled_columns = scaled_columns
+        self.exact = exact
+
+    def __repr__(self):
+        return f"<PreviewResult of '{self.query.query_id}' from {self.fraction:.2%} of subscribers>"
+
+    def get_exact_dataframe(self) -> "pandas.DataFrame":
+        """
+        Wait for the exact query to finish, and return its result.
+
+        Returns
+        -------
+        pandas.DataFrame
+        """
+        if self.exact is not None:
+            self.exact.result()
+        return self.query.get_dataframe()
+
+
+def preview(
+    query: Query,
+    fraction: float = 0.01,
+    seed: Optional[Union[str, float]] = None,
+    scale_columns: Optional[List[str]] = None,
+    run_exact: bool = True,
+) -> PreviewResult:
+    """
+    Estimate the result of a query from a sample of subscribers, while the
+    exact query runs in the background.
+
+    The query is rebuilt with `sample_subscribers`, so that it reads only the
+    events of a deterministic sample of subscribers, and the rebuilt query's
+    result is returned with its count columns divided by `fraction`. Results
+    per subscriber are exact for the sampled subscribers, and are not scaled.
+
+    Parameters
+    ----------
+    query : Query
+        Query to preview
+    fraction : float, default 0.01
+        Fraction of subscribers to sample, greater than 0 and at most 1
+    seed : str or float, optional
+        Seed for the hash, to draw a different sample of subscribers
+    scale_columns : list of str, optional
+        Columns to divide by `fraction`. By default, the 'value' column of
+        spatial aggregates, total events, unique subscriber counts, flows and
+        trip matrices is scaled, and no columns of other queries.
+    run_exact : bool, default True
+        If True, start storing the exact query before computing the preview.
+        If the query can't be stored, its result is fetched in the
+        background instead.
+
+    Returns
+    -------
+    PreviewResult
+        The estimate, and the future of the exact query
+
+    Examples
+    --------
+    >>> result = preview(UniqueSubscriberCounts("2016-01-01", "2016-02-01", spatial_unit=make_spatial_unit("admin", level=3)))
+    >>> result.estimate.head()  # Scaled up from 1% of subscribers
+    >>> result.get_exact_dataframe()  # Waits for the full month
+    """
+    sampled_query = sample_subscribers(query, fraction, seed=seed)
+    exact = None
+    if run_exact:
+        try:
+            exact = query.store()
+        except UnstorableQueryError:
+            exact = query.get_dataframe_async()
+    if scale_columns is None:
+        scale_columns = _default_scale_columns(query)
+    estimate = sampled_query.get_dataframe()
+    for column in scale_columns:
+        estimate[column] = estimate[column] / fraction
+    logger.debug(
+        f"Previewed query '{query.query_id}' from {fraction} of subscribers as '{sampled_query.query_id}'."
+    )
+    return PreviewResult(
+        query=query,
+        sampled_query=sampled_query,
+        estimate=estimate,
+        fraction=fraction,
+        scaled_columns=list(scale_columns),
+        exact=exact,
+    )
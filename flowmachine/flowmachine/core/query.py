@@ -10,6 +10,7 @@ defines methods that returns the query as a string and as a pandas dataframe.
 """
 import rapidjson as json
 import pickle
+import time
 import weakref
 from concurrent.futures import Future
 
@@ -18,20 +19,22 @@ import structlog
 from typing import List, Union
 
 import psycopg2
-import pandas as pd
 
 from hashlib import md5
 
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import ResourceClosedError
 
-from flowmachine.core.cache import touch_cache
+from flowmachine.core.cache import record_access
 from flowmachine.core.context import (
     get_db,
     get_redis,
+    get_shared_scan_sql,
+    query_profiling_enabled,
     submit_to_executor,
 )
 from flowmachine.core.errors.flowmachine_errors import QueryResetFailedException
+from flowmachine.core.query_profile import record_query_plan
 from flowmachine.core.query_state import QueryStateMachine
 from abc import ABCMeta, abstractmethod
 
@@ -59,6 +62,47 @@ logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
 MAX_POSTGRES_NAME_LENGTH = 63
 
 
+def write_query(query_ddl_ops: List[str], connection: Engine) -> float:
+    """
+    Execute the SQL statements which store a query, and return the time
+    taken to execute any which were explained.
+
+    Parameters
+    ----------
+    query_ddl_ops : list of str
+        SQL statements to execute, as returned by `Query._make_sql`
+    connection : Engine
+        Engine or connection to execute them with
+
+    Returns
+    -------
+    float
+        Total execution time of the explained statements, in milliseconds
+    """
+    plan_time = 0
+    ddl_op_results = []
+    for ddl_op in query_ddl_ops:
+        try:
+            ddl_op_result = connection.execute(ddl_op)
+        except Exception as e:
+            logger.error(f"Error executing SQL: '{ddl_op}'. Error was {e}")
+            raise e
+        try:
+            ddl_op_results.append(ddl_op_result.fetchall())
+        except ResourceClosedError:
+            pass  # Nothing to do here
+    for ddl_op_result in ddl_op_results:
+        try:
+            plan = ddl_op_result[0][0][0]  # Should be a query plan
+            plan_time += plan["Execution Time"]
+        except (IndexError, KeyError, TypeError):
+            pass  # Not an explain result
+        else:
+            record_query_plan(plan)
+    logger.debug("Executed queries.")
+    return plan_time
+
+
 class Query(metaclass=ABCMeta):
     """
     The core base class of the flowmachine module. This should handle
@@ -265,6 +309,9 @@ class Query(metaclass=ABCMeta):
             SQL query string.
 
         """
+        shared_scan_sql = get_shared_scan_sql(self.query_id)
+        if shared_scan_sql is not None:
+            return shared_scan_sql
         try:
             table_name = self.fully_qualified_table_name
             schema, name = table_name.split(".")
@@ -275,13 +322,9 @@ class Query(metaclass=ABCMeta):
             if state_machine.is_completed and get_db().has_table(
                 schema=schema, name=name
             ):
-                try:
-                    touch_cache(get_db(), self.query_id)
-                except ValueError:
-                    pass  # Cache record not written yet, which can happen for Models
-                    # which will call through to this method from their `_make_query` method while writing metadata.
-                # In that scenario, the table _is_ written, but won't be visible from the connection touch_cache uses
-                # as the cache metadata transaction isn't complete!
+                # Accesses to records which haven't been written yet (which can happen for Models calling
+                # through to this method from their `_make_query` method while writing metadata) are ignored.
+                record_access(get_db(), self.query_id)
                 return "SELECT * FROM {}".format(table_name)
         except NotImplementedError:
             pass
@@ -305,19 +348,21 @@ class Query(metaclass=ABCMeta):
         """
 
         def do_get():
+            import pandas as pd
+
             if self._cache:
                 try:
                     return self._df.copy()
                 except AttributeError:
                     qur = f"SELECT {self.column_names_as_string_list} FROM ({self.get_query()}) _"
-                    with get_db().engine.begin():
-                        self._df = pd.read_sql_query(qur, con=get_db().engine)
+                    with self._read_engine().begin() as con:
+                        self._df = pd.read_sql_query(qur, con=con)
 
                     return self._df.copy()
             else:
                 qur = f"SELECT {self.column_names_as_string_list} FROM ({self.get_query()}) _"
-                with get_db().engine.begin():
-                    return pd.read_sql_query(qur, con=get_db().engine)
+                with self._read_engine().begin() as con:
+                    return pd.read_sql_query(qur, con=con)
 
         df_future = submit_to_executor(do_get)
         return df_future
@@ -378,12 +423,31 @@ class Query(metaclass=ABCMeta):
         try:
             return self._df.head(n)
         except AttributeError:
+            import pandas as pd
+
             Q = f"SELECT {self.column_names_as_string_list} FROM ({self.get_query()}) h LIMIT {n};"
-            con = get_db().engine
-            with con.begin():
+            with self._read_engine().begin() as con:
                 df = pd.read_sql_query(Q, con=con)
                 return df
 
+    def _read_engine(self) -> Engine:
+        """
+        Get an engine to read the result of this query with, which will be
+        a read replica if one has the tables this query would be read from.
+
+        Returns
+        -------
+        sqlalchemy.engine.Engine
+        """
+        if self.is_stored:
+            required_tables = [self.fully_qualified_table_name]
+        else:
+            required_tables = sorted(
+                dependency.fully_qualified_table_name
+                for dependency in self._get_stored_dependencies(exclude_self=True)
+            )
+        return get_db().read_engine(required_tables=required_tables)
+
     def get_table(self):
         """
         If this Query is stored, return a Table object referencing
@@ -536,7 +600,11 @@ class Query(metaclass=ABCMeta):
             logger.info("Table already exists")
             return []
 
-        Q = f"""EXPLAIN (ANALYZE TRUE, TIMING FALSE, FORMAT JSON) CREATE TABLE {full_name} AS 
+        if query_profiling_enabled():
+            explain_options = "ANALYZE TRUE, BUFFERS TRUE, FORMAT JSON"
+        else:
+            explain_options = "ANALYZE TRUE, TIMING FALSE, FORMAT JSON"
+        Q = f"""EXPLAIN ({explain_options}) CREATE TABLE {full_name} AS 
         (SELECT {self.column_names_as_string_list} FROM ({self._make_query()}) _)"""
         queries.append(Q)
         for ix in self.index_cols:
@@ -583,28 +651,6 @@ class Query(metaclass=ABCMeta):
             ).format(name, len(name), MAX_POSTGRES_NAME_LENGTH)
             raise NameTooLongError(err_msg)
 
-        def write_query(query_ddl_ops: List[str], connection: Engine) -> float:
-            plan_time = 0
-            ddl_op_results = []
-            for ddl_op in query_ddl_ops:
-                try:
-                    ddl_op_result = connection.execute(ddl_op)
-                except Exception as e:
-                    logger.error(f"Error executing SQL: '{ddl_op}'. Error was {e}")
-                    raise e
-                try:
-                    ddl_op_results.append(ddl_op_result.fetchall())
-                except ResourceClosedError:
-                    pass  # Nothing to do here
-                for ddl_op_result in ddl_op_results:
-                    try:
-                        plan = ddl_op_result[0][0][0]  # Should be a query plan
-                        plan_time += plan["Execution Time"]
-                    except (IndexError, KeyError):
-                        pass  # Not an explain result
-            logger.debug("Executed queries.")
-            return plan_time
-
         if store_dependencies:
             store_queries_in_order(
                 unstored_dependencies_graph(self)
@@ -628,6 +674,7 @@ class Query(metaclass=ABCMeta):
             redis=get_redis(),
             ddl_ops_func=ddl_ops_func,
             write_func=write_query,
+            enqueued_at=time.time(),
         )
         return store_future
 
@@ -659,7 +706,7 @@ class Query(metaclass=ABCMeta):
             opts.append("ANALYZE")
         Q = "EXPLAIN ({})".format(", ".join(opts)) + self.get_query()
 
-        exp = get_db().fetch(Q)
+        exp = get_db().fetch(Q, engine=self._read_engine())
 
         if format == "TEXT":
             return "\n".join(
@@ -1008,7 +1055,7 @@ class Query(metaclass=ABCMeta):
 
         Parameters
         ----------
-        sampling_method : {'system', 'system_rows', 'bernoulli', 'random_ids'}, default 'random_ids'
+        sampling_method : {'system', 'system_rows', 'bernoulli', 'random_ids', 'subscriber_hash'}, default 'random_ids'
             Specifies the method used to select the random sample.
             'system_rows': performs block-level sampling by randomly sampling
                 each physical storage page of the underlying relation. This
@@ -1024,6 +1071,13 @@ class Query(metaclass=ABCMeta):
                 relation. This sampling method is slower and is not guaranteed to
                 generate a sample of the specified size, but an approximation
             'random_ids': samples rows by randomly sampling the row number.
+            'subscriber_hash': samples subscribers by a hash of the subscriber
+                identifier, when the events are read (see
+                `flowmachine.core.preview.sample_subscribers`). Rather than
+                sampling from the result of this query, the query is computed
+                from only the sampled subscribers' events, and any queries
+                sampled with the same fraction and seed use the same
+                subscribers. Only the 'fraction' and 'seed' arguments are used.
         size : int, optional
             The number of rows to draw.
             Exactly one of the 'size' or 'fraction' arguments must be provided.
@@ -1042,7 +1096,9 @@ class Query(metaclass=ABCMeta):
         Returns
         -------
         Random
-            A special query object which contains a random sample from this one
+            A special query object which contains a random sample from this
+            one, or for 'subscriber_hash' sampling, this query rebuilt to
+            read a sample of subscribers
 
         See Also
         --------
@@ -1052,10 +1108,63 @@ class Query(metaclass=ABCMeta):
         -----
         Random samples may only be stored if a seed is supplied.
         """
+        if sampling_method == "subscriber_hash":
+            from .preview import sample_subscribers
+
+            if params.get("size") is not None or params.get("fraction") is None:
+                raise ValueError(
+                    "Subscriber hash sampling requires a 'fraction', and can't draw a sample of a given 'size'."
+                )
+            return sample_subscribers(
+                self, fraction=params["fraction"], seed=params.get("seed")
+            )
+
         from .random import random_factory
 
         random_class = random_factory(self.__class__, sampling_method=sampling_method)
         return random_class(query=self, **params)
 
+    def preview(
+        self,
+        fraction: float = 0.01,
+        seed=None,
+        scale_columns: Union[List[str], None] = None,
+        run_exact: bool = True,
+    ) -> "PreviewResult":
+        """
+        Estimate the result of this query from a deterministic sample of
+        subscribers, while the exact query runs in the background.
+
+        Parameters
+        ----------
+        fraction : float, default 0.01
+            Fraction of subscribers to sample, greater than 0 and at most 1
+        seed : str or float, optional
+            Seed for the hash, to draw a different sample of subscribers
+        scale_columns : list of str, optional
+            Columns to divide by `fraction`. By default, the count columns
+            of aggregate queries are scaled.
+        run_exact : bool, default True
+            If True, start running the exact query in the background.
+
+        Returns
+        -------
+        PreviewResult
+            The estimate, and the future of the exact query
+
+        See Also
+        --------
+        flowmachine.core.preview.preview
+        """
+        from .preview import preview
+
+        return preview(
+            self,
+            fraction=fraction,
+            seed=seed,
+            scale_columns=scale_columns,
+            run_exact=run_exact,
+        )
+
     def __hash__(self):
         return hash(self.query_id)
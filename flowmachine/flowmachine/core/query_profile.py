@@ -0,0 +1,194 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Profiling of query execution.
+
+When profiling is enabled (see `flowmachine.core.context.query_profiling`),
+each query stored in the cache is run under `EXPLAIN (ANALYZE, BUFFERS)`,
+and a profile of the store is written to the `cache.query_profiles` table.
+The profile records the wall-clock time the query spent queued, generating
+its SQL and executing, alongside the full JSON query plans with per-node
+rows, timings and buffer usage.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from decimal import Decimal
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+import rapidjson
+import structlog
+
+if TYPE_CHECKING:
+    from .connection import Connection
+    from .query import Query
+
+logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
+
+try:
+    _collected_plans
+except NameError:
+    _collected_plans = ContextVar("collected_plans", default=None)
+
+
+@contextmanager
+def collect_query_plans():
+    """
+    Context manager which collects the plans of the statements explained by
+    `write_query` within it.
+
+    Yields
+    ------
+    list of dict
+        The JSON query plans, added to as statements are executed
+    """
+    plans = []
+    token = _collected_plans.set(plans)
+    try:
+        yield plans
+    finally:
+        _collected_plans.reset(token)
+
+
+def record_query_plan(plan: Dict[str, Any]) -> None:
+    """
+    Add a query plan to the plans being collected in this context, if any are.
+
+    Parameters
+    ----------
+    plan : dict
+        JSON output of EXPLAIN ANALYZE for one statement
+    """
+    plans = _collected_plans.get()
+    if plans is not None:
+        plans.append(plan)
+
+
+def summarise_plans(plans: List[Dict[str, Any]], block_size: int = 8192) -> dict:
+    """
+    Summarise the totals for a list of query plans.
+
+    Parameters
+    ----------
+    plans : list of dict
+        JSON outputs of EXPLAIN ANALYZE with BUFFERS
+    block_size : int, default 8192
+        Size of a postgres block in bytes
+
+    Returns
+    -------
+    dict
+        Total planning and execution time in milliseconds, rows output by the
+        top plan nodes, shared blocks hit and read, and the temp blocks and
+        bytes written (an upper bound on the peak temp file usage)
+    """
+    plan_nodes = [plan.get("Plan", {}) for plan in plans]
+    temp_blocks_written = sum(node.get("Temp Written Blocks", 0) for node in plan_nodes)
+    return dict(
+        planning_time=sum(plan.get("Planning Time", 0) for plan in plans),
+        execution_time=sum(plan.get("Execution Time", 0) for plan in plans),
+        rows=sum(node.get("Actual Rows", 0) for node in plan_nodes),
+        shared_blocks_hit=sum(node.get("Shared Hit Blocks", 0) for node in plan_nodes),
+        shared_blocks_read=sum(
+            node.get("Shared Read Blocks", 0) for node in plan_nodes
+        ),
+        temp_blocks_written=temp_blocks_written,
+        temp_bytes_written=temp_blocks_written * block_size,
+    )
+
+
+def write_query_profile(
+    connection: "Connection",
+    query: "Query",
+    *,
+    plans: List[Dict[str, Any]],
+    queued_time: Optional[float] = None,
+    sql_generation_time: Optional[float] = None,
+    execution_time: Optional[float] = None,
+) -> None:
+    """
+    Write a profile of storing a query to the cache.query_profiles table.
+
+    Parameters
+    ----------
+    connection : Connection
+        Flowmachine connection to write the profile with
+    query : Query
+        Query which was stored
+    plans : list of dict
+        JSON plans of the statements explained while storing the query
+    queued_time : float, optional
+        Milliseconds between the query being queued and starting to execute
+    sql_generation_time : float, optional
+        Milliseconds taken to generate the query's SQL
+    execution_time : float, optional
+        Wall-clock milliseconds taken to execute the query's SQL
+    """
+    with connection.engine.begin() as con:
+        block_size = int(con.execute("SELECT current_setting('block_size')").scalar())
+        summary = summarise_plans(plans, block_size=block_size)
+        con.execute(
+            """
+            INSERT INTO cache.query_profiles
+            (query_id, class, profiled_at, queued_time, sql_generation_time, execution_time,
+            planning_time, plan_execution_time, rows, shared_blocks_hit, shared_blocks_read,
+            temp_blocks_written, temp_bytes_written, plans)
+            VALUES (%s, %s, NOW(), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            """,
+            (
+                query.query_id,
+                query.__class__.__name__,
+                queued_time,
+                sql_generation_time,
+                execution_time,
+                summary["planning_time"],
+                summary["execution_time"],
+                summary["rows"],
+                summary["shared_blocks_hit"],
+                summary["shared_blocks_read"],
+                summary["temp_blocks_written"],
+                summary["temp_bytes_written"],
+                rapidjson.dumps(plans),
+            ),
+        )
+    logger.debug(f"Wrote profile of '{query.query_id}'.")
+
+
+def get_query_profile(connection: "Connection", query_id: str) -> Optional[dict]:
+    """
+    Get the most recent profile of storing a query.
+
+    Parameters
+    ----------
+    connection : Connection
+        Flowmachine connection to read the profile with
+    query_id : str
+        Query id of the query
+
+    Returns
+    -------
+    dict or None
+        The profile, with times in milliseconds and `profiled_at` as an ISO
+        formatted string, or None if the query has not been profiled
+    """
+    with connection.engine.begin() as con:
+        profile = con.execute(
+            """
+            SELECT query_id, class, profiled_at, queued_time, sql_generation_time, execution_time,
+            planning_time, plan_execution_time, rows, shared_blocks_hit, shared_blocks_read,
+            temp_blocks_written, temp_bytes_written, plans
+            FROM cache.query_profiles WHERE query_id=%s
+            ORDER BY profiled_at DESC LIMIT 1
+            """,
+            (query_id,),
+        ).first()
+    if profile is None:
+        return None
+    profile = dict(profile)
+    profile["profiled_at"] = profile["profiled_at"].isoformat()
+    return {
+        key: float(value) if isinstance(value, Decimal) else value
+        for key, value in profile.items()
+    }
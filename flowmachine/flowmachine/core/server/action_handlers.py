@@ -18,26 +18,32 @@ from contextvars import copy_context
 from functools import partial
 import json
 import textwrap
-from typing import Callable, Union
+from typing import Callable, List, Tuple, Union
 
+import structlog
 from marshmallow import ValidationError
 
 from flowmachine.core.context import get_db, get_redis
 from flowmachine.core.cache import get_query_object_by_id
+from flowmachine.core.query_profile import get_query_profile
 from flowmachine.core.query_info_lookup import (
     QueryInfoLookup,
     UnkownQueryIdError,
     QueryInfoLookupError,
 )
 from flowmachine.core.query_state import QueryStateMachine, QueryState
+from flowmachine.core.shared_scan import store_with_shared_scans
 from flowmachine.utils import convert_dict_keys_to_strings
 from .exceptions import FlowmachineServerError
 from .query_schemas import FlowmachineQuerySchema, GeographySchema
 from .query_schemas.flowmachine_query import get_query_schema
+from .warm_up import record_query_request
 from .zmq_helpers import ZMQReply
 
 __all__ = ["perform_action"]
 
+logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
+
 from ..dependency_graph import query_progress
 
 
@@ -75,18 +81,22 @@ async def action_handler__get_query_schemas(
     return ZMQReply(status="success", payload={"query_schemas": get_query_schema()})
 
 
-async def action_handler__run_query(
-    config: "FlowmachineServerConfig", **action_params: dict
-) -> ZMQReply:
+def _load_query_object(action_params: dict) -> Union["BaseExposedQuery", ZMQReply]:
     """
-    Handler for the 'run_query' action.
+    Helper function to construct an exposed query object from a query spec.
 
-    Constructs a flowmachine query object, sets it running and returns the query_id.
-    For this action handler the `action_params` are exactly the query kind plus the
-    parameters needed to construct the query.
+    Parameters
+    ----------
+    action_params : dict
+        The query kind plus the parameters needed to construct the query
+
+    Returns
+    -------
+    BaseExposedQuery or ZMQReply
+        The query object, or an error reply if the query object couldn't be constructed.
     """
     try:
-        query_obj = FlowmachineQuerySchema().load(action_params)
+        return FlowmachineQuerySchema().load(action_params)
     except TypeError as exc:
         # We need to catch TypeError here, otherwise they propagate up to
         # perform_action() and result in a very misleading error message.
@@ -119,6 +129,67 @@ async def action_handler__run_query(
         payload = {"validation_error_messages": validation_error_messages}
         return ZMQReply(status="error", msg=error_msg, payload=payload)
 
+
+def _record_query_requests(requests: List[Tuple[str, dict]]) -> None:
+    """
+    Helper function to add requests for queries to the query history, used
+    to choose queries to warm up the cache with. Failing to record a request
+    is logged, rather than failing the request.
+
+    Parameters
+    ----------
+    requests : list of tuple
+        Id of each query requested, and the query kind plus the parameters
+        needed to construct the query
+    """
+    for query_id, action_params in requests:
+        try:
+            record_query_request(get_db(), query_id, action_params)
+        except Exception as exc:
+            logger.error(
+                f"Couldn't record request for query '{query_id}'. Error was {exc}"
+            )
+
+
+async def _record_query_requests_if_warming_up(
+    config: "FlowmachineServerConfig", requests: List[Tuple[str, dict]]
+) -> None:
+    """
+    Add requests for queries to the query history if the cache is being
+    warmed up, writing them in the server's thread pool so the event loop
+    isn't blocked.
+
+    Parameters
+    ----------
+    config : FlowmachineServerConfig
+        Server config
+    requests : list of tuple
+        Id of each query requested, and the query kind plus the parameters
+        needed to construct the query
+    """
+    if config.warm_up_frequency < 0:
+        return
+    await asyncio.get_running_loop().run_in_executor(
+        executor=config.server_thread_pool,
+        func=partial(copy_context().run, partial(_record_query_requests, requests)),
+    )
+
+
+def _get_running_query_id(action_params: dict) -> Union[None, str]:
+    """
+    Helper function to look up the query id of a query which has already been
+    set running. Returns `None` if the query needs to be set running, because
+    it is not known, or has been cancelled or removed from the cache.
+
+    Parameters
+    ----------
+    action_params : dict
+        The query kind plus the parameters needed to construct the query
+
+    Returns
+    -------
+    str or None
+    """
     q_info_lookup = QueryInfoLookup(get_redis())
     try:
         query_id = q_info_lookup.get_query_id(action_params)
@@ -134,6 +205,26 @@ async def action_handler__run_query(
                 finish = qsm.finish_resetting()
             raise QueryInfoLookupError
     except QueryInfoLookupError:
+        return None
+    return query_id
+
+
+async def action_handler__run_query(
+    config: "FlowmachineServerConfig", **action_params: dict
+) -> ZMQReply:
+    """
+    Handler for the 'run_query' action.
+
+    Constructs a flowmachine query object, sets it running and returns the query_id.
+    For this action handler the `action_params` are exactly the query kind plus the
+    parameters needed to construct the query.
+    """
+    query_obj = _load_query_object(action_params)
+    if isinstance(query_obj, ZMQReply):
+        return query_obj
+
+    query_id = _get_running_query_id(action_params)
+    if query_id is None:
         try:
             # Set the query running (it's safe to call this even if the query was set running before)
             query_id = await asyncio.get_running_loop().run_in_executor(
@@ -156,7 +247,8 @@ async def action_handler__run_query(
         # Register the query as "known" (so that we can later look up the query kind
         # and its parameters from the query_id).
 
-        q_info_lookup.register_query(query_id, action_params)
+        QueryInfoLookup(get_redis()).register_query(query_id, action_params)
+    await _record_query_requests_if_warming_up(config, [(query_id, action_params)])
 
     return ZMQReply(
         status="success",
@@ -167,6 +259,81 @@ async def action_handler__run_query(
     )
 
 
+async def action_handler__run_query_batch(
+    config: "FlowmachineServerConfig", queries: List[dict]
+) -> ZMQReply:
+    """
+    Handler for the 'run_query_batch' action.
+
+    Constructs flowmachine query objects for a list of query specs, sets them running
+    and returns their query_ids in the same order. Queries which read the same subset
+    of the events tables are evaluated together with a single scan of that subset,
+    and each is stored under its usual query_id.
+
+    If any of the query specs is invalid, no queries are set running.
+    """
+    query_objs = []
+    for action_params in queries:
+        query_obj = _load_query_object(action_params)
+        if isinstance(query_obj, ZMQReply):
+            return query_obj
+        query_objs.append(query_obj)
+
+    running_query_ids = [_get_running_query_id(params) for params in queries]
+    to_run = {
+        query_obj.query_id: (query_obj, params)
+        for query_obj, params, query_id in zip(query_objs, queries, running_query_ids)
+        if query_id is None
+    }
+    if len(to_run) > 0:
+        try:
+            # Set the queries running (it's safe to call this even if they were set running before)
+            await asyncio.get_running_loop().run_in_executor(
+                executor=config.server_thread_pool,
+                func=partial(
+                    copy_context().run,
+                    partial(
+                        store_with_shared_scans,
+                        [
+                            query_obj._flowmachine_query_obj
+                            for query_obj, _ in to_run.values()
+                        ],
+                        store_dependencies=config.store_dependencies,
+                    ),
+                ),
+            )
+        except Exception as e:
+            return ZMQReply(
+                status="error",
+                msg="Unable to create query objects.",
+                payload={"exception": str(e)},
+            )
+
+        q_info_lookup = QueryInfoLookup(get_redis())
+        for query_id, (_, params) in to_run.items():
+            q_info_lookup.register_query(query_id, params)
+    await _record_query_requests_if_warming_up(
+        config,
+        [
+            (query_obj.query_id, params)
+            for query_obj, params in zip(query_objs, queries)
+        ],
+    )
+
+    return ZMQReply(
+        status="success",
+        payload={
+            "queries": [
+                {
+                    "query_id": query_obj.query_id,
+                    "progress": query_progress(query_obj._flowmachine_query_obj),
+                }
+                for query_obj in query_objs
+            ]
+        },
+    )
+
+
 def _get_query_kind_for_query_id(query_id: str) -> Union[None, str]:
     """
     Helper function to look up the query kind corresponding to the
@@ -260,6 +427,29 @@ async def action_handler__get_query_params(
     return ZMQReply(status="success", payload=payload)
 
 
+def _get_index_columns(query: "Query") -> List[str]:
+    """
+    Helper function to get the columns a query's cache table is indexed on,
+    which FlowAPI pages the result by.
+
+    Parameters
+    ----------
+    query : Query
+
+    Returns
+    -------
+    list of str
+        Names of the index columns, in order
+    """
+    index_columns = []
+    for index in query.index_cols:
+        for column in [index] if isinstance(index, str) else index:
+            column = column.strip('"')
+            if column in query.column_names and column not in index_columns:
+                index_columns.append(column)
+    return index_columns
+
+
 async def action_handler__get_sql(
     config: "FlowmachineServerConfig", query_id: str
 ) -> ZMQReply:
@@ -267,7 +457,8 @@ async def action_handler__get_sql(
     Handler for the 'get_sql' action.
 
     Returns a SQL string which can be run against flowdb to obtain
-    the result of the query with given `query_id`.
+    the result of the query with given `query_id`, and the columns the
+    result is indexed on.
     """
     # TODO: currently we can't use QueryStateMachine to determine whether
     # the query_id belongs to a valid query object, so we need to check it
@@ -286,7 +477,12 @@ async def action_handler__get_sql(
     if query_state == QueryState.COMPLETED:
         q = get_query_object_by_id(get_db(), query_id)
         sql = q.get_query()
-        payload = {"query_id": query_id, "query_state": query_state, "sql": sql}
+        payload = {
+            "query_id": query_id,
+            "query_state": query_state,
+            "sql": sql,
+            "index_columns": _get_index_columns(q),
+        }
         return ZMQReply(status="success", payload=payload)
     else:
         msg = f"Query with id '{query_id}' {query_state.description}."
@@ -408,6 +604,33 @@ async def action_handler__get_available_dates(
     return ZMQReply(status="success", payload=available_dates)
 
 
+async def action_handler__get_query_profile(
+    config: "FlowmachineServerConfig", query_id: str
+) -> ZMQReply:
+    """
+    Handler for the 'get_query_profile' action.
+
+    Returns the most recent execution profile of the query with the given `query_id`.
+    Profiles are only recorded while query profiling is enabled.
+    """
+    q_info_lookup = QueryInfoLookup(get_redis())
+    if not q_info_lookup.query_is_known(query_id):
+        msg = f"Unknown query id: '{query_id}'"
+        payload = {"query_id": query_id, "query_state": "awol"}
+        return ZMQReply(status="error", msg=msg, payload=payload)
+
+    profile = get_query_profile(get_db(), query_id)
+    if profile is None:
+        query_state = QueryStateMachine(
+            get_redis(), query_id, get_db().conn_id
+        ).current_query_state
+        msg = f"No profile has been recorded for query with id '{query_id}'."
+        payload = {"query_id": query_id, "query_state": query_state}
+        return ZMQReply(status="error", msg=msg, payload=payload)
+    payload = {"query_id": query_id, "profile": profile}
+    return ZMQReply(status="success", payload=payload)
+
+
 def get_action_handler(action: str) -> Callable:
     """Exception should be raised for handlers that don't exist."""
     try:
@@ -460,6 +683,7 @@ ACTION_HANDLERS = {
     "get_available_queries": action_handler__get_available_queries,
     "get_query_schemas": action_handler__get_query_schemas,
     "run_query": action_handler__run_query,
+    "run_query_batch": action_handler__run_query_batch,
     "poll_query": action_handler__poll_query,
     "get_query_kind": action_handler__get_query_kind,
     "get_query_params": action_handler__get_query_params,
@@ -467,4 +691,5 @@ ACTION_HANDLERS = {
     "get_geo_sql_for_query_result": action_handler__get_geo_sql,
     "get_geography": action_handler__get_geography,
     "get_available_dates": action_handler__get_available_dates,
+    "get_query_profile": action_handler__get_query_profile,
 }
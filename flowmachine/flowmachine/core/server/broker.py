@@ -0,0 +1,73 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Broker which shares messages from FlowAPI between several flowmachine server
+workers, so that server capacity can be added by running more workers (on
+one host or many).
+
+FlowAPI connects to the broker in place of a single flowmachine server.
+Workers are flowmachine servers started with `FLOWMACHINE_BROKER_ADDRESS`
+set to the address of the broker's worker port. The broker hands messages
+to the connected workers in turn, and passes each reply back to the sender.
+Workers share redis and FlowDB, so a query being run by one worker is not
+run again by another.
+"""
+
+import os
+from typing import NoReturn, Optional
+
+import structlog
+import zmq
+
+from flowmachine.core.logging import set_log_level
+
+logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
+
+
+def run_broker(
+    *, frontend_address: str, worker_address: str, ctx: Optional[zmq.Context] = None,
+) -> NoReturn:
+    """
+    Pass messages received at the frontend address to the workers connected
+    to the worker address, and their replies back to the sender. Blocks
+    until the zmq context is terminated.
+
+    Parameters
+    ----------
+    frontend_address : str
+        Address to listen for messages from FlowAPI on, e.g. "tcp://*:5555"
+    worker_address : str
+        Address for workers to connect to, e.g. "tcp://*:5556"
+    ctx : zmq.Context, optional
+        zmq context to use. Defaults to the global context.
+    """
+    ctx = zmq.Context.instance() if ctx is None else ctx
+    frontend = ctx.socket(zmq.ROUTER)
+    frontend.bind(frontend_address)
+    workers = ctx.socket(zmq.DEALER)
+    workers.bind(worker_address)
+    logger.info(
+        f"Flowmachine broker is listening on {frontend_address}, with workers on {worker_address}"
+    )
+    try:
+        zmq.proxy(frontend, workers)
+    except zmq.ContextTerminated:
+        logger.info("Flowmachine broker shutting down.")
+    finally:
+        frontend.close(linger=0)
+        workers.close(linger=0)
+
+
+def main():
+    set_log_level("flowmachine.debug", os.getenv("FLOWMACHINE_LOG_LEVEL", "error"))
+    port = int(os.getenv("FLOWMACHINE_PORT", 5555))
+    worker_port = int(os.getenv("FLOWMACHINE_BROKER_WORKER_PORT", 5556))
+    run_broker(
+        frontend_address=f"tcp://*:{port}", worker_address=f"tcp://*:{worker_port}"
+    )
+
+
+if __name__ == "__main__":
+    main()
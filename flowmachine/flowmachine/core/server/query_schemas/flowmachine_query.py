@@ -1,8 +1,16 @@
 # This Source Code Form is subject to the terms of the Mozilla Public
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
+import os
+import tempfile
 from functools import lru_cache
+from hashlib import md5
+from pathlib import Path
 
+import apispec
+import marshmallow
+import rapidjson
+import structlog
 from apispec import APISpec
 from apispec_oneofschema import MarshmallowPlugin
 
@@ -40,6 +48,8 @@ from .unmoving_at_reference_location_counts import (
 )
 from .unmoving_counts import UnmovingCountsSchema
 
+logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
+
 
 class FlowmachineQuerySchema(OneOfSchema):
     type_field = "query_kind"
@@ -68,17 +78,36 @@ class FlowmachineQuerySchema(OneOfSchema):
     }
 
 
-@lru_cache(maxsize=1)
-def get_query_schema() -> dict:
+def _query_schema_cache_path() -> Path:
     """
-    Get a dictionary representation of the FlowmachineQuerySchema api spec.
-    This will contain a schema which defines all valid query types that can be run.
+    Get the path of the file the query schema is cached in. The file name
+    depends on the versions of flowmachine, apispec and marshmallow, and on the
+    query schema modules, so the schema is regenerated whenever any of them change.
+
+    The cache directory can be set with the FLOWMACHINE_QUERY_SCHEMA_CACHE_DIR
+    environment variable, and defaults to a 'flowmachine' directory in the
+    system's temporary directory.
 
     Returns
     -------
-    dict
-
+    Path
     """
+    from flowmachine import __version__
+
+    key = md5(f"{__version__}|{apispec.__version__}|{marshmallow.__version__}".encode())
+    for schema_module in sorted(Path(__file__).parent.glob("*.py")):
+        module_stat = schema_module.stat()
+        key.update(
+            f"|{schema_module.name}|{module_stat.st_mtime_ns}|{module_stat.st_size}".encode()
+        )
+    cache_dir = os.getenv(
+        "FLOWMACHINE_QUERY_SCHEMA_CACHE_DIR",
+        os.path.join(tempfile.gettempdir(), "flowmachine"),
+    )
+    return Path(cache_dir) / f"query_schemas_{key.hexdigest()}.json"
+
+
+def _make_query_schema() -> dict:
     spec = APISpec(
         title="FlowAPI",
         version="1.0.0",
@@ -87,3 +116,39 @@ def get_query_schema() -> dict:
     )
     spec.components.schema("FlowmachineQuerySchema", schema=FlowmachineQuerySchema)
     return spec.to_dict()["components"]["schemas"]
+
+
+@lru_cache(maxsize=1)
+def get_query_schema() -> dict:
+    """
+    Get a dictionary representation of the FlowmachineQuerySchema api spec.
+    This will contain a schema which defines all valid query types that can be run.
+
+    The schema is cached on disk (see `_query_schema_cache_path`), so that it is
+    only generated once for each version of flowmachine rather than by every
+    server process.
+
+    Returns
+    -------
+    dict
+
+    """
+    cache_path = _query_schema_cache_path()
+    try:
+        return rapidjson.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        logger.debug("No cached query schema.", path=str(cache_path))
+    schema = _make_query_schema()
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first, so other processes never read a partly written schema
+        with tempfile.NamedTemporaryFile(
+            "w", dir=cache_path.parent, suffix=".tmp", delete=False
+        ) as tmp_file:
+            tmp_file.write(rapidjson.dumps(schema))
+        os.replace(tmp_file.name, cache_path)
+    except OSError as exc:
+        logger.debug(
+            "Couldn't cache query schema.", path=str(cache_path), error=str(exc)
+        )
+    return schema
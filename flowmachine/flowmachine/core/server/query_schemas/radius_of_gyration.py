@@ -23,6 +23,7 @@ class RadiusOfGyrationExposed(BaseExposedQueryWithSampling):
         end_date,
         event_types,
         subscriber_subset=None,
+        method="geodesic",
         sampling=None
     ):
         # Note: all input parameters need to be defined as attributes on `self`
@@ -31,6 +32,7 @@ class RadiusOfGyrationExposed(BaseExposedQueryWithSampling):
         self.end_date = end_date
         self.event_types = event_types
         self.subscriber_subset = subscriber_subset
+        self.method = method
         self.sampling = sampling
 
     @property
@@ -47,6 +49,7 @@ class RadiusOfGyrationExposed(BaseExposedQueryWithSampling):
             stop=self.end_date,
             table=self.event_types,
             subscriber_subset=self.subscriber_subset,
+            method=self.method,
         )
 
 
@@ -57,5 +60,8 @@ class RadiusOfGyrationSchema(BaseQueryWithSamplingSchema):
     end_date = ISODateTime(required=True)
     event_types = EventTypes()
     subscriber_subset = SubscriberSubset()
+    method = fields.String(
+        missing="geodesic", validate=OneOf(["geodesic", "unit-vector"])
+    )
 
     __model__ = RadiusOfGyrationExposed
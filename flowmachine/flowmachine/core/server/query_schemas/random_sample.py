@@ -66,6 +66,26 @@ class RandomIDsRandomSampleSchema(BaseRandomSampleSchema):
         return RandomSampler(sampling_method="random_ids", **params)
 
 
+class SubscriberHashRandomSampleSchema(BaseRandomSampleSchema):
+    # We must define the sampling_method field here for it to appear in the API spec.
+    # This field is removed by RandomSampleSchema before passing on to this schema,
+    # so the sampling_method parameter is never received here and is not included in the
+    # params passed to make_random_sampler.
+    sampling_method = fields.String(validate=OneOf(["subscriber_hash"]))
+    seed = fields.Float(required=True)
+
+    @validates_schema
+    def validate_fraction(self, data, **kwargs):
+        if data.get("fraction") is None:
+            raise ValidationError(
+                "Must provide 'fraction' for a subscriber hash random sample."
+            )
+
+    @post_load
+    def make_random_sampler(self, params, **kwargs):
+        return RandomSampler(sampling_method="subscriber_hash", **params)
+
+
 class RandomSampler:
     def __init__(
         self, *, sampling_method, estimate_count, seed, size=None, fraction=None
@@ -106,4 +126,5 @@ class RandomSampleSchema(OneOfSchema):
         "system": SystemRandomSampleSchema,
         "bernoulli": BernoulliRandomSampleSchema,
         "random_ids": RandomIDsRandomSampleSchema,
+        "subscriber_hash": SubscriberHashRandomSampleSchema,
     }
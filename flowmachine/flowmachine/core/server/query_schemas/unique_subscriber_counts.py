@@ -3,7 +3,7 @@
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
 from marshmallow import fields, post_load
-from marshmallow.validate import OneOf
+from marshmallow.validate import OneOf, Range
 
 from flowmachine.features import UniqueSubscriberCounts
 from flowmachine.features.location.redacted_unique_subscriber_counts import (
@@ -19,13 +19,16 @@ from .custom_fields import EventTypes, ISODateTime
 
 
 class UniqueSubscriberCountsExposed(BaseExposedQuery):
-    def __init__(self, *, start_date, end_date, aggregation_unit, event_types):
+    def __init__(
+        self, *, start_date, end_date, aggregation_unit, event_types, error_bound=None
+    ):
         # Note: all input parameters need to be defined as attributes on `self`
         # so that marshmallow can serialise the object correctly.
         self.start_date = start_date
         self.end_date = end_date
         self.aggregation_unit = aggregation_unit
         self.event_types = event_types
+        self.error_bound = error_bound
 
     @property
     def _flowmachine_query_obj(self):
@@ -42,6 +45,7 @@ class UniqueSubscriberCountsExposed(BaseExposedQuery):
                 stop=self.end_date,
                 spatial_unit=self.aggregation_unit,
                 table=self.event_types,
+                error_bound=self.error_bound,
             )
         )
 
@@ -52,5 +56,12 @@ class UniqueSubscriberCountsSchema(AggregationUnitMixin, BaseSchema):
     start_date = ISODateTime(required=True)
     end_date = ISODateTime(required=True)
     event_types = EventTypes()
+    # Relative standard error for approximate counts, or None for exact counts
+    error_bound = fields.Float(
+        required=False,
+        allow_none=True,
+        missing=None,
+        validate=Range(min=0.005, max=0.5),
+    )
 
     __model__ = UniqueSubscriberCountsExposed
@@ -22,13 +22,14 @@ from zmq.asyncio import Context
 import flowmachine
 from flowmachine.core import Query, Connection
 from flowmachine.core.cache import watch_and_shrink_cache
-from flowmachine.core.context import get_db, get_executor
+from flowmachine.core.context import get_db, get_executor, get_redis, profile_queries
 from flowmachine.utils import convert_dict_keys_to_strings
 from .exceptions import FlowmachineServerError
 from .zmq_helpers import ZMQReply
 from flowmachine.core.server.action_request_schema import ActionRequest
 from .action_handlers import perform_action
 from .server_config import get_server_config
+from .warm_up import warm_up_cache_periodically
 
 logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
 query_run_log = structlog.get_logger("flowmachine.query_run_log")
@@ -219,34 +220,79 @@ def shutdown(socket: "zmq.asyncio.Socket") -> None:
     logger.debug("Cancelled all remaining tasks.")
 
 
+async def shrink_cache_once_per_period(
+    *, config: "FlowmachineServerConfig"
+) -> NoReturn:
+    """
+    Background task to periodically trigger a shrink of the cache, when
+    several workers share the cache. In each period, only the first worker
+    to claim that period (using a key in redis which expires at the end of
+    the period) shrinks the cache.
+
+    Parameters
+    ----------
+    config : FlowmachineServerConfig
+        Server config options
+    """
+    while True:
+        if get_redis().set(
+            "flowmachine_cache_pruning_claimed",
+            "claimed",
+            nx=True,
+            ex=max(config.cache_pruning_frequency, 1),
+        ):
+            await watch_and_shrink_cache(
+                flowdb_connection=get_db(),
+                pool=get_executor(),
+                timeout=config.cache_pruning_timeout,
+                policy=config.cache_policy,
+                loop=False,
+            )
+        await asyncio.sleep(config.cache_pruning_frequency)
+
+
 async def recv(*, config: "FlowmachineServerConfig") -> NoReturn:
     """
     Main receive-and-reply loop. Listens to zmq messages on the given port,
     processes them and sends back a reply with the result or an error message.
 
+    If a broker address is configured, this server is one of several workers
+    and takes messages from the broker instead of listening on the port itself.
+
     Parameters
     ----------
     config : FlowmachineServerConfig
         Server config options
     """
-    logger.info(f"Flowmachine server is listening on port {config.port}")
-
     ctx = Context.instance()
-    socket = ctx.socket(zmq.ROUTER)
-    socket.bind(f"tcp://*:{config.port}")
-
-    # Get the loop and attach a sigterm handler to allow coverage data to be written
-    main_loop = asyncio.get_event_loop()
-    main_loop.add_signal_handler(signal.SIGTERM, partial(shutdown, socket=socket))
-
-    main_loop.create_task(
-        watch_and_shrink_cache(
+    if config.broker_address is None:
+        logger.info(f"Flowmachine server is listening on port {config.port}")
+        socket = ctx.socket(zmq.ROUTER)
+        socket.bind(f"tcp://*:{config.port}")
+        cache_shrinker = watch_and_shrink_cache(
             flowdb_connection=get_db(),
             pool=get_executor(),
             sleep_time=config.cache_pruning_frequency,
             timeout=config.cache_pruning_timeout,
+            policy=config.cache_policy,
         )
-    )
+    else:
+        logger.info(
+            f"Flowmachine server is taking messages from the broker at {config.broker_address}"
+        )
+        # A dealer socket receives messages from the broker in the same form a router
+        # socket receives them from FlowAPI (prefixed with the return address), and sends
+        # replies back through the broker to that address.
+        socket = ctx.socket(zmq.DEALER)
+        socket.connect(config.broker_address)
+        cache_shrinker = shrink_cache_once_per_period(config=config)
+
+    # Get the loop and attach a sigterm handler to allow coverage data to be written
+    main_loop = asyncio.get_event_loop()
+    main_loop.add_signal_handler(signal.SIGTERM, partial(shutdown, socket=socket))
+
+    main_loop.create_task(cache_shrinker)
+    main_loop.create_task(warm_up_cache_periodically(config=config))
     try:
         while True:
             await receive_next_zmq_message_and_send_back_reply(
@@ -271,6 +317,16 @@ def main():
         logger.info("Dependency caching is disabled.")
     if config.debug_mode:
         logger.info("Enabling asyncio's debugging mode.")
+    if config.profile_queries:
+        logger.info("Query profiling is enabled.")
+        profile_queries.set(True)
+    if config.warm_up_frequency >= 0:
+        logger.info(
+            "Cache warm-up is enabled.",
+            frequency=config.warm_up_frequency,
+            budget=config.warm_up_budget,
+            hours=config.warm_up_hours,
+        )
 
     # Run receive loop which receives zmq messages and sends back replies
     asyncio.run(
@@ -5,7 +5,7 @@
 import os
 from concurrent.futures.thread import ThreadPoolExecutor
 
-from typing import NamedTuple
+from typing import NamedTuple, Optional, Tuple
 
 
 def get_env_as_bool(env_var: str) -> bool:
@@ -47,6 +47,26 @@ class FlowmachineServerConfig(NamedTuple):
         Maximum number of seconds to wait for a cache pruning operation to complete.
     server_thread_pool : ThreadPoolExecutor
         Server's threadpool for managing blocking tasks
+    cache_policy : str
+        Policy used to choose which queries to remove when shrinking the cache.
+    broker_address : str or None
+        Address of a flowmachine broker to take messages from as one of several
+        workers (e.g. "tcp://flowmachine_broker:5556"). If None, the server listens
+        for messages on `port` itself.
+    profile_queries : bool
+        If True, record a profile of each query the server stores in the
+        cache.query_profiles table.
+    warm_up_frequency : int
+        Number of seconds to wait between checks for queries to compute ahead
+        of demand (if negative, the cache is never warmed up).
+    warm_up_budget : int
+        Maximum number of seconds of estimated compute time to spend on
+        each cache warm-up.
+    warm_up_hours : tuple of int, or None
+        Hours of the day (start and stop) in which to warm up the cache, or
+        None to warm it up at any time of day.
+    warm_up_min_requests : int
+        Only warm up queries which have been requested at least this many times.
     """
 
     port: int
@@ -55,6 +75,13 @@ class FlowmachineServerConfig(NamedTuple):
     cache_pruning_frequency: int
     cache_pruning_timeout: int
     server_thread_pool: ThreadPoolExecutor
+    cache_policy: str = "score"
+    broker_address: Optional[str] = None
+    profile_queries: bool = False
+    warm_up_frequency: int = -1
+    warm_up_budget: int = 3600
+    warm_up_hours: Optional[Tuple[int, int]] = None
+    warm_up_min_requests: int = 2
 
 
 def get_server_config() -> FlowmachineServerConfig:
@@ -75,6 +102,16 @@ def get_server_config() -> FlowmachineServerConfig:
         os.getenv("FLOWMACHINE_CACHE_PRUNING_FREQUENCY", 86400)
     )
     cache_pruning_timeout = int(os.getenv("FLOWMACHINE_CACHE_PRUNING_TIMEOUT", 600))
+    cache_policy = os.getenv("FLOWMACHINE_CACHE_POLICY", "score")
+    broker_address = os.getenv("FLOWMACHINE_BROKER_ADDRESS", None)
+    profile_queries = get_env_as_bool("FLOWMACHINE_SERVER_PROFILE_QUERIES")
+    warm_up_frequency = int(os.getenv("FLOWMACHINE_CACHE_WARM_UP_FREQUENCY", -1))
+    warm_up_budget = int(os.getenv("FLOWMACHINE_CACHE_WARM_UP_BUDGET", 3600))
+    warm_up_hours = os.getenv("FLOWMACHINE_CACHE_WARM_UP_HOURS", None)
+    if warm_up_hours is not None:
+        # Of the form "<start>-<stop>", e.g. "22-6" for 10pm to 6am
+        warm_up_hours = tuple(int(hour) for hour in warm_up_hours.split("-"))
+    warm_up_min_requests = int(os.getenv("FLOWMACHINE_CACHE_WARM_UP_MIN_REQUESTS", 2))
     thread_pool_size = os.getenv("FLOWMACHINE_SERVER_THREADPOOL_SIZE", None)
     try:
         thread_pool_size = int(thread_pool_size)
@@ -88,4 +125,11 @@ def get_server_config() -> FlowmachineServerConfig:
         cache_pruning_frequency=cache_pruning_frequency,
         cache_pruning_timeout=cache_pruning_timeout,
         server_thread_pool=ThreadPoolExecutor(max_workers=thread_pool_size),
+        cache_policy=cache_policy,
+        broker_address=broker_address,
+        profile_queries=profile_queries,
+        warm_up_frequency=warm_up_frequency,
+        warm_up_budget=warm_up_budget,
+        warm_up_hours=warm_up_hours,
+        warm_up_min_requests=warm_up_min_requests,
     )
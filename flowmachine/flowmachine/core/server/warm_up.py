@@ -0,0 +1,405 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Warming up the cache from the history of requested queries.
+
+Every query spec the server is asked to run is recorded in the
+`cache.query_history` table in FlowDB, with the number of times it has been
+requested and when it was last requested. Unlike the cache metadata, the
+history survives resetting the cache, so after a reset, a restart or an
+eviction pass, the server can recompute the most requested queries before
+anyone asks for them again.
+
+When a new day of data is ingested, queries which covered the most recent
+day before it are assumed to be rolling windows, and their next day's
+versions are computed too, so the first request for the new day finds them
+already stored.
+"""
+import asyncio
+import datetime
+import re
+from contextvars import copy_context
+from functools import partial
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+import rapidjson
+import structlog
+
+from flowmachine.core.context import get_db, get_redis
+from flowmachine.core.query_info_lookup import QueryInfoLookup
+from flowmachine.core.query_state import QueryStateMachine
+from .query_schemas import FlowmachineQuerySchema
+
+logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
+
+# Parameters of query specs which are dates (e.g. 'start_date', 'end_date_a')
+_DATE_PARAMETER = re.compile(r"^(date|start|stop|start_date|end_date)(_[a-z])?$")
+
+
+class WarmUpCandidate(NamedTuple):
+    """
+    A query spec which could be computed ahead of demand.
+
+    Attributes
+    ----------
+    query_params : dict
+        The query spec
+    score : float
+        Expected compute time saved by computing the query now, in seconds.
+        This is the query's compute time, weighted by how many times it has
+        been requested, with each request counting for less the longer ago
+        it was.
+    compute_time : float
+        Estimated seconds to compute the query
+    reason : {'recompute', 'next_day'}
+        'recompute' for a previously requested query which is not stored,
+        or 'next_day' for the next day's version of a rolling window query
+    """
+
+    query_params: dict
+    score: float
+    compute_time: float
+    reason: str
+
+
+def record_query_request(
+    connection: "Connection", query_id: str, query_params: dict
+) -> None:
+    """
+    Add a request for a query to the history in FlowDB.
+
+    Parameters
+    ----------
+    connection : Connection
+    query_id : str
+        Id of the query requested
+    query_params : dict
+        Query kind plus the parameters of the query
+    """
+    with connection.engine.begin() as con:
+        con.execute(
+            """
+            INSERT INTO cache.query_history (query_id, query_params)
+            VALUES (%s, %s)
+            ON CONFLICT (query_id) DO UPDATE
+            SET request_count = cache.query_history.request_count + 1,
+                last_requested = NOW()
+            """,
+            (query_id, rapidjson.dumps(query_params)),
+        )
+
+
+def shift_query_dates(query_params: Any, days: int) -> Any:
+    """
+    Shift every date in a query spec, including in the specs of its
+    sub-queries, by a number of days.
+
+    Parameters
+    ----------
+    query_params : dict
+        Query spec
+    days : int
+        Number of days to shift the dates by
+
+    Returns
+    -------
+    dict
+        The shifted spec. Dates keep their format.
+
+    Examples
+    --------
+    >>> shift_query_dates({"query_kind": "daily_location", "date": "2016-01-01", "method": "last"}, 1)
+    {'query_kind': 'daily_location', 'date': '2016-01-02', 'method': 'last'}
+    """
+    if isinstance(query_params, list):
+        return [shift_query_dates(value, days) for value in query_params]
+    if not isinstance(query_params, dict):
+        return query_params
+    shifted = {}
+    for key, value in query_params.items():
+        if _DATE_PARAMETER.match(key) and isinstance(value, str):
+            date = datetime.datetime.fromisoformat(value) + datetime.timedelta(
+                days=days
+            )
+            if len(value) == 10:
+                shifted[key] = date.date().isoformat()
+            else:
+                shifted[key] = date.isoformat(sep=value[10])
+        else:
+            shifted[key] = shift_query_dates(value, days)
+    return shifted
+
+
+def get_latest_query_date(query_params: Any) -> Optional[datetime.date]:
+    """
+    Get the latest date in a query spec, including in the specs of its
+    sub-queries.
+
+    Parameters
+    ----------
+    query_params : dict
+        Query spec
+
+    Returns
+    -------
+    datetime.date or None
+        The latest date, or None if the spec has no dates
+    """
+    if isinstance(query_params, list):
+        values = query_params
+    elif isinstance(query_params, dict):
+        values = list(query_params.values())
+        values += [
+            datetime.datetime.fromisoformat(value).date()
+            for key, value in query_params.items()
+            if _DATE_PARAMETER.match(key) and isinstance(value, str)
+        ]
+    else:
+        return None
+    dates = [
+        value if isinstance(value, datetime.date) else get_latest_query_date(value)
+        for value in values
+    ]
+    dates = [date for date in dates if date is not None]
+    return max(dates) if len(dates) > 0 else None
+
+
+def in_warm_up_hours(now: datetime.datetime, hours: Optional[Tuple[int, int]]):
+    """
+    Check whether it is time to warm up the cache.
+
+    Parameters
+    ----------
+    now : datetime.datetime
+        Current time
+    hours : tuple of int, or None
+        Hours of the day (start and stop) in which to warm up the cache. If
+        the start is after the stop, the hours span midnight. None for any
+        time of day.
+
+    Returns
+    -------
+    bool
+    """
+    if hours is None:
+        return True
+    start_hour, stop_hour = hours
+    if start_hour <= stop_hour:
+        return start_hour <= now.hour < stop_hour
+    return now.hour >= start_hour or now.hour < stop_hour
+
+
+def _is_running_or_stored(query_id: str) -> bool:
+    qsm = QueryStateMachine(get_redis(), query_id, get_db().conn_id)
+    return qsm.is_queued or qsm.is_executing or qsm.is_completed
+
+
+def get_warm_up_candidates(
+    connection: "Connection",
+    *,
+    min_requests: int = 2,
+    half_life: float = 7.0,
+    now: Optional[datetime.datetime] = None,
+) -> List[WarmUpCandidate]:
+    """
+    Choose queries to compute ahead of demand from the query history, in
+    order of the compute time they are expected to save.
+
+    Candidates are the previously requested queries which are not stored
+    or running, and the next day's versions of previously requested queries
+    whose latest date was the most recent ingested day before the latest
+    one (or the day after, for queries with exclusive end dates).
+
+    Parameters
+    ----------
+    connection : Connection
+    min_requests : int, default 2
+        Only consider queries which have been requested at least this many times
+    half_life : float, default 7.0
+        Number of days after which a request counts for half as much
+    now : datetime.datetime, optional
+        Time to measure the age of requests from. Defaults to the current time.
+
+    Returns
+    -------
+    list of WarmUpCandidate
+        Candidates, highest score first
+    """
+    if now is None:
+        now = datetime.datetime.now(datetime.timezone.utc)
+    # Keep the last known compute times, for queries which are later removed from cache
+    with connection.engine.begin() as con:
+        con.execute(
+            """
+            UPDATE cache.query_history
+            SET compute_time = cached.compute_time
+            FROM cache.cached
+            WHERE cached.query_id = query_history.query_id
+                AND cached.compute_time IS NOT NULL
+            """
+        )
+    history = connection.fetch(
+        f"""
+        SELECT query_id, query_params, request_count, last_requested, compute_time
+        FROM cache.query_history
+        WHERE request_count >= {int(min_requests)}
+        """
+    )
+    known_times = sorted(
+        float(compute_time) / 1000
+        for *_, compute_time in history
+        if compute_time is not None
+    )
+    # Queries which never finished are assumed to take the median time
+    default_time = known_times[len(known_times) // 2] if len(known_times) > 0 else 0.0
+
+    ingested_dates = sorted(
+        {date for dates in connection.available_dates.values() for date in dates}
+    )
+    if len(ingested_dates) > 1:
+        previous_date, latest_date = ingested_dates[-2:]
+        new_days = (latest_date - previous_date).days
+    else:
+        previous_date = None
+
+    candidates = []
+    for query_id, query_params, request_count, last_requested, compute_time in history:
+        if isinstance(query_params, str):
+            query_params = rapidjson.loads(query_params)
+        compute_time = (
+            default_time if compute_time is None else float(compute_time) / 1000
+        )
+        age_in_days = (now - last_requested).total_seconds() / 86400
+        score = request_count * 0.5 ** (age_in_days / half_life) * compute_time
+        if not _is_running_or_stored(query_id.strip()):
+            candidates.append(
+                WarmUpCandidate(
+                    query_params=query_params,
+                    score=score,
+                    compute_time=compute_time,
+                    reason="recompute",
+                )
+            )
+        latest_query_date = get_latest_query_date(query_params)
+        if (
+            previous_date is not None
+            and latest_query_date is not None
+            and 0 <= (latest_query_date - previous_date).days <= 1
+        ):
+            candidates.append(
+                WarmUpCandidate(
+                    query_params=shift_query_dates(query_params, new_days),
+                    score=score,
+                    compute_time=compute_time,
+                    reason="next_day",
+                )
+            )
+    return sorted(candidates, key=lambda candidate: candidate.score, reverse=True)
+
+
+def warm_up_cache(
+    connection: "Connection",
+    *,
+    budget: float,
+    min_requests: int = 2,
+    store_dependencies: bool = True,
+) -> List[str]:
+    """
+    Set running the queries chosen from the query history to compute ahead
+    of demand, within a budget of compute time.
+
+    Candidates are taken highest score first (see `get_warm_up_candidates`),
+    skipping any which would take the estimated compute time over the
+    budget, or which are already running or stored. Queries are registered
+    with the query info lookup, so that later requests for them find them already running or stored, but are not
+    added to the query history.
+
+    Parameters
+    ----------
+    connection : Connection
+    budget : float
+        Total seconds of estimated compute time to spend
+    min_requests : int, default 2
+        Only consider queries which have been requested at least this many times
+    store_dependencies : bool, default True
+        If True, store the queries' dependencies
+
+    Returns
+    -------
+    list of str
+        Ids of the queries set running
+    """
+    q_info_lookup = QueryInfoLookup(get_redis())
+    query_ids = []
+    spent = 0.0
+    for candidate in get_warm_up_candidates(connection, min_requests=min_requests):
+        if spent + candidate.compute_time > budget:
+            continue
+        try:
+            query_obj = FlowmachineQuerySchema().load(candidate.query_params)
+            if _is_running_or_stored(query_obj.query_id):
+                continue
+            query_id = query_obj.store_async(store_dependencies=store_dependencies)
+        except Exception as exc:
+            # e.g. the next day's version of a query whose dates are now invalid
+            logger.debug(
+                "Couldn't warm up query.",
+                query_params=candidate.query_params,
+                exception=str(exc),
+            )
+            continue
+        q_info_lookup.register_query(query_id, candidate.query_params)
+        spent += candidate.compute_time
+        query_ids.append(query_id)
+        logger.info(
+            f"Warming up query '{query_id}'.",
+            reason=candidate.reason,
+            score=candidate.score,
+            estimated_compute_time=candidate.compute_time,
+        )
+    return query_ids
+
+
+async def warm_up_cache_periodically(*, config: "FlowmachineServerConfig") -> None:
+    """
+    Background task to periodically warm up the cache during the configured
+    hours. When several workers share the cache, only the first worker to
+    claim each period (using a key in redis which expires at the end of the
+    period) warms up the cache.
+
+    Parameters
+    ----------
+    config : FlowmachineServerConfig
+        Server config options
+    """
+    if config.warm_up_frequency < 0:
+        logger.debug("Cache warm-up is disabled.")
+        return
+    while True:
+        if in_warm_up_hours(
+            datetime.datetime.now(), config.warm_up_hours
+        ) and get_redis().set(
+            "flowmachine_cache_warm_up_claimed",
+            "claimed",
+            nx=True,
+            ex=max(config.warm_up_frequency, 1),
+        ):
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    config.server_thread_pool,
+                    partial(
+                        copy_context().run,
+                        partial(
+                            warm_up_cache,
+                            get_db(),
+                            budget=config.warm_up_budget,
+                            min_requests=config.warm_up_min_requests,
+                            store_dependencies=config.store_dependencies,
+                        ),
+                    ),
+                )
+            except Exception as exc:
+                logger.error(f"Cache warm-up failed. Error was {exc}")
+        await asyncio.sleep(config.warm_up_frequency)
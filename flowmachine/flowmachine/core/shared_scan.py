@@ -0,0 +1,346 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Shared-scan execution for batches of queries.
+
+Queries which read the same subset of an events table (the same table,
+period, hours and subscriber subset, but possibly different columns) can
+be stored together, after reading that subset once into a temporary table
+with all of the columns any of them need. Each query is then computed from
+the temporary table and stored under its usual query id.
+"""
+
+from collections import defaultdict
+from concurrent.futures import Future
+from hashlib import md5
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import structlog
+
+from flowmachine.core.cache import write_cache_metadata
+from flowmachine.core.context import (
+    get_db,
+    get_redis,
+    shared_scans,
+    submit_to_executor,
+)
+from flowmachine.core.errors.flowmachine_errors import (
+    QueryCancelledException,
+    QueryErroredException,
+    StoreFailedException,
+)
+from flowmachine.core.query import Query, write_query
+from flowmachine.core.query_state import QueryStateMachine
+
+logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
+
+
+def _event_table_subsets(query: Query) -> List["EventTableSubset"]:
+    """
+    Get the event table subsets which a query reads from the events tables,
+    i.e. those which are not behind a stored query.
+
+    Parameters
+    ----------
+    query : Query
+        Query to find the event table subsets of
+
+    Returns
+    -------
+    list of EventTableSubset
+    """
+    from flowmachine.features.utilities.event_table_subset import EventTableSubset
+
+    subsets = {}
+    openlist = list(query.dependencies)
+    seen = set()
+    while openlist:
+        dependency = openlist.pop()
+        if dependency.query_id in seen or dependency.is_stored:
+            continue
+        seen.add(dependency.query_id)
+        if isinstance(dependency, EventTableSubset):
+            subsets[dependency.query_id] = dependency
+        else:
+            openlist += list(dependency.dependencies)
+    return list(subsets.values())
+
+
+def _scan_key(subset: "EventTableSubset") -> str:
+    """
+    Identifier for the rows of an events table an event table subset selects,
+    which doesn't depend on the columns it selects.
+    """
+    return md5(
+        "|".join(
+            str(x)
+            for x in (
+                subset.table_ORIG.fully_qualified_table_name,
+                subset.start,
+                subset.stop,
+                subset.hours,
+                subset.subscriber_subsetter.query_id,
+                subset.subscriber_identifier,
+            )
+        ).encode()
+    ).hexdigest()
+
+
+def _shared_scan_table_name(scan_key: str) -> str:
+    return f"shared_scan_{scan_key}"
+
+
+def _make_shared_scan(subsets: Sequence["EventTableSubset"]) -> "EventTableSubset":
+    """
+    Make an event table subset selecting the same rows as several event table
+    subsets which share a scan key, with all of their columns.
+    """
+    from flowmachine.features.utilities.event_table_subset import EventTableSubset
+
+    first = subsets[0]
+    subscriber_column = f"{first.subscriber_identifier} AS subscriber"
+    columns = sorted(
+        {
+            first.subscriber_identifier if column == subscriber_column else column
+            for subset in subsets
+            for column in subset.columns
+        }
+    )
+    return EventTableSubset(
+        start=first.start,
+        stop=first.stop,
+        hours=first.hours,
+        table=first.table_ORIG.fully_qualified_table_name,
+        subscriber_subset=first.subscriber_subsetter,
+        columns=columns,
+        subscriber_identifier=first.subscriber_identifier,
+    )
+
+
+def group_queries_for_shared_scans(
+    queries: Iterable[Query],
+) -> Tuple[List[Tuple[Dict[str, "EventTableSubset"], List[Query]]], List[Query]]:
+    """
+    Group queries which can share scans of the events tables.
+
+    Two queries are in the same group if they read the same rows of an events
+    table, or are both in a group with some third query.
+
+    Parameters
+    ----------
+    queries : iterable of Query
+        Queries to group
+
+    Returns
+    -------
+    groups : list of tuple
+        Pairs of the scans shared within a group (as a mapping from scan key
+        to an event table subset with all the columns needed), and the
+        queries in the group
+    unshared : list of Query
+        Queries which can't share a scan with any of the others
+    """
+    unique_queries = {query.query_id: query for query in queries}
+
+    subsets_by_key = defaultdict(list)
+    users = defaultdict(set)
+    for query_id, query in unique_queries.items():
+        if query.is_stored:
+            continue
+        for subset in _event_table_subsets(query):
+            key = _scan_key(subset)
+            subsets_by_key[key].append(subset)
+            users[key].add(query_id)
+    shared_keys = [key for key, query_ids in users.items() if len(query_ids) > 1]
+
+    # Union the queries which share each scan into groups
+    parents = {query_id: query_id for query_id in unique_queries}
+
+    def find(query_id):
+        while parents[query_id] != query_id:
+            parents[query_id] = parents[parents[query_id]]
+            query_id = parents[query_id]
+        return query_id
+
+    for key in shared_keys:
+        first, *rest = sorted(users[key])
+        for query_id in rest:
+            parents[find(query_id)] = find(first)
+
+    group_queries = defaultdict(list)
+    for query_id, query in unique_queries.items():
+        group_queries[find(query_id)].append(query)
+    group_scans = defaultdict(dict)
+    for key in shared_keys:
+        group_scans[find(next(iter(users[key])))][key] = _make_shared_scan(
+            subsets_by_key[key]
+        )
+
+    groups = []
+    unshared = []
+    for root, group in group_queries.items():
+        if root in group_scans:
+            groups.append((group_scans[root], group))
+        else:
+            unshared += group
+    return groups, unshared
+
+
+def write_queries_with_shared_scans(
+    *,
+    scans: Dict[str, "EventTableSubset"],
+    queries: Sequence[Query],
+    sleep_duration: int = 1,
+) -> List[Query]:
+    """
+    Store queries which read the same rows of the events tables, scanning
+    those rows once.
+
+    Each shared scan is written to a temporary table, and each of the queries
+    is stored from them in the same transaction, on a single connection. Each
+    query is stored under its own query id and its state is updated as usual,
+    so it can't be stored twice at once. Failure to store one query does not prevent the others being stored.
+
+    Parameters
+    ----------
+    scans : dict
+        Mapping from scan key to an event table subset with all the columns
+        any of the queries need
+    queries : list of Query
+        Queries to store
+    sleep_duration : int, default 1
+        Number of seconds to wait between polls when monitoring queries being
+        written from elsewhere
+
+    Returns
+    -------
+    list of Query
+        The queries, once they have been stored
+
+    Raises
+    ------
+    QueryCancelledException
+        If execution of one of the queries was interrupted by a user
+    QueryErroredException
+        If one of the queries failed
+    StoreFailedException
+        If something unexpected went wrong while storing one of the queries
+    """
+    connection = get_db()
+    state_machines = {
+        query.query_id: QueryStateMachine(
+            get_redis(), query.query_id, connection.conn_id
+        )
+        for query in queries
+    }
+    owned = [query for query in queries if state_machines[query.query_id].execute()[1]]
+    if owned:
+        logger.debug(
+            f"Storing {[query.query_id for query in owned]} with shared scans {list(scans)}."
+        )
+        plan_times = {}
+        try:
+            # The temporary tables only exist on this connection, so everything
+            # is run on it, in a single transaction
+            with connection.engine.connect() as con, con.begin():
+                for key, scan in scans.items():
+                    table_name = _shared_scan_table_name(key)
+                    con.execute(
+                        f"CREATE TEMPORARY TABLE {table_name} ON COMMIT DROP AS ({scan.get_query()})"
+                    )
+                    con.execute(f"ANALYZE {table_name}")
+                for query in owned:
+                    schema, name = query.fully_qualified_table_name.split(".")
+                    shared_scan_sql = {}
+                    for subset in _event_table_subsets(query):
+                        key = _scan_key(subset)
+                        if key in scans:
+                            shared_scan_sql[
+                                subset.query_id
+                            ] = f"SELECT {', '.join(subset.column_names)} FROM {_shared_scan_table_name(key)}"
+                    try:
+                        # Each query is written under a savepoint, so that one failing doesn't roll back the others
+                        with con.begin_nested():
+                            with shared_scans(shared_scan_sql):
+                                query_ddl_ops = query._make_sql(name, schema=schema)
+                            plan_times[query.query_id] = write_query(query_ddl_ops, con)
+                    except Exception as exc:
+                        logger.error(
+                            f"Error storing '{query.query_id}' with shared scans. Error was {exc}"
+                        )
+        except Exception as exc:
+            logger.error(f"Error running shared scans. Error was {exc}")
+            plan_times = {}
+        # Cache metadata is only written once the tables it records are committed
+        succeeded = []
+        for query in owned:
+            if query.query_id in plan_times:
+                try:
+                    write_cache_metadata(
+                        connection, query, compute_time=plan_times[query.query_id]
+                    )
+                    succeeded.append(query.query_id)
+                except Exception as exc:
+                    logger.error(
+                        f"Error writing cache metadata for '{query.query_id}'. Error was {exc}"
+                    )
+        for query in owned:
+            if query.query_id in succeeded:
+                state_machines[query.query_id].finish()
+            else:
+                state_machines[query.query_id].raise_error()
+
+    for query in queries:
+        q_state_machine = state_machines[query.query_id]
+        q_state_machine.wait_until_complete(sleep_duration=sleep_duration)
+        if q_state_machine.is_cancelled:
+            logger.error(f"Query '{query.query_id}' was cancelled.")
+            raise QueryCancelledException(query.query_id)
+        elif q_state_machine.is_errored:
+            logger.error(f"Query '{query.query_id}' finished with an error.")
+            raise QueryErroredException(query.query_id)
+        elif not q_state_machine.is_completed:
+            logger.error(
+                f"Query '{query.query_id}' not stored. State is {q_state_machine.current_query_state}"
+            )
+            raise StoreFailedException(query.query_id)
+    return list(queries)
+
+
+def store_with_shared_scans(
+    queries: Iterable[Query], store_dependencies: bool = False
+) -> Dict[str, Future]:
+    """
+    Store a batch of queries, sharing one scan of the events tables between
+    queries which read the same rows of them.
+
+    Parameters
+    ----------
+    queries : iterable of Query
+        Queries to store
+    store_dependencies : bool, default False
+        If True, store the dependencies of queries which don't share a scan
+        with another query. Dependencies of queries which share a scan are
+        not stored, because storing them would need separate scans.
+
+    Returns
+    -------
+    dict
+        Mapping from query id to a Future for the store of that query.
+        Queries which share scans share a Future.
+    """
+    groups, unshared = group_queries_for_shared_scans(queries)
+    futures = {}
+    for scans, group in groups:
+        for query in group:
+            QueryStateMachine(get_redis(), query.query_id, get_db().conn_id).enqueue()
+        future = submit_to_executor(
+            write_queries_with_shared_scans, scans=scans, queries=group
+        )
+        for query in group:
+            futures[query.query_id] = future
+    for query in unshared:
+        futures[query.query_id] = query.store(store_dependencies=store_dependencies)
+    return futures
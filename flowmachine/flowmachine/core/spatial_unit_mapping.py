@@ -0,0 +1,151 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Materialised mappings from location IDs to a spatial unit, which
+JoinToLocation uses in place of recomputing the spatial join.
+"""
+from typing import List, Optional, Tuple, Union
+
+from cachetools import TTLCache, cached
+
+from .context import get_db
+from .query import Query
+from .table import Table
+from .spatial_unit import GeomSpatialUnit
+
+
+def get_infrastructure_version(spatial_unit: GeomSpatialUnit) -> str:
+    """
+    Get a fingerprint of the current contents of the tables which a spatial
+    unit maps locations with.
+
+    The fingerprint is derived from the row versions of the location table
+    and of the spatial unit's geography and mapping tables (where these are
+    tables rather than queries), so it changes whenever a row is added,
+    removed or updated, without reading any geometries.
+
+    Parameters
+    ----------
+    spatial_unit : GeomSpatialUnit
+        Spatial unit to fingerprint the tables of
+
+    Returns
+    -------
+    str
+        md5 hash identifying this version of the tables
+
+    Notes
+    -----
+    Fingerprinting reads every row of the tables, so fingerprints are cached
+    for two minutes.
+    """
+    tables = [get_db().location_table]
+    for attr in ("geom_table", "mapping_table"):
+        table = getattr(spatial_unit, attr, None)
+        if isinstance(table, Table) and table.fully_qualified_table_name not in tables:
+            tables.append(table.fully_qualified_table_name)
+    return _get_tables_version(get_db().conn_id, tuple(tables))
+
+
+@cached(TTLCache(256, 120))
+def _get_tables_version(conn_id: str, tables: Tuple[str, ...]) -> str:
+    row_versions = " UNION ALL ".join(
+        f"SELECT '{table}' AS tbl, ctid::text || ':' || xmin::text AS row_version FROM {table}"
+        for table in tables
+    )
+    return get_db().fetch(
+        f"""
+        SELECT md5(COALESCE(string_agg(tbl || ':' || row_version, ',' ORDER BY tbl, row_version), ''))
+        FROM ({row_versions}) _
+        """
+    )[0][0]
+
+
+class SpatialUnitMapping(Query):
+    """
+    Mapping from each location ID in the location table to a spatial unit,
+    with the range of dates the mapping is valid for.
+
+    The validity is a daterange, so that storing this query builds a GiST
+    index on location ID and validity which JoinToLocation can use for
+    the join, rather than recomputing the spatial unit (which for polygon
+    spatial units is a point-in-polygon join) for every query.
+
+    The version of the infrastructure forms part of the query id, so a
+    stored mapping is never used after the underlying tables change. Like
+    tables, stored mappings are not removed when the cache is shrunk.
+
+    Parameters
+    ----------
+    spatial_unit : GeomSpatialUnit
+        Spatial unit to map location IDs to
+    infrastructure_version : str, optional
+        Identifier for the version of the infrastructure and geography
+        tables. If not given, this is derived from the tables.
+
+    Examples
+    --------
+    >>> mapping = SpatialUnitMapping(spatial_unit=make_spatial_unit("admin", level=3))
+    >>> mapping.head()
+      location_id                 validity         pcod
+    0      0RIMKL  [2016-01-01,infinity)  524 1 02 09
+    ...
+    """
+
+    def __init__(
+        self,
+        *,
+        spatial_unit: GeomSpatialUnit,
+        infrastructure_version: Optional[str] = None,
+    ):
+        spatial_unit.verify_criterion("has_geography")
+        self.spatial_unit = spatial_unit
+        self.infrastructure_version = (
+            get_infrastructure_version(spatial_unit)
+            if infrastructure_version is None
+            else infrastructure_version
+        )
+        super().__init__()
+
+    @property
+    def location_columns(self) -> List[str]:
+        """
+        Names of the spatial unit's location columns, excluding location_id.
+        """
+        return [c for c in self.spatial_unit.location_id_columns if c != "location_id"]
+
+    @property
+    def column_names(self) -> List[str]:
+        return ["location_id", "validity"] + self.location_columns
+
+    @property
+    def index_cols(self) -> List[Union[str, List[str]]]:
+        return []
+
+    def _make_sql(self, name: str, schema: Union[str, None] = None) -> List[str]:
+        queries = super()._make_sql(name, schema=schema)
+        if queries:
+            full_name = name if schema is None else f"{schema}.{name}"
+            queries.append(
+                f"CREATE INDEX ON {full_name} USING gist (location_id, validity)"
+            )
+        return queries
+
+    def _make_query(self):
+        location_columns = "".join(f", {c}" for c in self.location_columns)
+        return f"""
+        SELECT
+            location_id,
+            CASE
+                WHEN date_of_first_service > date_of_last_service THEN 'empty'::daterange
+                ELSE daterange(
+                    COALESCE(date_of_first_service::date, '-infinity'::date),
+                    COALESCE(date_of_last_service::date, 'infinity'::date),
+                    '[]'
+                )
+            END AS validity
+            {location_columns}
+        FROM ({self.spatial_unit.get_query()}) AS spatial_unit
+        """
@@ -2,10 +2,9 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at http://mozilla.org/MPL/2.0/.
 
-import pandas as pd
 from sqlalchemy import Table, MetaData
 from sqlalchemy.dialects import postgresql
-from sqlalchemy.sql import Selectable
+from sqlalchemy.sql import Selectable, Alias
 
 
 def get_sqlalchemy_table_definition(fully_qualified_table_name, *, engine):
@@ -92,6 +91,8 @@ def get_query_result_as_dataframe(query, *, engine):
     with engine.connect() as con:
         result = con.execute(query)
 
+    import pandas as pd
+
     columns = [c.name for c in query.columns]
     df = pd.DataFrame(result.fetchall(), columns=columns)
     return df
@@ -107,8 +108,8 @@ def make_sqlalchemy_column_from_flowmachine_column_description(
 
     Parameters
     ----------
-    table : sqlalchemy.Table
-        The sqlalchemy_table for which to obtain the column.
+    table : sqlalchemy.Table or sqlalchemy.sql.Alias
+        The sqlalchemy_table (or aliased subquery) for which to obtain the column.
     column_str : str
         The column name, optionally describing an alias via
 
@@ -122,7 +123,7 @@ def make_sqlalchemy_column_from_flowmachine_column_description(
         >>> make_sqlalchemy_column_from_flowmachine_column_description(sqlalchemy_table, "msisdn")
         >>> make_sqlalchemy_column_from_flowmachine_column_description(sqlalchemy_table, "msisdn AS subscriber")
     """
-    assert isinstance(sqlalchemy_table, Table)
+    assert isinstance(sqlalchemy_table, (Table, Alias))
     parts = column_str.split()
     if len(parts) == 1:
         colname = parts[0]
@@ -8,6 +8,8 @@ from hashlib import md5
 from typing import List
 
 from abc import abstractmethod
+from sqlalchemy import BigInteger, cast, func, literal
+from sqlalchemy.dialects.postgresql import BIT
 from sqlalchemy.sql import ClauseElement, select, text, column
 from .query import Query
 
@@ -16,6 +18,7 @@ __all__ = [
     "SubscriberSubsetterForAllSubscribers",
     "SubscriberSubsetterForExplicitSubset",
     "SubscriberSubsetterForFlowmachineQuery",
+    "SubscriberSubsetterForHashSample",
 ]
 
 
@@ -209,6 +212,92 @@ class SubscriberSubsetterForExplicitSubset(SubscriberSubsetterBase):
         return sql.where(parent_table.c[subscriber_identifier].in_(self.subscribers))
 
 
+class SubscriberSubsetterForHashSample(SubscriberSubsetterBase):
+    """
+    Represents a deterministic sample of subscribers, chosen by a hash of
+    the subscriber identifier.
+
+    A subscriber is in the sample if the first 32 bits of the md5 hash of
+    their identifier (prefixed with the seed, if there is one), as a
+    fraction of 2^32, are less than `fraction`. Since this depends only on
+    the subscriber, every query sampled with the same fraction and seed
+    includes the same subscribers, and the filter can be applied to each
+    row of the events tables as they are read.
+    """
+
+    is_proper_subset = True
+
+    def __init__(self, fraction, seed=None, subset=None):
+        """
+        Parameters
+        ----------
+        fraction : float
+            Fraction of subscribers to sample, greater than 0 and at most 1
+        seed : str or float, optional
+            Seed for the hash, to draw a different sample of subscribers
+        subset : optional
+            Subscriber subset to sample from, as accepted by
+            `make_subscriber_subsetter`. By default, samples from all
+            subscribers.
+        """
+        if not 0 < fraction <= 1:
+            raise ValueError(
+                f"Sample fraction must be greater than 0 and at most 1, not {fraction}."
+            )
+        self.fraction = fraction
+        self.seed = seed
+        self.subset = make_subscriber_subsetter(subset)
+        self._md5 = md5(
+            f"{self.__class__.__name__}{self.fraction}{self.seed}{self.subset.query_id}".encode()
+        ).hexdigest()
+        super().__init__()
+
+    def get_sampling_condition(self, subscriber_column):
+        """
+        Get the condition which is true for subscribers in the sample.
+
+        Parameters
+        ----------
+        subscriber_column : sqlalchemy.sql.ColumnElement
+            The column containing the subscriber identifier.
+
+        Returns
+        ----------
+        sqlalchemy.sql.ColumnElement
+        """
+        if self.seed is not None:
+            subscriber_column = literal(f"{self.seed}:").concat(subscriber_column)
+        hash_prefix = func.substr(func.md5(subscriber_column), 1, 8)
+        hash_value = cast(cast(literal("x").concat(hash_prefix), BIT(32)), BigInteger)
+        return hash_value < int(round(self.fraction * 2 ** 32))
+
+    def apply_subset_if_needed(self, sql, *, subscriber_identifier):
+        """
+        Return a modified version of the input SQL query which has the subset applied.
+
+        Parameters
+        ----------
+        sql : sqlalchemy.sql.ClauseElement
+            The SQL query to which the subset should be applied.
+
+        subscriber_identifier : str
+            The column in the parent table which contains the subscriber information.
+
+        Returns
+        ----------
+        sqlalchemy.sql.ClauseElement
+        """
+        assert isinstance(sql, ClauseElement)
+        assert len(sql.froms) == 1
+        parent_table = sql.froms[0]
+        sampled = sql.where(
+            self.get_sampling_condition(parent_table.c[subscriber_identifier])
+        )
+        return self.subset.apply_subset_if_needed(
+            sampled, subscriber_identifier=subscriber_identifier
+        )
+
+
 def make_subscriber_subsetter(subset):
     """
     Return an appropriate subsetter for the given input.
@@ -14,7 +14,7 @@ from .context import get_db, get_redis
 from .errors import NotConnectedError
 from .query import Query
 from .subset import subset_factory
-from .cache import write_cache_metadata
+from .cache import record_access, write_cache_metadata
 
 import structlog
 
@@ -135,12 +135,7 @@ class Table(Query):
         return "SELECT {cols} FROM {fqn}".format(fqn=self.fqn, cols=cols)
 
     def get_query(self):
-        with get_db().engine.begin():
-            get_db().engine.execute(
-                "UPDATE cache.cached SET last_accessed = NOW(), access_count = access_count + 1 WHERE query_id ='{}'".format(
-                    self.query_id
-                )
-            )
+        record_access(get_db(), self.query_id)
         return self._make_query()
 
     @property
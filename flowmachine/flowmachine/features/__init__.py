@@ -80,11 +80,12 @@ subs = [
     "HandsetStats",
 ]
 
-rast = ["RasterStatistics"]
+rast = ["RasterStatistics", "ZonalStatistics"]
 spat = [
     "LocationArea",
     "LocationCluster",
     "DistanceMatrix",
+    "SparseDistanceMatrix",
     "Geography",
     "VersionedInfrastructure",
     "Grid",
@@ -95,6 +96,7 @@ spat = [
 ut = [
     "GroupValues",
     "feature_collection",
+    "FeatureMatrix",
     "SubscriberLocations",
     "EventTableSubset",
     "UniqueSubscribers",
@@ -9,9 +9,14 @@ of subscribers at a given location.
 
 """
 from .flows import Flows
+from .location_event_cube import LocationEventCube
 from .total_events import TotalLocationEvents
 from .location_introversion import LocationIntroversion
 from .unique_subscriber_counts import UniqueSubscriberCounts
+from .subscriber_sketches import (
+    DailyLocationSubscriberSketches,
+    LocationSubscriberSketches,
+)
 from .pwo import PopulationWeightedOpportunities
 from .meaningful_locations_aggregate import MeaningfulLocationsAggregate
 from .meaningful_locations_od import MeaningfulLocationsOD
@@ -33,4 +38,7 @@ __all__ = [
     "MeaningfulLocationsOD",
     "UniqueVisitorCounts",
     "ActiveAtReferenceLocationCounts",
+    "DailyLocationSubscriberSketches",
+    "LocationSubscriberSketches",
+    "LocationEventCube",
 ]
@@ -0,0 +1,201 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Hourly counts of events at each cell, read from the daily location event
+cubes which FlowETL builds for each ingested day.
+"""
+import datetime
+import re
+from typing import List, Optional, Set, Union
+
+from flowmachine.core.context import get_db
+from flowmachine.core.query import Query
+from flowmachine.core.subscriber_subsetter import make_subscriber_subsetter
+from flowmachine.features.utilities.direction_enum import Direction
+from flowmachine.utils import make_where, parse_datestring, standardise_date
+
+import structlog
+
+logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
+
+LOCATION_EVENT_CUBES = "cubes.location_events"
+
+
+def _get_event_dates(table: str) -> Set[datetime.date]:
+    """
+    Get the days which an events table has events for: the days of its
+    daily child tables (as attached by FlowETL), and its ingested days.
+    """
+    parent = f"events.{table}"
+    daily_table = re.compile(rf"^{re.escape(parent)}_(\d{{8}})$")
+    dates = set(get_db().available_dates[table])
+    for child_table in get_db().child_tables[parent]:
+        match = daily_table.match(child_table)
+        if match is not None:
+            dates.add(datetime.datetime.strptime(match.group(1), "%Y%m%d").date())
+    return dates
+
+
+class LocationEventCube(Query):
+    """
+    The number of events at each cell in each hour, summed from the daily
+    location event cubes rather than counted from the events tables.
+
+    FlowETL builds a cube for an ingested day of a cdr type when the DAG is
+    created with `build_location_event_cube=True`. The cube holds the events
+    counted by hour, cell and direction, so it can only be used for periods
+    of whole hours, and only gives the same counts as the events tables if
+    every day of the events tables in the period has a cube (see
+    `is_available`).
+
+    Parameters
+    ----------
+    start : str
+        ISO format date of the start of the period, which must be the
+        start of an hour
+    stop : str
+        As above for the end of the period
+    tables : str or list of str, optional
+        Events tables to count the events of. By default, or if 'all', all
+        of the tables with subscribers.
+    direction : {'out', 'in', 'both'} or Direction, default Direction.BOTH
+        Count only incoming or outgoing events
+    hours : tuple of ints, default 'all'
+        Count only the events within these hours of the day
+
+    Examples
+    --------
+    >>> cube = LocationEventCube("2016-01-01", "2016-01-02", tables="events.calls")
+    >>> cube.is_available
+    True
+    >>> cube.head()
+      location_id                  datetime  value
+    0      0RIMKL 2016-01-01 00:00:00+00:00      3
+    ...
+    """
+
+    def __init__(
+        self,
+        start: str,
+        stop: str,
+        *,
+        tables: Union[None, str, List[str]] = None,
+        direction: Union[str, Direction] = Direction.BOTH,
+        hours="all",
+    ):
+        self.start = standardise_date(start)
+        self.stop = standardise_date(stop)
+        for date in (self.start, self.stop):
+            if not date.endswith("00:00"):
+                raise ValueError(
+                    f"Location event cubes can only be used for periods of whole hours, got '{date}'."
+                )
+        if tables is None or (isinstance(tables, str) and tables.lower() == "all"):
+            tables = get_db().subscriber_tables
+        elif isinstance(tables, str):
+            tables = [tables]
+        self.tables = sorted({table.split(".")[-1] for table in tables})
+        self.direction = Direction(direction)
+        self.hours = hours
+        super().__init__()
+
+    @property
+    def column_names(self) -> List[str]:
+        return ["location_id", "datetime", "value"]
+
+    @property
+    def is_available(self) -> bool:
+        """
+        True if every day of the tables which may have events in this period
+        has a cube. The days of a table are those of its daily child tables,
+        and any other ingested days. False if the tables have no days in this
+        period, since then there is no record of which days have events.
+        """
+        # Allow a day either side, in case the tables' dates are in a different time zone
+        first_date = parse_datestring(self.start).date() - datetime.timedelta(days=1)
+        last_date = parse_datestring(self.stop).date() + datetime.timedelta(days=1)
+        needed = [
+            f"{LOCATION_EVENT_CUBES}_{table}_{date:%Y%m%d}"
+            for table in self.tables
+            for date in sorted(_get_event_dates(table))
+            if first_date <= date <= last_date
+        ]
+        cubes = set(get_db().child_tables[LOCATION_EVENT_CUBES])
+        missing = [cube for cube in needed if cube not in cubes]
+        if missing:
+            logger.debug(
+                f"Location event cubes are missing for {len(missing)} days.",
+                missing=missing,
+            )
+        return len(needed) > 0 and len(missing) == 0
+
+    def _make_hours_clause(self) -> str:
+        if self.hours == "all":
+            return ""
+        start_hour, stop_hour = self.hours
+        # Hours which are backwards span midnight, as in EventTableSubset
+        join = "AND" if start_hour <= stop_hour else "OR"
+        return f"(extract(hour FROM datetime) >= {start_hour} {join} extract(hour FROM datetime) < {stop_hour})"
+
+    def _make_query(self):
+        tables = ", ".join(f"'{table}'" for table in self.tables)
+        clauses = [
+            f"cdr_type IN ({tables})",
+            f"datetime >= '{self.start}'::timestamptz",
+            f"datetime < '{self.stop}'::timestamptz",
+            self._make_hours_clause(),
+            self.direction.get_filter_clause(),
+        ]
+        return f"""
+        SELECT location_id, datetime, sum(event_count)::bigint AS value
+        FROM {LOCATION_EVENT_CUBES}
+        {make_where(clauses)}
+        GROUP BY location_id, datetime
+        """
+
+
+def get_available_location_event_cube(
+    start: str,
+    stop: str,
+    *,
+    tables: Union[None, str, List[str]] = None,
+    direction: Union[str, Direction] = Direction.BOTH,
+    hours="all",
+    subscriber_subset=None,
+) -> Optional[LocationEventCube]:
+    """
+    Get a `LocationEventCube` which counts the same events as an events
+    query with these parameters would, if the cubes can be used.
+
+    Parameters
+    ----------
+    start, stop : str
+        Period of the events
+    tables : str or list of str, optional
+        Events tables
+    direction : {'out', 'in', 'both'} or Direction, default Direction.BOTH
+        Direction of the events
+    hours : tuple of ints, default 'all'
+        Hours of the day of the events
+    subscriber_subset : optional
+        Subscriber subset of the events. Cubes can't be used for a subset.
+
+    Returns
+    -------
+    LocationEventCube or None
+        The cube query, or None if the period isn't whole hours, the
+        events are a subset of subscribers, or some cubes are missing
+    """
+    if make_subscriber_subsetter(subscriber_subset).is_proper_subset:
+        return None
+    try:
+        cube = LocationEventCube(
+            start, stop, tables=tables, direction=direction, hours=hours
+        )
+    except ValueError:
+        return None
+    if not cube.is_available:
+        return None
+    return cube
@@ -26,10 +26,12 @@ References
 """
 
 import warnings
+from concurrent.futures import Future
 from typing import List, Optional, Union, Tuple
 
 import pandas as pd
 
+from flowmachine.core.dataframe_query import DataFrameQuery
 from flowmachine.core.query import Query
 from flowmachine.features.subscriber import daily_location
 from flowmachine.utils import list_of_dates, standardise_date
@@ -201,11 +203,14 @@ class PopulationWeightedOpportunities(Query):
         if isinstance(departure_rate, pd.DataFrame):
             # Rename the columns to match what we'll join to
             # sort the dataframe so we'll have a consistent md5
-            self.departure_rate = departure_rate.rename(
+            departure_rate = departure_rate.rename(
                 columns=lambda x: x if x == "rate" else f"{x}_from"
-            ).apply(lambda x: x.sort_values().values)
-            self.departure_rate = self.departure_rate.reindex(
-                columns=sorted(self.departure_rate.columns)
+            )
+            columns = sorted(departure_rate.columns)
+            self.departure_rate = DataFrameQuery(
+                departure_rate.reindex(columns=columns).sort_values(
+                    sorted(columns, key=lambda x: x == "rate")
+                )
             )
         elif isinstance(departure_rate, float):
             self.departure_rate = departure_rate
@@ -250,18 +255,33 @@ class PopulationWeightedOpportunities(Query):
             for c in self.spatial_unit.location_id_columns
         ] + ["prediction", "probability"]
 
+    def to_sql(
+        self,
+        name: str,
+        schema: Union[str, None] = None,
+        store_dependencies: bool = False,
+    ) -> Future:
+        if (
+            isinstance(self.departure_rate, DataFrameQuery)
+            and not self.departure_rate.is_stored
+        ):
+            # Write the departure rates with COPY rather than rendering them into this query
+            self.departure_rate.store()
+        return super().to_sql(
+            name, schema=schema, store_dependencies=store_dependencies
+        )
+
     def _make_query(self):
         if isinstance(self.departure_rate, float):
             scaled_buffer_query = (
                 f"SELECT buffer.src_pop*{self.departure_rate} as T_i, * FROM buffer"
             )
-        elif isinstance(self.departure_rate, pd.DataFrame):
+        elif isinstance(self.departure_rate, DataFrameQuery):
             scaled_buffer_query = f"""
             SELECT buffer.*, buffer.src_pop*rate as T_i FROM 
-            (VALUES {", ".join([str(tuple(x)) for x in self.departure_rate.values])}) 
-                AS t({", ".join(c for c in self.departure_rate.columns)})
+            ({self.departure_rate.get_query()}) AS t
                 LEFT JOIN buffer
-                USING ({", ".join(c for c in self.departure_rate.columns if c != 'rate')})
+                USING ({", ".join(c for c in self.departure_rate.column_names if c != 'rate')})
             """
         else:
             raise ValueError(
@@ -0,0 +1,208 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+HyperLogLog sketches of the subscribers seen at each location, which
+can be combined to give approximate unique subscriber counts for any
+period of whole days and any spatial unit.
+"""
+from math import ceil, log2, sqrt
+from typing import List
+
+from flowmachine.core import make_spatial_unit
+from flowmachine.core.join_to_location import JoinToLocation
+from flowmachine.core.query import Query
+from flowmachine.core.spatial_unit import AnySpatialUnit
+from flowmachine.features.utilities.subscriber_locations import SubscriberLocations
+from flowmachine.utils import list_of_dates, parse_datestring, time_period_add
+
+# Range of the number of registers (as a power of two) used for sketches.
+# Each sketch takes up to 2**log2m * HLL_REGWIDTH bits.
+MIN_LOG2M = 4
+MAX_LOG2M = 16
+HLL_REGWIDTH = 5
+# Sketches of up to this many subscribers store each subscriber's hash,
+# so counts of up to this many subscribers are exact. This is well above
+# the redaction threshold, so redaction is always applied to exact counts.
+HLL_EXPLICIT_THRESHOLD = 128
+
+
+def hll_relative_error(log2m: int) -> float:
+    """
+    Relative standard error of a HyperLogLog sketch with 2**log2m registers.
+
+    Parameters
+    ----------
+    log2m : int
+        Log (base 2) of the number of registers
+
+    Returns
+    -------
+    float
+    """
+    return 1.04 / sqrt(2 ** log2m)
+
+
+def log2m_for_error_bound(error_bound: float) -> int:
+    """
+    Get the smallest number of registers (as a power of two) for which a
+    HyperLogLog sketch has a relative standard error no larger than `error_bound`.
+
+    Parameters
+    ----------
+    error_bound : float
+        Largest acceptable relative standard error, e.g. 0.01 for 1%
+
+    Returns
+    -------
+    int
+        Log (base 2) of the number of registers
+    """
+    if not 0 < error_bound < 1:
+        raise ValueError(f"Error bound must be between 0 and 1, got {error_bound}.")
+    log2m = max(MIN_LOG2M, ceil(2 * log2(1.04 / error_bound)))
+    if log2m > MAX_LOG2M:
+        raise ValueError(
+            f"Error bound {error_bound} is too small. The smallest supported error bound is {hll_relative_error(MAX_LOG2M):.4f}."
+        )
+    return log2m
+
+
+def _is_midnight(date: str) -> bool:
+    date = parse_datestring(date)
+    return date == date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class DailyLocationSubscriberSketches(Query):
+    """
+    HyperLogLog sketch of the subscribers seen at each cell on one day.
+
+    Each day is a separate query, so the sketches for a day are stored
+    once and reused by every `LocationSubscriberSketches` covering that day.
+
+    Parameters
+    ----------
+    date : str
+        ISO format date of the day
+    hours : tuple of ints, default 'all'
+        Subset the events to within these hours
+    table : str, default 'all'
+        Schema qualified name of the table to use, or 'all' to
+        use all of the tables specified in flowmachine.yml
+    log2m : int, default 11
+        Log (base 2) of the number of registers in each sketch
+    """
+
+    def __init__(self, date: str, *, hours="all", table="all", log2m: int = 11):
+        if not _is_midnight(date):
+            raise ValueError(f"Date must be the start of a day, got '{date}'.")
+        if not MIN_LOG2M <= log2m <= MAX_LOG2M:
+            raise ValueError(
+                f"log2m must be between {MIN_LOG2M} and {MAX_LOG2M}, got {log2m}."
+            )
+        self.date = parse_datestring(date).strftime("%Y-%m-%d")
+        self.hours = hours
+        self.table = table
+        self.log2m = log2m
+        self.subscriber_locations = SubscriberLocations(
+            start=self.date,
+            stop=time_period_add(self.date, 1),
+            spatial_unit=make_spatial_unit("cell"),
+            hours=hours,
+            table=table,
+        )
+        super().__init__()
+
+    @property
+    def column_names(self) -> List[str]:
+        return ["location_id", "date", "sketch"]
+
+    def _make_query(self):
+        return f"""
+        SELECT location_id, '{self.date}'::date AS date,
+            hll_add_agg(
+                hll_hash_text(subscriber::text),
+                {self.log2m}, {HLL_REGWIDTH}, {HLL_EXPLICIT_THRESHOLD}, 1
+            ) AS sketch
+        FROM ({self.subscriber_locations.get_query()}) AS subscriber_locations
+        GROUP BY location_id
+        """
+
+
+class LocationSubscriberSketches(Query):
+    """
+    HyperLogLog sketch of the subscribers seen at each location over a
+    period of whole days, combined from the daily cell-level sketches.
+
+    Parameters
+    ----------
+    start : str
+        ISO format date of the first day
+    stop : str
+        ISO format date of the day _after_ the last day
+    spatial_unit : flowmachine.core.spatial_unit.*SpatialUnit, default cell
+        Spatial unit to combine the sketches to
+    hours : tuple of ints, default 'all'
+        Subset the events to within these hours
+    table : str, default 'all'
+        Schema qualified name of the table to use, or 'all' to
+        use all of the tables specified in flowmachine.yml
+    log2m : int, default 11
+        Log (base 2) of the number of registers in each sketch
+
+    Notes
+    -----
+    Requires the postgresql-hll extension in FlowDB.
+    """
+
+    def __init__(
+        self,
+        start: str,
+        stop: str,
+        *,
+        spatial_unit: AnySpatialUnit = make_spatial_unit("cell"),
+        hours="all",
+        table="all",
+        log2m: int = 11,
+    ):
+        if not (_is_midnight(start) and _is_midnight(stop)):
+            raise ValueError(
+                f"Subscriber sketches cover whole days, so start and stop must be dates. Got '{start}' and '{stop}'."
+            )
+        days = list_of_dates(start, stop)[:-1]
+        if len(days) == 0:
+            raise ValueError(f"Stop date '{stop}' must be after start date '{start}'.")
+        self.start = days[0]
+        self.stop = parse_datestring(stop).strftime("%Y-%m-%d")
+        self.spatial_unit = spatial_unit
+        self.hours = hours
+        self.table = table
+        self.log2m = log2m
+        self.daily_sketches = [
+            DailyLocationSubscriberSketches(day, hours=hours, table=table, log2m=log2m)
+            for day in days
+        ]
+        super().__init__()
+
+    @property
+    def column_names(self) -> List[str]:
+        return self.spatial_unit.location_id_columns + ["sketch"]
+
+    def _make_query(self):
+        location_columns = ",".join(self.spatial_unit.location_id_columns)
+        if self.spatial_unit.has_geography:
+            daily_sketches = [
+                JoinToLocation(
+                    daily, spatial_unit=self.spatial_unit, time_col="date"
+                ).get_query()
+                for daily in self.daily_sketches
+            ]
+        else:
+            daily_sketches = [daily.get_query() for daily in self.daily_sketches]
+        all_sketches = " UNION ALL ".join(f"({sql})" for sql in daily_sketches)
+        return f"""
+        SELECT {location_columns}, hll_union_agg(sketch) AS sketch
+        FROM ({all_sketches}) AS daily_sketches
+        GROUP BY {location_columns}
+        """
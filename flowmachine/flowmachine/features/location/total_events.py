@@ -9,18 +9,23 @@ Calculates the number of events at a location
 during a specified time period.
 """
 
-from typing import List, Union
+from typing import List, Optional, Union
 
 from flowmachine.core.query import Query
-from flowmachine.core.join_to_location import location_joined_query
+from flowmachine.core.join_to_location import JoinToLocation, location_joined_query
 from flowmachine.core.mixins.geodata_mixin import GeoDataMixin
+from flowmachine.core.mixins.spatial_rollup_mixin import SpatialRollupMixin
 from flowmachine.core.spatial_unit import AnySpatialUnit, make_spatial_unit
+from flowmachine.features.location.location_event_cube import (
+    LocationEventCube,
+    get_available_location_event_cube,
+)
 from flowmachine.features.utilities.events_tables_union import EventsTablesUnion
 from flowmachine.features.utilities.direction_enum import Direction
 from flowmachine.utils import make_where, standardise_date
 
 
-class TotalLocationEvents(GeoDataMixin, Query):
+class TotalLocationEvents(SpatialRollupMixin, GeoDataMixin, Query):
     """
     Calculates the total number of events on an hourly basis
     per location (such as a tower or admin region),
@@ -44,6 +49,17 @@ class TotalLocationEvents(GeoDataMixin, Query):
     direction : {'out', 'in', 'both'} or Direction, default Direction.BOTH
         Look only at incoming or outgoing events. Can be either
         'out', 'in' or 'both'.
+
+    Notes
+    -----
+    If the same query at cell level is stored, the counts for a spatial unit
+    with geography are summed from the stored cell-level counts instead of
+    being recomputed from the events tables.
+
+    Hourly and daily counts of all subscribers' events are summed from the
+    daily location event cubes built by FlowETL, rather than counted from
+    the events tables, if every day of the events tables in the period has
+    a cube (see `LocationEventCube`).
     """
 
     allowed_intervals = {"day", "hour", "min"}
@@ -67,6 +83,25 @@ class TotalLocationEvents(GeoDataMixin, Query):
         self.spatial_unit = spatial_unit
         self.interval = interval
         self.direction = Direction(direction)
+        # Kept out of the query's state, so they don't change the query id
+        self._rollup_source_kwargs = dict(
+            start=self.start,
+            stop=self.stop,
+            table=table,
+            interval=interval,
+            direction=self.direction,
+            hours=hours,
+            subscriber_subset=subscriber_subset,
+            subscriber_identifier=subscriber_identifier,
+        )
+        self._cube_kwargs = dict(
+            start=self.start,
+            stop=self.stop,
+            tables=table,
+            direction=self.direction,
+            hours=hours,
+            subscriber_subset=subscriber_subset,
+        )
 
         if self.interval not in self.allowed_intervals:
             raise ValueError(
@@ -103,6 +138,14 @@ class TotalLocationEvents(GeoDataMixin, Query):
         )
         super().__init__()
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        try:
+            del state["_cube_kwargs"]
+        except KeyError:
+            pass
+        return state
+
     @property
     def column_names(self) -> List[str]:
         return (
@@ -111,13 +154,53 @@ class TotalLocationEvents(GeoDataMixin, Query):
             + ["value"]
         )
 
+    def _make_rollup_source(self) -> "TotalLocationEvents":
+        return TotalLocationEvents(
+            spatial_unit=make_spatial_unit("cell"), **self._rollup_source_kwargs
+        )
+
+    def _make_rollup_query(self, source: "TotalLocationEvents") -> str:
+        location_columns = ", ".join(self.spatial_unit.location_id_columns)
+        time_columns = ", ".join(x.split(" AS ")[1] for x in self.time_cols)
+        joined = JoinToLocation(source, spatial_unit=self.spatial_unit, time_col="date")
+        return f"""
+            SELECT
+                {location_columns},
+                {time_columns},
+                sum(value)::bigint AS value
+            FROM
+                ({joined.get_query()}) joined
+            GROUP BY
+                {location_columns}, {time_columns}
+        """
+
     def _make_query(self):
+        source = self._get_stored_rollup_source()
+        if source is not None:
+            return self._make_rollup_query(source)
+
         # list of columns that we want to group by, these are all the time
         # columns, plus the location columns
         groups = [
             x.split(" AS ")[0] for x in self.time_cols
         ] + self.spatial_unit.location_id_columns
 
+        cube = self._get_location_event_cube()
+        if cube is not None:
+            cube_joined = location_joined_query(
+                cube, spatial_unit=self.spatial_unit, time_col="datetime"
+            )
+            return f"""
+                SELECT
+                    {', '.join(self.spatial_unit.location_id_columns)},
+                    {', '.join(self.time_cols)},
+                    sum(value)::bigint AS value
+                FROM
+                    ({cube_joined.get_query()}) cube
+                GROUP BY
+                    {', '.join(groups)}
+            """
+
         # We now need to group this table by the relevant columns in order to
         # get a count per region
         sql = f"""
@@ -133,3 +216,17 @@ class TotalLocationEvents(GeoDataMixin, Query):
         """
 
         return sql
+
+    def _get_location_event_cube(self) -> Optional[LocationEventCube]:
+        """
+        Get the location event cube to count the events from, or None if
+        the events must be counted from the events tables.
+        """
+        if self.interval == "min":
+            return None
+        try:
+            cube_kwargs = self._cube_kwargs
+        except AttributeError:
+            # Queries loaded from the cache don't keep the parameters
+            return None
+        return get_available_location_event_cube(**cube_kwargs)
@@ -4,9 +4,10 @@
 
 # -*- coding: utf-8 -*-
 
-from typing import List, Union
+from typing import List, Optional, Union
 
-from ..subscriber.unique_locations import UniqueLocations
+from ..subscriber.unique_locations import DailyUniqueLocations, UniqueLocations
+from .subscriber_sketches import LocationSubscriberSketches, log2m_for_error_bound
 from flowmachine.utils import standardise_date
 
 """
@@ -19,14 +20,15 @@ visited in a given period of time.
 
 """
 from ...core.query import Query
-from ...core.mixins import GeoDataMixin
+from ...core.join_to_location import JoinToLocation
+from ...core.mixins import GeoDataMixin, SpatialRollupMixin
 from ...core import make_spatial_unit
 from ...core.spatial_unit import AnySpatialUnit
 
 from ..utilities.subscriber_locations import SubscriberLocations
 
 
-class UniqueSubscriberCounts(GeoDataMixin, Query):
+class UniqueSubscriberCounts(SpatialRollupMixin, GeoDataMixin, Query):
 
     """
     Class that defines counts of unique subscribers for each location.
@@ -63,6 +65,21 @@ class UniqueSubscriberCounts(GeoDataMixin, Query):
         these lines with null cells should still be present, although they contain
         no information on the subscribers location, they still tell us that the subscriber made
         a call at that time.
+    error_bound : float, optional
+        If given, count subscribers approximately, using HyperLogLog sketches
+        with a relative standard error no larger than this (e.g. 0.01 for 1%).
+        Approximate counts require start and stop to be dates.
+
+    Notes
+    -----
+    Approximate counts are combined from daily cell-level sketches, which are
+    stored and reused by other approximate counts which cover the same days,
+    at any spatial unit. Counts of up to 128 subscribers are always exact.
+
+    If the unique cells visited by each subscriber on each day in the same
+    period (a `DailyUniqueLocations` at cell level) are stored, the counts for a
+    spatial unit with geography are computed from those rather than from the
+    events tables.
 
     Examples
     --------
@@ -81,6 +98,7 @@ class UniqueSubscriberCounts(GeoDataMixin, Query):
         spatial_unit: AnySpatialUnit = make_spatial_unit("cell"),
         hours="all",
         table="all",
+        error_bound: Optional[float] = None,
     ):
 
         self.start = standardise_date(start)
@@ -88,29 +106,85 @@ class UniqueSubscriberCounts(GeoDataMixin, Query):
         self.spatial_unit = spatial_unit
         self.hours = hours
         self.table = table
-        self.ul = UniqueLocations(
-            SubscriberLocations(
-                start=self.start,
-                stop=self.stop,
+        self.error_bound = error_bound
+        if error_bound is None:
+            self.sketches = None
+            self.ul = UniqueLocations(
+                SubscriberLocations(
+                    start=self.start,
+                    stop=self.stop,
+                    spatial_unit=self.spatial_unit,
+                    hours=self.hours,
+                    table=self.table,
+                )
+            )
+        else:
+            self.sketches = LocationSubscriberSketches(
+                self.start,
+                self.stop,
                 spatial_unit=self.spatial_unit,
                 hours=self.hours,
                 table=self.table,
+                log2m=log2m_for_error_bound(error_bound),
             )
-        )
+            self.ul = None
 
         super().__init__()
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        if self.error_bound is None:
+            # Keep the query ids of exact counts unchanged
+            for k in ("error_bound", "sketches"):
+                try:
+                    del state[k]
+                except KeyError:
+                    pass
+        return state
+
     @property
     def column_names(self) -> List[str]:
         return self.spatial_unit.location_id_columns + ["value"]
 
+    def _make_rollup_source(self) -> Optional[DailyUniqueLocations]:
+        if self.error_bound is not None:
+            # Approximate counts are already combined from cell-level sketches
+            return None
+        return DailyUniqueLocations(
+            SubscriberLocations(
+                start=self.start,
+                stop=self.stop,
+                spatial_unit=make_spatial_unit("cell"),
+                hours=self.hours,
+                table=self.table,
+            )
+        )
+
+    def _make_rollup_query(self, source: DailyUniqueLocations) -> str:
+        relevant_columns = ",".join(self.spatial_unit.location_id_columns)
+        joined = JoinToLocation(source, spatial_unit=self.spatial_unit, time_col="date")
+        return f"""
+        SELECT {relevant_columns}, COUNT(DISTINCT subscriber) AS value
+        FROM ({joined.get_query()}) AS joined
+        GROUP BY {relevant_columns}
+        """
+
     def _make_query(self):
         """
         Default query method implemented in the
         metaclass Query().
         """
-
         relevant_columns = ",".join(self.spatial_unit.location_id_columns)
+        if self.sketches is not None:
+            return f"""
+            SELECT {relevant_columns}, round(hll_cardinality(sketch))::bigint AS value
+            FROM ({self.sketches.get_query()}) AS sketches
+            """
+
+        source = self._get_stored_rollup_source()
+        if source is not None:
+            return self._make_rollup_query(source)
+
         sql = """
         SELECT {rc}, COUNT(unique_subscribers) AS value FROM 
         (SELECT 
@@ -19,6 +19,7 @@ from ...core import location_joined_query, make_spatial_unit
 from ...core.spatial_unit import AnySpatialUnit
 from ...core.query import Query
 from ..utilities import EventsTablesUnion
+from ..location.location_event_cube import get_available_location_event_cube
 from flowmachine.utils import standardise_date
 
 valid_stats = {"avg", "max", "min", "median", "mode", "stddev", "variance"}
@@ -53,6 +54,14 @@ class TotalNetworkObjects(GeoDataMixin, Query):
     ----------------
     Passed to EventsTablesUnion
 
+    Notes
+    -----
+    When totalling by hour or longer periods over all subscribers, the
+    network objects with events are found from the daily location event
+    cubes built by FlowETL rather than from the events tables, if every
+    day of the events tables in the period has a cube (see
+    `LocationEventCube`).
+
     Examples
     --------
     >>> t = TotalNetworkObjects()
@@ -120,14 +129,55 @@ class TotalNetworkObjects(GeoDataMixin, Query):
         self.total_by = total_by.lower()
         if self.total_by not in valid_periods:
             raise ValueError("{} is not a valid total_by value.".format(self.total_by))
+        # Kept out of the query's state, so they don't change the query id
+        self._cube_kwargs = dict(
+            start=self.start,
+            stop=self.stop,
+            tables=self.table,
+            hours=hours,
+            subscriber_subset=subscriber_subset,
+        )
 
         super().__init__()
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        try:
+            del state["_cube_kwargs"]
+        except KeyError:
+            pass
+        return state
+
     @property
     def column_names(self) -> List[str]:
         return self.spatial_unit.location_id_columns + ["value", "datetime"]
 
+    def _get_joined_from_cube(self) -> Optional[Query]:
+        """
+        Get the location event cube joined to the network objects and the
+        spatial unit, or None if the events tables must be used.
+        """
+        if self.total_by in {"second", "minute"}:
+            return None
+        try:
+            cube_kwargs = self._cube_kwargs
+        except AttributeError:
+            # Queries loaded from the cache don't keep the parameters
+            return None
+        cube = get_available_location_event_cube(**cube_kwargs)
+        if cube is None:
+            return None
+        events = location_joined_query(
+            cube, spatial_unit=self.network_object, time_col="datetime"
+        )
+        return location_joined_query(
+            events, spatial_unit=self.spatial_unit, time_col="datetime"
+        )
+
     def _make_query(self):
+        joined = self._get_joined_from_cube()
+        if joined is None:
+            joined = self.joined
         cols = self.network_object.location_id_columns
         group_cols = self.spatial_unit.location_id_columns
         for column in group_cols:
@@ -140,7 +190,7 @@ class TotalNetworkObjects(GeoDataMixin, Query):
              datetime FROM
               (SELECT DISTINCT {group_cols_str}, {cols_str}, datetime FROM           
                 (SELECT {group_cols_str}, {cols_str}, date_trunc('{self.total_by}', x.datetime) AS datetime
-                FROM ({self.joined.get_query()}) x) y) _
+                FROM ({joined.get_query()}) x) y) _
             GROUP BY {group_cols_str}, datetime
             ORDER BY {group_cols_str}, datetime
         """
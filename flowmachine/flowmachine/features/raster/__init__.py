@@ -9,5 +9,6 @@ Utilities for working with rasters in FlowMachine.
 
 """
 from .raster_statistics import RasterStatistics
+from .zonal_statistics import ZonalStatistics
 
-__all__ = ["RasterStatistics"]
+__all__ = ["RasterStatistics", "ZonalStatistics"]
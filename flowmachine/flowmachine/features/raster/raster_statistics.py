@@ -6,9 +6,12 @@
 Utility method for calculating raster
 statistics.
 """
-from ...core.query import Query
 from typing import List
 
+from ...core.query import Query
+from ...core.spatial_unit import GeomSpatialUnit
+from .zonal_statistics import ZonalStatistics, ZONAL_STATISTICS, get_raster_version
+
 
 class RasterStatistics(Query):
     """
@@ -25,17 +28,20 @@ class RasterStatistics(Query):
         This assumes that raster table contains
         a column named `rast`.
 
-    band : int or array
+    band : int
         Band number to use for calculations. Default
-        is band 1. For multiple bands, use array: [1, 2]
+        is band 1. Statistics are calculated for a
+        single band; a list containing one band
+        number is also accepted.
 
-    vector : str
+    vector : Query or GeomSpatialUnit
         Vector layer to use in case of clipping
         and grouping operations. If this option
         is provided, the parameters `vector_property`
         and `grouping_element` need to be provided. 
-        This can also be a Query object which returns a
-        geometry column.
+        This can also be a polygon spatial unit, in
+        which case the results are grouped by the
+        spatial unit's location id columns.
 
     vector_property : str
         Column name from vector layer with geometry
@@ -48,10 +54,25 @@ class RasterStatistics(Query):
         be an equivalent human-readable to the
         values in the `vector_property` column.
 
-    statistic : str
+    statistic : {'sum', 'count', 'mean', 'min', 'max'}, default 'sum'
         Type of statistic to calculate from raster.
-        Only `sum` is supported at the moment.
 
+    raster_version : str, optional
+        Identifier for the version of the raster. If not
+        given, this is derived from the raster table so that
+        cached results are not reused once the raster changes.
+
+    Notes
+    -----
+    When a vector layer is given, the statistic is served from a
+    `ZonalStatistics` query, which computes all of the statistics
+    for the raster, vector layer and band at once. Store that query
+    to precompute the statistics for every `RasterStatistics` which
+    shares it.
+
+    See Also
+    --------
+    flowmachine.features.raster.ZonalStatistics
     """
 
     def __init__(
@@ -62,17 +83,27 @@ class RasterStatistics(Query):
         vector_property="geom",
         grouping_element=None,
         statistic="sum",
+        raster_version=None,
     ):
 
         if isinstance(band, int):
             band = [band]
+        if len(band) != 1:
+            raise ValueError(
+                f"Statistics can only be calculated for a single band, not {band}. "
+                "Use a separate RasterStatistics query for each band."
+            )
 
-        if statistic not in ["sum"]:
+        if statistic not in ZONAL_STATISTICS:
             raise NotImplementedError(
                 "The statistic %s is not implemented." % statistic
             )
 
-        if vector is not None and grouping_element is None:
+        if (
+            vector is not None
+            and grouping_element is None
+            and not isinstance(vector, GeomSpatialUnit)
+        ):
             raise ValueError("Provide `grouping_element` alongside `vector`.")
 
         self.raster = raster
@@ -81,6 +112,21 @@ class RasterStatistics(Query):
         self.vector_property = vector_property
         self.grouping_element = grouping_element
         self.statistic = statistic
+        self.raster_version = (
+            get_raster_version(raster) if raster_version is None else raster_version
+        )
+
+        if vector is not None:
+            if not isinstance(vector, (Query, GeomSpatialUnit)):
+                raise ValueError("Vector must be a geo-type query")
+            self.zonal_statistics = ZonalStatistics(
+                raster=raster,
+                vector=vector,
+                band=band[0],
+                vector_property=vector_property,
+                grouping_element=grouping_element,
+                raster_version=self.raster_version,
+            )
 
         super().__init__()
 
@@ -89,7 +135,7 @@ class RasterStatistics(Query):
         if self.vector is None:
             return ["statistic"]
         else:
-            return [self.grouping_element, "statistic"]
+            return self.zonal_statistics.grouping_columns + ["statistic"]
 
     def _make_query(self):
         """
@@ -100,39 +146,27 @@ class RasterStatistics(Query):
         if self.vector is None:
             sql = """
             SELECT
-                (ST_SummaryStats(W.rast)).sum AS statistic
+                (ST_SummaryStats(W.rast, {band})).{statistic} AS statistic
             FROM
                 {raster} as W
             """.format(
-                raster=self.raster
+                raster=self.raster, band=self.band[0], statistic=self.statistic
             )
 
-        elif self.statistic == "sum":
-            # deal with possibility that vector is a query
-            try:
-                vector_clause = "({})".format(self.vector.get_query())
-            except AttributeError:
-                raise ValueError("Vector must be a geo-type query")
-
+        else:
             sql = """
 
                 SELECT
-                    G.{grouping_element},
-                    {statistic}((ST_SummaryStats(ST_Clip(R.rast, ARRAY[{band}], G.{vector_property}::geometry))).sum) AS statistic
+                    {grouping_columns},
+                    {statistic} AS statistic
                 FROM
-                    {vector_clause} as G,
-                    {raster} as R
-                WHERE ST_Intersects(G.{vector_property}::geometry, R.rast)
-                GROUP BY G.{grouping_element}
+                    ({zonal_statistics}) AS Z
                 ORDER BY statistic DESC
 
             """.format(
-                grouping_element=self.grouping_element,
-                band=",".join([str(_) for _ in self.band]),
+                grouping_columns=", ".join(self.zonal_statistics.grouping_columns),
                 statistic=self.statistic,
-                vector_clause=vector_clause,
-                vector_property=self.vector_property,
-                raster=self.raster,
+                zonal_statistics=self.zonal_statistics.get_query(),
             )
 
         return sql
@@ -0,0 +1,189 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Zonal statistics of a raster over a set of polygons, computed
+once and stored in the cache so that they can be reused.
+"""
+from typing import List, Optional, Union
+
+from ...core.context import get_db
+from ...core.query import Query
+from ...core.spatial_unit import GeomSpatialUnit
+
+# Statistics which can be derived from the per-tile summaries
+# returned by ST_SummaryStats
+ZONAL_STATISTICS = ("count", "sum", "mean", "min", "max")
+
+
+def get_raster_version(raster: str) -> str:
+    """
+    Get a fingerprint of the current contents of a raster table.
+
+    The fingerprint is derived from the row versions and metadata of each
+    tile (and the band path for out-db rasters), so it changes whenever a
+    tile is added, removed or rewritten, without reading any pixel data.
+
+    Parameters
+    ----------
+    raster : str
+        Fully qualified name of the raster table. The table must contain
+        a column named `rast`.
+
+    Returns
+    -------
+    str
+        md5 hash identifying this version of the raster
+
+    Notes
+    -----
+    Changes made to the _files_ backing an out-db raster are not visible to
+    the database. If you replace the files in place, pass an explicit
+    `raster_version` to the raster queries instead.
+    """
+    return get_db().fetch(
+        f"""
+        SELECT md5(COALESCE(string_agg(tile, ',' ORDER BY tile), ''))
+        FROM (
+            SELECT concat_ws(':', xmin, ST_MetaData(rast), ST_BandPath(rast)) AS tile
+            FROM {raster}
+        ) _
+        """
+    )[0][0]
+
+
+class ZonalStatistics(Query):
+    """
+    Summary statistics of one band of a raster over each polygon in a vector
+    layer or polygon spatial unit.
+
+    All of the statistics (count, sum, mean, min and max) are computed in a
+    single pass over the intersecting tiles. Tiles which lie entirely within
+    a polygon are summarised directly, and only tiles crossing a polygon
+    boundary are clipped. Storing this query precomputes the statistics for
+    every `RasterStatistics` query with the same raster, polygons and band.
+
+    The version of the raster forms part of the query id, so that any change
+    to the raster produces a different query and the stale statistics are
+    never served.
+
+    Parameters
+    ----------
+    raster : str
+        Fully qualified table name of raster data.
+        This assumes that raster table contains
+        a column named `rast`. Both in-db and
+        out-db (`raster2pgsql -R`) rasters are
+        supported, and tiled rasters are clipped
+        one tile at a time.
+    band : int, default 1
+        Band number to use for calculations.
+    vector : Query or GeomSpatialUnit
+        Vector layer to summarise the raster over. If this
+        is a polygon spatial unit, the statistics are grouped
+        by the spatial unit's location id columns.
+    vector_property : str, default "geom"
+        Column name from vector layer with geometry
+        data. Ignored if `vector` is a spatial unit.
+    grouping_element : str
+        Column name of grouping property to use
+        for aggregating values. Required unless
+        `vector` is a spatial unit.
+    raster_version : str, optional
+        Identifier for the version of the raster. If not given,
+        this is derived from the raster table.
+
+    Examples
+    --------
+    >>> zs = ZonalStatistics(
+    ...     raster="population.small_nepal_raster",
+    ...     vector=make_spatial_unit("admin", level=2),
+    ... )
+    >>> zs.store().result()
+    >>> zs.head()
+           pcod  count        sum   mean  min     max
+    0  524 3 07    100  2500000.0  25000  ...
+    """
+
+    def __init__(
+        self,
+        *,
+        raster: str,
+        vector: Union[Query, GeomSpatialUnit],
+        band: int = 1,
+        vector_property: str = "geom",
+        grouping_element: Optional[str] = None,
+        raster_version: Optional[str] = None,
+    ):
+        if isinstance(vector, GeomSpatialUnit):
+            vector.verify_criterion("is_polygon")
+            grouping_element = None
+            vector_property = "geom"
+        elif not isinstance(vector, Query):
+            raise ValueError("Vector must be a geo-type query or spatial unit")
+        elif grouping_element is None:
+            raise ValueError("Provide `grouping_element` alongside `vector`.")
+
+        self.raster = raster
+        self.band = int(band)
+        self.vector = vector
+        self.vector_property = vector_property
+        self.grouping_element = grouping_element
+        self.raster_version = (
+            get_raster_version(raster) if raster_version is None else raster_version
+        )
+
+        super().__init__()
+
+    @property
+    def grouping_columns(self) -> List[str]:
+        """
+        Names of the columns identifying each polygon.
+        """
+        if self.grouping_element is None:
+            return self.vector.location_id_columns
+        return [self.grouping_element]
+
+    @property
+    def column_names(self) -> List[str]:
+        return self.grouping_columns + list(ZONAL_STATISTICS)
+
+    @property
+    def index_cols(self) -> List[List[str]]:
+        return [self.grouping_columns]
+
+    def _make_query(self):
+        if self.grouping_element is None:
+            vector_clause = self.vector.get_geom_query()
+        else:
+            vector_clause = self.vector.get_query()
+        grouping_cols = ", ".join(self.grouping_columns)
+        aliased_grouping_cols = ", ".join(f"G.{c}" for c in self.grouping_columns)
+        geom = f"G.{self.vector_property}::geometry"
+
+        sql = f"""
+        SELECT
+            {grouping_cols},
+            SUM((stats).count) AS count,
+            SUM((stats).sum) AS sum,
+            SUM((stats).sum) / NULLIF(SUM((stats).count), 0) AS mean,
+            MIN((stats).min) AS min,
+            MAX((stats).max) AS max
+        FROM (
+            SELECT
+                {aliased_grouping_cols},
+                CASE
+                    WHEN ST_Within(ST_Envelope(R.rast), {geom})
+                    THEN ST_SummaryStats(R.rast, {self.band}, TRUE)
+                    ELSE ST_SummaryStats(ST_Clip(R.rast, {self.band}, {geom}), 1, TRUE)
+                END AS stats
+            FROM
+                ({vector_clause}) AS G,
+                {self.raster} AS R
+            WHERE ST_Intersects({geom}, R.rast)
+        ) _
+        GROUP BY {grouping_cols}
+        """
+
+        return sql
@@ -7,6 +7,7 @@ Utilities for working with spatial datasets in FlowMachine.
 """
 from .location_area import LocationArea
 from .distance_matrix import DistanceMatrix
+from .sparse_distance_matrix import SparseDistanceMatrix
 from .geography import Geography
 from .location_cluster import LocationCluster
 from .versioned_infrastructure import VersionedInfrastructure
@@ -15,6 +16,7 @@ from .circles import Circle, CircleGeometries
 __all__ = [
     "LocationArea",
     "DistanceMatrix",
+    "SparseDistanceMatrix",
     "Geography",
     "LocationCluster",
     "VersionedInfrastructure",
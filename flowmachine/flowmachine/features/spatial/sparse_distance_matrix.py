@@ -0,0 +1,320 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Distances between only those pairs of locations which appear in a query,
+rather than between every pair of locations.
+"""
+import time
+from concurrent.futures import Future
+from typing import List, Optional, Union
+
+import pandas as pd
+from sqlalchemy.engine import Engine
+
+from ...core import make_spatial_unit
+from ...core.bulk_write import copy_dataframe
+from ...core.cache import write_query_to_cache
+from ...core.context import get_db, get_redis, submit_to_executor
+from ...core.dependency_graph import store_queries_in_order, unstored_dependencies_graph
+from ...core.mixins import GraphMixin
+from ...core.query import Query
+from ...core.query_state import QueryStateMachine
+from ...core.spatial_unit import LonLatSpatialUnit
+from ...utils import geodesic_distance
+
+import structlog
+
+logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
+
+DISTANCE_ENGINES = ("postgis", "numpy")
+
+
+class SparseDistanceMatrix(GraphMixin, Query):
+    """
+    Distances between the pairs of locations which appear in a query.
+
+    The rows are those rows of `DistanceMatrix` for the same spatial unit
+    whose origin and destination match a pair of locations in `pairs`, so
+    this can be used in place of a `DistanceMatrix` when only some pairs
+    are needed. Only the distinct pairs of locations are computed (rather
+    than every pair of locations, which for tens of thousands of cells is
+    billions of distances), and once stored the distances are indexed on
+    the origin and destination.
+
+    Distance is returned in km.
+
+    Parameters
+    ----------
+    pairs : Query
+        Query with columns `<column>_from` and `<column>_to` for some of the
+        location id columns of the spatial unit, e.g. `location_id_from` and
+        `location_id_to`. Where pairs does not have all of the spatial unit's
+        columns, each pair of locations matches every row of the spatial
+        unit with those values.
+    spatial_unit : flowmachine.core.spatial_unit.LonLatSpatialUnit, default versioned-cell
+        Locations to compute distances for.
+        Note: only point locations (i.e. spatial_unit.has_lon_lat_columns) are
+        supported at this time.
+    engine : {"postgis", "numpy"}, default "postgis"
+        How to compute the distances. "postgis" uses `ST_Distance` in FlowDB.
+        "numpy" streams the pairs of locations out of the database in chunks,
+        computes the distances for each chunk with NumPy, and writes them back
+        using COPY, which is considerably faster for large numbers of pairs.
+        Both engines produce the same distances (to well under a millimetre),
+        so the engine is not part of the query id. The numpy engine is only
+        used when the query is stored.
+    chunk_size : int, default 100000
+        Number of pairs of locations to fetch at a time when using the
+        "numpy" engine.
+
+    Notes
+    -----
+    The distances are only kept in the matrix's own table, which is a cache
+    entry like any other, so it counts towards the size of the cache and can
+    be removed when the cache is shrunk.
+
+    Examples
+    --------
+    >>> trips = ConsecutiveTrips(...)  # Any query with location_id_from and location_id_to columns
+    >>> dm = SparseDistanceMatrix(trips, spatial_unit=make_spatial_unit("versioned-cell"))
+    >>> dm.head()
+      location_id_from  version_from  lon_from  lat_from location_id_to  version_to  lon_to  lat_to      value
+    0           0RIMKL             0  84.04...  28.45...         1ifQIw           0  85.3...  27.6...  151.86...
+    ...
+    """
+
+    def __init__(
+        self,
+        pairs: Query,
+        spatial_unit: Optional[LonLatSpatialUnit] = None,
+        engine: str = "postgis",
+        chunk_size: int = 100000,
+    ):
+        if engine not in DISTANCE_ENGINES:
+            raise ValueError(
+                f"Unrecognised engine '{engine}', must be one of {DISTANCE_ENGINES}."
+            )
+        self.engine = engine
+        self.chunk_size = int(chunk_size)
+
+        if spatial_unit is None:
+            self.spatial_unit = make_spatial_unit("versioned-cell")
+        else:
+            self.spatial_unit = spatial_unit
+        self.spatial_unit.verify_criterion("has_lon_lat_columns")
+
+        self.pair_columns = [
+            c
+            for c in self.spatial_unit.location_id_columns
+            if f"{c}_from" in pairs.column_names and f"{c}_to" in pairs.column_names
+        ]
+        if len(self.pair_columns) == 0:
+            raise ValueError(
+                f"pairs must have '<column>_from' and '<column>_to' columns for at least one of {self.spatial_unit.location_id_columns}."
+            )
+        self.pairs = pairs
+        super().__init__()
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        # The engines give identical results, so should share a query id
+        for k in ("engine", "chunk_size"):
+            try:
+                del state[k]
+            except KeyError:
+                pass
+        return state
+
+    @property
+    def column_names(self) -> List[str]:
+        return self._location_columns + ["value"]
+
+    @property
+    def _location_columns(self) -> List[str]:
+        return [
+            f"{c}_{direction}"
+            for direction in ("from", "to")
+            for c in self.spatial_unit.location_id_columns
+        ]
+
+    @property
+    def index_cols(self) -> List[Union[str, List[str]]]:
+        return [self._location_columns]
+
+    def _make_located_pairs_query(self) -> str:
+        """
+        SQL for the distinct pairs of locations, with every location id column
+        of the spatial unit (and so longitude and latitude).
+        """
+        distinct_pairs = f"""
+        SELECT DISTINCT {", ".join(f"{c}_{direction}" for direction in ("from", "to") for c in self.pair_columns)}
+        FROM ({self.pairs.get_query()}) AS pairs
+        """
+        if len(self.pair_columns) == len(self.spatial_unit.location_id_columns):
+            return distinct_pairs
+
+        geom_query = self.spatial_unit.get_geom_query()
+        join_on = {
+            direction: " AND ".join(
+                f"pairs.{c}_{direction} = {alias}.{c}" for c in self.pair_columns
+            )
+            for direction, alias in (("from", "A"), ("to", "B"))
+        }
+        columns = ", ".join(
+            f"{alias}.{c} AS {c}_{direction}"
+            for direction, alias in (("from", "A"), ("to", "B"))
+            for c in self.spatial_unit.location_id_columns
+        )
+        return f"""
+        SELECT {columns}
+        FROM ({distinct_pairs}) AS pairs
+        JOIN ({geom_query}) AS A ON {join_on["from"]}
+        JOIN ({geom_query}) AS B ON {join_on["to"]}
+        """
+
+    def _make_query(self):
+        # The numpy engine only changes how the distances are stored (see to_sql),
+        # so both engines have the same SQL.
+        return f"""
+        SELECT {", ".join(self._location_columns)},
+            ST_Distance(
+                ST_SetSRID(ST_Point(lon_from, lat_from), 4326)::geography,
+                ST_SetSRID(ST_Point(lon_to, lat_to), 4326)::geography
+            ) / 1000 AS value
+        FROM ({self._make_located_pairs_query()}) AS located_pairs
+        """
+
+    def _make_distances_sql(self, name: str, schema: Optional[str] = None) -> List[str]:
+        """
+        SQL which builds the distance matrix from the pairs in the temporary
+        `sparse_distance_pairs` table, and the distances written to the
+        temporary `sparse_distances` table.
+        """
+        full_name = name if schema is None else f"{schema}.{name}"
+        if get_db().has_table(name, schema=schema):
+            logger.info("Table already exists")
+            return []
+        queries = [
+            f"""
+            CREATE TABLE {full_name} AS (
+                SELECT {", ".join(self._location_columns)}, sparse_distances.value
+                FROM sparse_distance_pairs
+                LEFT JOIN sparse_distances USING (pair_id)
+            )
+            """
+        ]
+        for ix in self.index_cols:
+            queries.append(
+                "CREATE INDEX ON {tbl} ({ixen})".format(
+                    tbl=full_name, ixen=",".join(ix) if isinstance(ix, list) else ix
+                )
+            )
+        return queries
+
+    def to_sql(
+        self,
+        name: str,
+        schema: Union[str, None] = None,
+        store_dependencies: bool = False,
+    ) -> Future:
+        """
+        Store the result of the calculation back into the database.
+
+        Overridden to compute the distances outside the database when using
+        the "numpy" engine.
+
+        Parameters
+        ----------
+        name : str
+            name of the table
+        schema : str, default None
+            Name of an existing schema. If none will use the postgres default,
+            see postgres docs for more info.
+        store_dependencies : bool, default False
+            If True, store the dependencies of this query.
+
+        Returns
+        -------
+        Future
+            Future object, containing this query and any result information.
+        """
+        if self.engine != "numpy":
+            return super().to_sql(
+                name, schema=schema, store_dependencies=store_dependencies
+            )
+
+        def write_distances(query_ddl_ops: List[str], connection: Engine) -> float:
+            if not query_ddl_ops:
+                return 0
+            start = time.time()
+            with connection.begin() as conn:
+                dbapi_connection = conn.connection
+                dbapi_connection.cursor().execute(
+                    f"""
+                    CREATE TEMPORARY TABLE sparse_distance_pairs ON COMMIT DROP AS
+                    SELECT row_number() OVER () AS pair_id, located_pairs.*
+                    FROM ({self._make_located_pairs_query()}) AS located_pairs;
+                    CREATE TEMPORARY TABLE sparse_distances (
+                        pair_id BIGINT, value DOUBLE PRECISION
+                    ) ON COMMIT DROP
+                    """
+                )
+                with dbapi_connection.cursor(name="sparse_distance_pairs") as cursor:
+                    cursor.execute(
+                        "SELECT pair_id, lon_from, lat_from, lon_to, lat_to FROM sparse_distance_pairs"
+                    )
+                    while True:
+                        rows = cursor.fetchmany(self.chunk_size)
+                        if not rows:
+                            break
+                        chunk = pd.DataFrame(
+                            rows,
+                            columns=[
+                                "pair_id",
+                                "lon_from",
+                                "lat_from",
+                                "lon_to",
+                                "lat_to",
+                            ],
+                        )
+                        distances = pd.DataFrame(
+                            {
+                                "pair_id": chunk.pair_id,
+                                "value": geodesic_distance(
+                                    chunk.lon_from.to_numpy(dtype=float),
+                                    chunk.lat_from.to_numpy(dtype=float),
+                                    chunk.lon_to.to_numpy(dtype=float),
+                                    chunk.lat_to.to_numpy(dtype=float),
+                                )
+                                / 1000,
+                            }
+                        )
+                        copy_dataframe(
+                            dbapi_connection.cursor(), distances, "sparse_distances"
+                        )
+                for ddl_op in query_ddl_ops:
+                    conn.execute(ddl_op)
+            logger.debug("Wrote sparse distance matrix.")
+            return (time.time() - start) * 1000
+
+        if store_dependencies:
+            store_queries_in_order(unstored_dependencies_graph(self))
+
+        current_state, changed_to_queue = QueryStateMachine(
+            get_redis(), self.query_id, get_db().conn_id
+        ).enqueue()
+        logger.debug(
+            f"Attempted to enqueue query '{self.query_id}', query state is now {current_state} and change happened {'here and now' if changed_to_queue else 'elsewhere'}."
+        )
+        return submit_to_executor(
+            write_query_to_cache,
+            name=name,
+            schema=schema,
+            query=self,
+            connection=get_db(),
+            redis=get_redis(),
+            ddl_ops_func=self._make_distances_sql,
+            write_func=write_distances,
+        )
@@ -72,4 +72,4 @@ from .distance_series import DistanceSeries
 from .imputed_distance_series import ImputedDistanceSeries
 from .iterative_median_filter import IterativeMedianFilter
 from .active_at_reference_location import ActiveAtReferenceLocation
-from .unique_locations import UniqueLocations
+from .unique_locations import UniqueLocations, DailyUniqueLocations
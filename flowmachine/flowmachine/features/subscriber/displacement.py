@@ -8,8 +8,9 @@ The maximum displacement of a user from its home location
 """
 from typing import List, Union, Tuple, Optional
 
-from flowmachine.features.spatial import DistanceMatrix
+from flowmachine.features.spatial import SparseDistanceMatrix
 from .metaclasses import SubscriberFeature
+from .unique_locations import UniqueLocations
 from ..utilities.subscriber_locations import SubscriberLocations, BaseLocation
 from flowmachine.core import Query
 from flowmachine.utils import standardise_date
@@ -125,13 +126,21 @@ class Displacement(SubscriberFeature):
             )
         else:
             self.reference_location = reference_location
-            self.joined = reference_location.join(
+            located = reference_location.join(
                 other=subscriber_locations,
                 on_left=["subscriber"],
                 left_append="_from",
                 right_append="_to",
-            ).join(
-                DistanceMatrix(spatial_unit=self.spatial_unit),
+            )
+            # Only the distinct pairs of locations are needed for the distances
+            located_pairs = reference_location.join(
+                other=UniqueLocations(subscriber_locations),
+                on_left=["subscriber"],
+                left_append="_from",
+                right_append="_to",
+            )
+            self.joined = located.join(
+                SparseDistanceMatrix(located_pairs, spatial_unit=self.spatial_unit),
                 on_left=[
                     f"{col}_{direction}"
                     for direction in ("from", "to")
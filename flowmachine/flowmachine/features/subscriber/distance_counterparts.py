@@ -8,8 +8,10 @@ Calculate metrics related with distance between caller and her/his counterparts.
 """
 from typing import List, Union
 
+from flowmachine.core.context import shared_scans
+from flowmachine.core.query import Query
 from flowmachine.features.utilities.events_tables_union import EventsTablesUnion
-from flowmachine.features.spatial.distance_matrix import DistanceMatrix
+from flowmachine.features.spatial.sparse_distance_matrix import SparseDistanceMatrix
 from flowmachine.features.subscriber.metaclasses import SubscriberFeature
 from flowmachine.features.utilities.direction_enum import Direction
 from flowmachine.utils import make_where, standardise_date
@@ -17,6 +19,44 @@ from flowmachine.utils import make_where, standardise_date
 valid_stats = {"count", "sum", "avg", "max", "min", "median", "stddev", "variance"}
 
 
+class _CounterpartLocations(Query):
+    """
+    The location of each subscriber's side of an event, and of their
+    counterpart's side of the same event.
+    """
+
+    def __init__(
+        self,
+        *,
+        unioned_from_query: EventsTablesUnion,
+        unioned_to_query: EventsTablesUnion,
+        direction: Direction,
+        exclude_self_calls: bool,
+    ):
+        self.unioned_from_query = unioned_from_query
+        self.unioned_to_query = unioned_to_query
+        self.direction = direction
+        self.exclude_self_calls = exclude_self_calls
+        super().__init__()
+
+    @property
+    def column_names(self) -> List[str]:
+        return ["subscriber", "location_id_from", "location_id_to"]
+
+    def _make_query(self):
+        filters = [self.direction.get_filter_clause("A")]
+        if self.exclude_self_calls:
+            filters.append("A.subscriber != A.msisdn_counterpart")
+        on_filters = make_where(filters)
+
+        return f"""
+        SELECT A.subscriber, A.location_id AS location_id_from, B.location_id AS location_id_to FROM
+        ({self.unioned_from_query.get_query()}) AS A
+        JOIN ({self.unioned_to_query.get_query()}) AS B
+        ON A.id = B.id AND A.outgoing != B.outgoing {on_filters}
+        """
+
+
 class DistanceCounterparts(SubscriberFeature):
     """
     This class returns metrics related with the distance between event
@@ -97,7 +137,7 @@ class DistanceCounterparts(SubscriberFeature):
         # EventsTablesUnion will only subset on the subscriber identifier,
         # which means that we need to query for a unioned table twice. That has
         # a considerable negative impact on execution time.
-        self.unioned_from_query = EventsTablesUnion(
+        unioned_from_query = EventsTablesUnion(
             self.start,
             self.stop,
             columns=column_list,
@@ -107,7 +147,7 @@ class DistanceCounterparts(SubscriberFeature):
             subscriber_subset=subscriber_subset,
         )
 
-        self.unioned_to_query = EventsTablesUnion(
+        unioned_to_query = EventsTablesUnion(
             self.start,
             self.stop,
             columns=column_list,
@@ -117,7 +157,14 @@ class DistanceCounterparts(SubscriberFeature):
             subscriber_subset=subscriber_subset,
         )
 
-        self.distance_matrix = DistanceMatrix()
+        self.counterpart_locations = _CounterpartLocations(
+            unioned_from_query=unioned_from_query,
+            unioned_to_query=unioned_to_query,
+            direction=self.direction,
+            exclude_self_calls=self.exclude_self_calls,
+        )
+        # Only the distances between locations where events happened are needed
+        self.distance_matrix = SparseDistanceMatrix(self.counterpart_locations)
 
         super().__init__()
 
@@ -126,25 +173,22 @@ class DistanceCounterparts(SubscriberFeature):
         return ["subscriber", "value"]
 
     def _make_query(self):
-
-        filters = [self.direction.get_filter_clause("A")]
-        if self.exclude_self_calls:
-            filters.append("A.subscriber != A.msisdn_counterpart")
-        on_filters = make_where(filters)
+        # The distances are read from the same scan of the events as the
+        # counterpart locations (unless the distance matrix is stored)
+        with shared_scans(
+            {self.counterpart_locations.query_id: "SELECT * FROM counterpart_locations"}
+        ):
+            distances = self.distance_matrix.get_query()
 
         sql = f"""
+        WITH counterpart_locations AS ({self.counterpart_locations.get_query()})
         SELECT
             U.subscriber AS subscriber,
             {self.statistic}(D.value) AS value
         FROM
-            (
-                SELECT A.subscriber, A.location_id AS location_id_from, B.location_id AS location_id_to FROM
-                ({self.unioned_from_query.get_query()}) AS A
-                JOIN ({self.unioned_to_query.get_query()}) AS B
-                ON A.id = B.id AND A.outgoing != B.outgoing {on_filters}
-            ) U
+            counterpart_locations U
         JOIN
-            ({self.distance_matrix.get_query()}) D
+            ({distances}) D
         USING (location_id_from, location_id_to)
         GROUP BY U.subscriber
         """
@@ -8,8 +8,9 @@ Per subscriber time series of distances from some reference location.
 """
 from typing import List, Optional, Union, Tuple
 
-from flowmachine.features.spatial import DistanceMatrix
+from flowmachine.features.spatial import SparseDistanceMatrix
 from .metaclasses import SubscriberFeature
+from .unique_locations import UniqueLocations
 from ..utilities.subscriber_locations import SubscriberLocations, BaseLocation
 from flowmachine.utils import standardise_date
 
@@ -97,13 +98,21 @@ class DistanceSeries(SubscriberFeature):
                     "reference_location must have the same spatial unit as subscriber_locations."
                 )
             self.reference_location = reference_location
-            self.joined = reference_location.join(
+            located = reference_location.join(
                 other=subscriber_locations,
                 on_left=["subscriber"],
                 left_append="_from",
                 right_append="_to",
-            ).join(
-                DistanceMatrix(spatial_unit=self.spatial_unit),
+            )
+            # Only the distinct pairs of locations are needed for the distances
+            located_pairs = reference_location.join(
+                other=UniqueLocations(subscriber_locations),
+                on_left=["subscriber"],
+                left_append="_from",
+                right_append="_to",
+            )
+            self.joined = located.join(
+                SparseDistanceMatrix(located_pairs, spatial_unit=self.spatial_unit),
                 on_left=[
                     f"{col}_{direction}"
                     for direction in ("from", "to")
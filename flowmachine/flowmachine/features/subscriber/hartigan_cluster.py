@@ -11,14 +11,136 @@ These methods are great options for reducing the dimensionality of the
 problem in hand.
 """
 
-from typing import List, Union
+import time
+from concurrent.futures import Future
+from typing import Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.engine import Engine
 
 from ..utilities import SubscriberLocations
 from ...core import make_spatial_unit
+from ...core.bulk_write import copy_dataframe
+from ...core.cache import write_query_to_cache
+from ...core.context import get_db, get_redis, submit_to_executor
+from ...core.dependency_graph import store_queries_in_order, unstored_dependencies_graph
 from ...core.query import Query
+from ...core.query_state import QueryStateMachine
 from ...core.mixins import GeoDataMixin
+from ...utils import geodesic_distance
 from .call_days import CallDays
 
+import structlog
+
+logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
+
+HARTIGAN_ENGINES = ("plpgsql", "numpy")
+
+
+def hartigan_assign(
+    call_days: pd.DataFrame, radius: float, call_threshold: int = 0
+) -> pd.DataFrame:
+    """
+    Run the Hartigan clustering algorithm for many subscribers at once.
+
+    Replicates the `hartigan` aggregate in FlowDB, but rather than working
+    through one subscriber at a time it takes the n-th ranked site of every
+    subscriber in a single vectorised step.
+
+    Parameters
+    ----------
+    call_days : pandas.DataFrame
+        Call days with columns subscriber, site_id, version, value, lon and
+        lat, sorted by subscriber and then in the order the sites should be
+        considered (i.e. by descending call days).
+    radius : float
+        Clustering threshold in km
+    call_threshold : int, default 0
+        Minimum number of call days a cluster must have to be returned
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per site, with the subscriber, the rank of the cluster it
+        belongs to, the cluster centroid's lon and lat, the total call days
+        of the cluster, the site_id and version, and the order in which the
+        site joined the cluster.
+    """
+    n_rows = len(call_days)
+    threshold = radius * 1000
+    subscriber = call_days["subscriber"].to_numpy()
+    lon = call_days["lon"].to_numpy(dtype=float)
+    lat = call_days["lat"].to_numpy(dtype=float)
+    weight = call_days["value"].to_numpy(dtype=np.int64)
+
+    # Each subscriber's clusters occupy the slots from the position of their
+    # first site onwards, since they can never have more clusters than sites
+    is_start = np.ones(n_rows, dtype=bool)
+    is_start[1:] = subscriber[1:] != subscriber[:-1]
+    group = np.cumsum(is_start) - 1
+    offset = np.flatnonzero(is_start)
+    position = np.arange(n_rows) - offset[group]
+
+    cluster_lon = np.full(n_rows, np.nan)
+    cluster_lat = np.full(n_rows, np.nan)
+    cluster_weight = np.zeros(n_rows, dtype=np.int64)
+    n_clusters = np.zeros(len(offset), dtype=np.int64)
+    assignment = np.zeros(n_rows, dtype=np.int64)
+
+    by_position = np.argsort(position, kind="stable")
+    steps = np.split(by_position, np.flatnonzero(np.diff(position[by_position])) + 1)
+    for rows in steps:
+        if len(rows) == 0:
+            continue
+        groups = group[rows]
+        width = max(int(n_clusters[groups].max()), 1)
+        candidates = offset[groups, None] + np.arange(width)
+        is_cluster = np.arange(width) < n_clusters[groups, None]
+        candidates = np.where(is_cluster, candidates, offset[groups, None])
+        distance = geodesic_distance(
+            cluster_lon[candidates],
+            cluster_lat[candidates],
+            lon[rows, None],
+            lat[rows, None],
+        )
+        within = is_cluster & (distance < threshold)
+        joins = within.any(axis=1)
+        slot = np.where(joins, within.argmax(axis=1), n_clusters[groups])
+        target = offset[groups] + slot
+
+        old_weight = cluster_weight[target]
+        new_weight = old_weight + weight[rows]
+        cluster_lon[target] = np.where(
+            joins,
+            (cluster_lon[target] * old_weight + lon[rows] * weight[rows]) / new_weight,
+            lon[rows],
+        )
+        cluster_lat[target] = np.where(
+            joins,
+            (cluster_lat[target] * old_weight + lat[rows] * weight[rows]) / new_weight,
+            lat[rows],
+        )
+        cluster_weight[target] = new_weight
+        n_clusters[groups[~joins]] += 1
+        assignment[rows] = slot
+
+    target = offset[group] + assignment
+    member = pd.Series(assignment).groupby([group, assignment]).cumcount().to_numpy()
+    clusters = pd.DataFrame(
+        {
+            "subscriber": subscriber,
+            "rank": assignment + 1,
+            "lon": cluster_lon[target],
+            "lat": cluster_lat[target],
+            "calldays": cluster_weight[target],
+            "site_id": call_days["site_id"].to_numpy(),
+            "version": call_days["version"].to_numpy(),
+            "member": member,
+        }
+    )
+    return clusters[clusters.calldays >= call_threshold]
+
 
 class BaseCluster(GeoDataMixin, Query):
     """ Base query for cluster methods, providing a geo augmented query method."""
@@ -73,6 +195,23 @@ class HartiganCluster(BaseCluster):
     call_threshold : float
         The minimum number of calls that a cluster must have. Any cluster
         with less than that amount of calls will be eliminated.
+    engine : {"plpgsql", "numpy"}, default "plpgsql"
+        How to compute the clusters. "plpgsql" uses the `hartigan` aggregate
+        in FlowDB. "numpy" streams the call days out of the database in
+        subscriber-ordered chunks, clusters all the subscribers in a chunk
+        together using NumPy, and writes the clusters back using COPY,
+        which is considerably faster for large numbers of subscribers.
+        Both engines produce the same clusters, so the engine is not part of
+        the query id. The "numpy" engine is only used when the query is
+        stored; unstored, the query runs as SQL like the "plpgsql" engine.
+    chunk_size : int, default 100000
+        Number of call day rows to fetch at a time when using the "numpy"
+        engine.
+
+    Notes
+    -----
+    Sites with the same number of call days are considered in order of
+    site_id and version.
 
     Examples
     --------
@@ -109,10 +248,19 @@ class HartiganCluster(BaseCluster):
         radius: Union[float, str],
         buffer: float = 0,
         call_threshold: int = 0,
+        engine: str = "plpgsql",
+        chunk_size: int = 100000,
     ):
         """
         """
 
+        if engine not in HARTIGAN_ENGINES:
+            raise ValueError(
+                f"Unrecognised engine '{engine}', must be one of {HARTIGAN_ENGINES}."
+            )
+        self.engine = engine
+        self.chunk_size = int(chunk_size)
+
         self.calldays = calldays
         try:
             if (
@@ -131,8 +279,19 @@ class HartiganCluster(BaseCluster):
         self.buffer = float(buffer)
         super().__init__()
 
-    def _make_query(self):
+    def __getstate__(self):
+        state = super().__getstate__()
+        # The engines give identical results, so should share a query id
+        for k in ("engine", "chunk_size"):
+            try:
+                del state[k]
+            except KeyError:
+                pass
+        return state
 
+    def _make_query(self):
+        # The numpy engine only changes how the clusters are stored (see to_sql),
+        # so both engines have the same SQL.
         calldays = "({}) AS calldays".format(self.calldays.get_query())
 
         sql = f"""
@@ -144,7 +303,8 @@ class HartiganCluster(BaseCluster):
                regexp_split_to_array(unnest(versions), '::')::integer[] AS version
         FROM (
             SELECT calldays.subscriber, (hartigan(calldays.site_id, calldays.version, calldays.value::integer, {self.radius},
-                {self.buffer}, {self.call_threshold})).*
+                {self.buffer}, {self.call_threshold}
+                ORDER BY calldays.value DESC, calldays.site_id, calldays.version)).*
             FROM {calldays}
             GROUP BY calldays.subscriber
         ) clusters
@@ -152,6 +312,164 @@ class HartiganCluster(BaseCluster):
 
         return sql
 
+    def _iter_call_day_chunks(self, cursor) -> Iterator[pd.DataFrame]:
+        """
+        Yield the call days with site coordinates from a server-side cursor,
+        in chunks which each hold every row for the subscribers they contain.
+        """
+        cursor.execute(
+            f"""
+            SELECT calldays.subscriber, calldays.site_id, calldays.version,
+                   calldays.value::integer AS value,
+                   ST_X(sites.geom_point) AS lon, ST_Y(sites.geom_point) AS lat
+            FROM ({self.calldays.get_query()}) AS calldays
+            LEFT JOIN infrastructure.sites AS sites
+                ON sites.id = calldays.site_id AND sites.version = calldays.version
+            ORDER BY calldays.subscriber, calldays.value DESC, calldays.site_id, calldays.version
+            """
+        )
+        columns = ["subscriber", "site_id", "version", "value", "lon", "lat"]
+        carried = None
+        while True:
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            chunk = pd.DataFrame(rows, columns=columns)
+            if carried is not None:
+                chunk = pd.concat([carried, chunk], ignore_index=True)
+            # The last subscriber may continue into the next chunk
+            last = chunk.subscriber.iloc[-1]
+            is_last = (chunk.subscriber == last).to_numpy()
+            carried = chunk[is_last]
+            if not is_last.all():
+                yield chunk[~is_last]
+        if carried is not None:
+            yield carried
+
+    def _make_clusters_sql(self, name: str, schema: Optional[str] = None) -> List[str]:
+        """
+        SQL which builds the table of clusters from the raw clusters written
+        to the temporary `hartigan_raw` table.
+        """
+        full_name = name if schema is None else f"{schema}.{name}"
+        if get_db().has_table(name, schema=schema):
+            logger.info("Table already exists")
+            return []
+        if self.buffer > 0:
+            cluster = f"""
+            CASE
+                WHEN cardinality(clusters.version) > 1
+                THEN ST_Buffer(clusters.centroid, {self.buffer * 1000})
+                ELSE COALESCE(sites.geom_polygon::geography, ST_Buffer(clusters.centroid, {self.buffer * 1000}))
+            END"""
+        else:
+            cluster = "clusters.centroid"
+        queries = [
+            f"""
+            CREATE TABLE {full_name} AS (
+                SELECT clusters.subscriber, {cluster} AS cluster, clusters.rank,
+                       clusters.calldays, clusters.site_id, clusters.version
+                FROM (
+                    SELECT subscriber, rank, calldays,
+                           ST_SetSRID(ST_MakePoint(lon, lat), 4326)::geography AS centroid,
+                           array_agg(site_id ORDER BY member) AS site_id,
+                           array_agg(version ORDER BY member) AS version
+                    FROM hartigan_raw
+                    GROUP BY subscriber, rank, calldays, lon, lat
+                ) clusters
+                LEFT JOIN infrastructure.sites AS sites
+                    ON sites.id = clusters.site_id[1] AND sites.version = clusters.version[1]
+            )
+            """
+        ]
+        for ix in self.index_cols:
+            queries.append(
+                "CREATE INDEX ON {tbl} ({ixen})".format(
+                    tbl=full_name, ixen=",".join(ix) if isinstance(ix, list) else ix
+                )
+            )
+        return queries
+
+    def to_sql(
+        self,
+        name: str,
+        schema: Union[str, None] = None,
+        store_dependencies: bool = False,
+    ) -> Future:
+        """
+        Store the result of the calculation back into the database.
+
+        Overridden to compute the clusters outside the database when using
+        the "numpy" engine.
+
+        Parameters
+        ----------
+        name : str
+            name of the table
+        schema : str, default None
+            Name of an existing schema. If none will use the postgres default,
+            see postgres docs for more info.
+        store_dependencies : bool, default False
+            If True, store the dependencies of this query.
+
+        Returns
+        -------
+        Future
+            Future object, containing this query and any result information.
+        """
+        if self.engine != "numpy":
+            return super().to_sql(
+                name, schema=schema, store_dependencies=store_dependencies
+            )
+
+        def write_clusters(query_ddl_ops: List[str], connection: Engine) -> float:
+            if not query_ddl_ops:
+                return 0
+            start = time.time()
+            with connection.begin() as conn:
+                dbapi_connection = conn.connection
+                dbapi_connection.cursor().execute(
+                    """
+                    CREATE TEMPORARY TABLE hartigan_raw (
+                        subscriber TEXT, rank INTEGER, lon DOUBLE PRECISION,
+                        lat DOUBLE PRECISION, calldays INTEGER, site_id TEXT,
+                        version INTEGER, member INTEGER
+                    ) ON COMMIT DROP
+                    """
+                )
+                with dbapi_connection.cursor(name="hartigan_call_days") as cursor:
+                    for chunk in self._iter_call_day_chunks(cursor):
+                        clusters = hartigan_assign(
+                            chunk, self.radius, self.call_threshold
+                        )
+                        copy_dataframe(
+                            dbapi_connection.cursor(), clusters, "hartigan_raw"
+                        )
+                for ddl_op in query_ddl_ops:
+                    conn.execute(ddl_op)
+            logger.debug("Wrote Hartigan clusters.")
+            return (time.time() - start) * 1000
+
+        if store_dependencies:
+            store_queries_in_order(unstored_dependencies_graph(self))
+
+        current_state, changed_to_queue = QueryStateMachine(
+            get_redis(), self.query_id, get_db().conn_id
+        ).enqueue()
+        logger.debug(
+            f"Attempted to enqueue query '{self.query_id}', query state is now {current_state} and change happened {'here and now' if changed_to_queue else 'elsewhere'}."
+        )
+        return submit_to_executor(
+            write_query_to_cache,
+            name=name,
+            schema=schema,
+            query=self,
+            connection=get_db(),
+            redis=get_redis(),
+            ddl_ops_func=self._make_clusters_sql,
+            write_func=write_clusters,
+        )
+
     @property
     def column_names(self) -> List[str]:
         return ["subscriber", "cluster", "rank", "calldays", "site_id", "version"]
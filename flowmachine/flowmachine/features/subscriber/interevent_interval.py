@@ -11,6 +11,7 @@ duration between calls.
 from typing import Union, Tuple, List, Optional
 
 from flowmachine.core import Query
+from flowmachine.core.mixins import MultiStatisticMixin
 from flowmachine.features.utilities import EventsTablesUnion
 from flowmachine.features.subscriber.metaclasses import SubscriberFeature
 from flowmachine.features.utilities.direction_enum import Direction
@@ -19,7 +20,7 @@ from flowmachine.utils import make_where, standardise_date
 valid_stats = {"count", "sum", "avg", "max", "min", "median", "stddev", "variance"}
 
 
-class IntereventInterval(SubscriberFeature):
+class IntereventInterval(MultiStatisticMixin, SubscriberFeature):
     """
     This class calculates intervent period statistics such as the average and
     standard deviation of the duration between calls and returns them as time
@@ -46,8 +47,10 @@ class IntereventInterval(SubscriberFeature):
         Can be a string of a single table (with the schema)
         or a list of these. The keyword all is to select all
         subscriber tables
-    statistic :  {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'}, default 'avg'
+    statistic : {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'} or list, default 'avg'
         Defaults to sum, aggregation statistic over the durations.
+        If a list of statistics, they are calculated together and returned
+        in a 'value_<statistic>' column for each statistic.
 
     Examples
     --------
@@ -97,13 +100,7 @@ class IntereventInterval(SubscriberFeature):
             *self.direction.required_columns,
         ]
 
-        self.statistic = statistic.lower()
-        if self.statistic not in valid_stats:
-            raise ValueError(
-                "{} is not a valid statistic. Use one of {}".format(
-                    self.statistic, valid_stats
-                )
-            )
+        self._set_statistic(statistic, valid_stats)
 
         self.unioned_query = EventsTablesUnion(
             self.start,
@@ -118,24 +115,26 @@ class IntereventInterval(SubscriberFeature):
 
     @property
     def column_names(self):
-        return ["subscriber", "value"]
+        return ["subscriber", *self._statistic_column_names]
 
     def _make_query(self):
+        source = self._get_stored_statistics_source()
+        if source is not None:
+            return self._make_statistics_projection_query(source)
 
         where_clause = make_where(self.direction.get_filter_clause())
 
-        # Postgres does not support the following three operations with intervals
-        if self.statistic in {"median", "stddev", "variance"}:
-            statistic_clause = (
-                f"MAKE_INTERVAL(secs => {self.statistic}(EXTRACT(EPOCH FROM delta)))"
-            )
-        else:
-            statistic_clause = f"{self.statistic}(delta)"
+        def make_aggregate(statistic):
+            # Postgres does not support the following three operations with intervals
+            if statistic in {"median", "stddev", "variance"}:
+                return f"MAKE_INTERVAL(secs => {statistic}(EXTRACT(EPOCH FROM delta)))"
+            else:
+                return f"{statistic}(delta)"
 
         sql = f"""
         SELECT
             subscriber,
-            {statistic_clause} AS value
+            {self._make_statistic_columns(make_aggregate)}
         FROM (
             SELECT subscriber, datetime - LAG(datetime, 1, NULL) OVER (PARTITION BY subscriber ORDER BY datetime) AS delta
             FROM ({self.unioned_query.get_query()}) AS U
@@ -46,8 +46,10 @@ class IntereventPeriod(SubscriberFeature):
         Can be a string of a single table (with the schema)
         or a list of these. The keyword all is to select all
         subscriber tables
-    statistic :  {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'}, default 'avg'
+    statistic : {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'} or list, default 'avg'
         Defaults to sum, aggregation statistic over the durations.
+        If a list of statistics, they are calculated together and returned
+        in a 'value_<statistic>' column for each statistic.
 
     Examples
     --------
@@ -104,14 +106,19 @@ class IntereventPeriod(SubscriberFeature):
 
     @property
     def column_names(self):
-        return ["subscriber", "value"]
+        return ["subscriber", *self.event_interval._statistic_column_names]
 
     def _make_query(self):
 
+        value_columns = ", ".join(
+            f"FLOOR(EXTRACT(epoch FROM {column})/{self.time_divisor}) AS {column}"
+            for column in self.event_interval._statistic_column_names
+        )
+
         sql = f"""
         SELECT
             subscriber,
-            FLOOR(EXTRACT(epoch FROM value)/{self.time_divisor}) AS value
+            {value_columns}
         FROM ({self.event_interval.get_query()}) AS U
         """
 
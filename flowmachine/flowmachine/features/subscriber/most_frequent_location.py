@@ -112,7 +112,7 @@ class MostFrequentLocation(BaseLocation, Query):
         Default query method implemented in the
         metaclass Query().
         """
-        subscriber_query = "{} ORDER BY time".format(self.subscriber_locs.get_query())
+        subscriber_query = self.subscriber_locs.get_query()
 
         relevant_columns = ", ".join(self.spatial_unit.location_id_columns)
 
@@ -5,12 +5,13 @@
 # -*- coding: utf-8 -*-
 
 from ..utilities.sets import EventsTablesUnion
+from ...core.mixins import MultiStatisticMixin
 from .metaclasses import SubscriberFeature
 
 valid_stats = {"count", "sum", "avg", "max", "min", "median", "stddev", "variance"}
 
 
-class PerContactEventStats(SubscriberFeature):
+class PerContactEventStats(MultiStatisticMixin, SubscriberFeature):
     """
     This class returns the statistics of event count per contact per
     subscriber within the period, optionally limited to only incoming or
@@ -22,8 +23,10 @@ class PerContactEventStats(SubscriberFeature):
     contact_balance: flowmachine.features.ContactBalance
         An instance of `ContactBalance` which lists the contacts of the
         targeted subscribers along with the number of events between them.
-    statistic : {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'}, default 'avg'
+    statistic : {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'} or list, default 'avg'
         Defaults to avg, aggregation statistic over the durations.
+        If a list of statistics, they are calculated together and returned
+        in a 'value_<statistic>' column for each statistic.
 
     Examples
     --------
@@ -42,23 +45,19 @@ class PerContactEventStats(SubscriberFeature):
 
     def __init__(self, contact_balance, statistic="avg"):
         self.contact_balance = contact_balance
-        self.statistic = statistic
-
-        if self.statistic not in valid_stats:
-            raise ValueError(
-                "{} is not a valid statistic. Use one of {}".format(
-                    self.statistic, valid_stats
-                )
-            )
+        self._set_statistic(statistic, valid_stats)
 
     @property
     def column_names(self):
-        return ["subscriber", "value"]
+        return ["subscriber", *self._statistic_column_names]
 
     def _make_query(self):
+        source = self._get_stored_statistics_source()
+        if source is not None:
+            return self._make_statistics_projection_query(source)
 
         return f"""
-        SELECT subscriber, {self.statistic}(events) AS value
+        SELECT subscriber, {self._make_statistic_columns(lambda stat: f"{stat}(events)")}
         FROM ({self.contact_balance.get_query()}) C
         GROUP BY subscriber
         """
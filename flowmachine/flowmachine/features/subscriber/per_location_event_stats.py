@@ -8,6 +8,7 @@ from typing import Union
 from flowmachine.core import location_joined_query
 from flowmachine.core.spatial_unit import AnySpatialUnit, make_spatial_unit
 from flowmachine.features.utilities.events_tables_union import EventsTablesUnion
+from flowmachine.core.mixins import MultiStatisticMixin
 from flowmachine.features.subscriber.metaclasses import SubscriberFeature
 from flowmachine.features.utilities.direction_enum import Direction
 from flowmachine.utils import make_where, standardise_date
@@ -15,7 +16,7 @@ from flowmachine.utils import make_where, standardise_date
 valid_stats = {"count", "sum", "avg", "max", "min", "median", "stddev", "variance"}
 
 
-class PerLocationEventStats(SubscriberFeature):
+class PerLocationEventStats(MultiStatisticMixin, SubscriberFeature):
     """
     This class returns the statistics of event count per location per
     subscriber within the period, optionally limited to only incoming or
@@ -26,8 +27,10 @@ class PerLocationEventStats(SubscriberFeature):
     ----------
     start, stop : str
          iso-format start and stop datetimes
-    statistic : {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'}, default 'avg'
+    statistic : {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'} or list, default 'avg'
         Defaults to avg, aggregation statistic over the durations.
+        If a list of statistics, they are calculated together and returned
+        in a 'value_<statistic>' column for each statistic.
     hours : 2-tuple of floats, default 'all'
         Restrict the analysis to only a certain set
         of hours within each day.
@@ -83,14 +86,7 @@ class PerLocationEventStats(SubscriberFeature):
         self.tables = tables
         self.subscriber_identifier = subscriber_identifier
         self.direction = Direction(direction)
-        self.statistic = statistic
-
-        if self.statistic not in valid_stats:
-            raise ValueError(
-                "{} is not a valid statistic. Use one of {}".format(
-                    self.statistic, valid_stats
-                )
-            )
+        self._set_statistic(statistic, valid_stats)
 
         column_list = [
             self.subscriber_identifier,
@@ -117,15 +113,19 @@ class PerLocationEventStats(SubscriberFeature):
 
     @property
     def column_names(self):
-        return ["subscriber", "value"]
+        return ["subscriber", *self._statistic_column_names]
 
     def _make_query(self):
+        source = self._get_stored_statistics_source()
+        if source is not None:
+            return self._make_statistics_projection_query(source)
+
         loc_cols = ", ".join(self.spatial_unit.location_id_columns)
 
         where_clause = make_where(self.direction.get_filter_clause())
 
         return f"""
-        SELECT subscriber, {self.statistic}(events) AS value
+        SELECT subscriber, {self._make_statistic_columns(lambda stat: f"{stat}(events)")}
         FROM (
             SELECT subscriber, {loc_cols}, COUNT(*) AS events
             FROM ({self.unioned_query.get_query()}) U
@@ -6,7 +6,8 @@
 """
 Calculates the radius of gyration for subscribers
 within a specified time period. Radius of gyration
-can be calculated in `km` or `m`.
+can be calculated in `km` or `m`, either from geodesic
+distances or in a single pass over the events.
 
 
 """
@@ -56,6 +57,13 @@ class RadiusOfGyration(SubscriberFeature):
         these lines with null cells should still be present, although they contain
         no information on the subscribers location, they still tell us that the subscriber made
         a call at that time.
+    method : {'geodesic', 'unit-vector'}, default 'geodesic'
+        Method used to calculate the radius of gyration. 'geodesic' calculates
+        the distance on the WGS84 spheroid from each of a subscriber's locations
+        to their centroid, which requires holding all of a subscriber's
+        locations at once. 'unit-vector' calculates the radius of gyration
+        in one pass over the events, from the mean and variance of the locations
+        as unit vectors on a sphere (see Notes).
 
     Notes
     -----
@@ -65,6 +73,20 @@ class RadiusOfGyration(SubscriberFeature):
 
     * Use 24 hr format!
 
+    * The 'unit-vector' method treats the Earth as a sphere of radius
+      6371008.8 m, and each location as a unit vector. The mean squared
+      chord distance from the locations to the centroid (the unit vector
+      of the mean longitude and latitude, as in the 'geodesic' method) is
+      the sum of the variances of the vector components, plus the squared
+      distance between the mean vector and the centroid, so only running
+      sums are needed. Postgres accumulates the variances with a
+      numerically stable one-pass algorithm, so small radii are not lost
+      to cancellation. The result differs from the 'geodesic' method only
+      by the difference between chord and arc lengths (an underestimate by
+      at most 0.01% for distances up to 300 km, and 0.1% up to 1000 km),
+      and between the sphere and the WGS84 spheroid (at most 0.56%, and
+      typically under 0.3%).
+
     Examples
     --------
     >>> RoG = RadiusOfGyration('2016-01-01 13:30:30',
@@ -79,6 +101,9 @@ class RadiusOfGyration(SubscriberFeature):
     """
 
     allowed_units = {"km", "m"}
+    allowed_methods = {"geodesic", "unit-vector"}
+    # Mean radius of the earth in metres, used by the unit-vector method
+    earth_radius = 6371008.8
 
     def __init__(
         self,
@@ -90,6 +115,7 @@ class RadiusOfGyration(SubscriberFeature):
         subscriber_identifier="msisdn",
         ignore_nulls=True,
         subscriber_subset=None,
+        method="geodesic",
     ):
 
         self.unit = unit.lower()
@@ -97,6 +123,11 @@ class RadiusOfGyration(SubscriberFeature):
             raise ValueError(
                 f"Unrecognised unit {unit}, use one of {self.allowed_units}"
             )
+        if method not in self.allowed_methods:
+            raise ValueError(
+                f"Unrecognised method {method}, use one of {self.allowed_methods}"
+            )
+        self.method = method
 
         self.start = standardise_date(start)
         self.stop = standardise_date(stop)
@@ -113,6 +144,16 @@ class RadiusOfGyration(SubscriberFeature):
 
         super().__init__()
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        if self.method == "geodesic":
+            # Keep the query ids of geodesic radii of gyration unchanged
+            try:
+                del state["method"]
+            except KeyError:
+                pass
+        return state
+
     @property
     def column_names(self) -> List[str]:
         return ["subscriber", "value"]
@@ -124,6 +165,9 @@ class RadiusOfGyration(SubscriberFeature):
         elif self.unit == "m":
             divisor = 1
 
+        if self.method == "unit-vector":
+            return self._make_unit_vector_query(divisor)
+
         return f"""
             SELECT subscriber,
             SQRT(AVG(ST_DISTANCE(point, ST_point(av_lon, av_lat)::GEOGRAPHY) ^ 2)) / {divisor} as value
@@ -140,3 +184,25 @@ class RadiusOfGyration(SubscriberFeature):
             ) AS dist
             GROUP BY dist.subscriber
         """
+
+    def _make_unit_vector_query(self, divisor):
+        # Sums and variances of the locations as unit vectors can be accumulated
+        # in one pass, without collecting each subscriber's locations
+        return f"""
+            SELECT subscriber,
+            {self.earth_radius} * SQRT(
+                VAR_POP(x) + VAR_POP(y) + VAR_POP(z)
+                + (AVG(x) - COS(RADIANS(AVG(lat))) * COS(RADIANS(AVG(lon)))) ^ 2
+                + (AVG(y) - COS(RADIANS(AVG(lat))) * SIN(RADIANS(AVG(lon)))) ^ 2
+                + (AVG(z) - SIN(RADIANS(AVG(lat)))) ^ 2
+            ) / {divisor} as value
+            FROM (
+                SELECT subscriber_locs.subscriber, lon, lat,
+                       COS(RADIANS(lat)) * COS(RADIANS(lon)) as x,
+                       COS(RADIANS(lat)) * SIN(RADIANS(lon)) as y,
+                       SIN(RADIANS(lat)) as z
+                FROM ({self.ul.get_query()})
+                AS subscriber_locs
+            ) AS vectors
+            GROUP BY vectors.subscriber
+        """
@@ -15,6 +15,7 @@ from typing import List, Optional, Union
 from flowmachine.core import location_joined_query
 from flowmachine.core.spatial_unit import AnySpatialUnit, make_spatial_unit
 from flowmachine.features.utilities.events_tables_union import EventsTablesUnion
+from flowmachine.core.mixins import MultiStatisticMixin
 from flowmachine.features.subscriber.metaclasses import SubscriberFeature
 from flowmachine.features.utilities.direction_enum import Direction
 from flowmachine.utils import make_where, standardise_date
@@ -22,7 +23,7 @@ from flowmachine.utils import make_where, standardise_date
 valid_stats = {"count", "sum", "avg", "max", "min", "median", "stddev", "variance"}
 
 
-class SubscriberCallDurations(SubscriberFeature):
+class SubscriberCallDurations(MultiStatisticMixin, SubscriberFeature):
     """
     This class returns the total amount of time a subscriber spent calling
     within the period, optionally limited to only calls they made, or received.
@@ -42,8 +43,10 @@ class SubscriberCallDurations(SubscriberFeature):
         subscriber_identifier (typically, msisdn), to limit results to.
     direction : {'in', 'out', 'both'} or Direction, default Direction.OUT
         Whether to consider calls made, received, or both. Defaults to 'out'.
-    statistic :  {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'}, default 'sum'
+    statistic : {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'} or list, default 'sum'
         Defaults to sum, aggregation statistic over the durations.
+        If a list of statistics, they are calculated together and returned
+        in a 'value_<statistic>' column for each statistic.
 
 
     Examples
@@ -78,13 +81,7 @@ class SubscriberCallDurations(SubscriberFeature):
         self.subscriber_identifier = subscriber_identifier
         self.hours = hours
         self.direction = Direction(direction)
-        self.statistic = statistic.lower()
-        if self.statistic not in valid_stats:
-            raise ValueError(
-                "{} is not a valid statistic. Use one of {}".format(
-                    self.statistic, valid_stats
-                )
-            )
+        self._set_statistic(statistic, valid_stats)
 
         column_list = [
             self.subscriber_identifier,
@@ -104,20 +101,24 @@ class SubscriberCallDurations(SubscriberFeature):
 
     @property
     def column_names(self) -> List[str]:
-        return ["subscriber", "value"]
+        return ["subscriber", *self._statistic_column_names]
 
     def _make_query(self):
+        source = self._get_stored_statistics_source()
+        if source is not None:
+            return self._make_statistics_projection_query(source)
+
         where_clause = make_where(self.direction.get_filter_clause())
 
         return f"""
-        SELECT subscriber, {self.statistic}(duration) as value FROM 
+        SELECT subscriber, {self._make_statistic_columns(lambda stat: f"{stat}(duration)")} FROM 
         ({self.unioned_query.get_query()}) u
         {where_clause}
         GROUP BY subscriber
         """
 
 
-class PerLocationSubscriberCallDurations(SubscriberFeature):
+class PerLocationSubscriberCallDurations(MultiStatisticMixin, SubscriberFeature):
     """
     This class returns the total amount of time a subscriber spent calling
     within the period, optionally limited to only calls they made, or received,
@@ -141,8 +142,10 @@ class PerLocationSubscriberCallDurations(SubscriberFeature):
     spatial_unit : flowmachine.core.spatial_unit.*SpatialUnit, default admin3
         Spatial unit to which subscriber locations will be mapped. See the
         docstring of make_spatial_unit for more information.
-    statistic : {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'}, default 'sum'
+    statistic : {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'} or list, default 'sum'
         Defaults to sum, aggregation statistic over the durations.
+        If a list of statistics, they are calculated together and returned
+        in a 'value_<statistic>' column for each statistic.
 
 
     Examples
@@ -179,13 +182,7 @@ class PerLocationSubscriberCallDurations(SubscriberFeature):
             self.spatial_unit = make_spatial_unit("admin", level=3)
         else:
             self.spatial_unit = spatial_unit
-        self.statistic = statistic.lower()
-        if self.statistic not in valid_stats:
-            raise ValueError(
-                "{} is not a valid statistic. Use one of {}".format(
-                    self.statistic, valid_stats
-                )
-            )
+        self._set_statistic(statistic, valid_stats)
 
         column_list = [
             self.subscriber_identifier,
@@ -212,21 +209,29 @@ class PerLocationSubscriberCallDurations(SubscriberFeature):
 
     @property
     def column_names(self) -> List[str]:
-        return ["subscriber"] + self.spatial_unit.location_id_columns + ["value"]
+        return (
+            ["subscriber"]
+            + self.spatial_unit.location_id_columns
+            + self._statistic_column_names
+        )
 
     def _make_query(self):
+        source = self._get_stored_statistics_source()
+        if source is not None:
+            return self._make_statistics_projection_query(source)
+
         loc_cols = ", ".join(self.spatial_unit.location_id_columns)
         where_clause = make_where(self.direction.get_filter_clause())
 
         return f"""
-        SELECT subscriber, {loc_cols}, {self.statistic}(duration) as value 
+        SELECT subscriber, {loc_cols}, {self._make_statistic_columns(lambda stat: f"{stat}(duration)")}
         FROM ({self.unioned_query.get_query()}) u
         {where_clause}
         GROUP BY subscriber, {loc_cols}
         """
 
 
-class PairedSubscriberCallDurations(SubscriberFeature):
+class PairedSubscriberCallDurations(MultiStatisticMixin, SubscriberFeature):
     """
     This class returns the total amount of time a subscriber spent calling
     each other subscriber within the period.
@@ -244,8 +249,10 @@ class PairedSubscriberCallDurations(SubscriberFeature):
         If provided, string or list of string which are msisdn or imeis to limit
         results to; or, a query or table which has a column with a name matching
         subscriber_identifier (typically, msisdn), to limit results to.
-    statistic : {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'}, default 'sum'
+    statistic : {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'} or list, default 'sum'
         Defaults to sum, aggregation statistic over the durations.
+        If a list of statistics, they are calculated together and returned
+        in a 'value_<statistic>' column for each statistic.
 
 
     Examples
@@ -277,13 +284,7 @@ class PairedSubscriberCallDurations(SubscriberFeature):
         self.stop = standardise_date(stop)
         self.subscriber_identifier = subscriber_identifier
 
-        self.statistic = statistic.lower()
-        if self.statistic not in valid_stats:
-            raise ValueError(
-                "{} is not a valid statistic. Use one of {}".format(
-                    self.statistic, valid_stats
-                )
-            )
+        self._set_statistic(statistic, valid_stats)
 
         column_list = [
             self.subscriber_identifier,
@@ -305,18 +306,22 @@ class PairedSubscriberCallDurations(SubscriberFeature):
 
     @property
     def column_names(self) -> List[str]:
-        return ["subscriber", "msisdn_counterpart", "value"]
+        return ["subscriber", "msisdn_counterpart", *self._statistic_column_names]
 
     def _make_query(self):
+        source = self._get_stored_statistics_source()
+        if source is not None:
+            return self._make_statistics_projection_query(source)
+
         return f"""
-        SELECT subscriber, msisdn_counterpart, {self.statistic}(duration) as value 
+        SELECT subscriber, msisdn_counterpart, {self._make_statistic_columns(lambda stat: f"{stat}(duration)")}
         FROM ({self.unioned_query.get_query()}) u
         WHERE outgoing
         GROUP BY subscriber, msisdn_counterpart
         """
 
 
-class PairedPerLocationSubscriberCallDurations(SubscriberFeature):
+class PairedPerLocationSubscriberCallDurations(MultiStatisticMixin, SubscriberFeature):
     """
     This class returns the total amount of time a subscriber spent calling
     each other subscriber within the period, faceted by their respective
@@ -338,8 +343,10 @@ class PairedPerLocationSubscriberCallDurations(SubscriberFeature):
     spatial_unit : flowmachine.core.spatial_unit.*SpatialUnit, default admin3
         Spatial unit to which subscriber locations will be mapped. See the
         docstring of make_spatial_unit for more information.
-    statistic : {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'}, default 'sum'
+    statistic : {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'} or list, default 'sum'
         Defaults to 'sum', aggregation statistic over the durations.
+        If a list of statistics, they are calculated together and returned
+        in a 'value_<statistic>' column for each statistic.
 
 
     Examples
@@ -381,13 +388,7 @@ class PairedPerLocationSubscriberCallDurations(SubscriberFeature):
             self.spatial_unit = make_spatial_unit("admin", level=3)
         else:
             self.spatial_unit = spatial_unit
-        self.statistic = statistic.lower()
-        if self.statistic not in valid_stats:
-            raise ValueError(
-                "{} is not a valid statistic. Use one of {}".format(
-                    self.statistic, valid_stats
-                )
-            )
+        self._set_statistic(statistic, valid_stats)
 
         column_list = [
             "id",
@@ -428,10 +429,14 @@ class PairedPerLocationSubscriberCallDurations(SubscriberFeature):
             ["subscriber", "msisdn_counterpart"]
             + self.spatial_unit.location_id_columns
             + [f"{x}_counterpart" for x in self.spatial_unit.location_id_columns]
-            + ["value"]
+            + self._statistic_column_names
         )
 
     def _make_query(self):
+        source = self._get_stored_statistics_source()
+        if source is not None:
+            return self._make_statistics_projection_query(source)
+
         loc_cols = self.spatial_unit.location_id_columns
         loc_cols += [
             "{}_counterpart".format(c) for c in self.spatial_unit.location_id_columns
@@ -439,7 +444,7 @@ class PairedPerLocationSubscriberCallDurations(SubscriberFeature):
         loc_cols = ", ".join(loc_cols)
 
         return f"""
-        SELECT subscriber, msisdn_counterpart, {loc_cols}, {self.statistic}(duration) as value
+        SELECT subscriber, msisdn_counterpart, {loc_cols}, {self._make_statistic_columns(lambda stat: f"{stat}(duration)")}
          FROM ({self.joined.get_query()}) u
         GROUP BY subscriber, msisdn_counterpart, {loc_cols}
         """
@@ -10,13 +10,14 @@ Class for calculating top-up recharge amount statistics.
 import warnings
 
 from ..utilities.sets import EventsTablesUnion
+from ...core.mixins import MultiStatisticMixin
 from .metaclasses import SubscriberFeature
 from flowmachine.utils import standardise_date
 
 valid_stats = {"count", "sum", "avg", "max", "min", "median", "stddev", "variance"}
 
 
-class TopUpAmount(SubscriberFeature):
+class TopUpAmount(MultiStatisticMixin, SubscriberFeature):
     """
     This class calculates statistics associated with top-up recharge amounts.
 
@@ -24,8 +25,10 @@ class TopUpAmount(SubscriberFeature):
     ----------
     start, stop : str
          iso-format start and stop datetimes
-    statistic : {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'}, default 'avg'
+    statistic : {'count', 'sum', 'avg', 'max', 'min', 'median', 'mode', 'stddev', 'variance'} or list, default 'avg'
         Defaults to sum, aggregation statistic over the durations.
+        If a list of statistics, they are calculated together and returned
+        in a 'value_<statistic>' column for each statistic.
     hours : 2-tuple of floats, default 'all'
         Restrict the analysis to only a certain set
         of hours within each day.
@@ -65,16 +68,9 @@ class TopUpAmount(SubscriberFeature):
         self.stop = standardise_date(stop)
         self.subscriber_identifier = subscriber_identifier
         self.hours = hours
-        self.statistic = statistic.lower()
+        self._set_statistic(statistic, valid_stats)
         self.tables = "events.topups"
 
-        if self.statistic not in valid_stats:
-            raise ValueError(
-                "{} is not a valid statistic. Use one of {}".format(
-                    self.statistic, valid_stats
-                )
-            )
-
         column_list = [self.subscriber_identifier, "recharge_amount"]
 
         self.unioned_query = EventsTablesUnion(
@@ -91,12 +87,15 @@ class TopUpAmount(SubscriberFeature):
 
     @property
     def column_names(self):
-        return ["subscriber", f"value"]
+        return ["subscriber", *self._statistic_column_names]
 
     def _make_query(self):
+        source = self._get_stored_statistics_source()
+        if source is not None:
+            return self._make_statistics_projection_query(source)
 
         return f"""
-        SELECT subscriber, {self.statistic}(recharge_amount) AS value
+        SELECT subscriber, {self._make_statistic_columns(lambda stat: f"{stat}(recharge_amount)")}
         FROM ({self.unioned_query.get_query()}) U
         GROUP BY subscriber
         """
@@ -60,3 +60,52 @@ class UniqueLocations(SubscriberFeature):
         """
 
         return sql
+
+
+class DailyUniqueLocations(SubscriberFeature):
+    """
+    The unique locations a subscriber has visited on each day.
+
+    Unlike `UniqueLocations`, this keeps the date on which each location
+    was visited, so a `DailyUniqueLocations` at cell level can be mapped to
+    any other spatial unit using the versions of the cells on each date.
+
+    Parameters
+    ----------
+    subscriber_locations : SubscriberLocations
+        A subscriber locations object
+
+    Examples
+    --------
+    >>> DailyUniqueLocations(subscriber_locations=SubscriberLocations("2016-01-01", "2016-01-03")).head()
+             subscriber location_id        date
+    0  038OVABN11Ak4W5P      0RIMKL  2016-01-01
+    1  038OVABN11Ak4W5P      dJb0Wd  2016-01-02
+    2  09NrjaNNvDanD8pk      0RIMKL  2016-01-01
+    """
+
+    def __init__(
+        self, subscriber_locations: SubscriberLocations,
+    ):
+
+        self.spatial_unit = subscriber_locations.spatial_unit
+        self.subscriber_locations = subscriber_locations
+        super().__init__()
+
+    @property
+    def column_names(self) -> List[str]:
+        return ["subscriber", *self.spatial_unit.location_id_columns, "date"]
+
+    def _make_query(self):
+        location_columns = ",".join(self.spatial_unit.location_id_columns)
+
+        sql = f"""
+        SELECT 
+            subscriber,
+            {location_columns},
+            time::date AS date
+        FROM
+            ({self.subscriber_locations.get_query()}) _ GROUP BY subscriber, {location_columns}, time::date
+        """
+
+        return sql
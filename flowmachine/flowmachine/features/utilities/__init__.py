@@ -7,7 +7,9 @@ Utilities for working with features.
 """
 from .group_values import GroupValues
 from .subscriber_locations import SubscriberLocations
+from .subscriber_timeline import SubscriberTimeline
 from .feature_collection import feature_collection
+from .feature_matrix import FeatureMatrix
 
 
 from .sets import UniqueSubscribers, SubscriberLocationSubset
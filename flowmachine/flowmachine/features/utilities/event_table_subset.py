@@ -4,10 +4,11 @@
 
 
 import datetime
-import pandas as pd
+import re
 import warnings
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import select, union_all, Column, MetaData
+from sqlalchemy import Table as SqlAlchemyTable
+from typing import List, Optional
 
 from ...core import Query, Table
 from ...core.context import get_db
@@ -62,6 +63,11 @@ class EventTableSubset(Query):
 
     * Use 24 hr format!
 
+    * Where the events table has one child table per day (as attached by
+      FlowETL), only the child tables for the ingested dates which overlap
+      the requested period are scanned, rather than leaving the planner
+      to exclude the rest using their check constraints.
+
     Examples
     --------
     >>> sd = EventTableSubset(start='2016-01-01 13:30:30', stop='2016-01-02 16:25:00')
@@ -214,26 +220,112 @@ class EventTableSubset(Query):
                 stacklevel=2,
             )
 
+    def _get_daily_tables(self) -> Optional[List[str]]:
+        """
+        Get the names of the daily child tables of the events table which
+        overlap this subset.
+
+        Returns
+        -------
+        list of str or None
+            Child table names, or None if the events table isn't split into
+            daily child tables (or some of the ingested dates aren't in one),
+            in which case the parent table should be queried.
+
+        Notes
+        -----
+        Tables are chosen by the date in their name, so days which are in a
+        child table but have no ingested ETL record (e.g. tables loaded
+        outside FlowETL) are included.
+        """
+        if self.start is None or self.stop is None:
+            return None
+        parent = self.table_ORIG.fully_qualified_table_name
+        child_tables = get_db().child_tables[parent]
+        daily_table = re.compile(rf"^{re.escape(parent)}_(\d{{8}})$")
+        matches = [daily_table.match(t) for t in child_tables]
+        if not child_tables or not all(matches):
+            return None
+        # Allow a day either side, in case the tables' dates are in a different time zone
+        first_date = datetime.date.fromisoformat(self.start[:10]) - datetime.timedelta(
+            days=1
+        )
+        last_date = datetime.date.fromisoformat(self.stop[:10]) + datetime.timedelta(
+            days=1
+        )
+        table_dates = {
+            datetime.datetime.strptime(match.group(1), "%Y%m%d").date(): match.group(0)
+            for match in matches
+        }
+        # An ingested date without a child table means the list of child tables
+        # is out of date, so fall back to the parent table
+        if any(
+            first_date <= d <= last_date and d not in table_dates
+            for d in get_db().available_dates[self.table_ORIG.name]
+        ):
+            return None
+        return [
+            table
+            for d, table in sorted(table_dates.items())
+            if first_date <= d <= last_date
+        ]
+
+    def _get_source_table(self):
+        """
+        Get the sqlalchemy table to select events from. This is either the
+        events table itself or, if possible, the union of its daily child
+        tables for the requested period and any rows held in the parent
+        table directly.
+        """
+        daily_tables = self._get_daily_tables()
+        if daily_tables is None:
+            return self.sqlalchemy_table
+
+        needed_columns = {c.split()[0] for c in self.columns} | {
+            "datetime",
+            self.subscriber_identifier,
+        }
+        columns = [c for c in self.sqlalchemy_table.columns if c.name in needed_columns]
+
+        def select_from(table):
+            return select([table.c[c.name] for c in columns]).where(
+                (table.c.datetime >= self.start) & (table.c.datetime < self.stop)
+            )
+
+        metadata = MetaData()
+        selects = [
+            select_from(self.sqlalchemy_table).with_hint(
+                self.sqlalchemy_table, "ONLY", "postgresql"
+            )
+        ]
+        for daily_table in daily_tables:
+            schema, name = daily_table.split(".")
+            table = SqlAlchemyTable(
+                name,
+                metadata,
+                *[Column(c.name, c.type) for c in columns],
+                schema=schema,
+            )
+            selects.append(select_from(table))
+        return union_all(*selects).alias(self.sqlalchemy_table.name)
+
     def _make_query_with_sqlalchemy(self):
+        source_table = self._get_source_table()
         sqlalchemy_columns = [
             make_sqlalchemy_column_from_flowmachine_column_description(
-                self.sqlalchemy_table, column_str
+                source_table, column_str
             )
             for column_str in self.columns
         ]
         select_stmt = select(sqlalchemy_columns)
 
         if self.start is not None:
-            select_stmt = select_stmt.where(
-                self.sqlalchemy_table.c.datetime >= self.start
-            )
+            select_stmt = select_stmt.where(source_table.c.datetime >= self.start)
         if self.stop is not None:
-            select_stmt = select_stmt.where(
-                self.sqlalchemy_table.c.datetime < self.stop
-            )
+            select_stmt = select_stmt.where(source_table.c.datetime < self.stop)
 
         select_stmt = select_stmt.where(
-            self.hour_slices.get_subsetting_condition(self.sqlalchemy_table.c.datetime)
+            self.hour_slices.get_subsetting_condition(source_table.c.datetime)
         )
         select_stmt = self.subscriber_subsetter.apply_subset_if_needed(
             select_stmt, subscriber_identifier=self.subscriber_identifier
@@ -6,10 +6,10 @@
 Class definition for feature_collection, this is a group of
 joined features.
 """
-from flowmachine.core.join import Join
+from .feature_matrix import FeatureMatrix
 
 
-def feature_collection(metrics, dropna=True) -> Join:
+def feature_collection(metrics, dropna=True) -> FeatureMatrix:
     """
     Joined set of features. Takes a set of features and creates
     one wide dataset about these features. Most often used to gather
@@ -75,8 +75,8 @@ def feature_collection(metrics, dropna=True) -> Join:
 
     Returns
     -------
-    Join
-        A Join object combining all the features
+    FeatureMatrix
+        A FeatureMatrix combining all the features
 
     Notes
     -----
@@ -85,14 +85,21 @@ def feature_collection(metrics, dropna=True) -> Join:
     names must be unique, and it is possible to use the same metric 
     multiple times but with different parameters.
 
+    The features are combined in a single multi-way join. To export a large
+    collection, store it with `store_dependencies=True` so that each feature
+    is stored once, and write it out in chunks with `to_parquet`.
+
+    See Also
+    --------
+    FeatureMatrix
     """
 
-    return _join_queries(metrics, dropna)
+    return FeatureMatrix(metrics, dropna=dropna)
 
 
 def feature_collection_from_list_of_classes(
     classes, *args, dropna=False, **kwargs
-) -> Join:
+) -> FeatureMatrix:
     """
     Create a feature collection from uninstantiated classes with common arguments.
 
@@ -102,40 +109,9 @@ def feature_collection_from_list_of_classes(
 
     Returns
     -------
-    Join
-        A Join object combining all the features
+    FeatureMatrix
+        A FeatureMatrix combining all the features
     """
 
     metrics = [c(*args, **kwargs) for c in classes]
     return feature_collection(metrics, dropna=dropna)
-
-
-# Private function that joins multiple queries together
-# and returns a joined query.
-def _join_queries(queries, dropna):
-
-    # We want to handle the first case as a special case, as we
-    # need to give the left object a name on the first join, but
-    # not in any subsequent joins.
-    col = queries[0].column_names[0]
-    left_append = "_" + queries[0].__class__.__name__.lower() + "_0"
-    right_append = "_" + queries[1].__class__.__name__.lower() + "_1"
-    how = "inner" if dropna else "full outer"
-    running_join = queries[0].join(
-        queries[1],
-        on_left=col,
-        left_append=left_append,
-        right_append=right_append,
-        how=how,
-    )
-
-    for i, q in enumerate(queries[2:]):
-        col = q.column_names[0]
-        append = "_" + q.__class__.__name__.lower() + "_{}".format(i + 2)
-        running_join = running_join.join(q, on_left=col, right_append=append, how=how)
-        # Trigger memoization
-        _ = q.query_id
-        _ = running_join.query_id
-        _ = running_join.column_names
-
-    return running_join
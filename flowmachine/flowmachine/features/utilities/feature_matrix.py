@@ -0,0 +1,207 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+A wide table of per-subscriber features, assembled with a single multi-way
+join, which can be exported to Parquet in chunks.
+"""
+from typing import List, Union
+
+from flowmachine.core.query import Query
+
+import structlog
+
+logger = structlog.get_logger("flowmachine.debug", submodule=__name__)
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    logger.debug("PyArrow not found. `to_parquet` unavailable.")
+
+# Arrow types for the postgres types (by type oid) features usually have.
+# Numeric values are written as floating point, and values of any other
+# type as strings.
+_ARROW_TYPES = {
+    16: lambda: pyarrow.bool_(),
+    20: lambda: pyarrow.int64(),
+    21: lambda: pyarrow.int16(),
+    23: lambda: pyarrow.int32(),
+    700: lambda: pyarrow.float32(),
+    701: lambda: pyarrow.float64(),
+    1700: lambda: pyarrow.float64(),
+    25: lambda: pyarrow.string(),
+    1042: lambda: pyarrow.string(),
+    1043: lambda: pyarrow.string(),
+    1082: lambda: pyarrow.date32(),
+    1114: lambda: pyarrow.timestamp("us"),
+    1184: lambda: pyarrow.timestamp("us", tz="UTC"),
+    1186: lambda: pyarrow.duration("us"),
+}
+
+
+class FeatureMatrix(Query):
+    """
+    Wide table of features, with one row per subscriber and the columns of
+    every feature.
+
+    The features are joined on their first column (usually 'subscriber') in
+    one flat multi-way join, rather than as a chain of nested pairwise joins,
+    so the database plans all of the joins together and each feature's query
+    appears once. Storing the matrix with `store_dependencies=True` stores
+    each feature first, so the matrix is assembled from the stored feature
+    tables.
+
+    Parameters
+    ----------
+    features : list of Query
+        Features to combine. Each feature's first column is the column to
+        join on, and these must have the same name.
+    dropna : bool, default True
+        If True, only keep subscribers who have a row in every feature.
+        Otherwise keep every subscriber with a row in any feature, with
+        nulls for the features they are missing from.
+
+    Notes
+    -----
+    Each column other than the join column has the name of the class of its
+    feature, and the feature's position in `features`, appended to it.
+    This is because the column names must be unique, and it is possible to
+    use the same feature more than once with different parameters.
+
+    Examples
+    --------
+    >>> start, stop = '2016-01-01', '2016-01-03'
+    >>> fm = FeatureMatrix([RadiusOfGyration(start, stop), SubscriberDegree(start, stop)])
+    >>> fm.column_names
+    ['subscriber', 'value_radiusofgyration_0', 'value_subscriberdegree_1']
+    >>> fm.store(store_dependencies=True).result()
+    >>> fm.to_parquet("features.parquet")
+    """
+
+    def __init__(self, features: List[Query], dropna: bool = True):
+        self.features = list(features)
+        if len(self.features) == 0:
+            raise ValueError("At least one feature is required.")
+        self.join_column = self.features[0].column_names[0]
+        for feature in self.features[1:]:
+            if feature.column_names[0] != self.join_column:
+                raise ValueError(
+                    f"The first column of every feature must be '{self.join_column}', but {feature.__class__.__name__} has '{feature.column_names[0]}'."
+                )
+        self.dropna = dropna
+        super().__init__()
+
+    @property
+    def _feature_columns(self) -> List[List[str]]:
+        """
+        The columns of each feature, other than the join column.
+        """
+        return [
+            [col for col in feature.column_names if col != self.join_column]
+            for feature in self.features
+        ]
+
+    @property
+    def column_names(self) -> List[str]:
+        return [self.join_column] + [
+            f"{col}_{feature.__class__.__name__.lower()}_{i}"
+            for i, (feature, columns) in enumerate(
+                zip(self.features, self._feature_columns)
+            )
+            for col in columns
+        ]
+
+    @property
+    def index_cols(self) -> List[Union[str, List[str]]]:
+        return [self.join_column]
+
+    def _make_query(self):
+        join_kind = "INNER JOIN" if self.dropna else "FULL OUTER JOIN"
+        # USING merges the join columns, so later joins match on whichever
+        # of the earlier features a subscriber appeared in
+        from_clause = f"({self.features[0].get_query()}) AS f0" + "".join(
+            f"\n{join_kind} ({feature.get_query()}) AS f{i} USING ({self.join_column})"
+            for i, feature in enumerate(self.features[1:], start=1)
+        )
+        feature_columns = [
+            f"f{i}.{col}"
+            for i, columns in enumerate(self._feature_columns)
+            for col in columns
+        ]
+        columns = ", ".join(
+            [self.join_column]
+            + [
+                f"{col} AS {name}"
+                for col, name in zip(feature_columns, self.column_names[1:])
+            ]
+        )
+        return f"""
+        SELECT {columns}
+        FROM {from_clause}
+        """
+
+    def to_parquet(self, path: str, chunk_size: int = 100000) -> None:
+        """
+        Write the feature matrix to a Parquet file, streaming it from the
+        database in chunks so that the whole matrix is never held in memory.
+        Requires pyarrow.
+
+        Parameters
+        ----------
+        path : str
+            Path of the Parquet file to write
+        chunk_size : int, default 100000
+            Number of rows to fetch at a time. Each chunk is written as a
+            row group.
+
+        Notes
+        -----
+        The column types are taken from the types of the query's columns, so
+        they are the same for every chunk. Numeric columns are written as
+        floating point, and columns of types with no obvious Parquet
+        equivalent as strings.
+        """
+        import pandas as pd
+
+        writer = None
+        try:
+            with self._read_engine().begin() as conn:
+                with conn.connection.cursor(name="feature_matrix") as cursor:
+                    cursor.execute(
+                        f"SELECT {self.column_names_as_string_list} FROM ({self.get_query()}) _"
+                    )
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows and writer is not None:
+                            break
+                        if writer is None:
+                            # The column types are only known once something has been fetched
+                            arrow_types = [
+                                _ARROW_TYPES.get(column.type_code, pyarrow.string)()
+                                for column in cursor.description
+                            ]
+                            schema = pyarrow.schema(
+                                list(zip(self.column_names, arrow_types))
+                            )
+                            writer = pyarrow.parquet.ParquetWriter(path, schema)
+                        chunk = pd.DataFrame(rows, columns=self.column_names)
+                        for column, arrow_type in zip(self.column_names, arrow_types):
+                            if pyarrow.types.is_floating(arrow_type):
+                                chunk[column] = chunk[column].astype(float)
+                            elif pyarrow.types.is_string(arrow_type):
+                                chunk[column] = chunk[column].map(
+                                    lambda value: None if value is None else str(value)
+                                )
+                        writer.write_table(
+                            pyarrow.Table.from_pandas(
+                                chunk, schema=schema, preserve_index=False
+                            )
+                        )
+                        if not rows:
+                            break
+        finally:
+            if writer is not None:
+                writer.close()
+        logger.debug(f"Wrote feature matrix '{self.query_id}' to '{path}'.")
@@ -121,11 +121,60 @@ class SubscriberLocations(Query):
         )
         super().__init__()
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        # Whether the timeline is read from doesn't change the result
+        try:
+            del state["_use_timeline"]
+        except KeyError:
+            pass
+        return state
+
     @property
     def column_names(self) -> List[str]:
         return ["subscriber", "time"] + self.spatial_unit.location_id_columns
 
+    @property
+    def timeline(self) -> "SubscriberTimeline":
+        """
+        The timeline of these subscriber locations, which stores them ordered
+        by subscriber and time. If the timeline is stored when this query is
+        first used, this query (and so any query which uses it) reads from the
+        timeline rather than the events tables.
+
+        Returns
+        -------
+        SubscriberTimeline
+        """
+        from .subscriber_timeline import SubscriberTimeline
+
+        return SubscriberTimeline(self)
+
+    @property
+    def _reads_from_timeline(self) -> bool:
+        # Checked once, so every use of this object reads from the same place
+        try:
+            return self._use_timeline
+        except AttributeError:
+            self._use_timeline = self.timeline.is_stored
+            return self._use_timeline
+
     def _make_query(self):
+        if self._reads_from_timeline:
+            return f"""
+                SELECT {", ".join(self.column_names)}
+                FROM ({self.timeline.get_query()}) AS timeline
+                """
+        return self._make_events_query()
+
+    def _make_events_query(self) -> str:
+        """
+        SQL which selects these subscriber locations from the events tables.
+
+        Returns
+        -------
+        str
+        """
 
         if self.ignore_nulls:
             where_clause = "WHERE location_id IS NOT NULL AND location_id !=''"
@@ -143,9 +192,23 @@ class SubscriberLocations(Query):
                 """
         return sql
 
+    def _get_stored_dependencies(
+        self, exclude_self=False, discovered_dependencies=None
+    ):
+        if discovered_dependencies is None:
+            discovered_dependencies = set()
+        if self._reads_from_timeline:
+            # Read from the timeline rather than the events tables
+            discovered_dependencies.add(self.timeline)
+            return discovered_dependencies.difference([self])
+        return super()._get_stored_dependencies(
+            exclude_self=exclude_self, discovered_dependencies=discovered_dependencies
+        )
+
     @property
     def fully_qualified_table_name(self):
-        # Cost of cache creation for subscriber locations outweighs benefits
+        # Cost of cache creation for subscriber locations outweighs benefits,
+        # but they can be stored ordered by subscriber and time as a SubscriberTimeline
         raise NotImplementedError
 
 
@@ -0,0 +1,82 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+A timeline of subscriber locations, stored ordered by subscriber and time so
+that features which process each subscriber's events in time order can share
+one sort of the events.
+"""
+from typing import List, Union
+
+from flowmachine.core.query import Query
+from .subscriber_locations import SubscriberLocations
+
+
+class SubscriberTimeline(Query):
+    """
+    The locations of subscribers' events, stored in the cache ordered by
+    subscriber and time, and indexed on subscriber and time.
+
+    Storing a timeline is never needed, but once it is stored, the
+    `SubscriberLocations` query it was made from reads from it. Features
+    which process each subscriber's events in time order (such as
+    `LastLocation` and `ConsecutiveTripsODMatrix`) can then read the events
+    in order from the index, so the events for a period are sorted once when
+    the timeline is stored, rather than once by every feature. Query ids of
+    the features are not affected.
+
+    Parameters
+    ----------
+    subscriber_locations : SubscriberLocations
+        Subscriber locations to store the timeline of
+
+    Examples
+    --------
+    >>> subscriber_locs = SubscriberLocations("2016-01-01", "2016-01-08", spatial_unit=make_spatial_unit("admin", level=3))
+    >>> subscriber_locs.timeline.store().result()
+    >>> LastLocation("2016-01-01", "2016-01-08").get_query()  # Reads from the stored timeline
+    """
+
+    def __init__(self, subscriber_locations: SubscriberLocations):
+        self.subscriber_locations = subscriber_locations
+        self.spatial_unit = subscriber_locations.spatial_unit
+        super().__init__()
+
+    @property
+    def column_names(self) -> List[str]:
+        return self.subscriber_locations.column_names
+
+    @property
+    def index_cols(self) -> List[Union[str, List[str]]]:
+        # Window functions partitioned by subscriber can read rows in either time order without sorting
+        return [["subscriber", "time"], ["subscriber", "time DESC"]]
+
+    def _make_query(self):
+        return f"""
+        SELECT {", ".join(self.column_names)}
+        FROM ({self.subscriber_locations._make_events_query()}) AS subscriber_locs
+        ORDER BY subscriber, time
+        """
+
+    def _make_sql(self, name: str, schema: Union[str, None] = None) -> List[str]:
+        queries = super()._make_sql(name, schema=schema)
+        if queries:
+            # Update the statistics so that the planner knows the table is in index order
+            full_name = name if schema is None else f"{schema}.{name}"
+            queries.append(f"ANALYZE {full_name}")
+        return queries
+
+    def _get_stored_dependencies(
+        self, exclude_self=False, discovered_dependencies=None
+    ):
+        if discovered_dependencies is None:
+            discovered_dependencies = set()
+        if not exclude_self and self.is_stored:
+            discovered_dependencies.add(self)
+        else:
+            # The timeline is made from the events, not from itself
+            super(
+                SubscriberLocations, self.subscriber_locations
+            )._get_stored_dependencies(discovered_dependencies=discovered_dependencies)
+        return discovered_dependencies.difference([self])
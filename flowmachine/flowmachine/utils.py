@@ -11,6 +11,7 @@ import datetime
 import re
 from functools import singledispatch
 
+import numpy as np
 from pglast import prettify
 from psycopg2._psycopg import adapt
 from time import sleep
@@ -150,6 +151,93 @@ def get_dist_query_string(*, lon1, lat1, lon2, lat2):
     """
 
 
+def geodesic_distance(lon1, lat1, lon2, lat2, max_iterations: int = 200):
+    """
+    Vectorised geodesic distance in metres between lon-lat points on the
+    WGS84 spheroid, using Vincenty's inverse formula.
+
+    Equivalent to `ST_Distance(a::geography, b::geography)` in PostGIS to
+    well under a millimetre. Inputs are broadcast against each other, and
+    NaN coordinates produce NaN distances.
+
+    Parameters
+    ----------
+    lon1, lat1, lon2, lat2 : float or numpy.ndarray
+        Coordinates in decimal degrees
+    max_iterations : int, default 200
+        Maximum number of iterations to run for points which are slow to
+        converge (i.e. nearly antipodal)
+
+    Returns
+    -------
+    numpy.ndarray
+        Distances in metres
+    """
+    a = 6378137.0
+    f = 1 / 298.257223563
+    b = (1 - f) * a
+
+    lon1, lat1, lon2, lat2 = np.broadcast_arrays(
+        *(np.radians(np.asarray(x, dtype=float)) for x in (lon1, lat1, lon2, lat2))
+    )
+    L = lon2 - lon1
+    U1 = np.arctan((1 - f) * np.tan(lat1))
+    U2 = np.arctan((1 - f) * np.tan(lat2))
+    sin_U1, cos_U1 = np.sin(U1), np.cos(U1)
+    sin_U2, cos_U2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    converged = np.isnan(lam)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for _ in range(max_iterations):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(
+                cos_U2 * sin_lam, cos_U1 * sin_U2 - sin_U1 * cos_U2 * cos_lam
+            )
+            cos_sigma = sin_U1 * sin_U2 + cos_U1 * cos_U2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alpha = np.where(
+                sin_sigma == 0, 0.0, cos_U1 * cos_U2 * sin_lam / sin_sigma
+            )
+            cos_sq_alpha = 1 - sin_alpha ** 2
+            cos_2sigma_m = np.where(
+                cos_sq_alpha == 0, 0.0, cos_sigma - 2 * sin_U1 * sin_U2 / cos_sq_alpha
+            )
+            C = f / 16 * cos_sq_alpha * (4 + f * (4 - 3 * cos_sq_alpha))
+            lam_prev = lam
+            lam = L + (1 - C) * f * sin_alpha * (
+                sigma
+                + C
+                * sin_sigma
+                * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2))
+            )
+            converged = converged | (np.abs(lam - lam_prev) < 1e-12)
+            if converged.all():
+                break
+
+        u_sq = cos_sq_alpha * (a ** 2 - b ** 2) / b ** 2
+        A = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+        B = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+        delta_sigma = (
+            B
+            * sin_sigma
+            * (
+                cos_2sigma_m
+                + B
+                / 4
+                * (
+                    cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+                    - B
+                    / 6
+                    * cos_2sigma_m
+                    * (-3 + 4 * sin_sigma ** 2)
+                    * (-3 + 4 * cos_2sigma_m ** 2)
+                )
+            )
+        )
+    return b * A * (sigma - delta_sigma)
+
+
 def proj4string(conn, crs=None):
     """
     Provide a proj4 string for the input, or by default
@@ -58,7 +58,10 @@ setup(
     version=versioneer.get_version(),
     cmdclass=versioneer.get_cmdclass(),
     entry_points={
-        "console_scripts": ["flowmachine = flowmachine.core.server.server:main"]
+        "console_scripts": [
+            "flowmachine = flowmachine.core.server.server:main",
+            "flowmachine-broker = flowmachine.core.server.broker:main",
+        ]
     },
     description="Digestion program for Call Detail Record (CDR) data.",
     long_description=readme,
@@ -196,6 +196,7 @@ def clean_env(monkeypatch):
     monkeypatch.delenv("FLOWDB_HOST", raising=False)
     monkeypatch.delenv("DB_CONNECTION_POOL_SIZE", raising=False)
     monkeypatch.delenv("DB_CONNECTION_POOL_OVERFLOW", raising=False)
+    monkeypatch.delenv("FLOWDB_REPLICA_HOSTS", raising=False)
     monkeypatch.delenv("REDIS_HOST", raising=False)
     monkeypatch.delenv("REDIS_PORT", raising=False)
     monkeypatch.delenv("REDIS_PASSWORD", raising=False)
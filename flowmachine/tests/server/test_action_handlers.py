@@ -15,6 +15,7 @@ from flowmachine.core.context import (
     redis_connection,
     context,
     get_executor,
+    query_profiling,
 )
 from flowmachine.core.query_info_lookup import QueryInfoLookup
 from flowmachine.core.query_state import QueryState, QueryStateMachine
@@ -22,8 +23,10 @@ from flowmachine.core.query_state import QueryState, QueryStateMachine
 from flowmachine.core.server.action_handlers import (
     action_handler__get_geography,
     action_handler__get_query_params,
+    action_handler__get_query_profile,
     action_handler__get_sql,
     action_handler__run_query,
+    action_handler__run_query_batch,
     get_action_handler,
 )
 from flowmachine.core.server.exceptions import FlowmachineServerError
@@ -143,6 +146,118 @@ async def test_rerun_query_after_cancelled(server_config, real_connections):
     assert query_obj.is_stored
 
 
+@pytest.mark.asyncio
+async def test_run_query_records_requests(server_config, real_connections):
+    """
+    Test that every request to run a query is recorded in the query history when the cache is warmed up.
+    """
+    server_config = server_config._replace(warm_up_frequency=3600)
+    spec = dict(
+        query_kind="spatial_aggregate",
+        locations=dict(
+            query_kind="daily_location",
+            date="2016-01-02",
+            method="last",
+            aggregation_unit="admin3",
+        ),
+    )
+    for _ in range(2):
+        msg = await action_handler__run_query(config=server_config, **spec)
+        assert msg["status"] == ZMQReplyStatus.SUCCESS
+    query_id = msg["payload"]["query_id"]
+    try:
+        ((request_count, query_params),) = get_db().fetch(
+            f"SELECT request_count, query_params FROM cache.query_history WHERE query_id='{query_id}'"
+        )
+        assert request_count == 2
+        assert query_params == spec
+    finally:
+        get_db().engine.execute(
+            f"DELETE FROM cache.query_history WHERE query_id='{query_id}'"
+        )
+
+
+@pytest.mark.asyncio
+async def test_run_query_does_not_record_requests_without_warm_up(
+    server_config, real_connections
+):
+    """
+    Test that requests to run a query aren't recorded in the query history when the cache isn't warmed up.
+    """
+    msg = await action_handler__run_query(
+        config=server_config._replace(warm_up_frequency=-1),
+        query_kind="spatial_aggregate",
+        locations=dict(
+            query_kind="daily_location",
+            date="2016-01-03",
+            method="last",
+            aggregation_unit="admin3",
+        ),
+    )
+    assert msg["status"] == ZMQReplyStatus.SUCCESS
+    query_id = msg["payload"]["query_id"]
+    assert (
+        get_db().fetch(
+            f"SELECT count(*) FROM cache.query_history WHERE query_id='{query_id}'"
+        )[0][0]
+        == 0
+    )
+
+
+@pytest.mark.asyncio
+async def test_run_query_batch(server_config, real_connections):
+    """
+    Test that run_query_batch sets all the queries running, and returns their ids in order.
+    """
+    specs = [
+        dict(
+            query_kind="unique_subscriber_counts",
+            start_date="2016-01-01",
+            end_date="2016-01-02",
+            aggregation_unit="admin3",
+        ),
+        dict(
+            query_kind="location_event_counts",
+            start_date="2016-01-01",
+            end_date="2016-01-02",
+            aggregation_unit="admin3",
+            interval="day",
+            direction="both",
+        ),
+    ]
+    msg = await action_handler__run_query_batch(config=server_config, queries=specs)
+    assert msg["status"] == ZMQReplyStatus.SUCCESS
+    query_ids = [q["query_id"] for q in msg["payload"]["queries"]]
+    query_info_lookup = QueryInfoLookup(get_redis())
+    for spec, query_id in zip(specs, query_ids):
+        assert query_id == FlowmachineQuerySchema().load(spec).query_id
+        assert query_info_lookup.get_query_id(spec) == query_id
+        qsm = QueryStateMachine(get_redis(), query_id, get_db().conn_id)
+        qsm.wait_until_complete()
+        assert qsm.is_completed
+
+
+@pytest.mark.asyncio
+async def test_run_query_batch_validation_error(server_config, real_connections):
+    """
+    Test that run_query_batch returns an error, and runs nothing, if any query spec is invalid.
+    """
+    msg = await action_handler__run_query_batch(
+        config=server_config,
+        queries=[
+            dict(
+                query_kind="unique_subscriber_counts",
+                start_date="2016-01-01",
+                end_date="2016-01-02",
+                aggregation_unit="admin3",
+            ),
+            dict(query_kind="unique_subscriber_counts", aggregation_unit="admin3"),
+        ],
+    )
+    assert msg.status == ZMQReplyStatus.ERROR
+    assert "validation_error_messages" in msg.payload
+
+
 @pytest.mark.asyncio
 async def test_run_query_type_error(monkeypatch, server_config):
     """
@@ -228,3 +343,57 @@ async def test_get_sql_error_states(query_state, dummy_redis, server_config):
     assert msg.status == ZMQReplyStatus.ERROR
     assert msg.payload["query_state"] == query_state
     redis_connection.reset(redis_reset)
+
+
+@pytest.mark.asyncio
+async def test_get_query_profile(server_config, real_connections):
+    """
+    Test that get_query_profile returns the profile of a query run with profiling enabled.
+    """
+    with query_profiling():
+        msg = await action_handler__run_query(
+            config=server_config,
+            query_kind="unique_subscriber_counts",
+            start_date="2016-01-01",
+            end_date="2016-01-02",
+            aggregation_unit="admin3",
+        )
+    query_id = msg["payload"]["query_id"]
+    QueryStateMachine(get_redis(), query_id, get_db().conn_id).wait_until_complete()
+    msg = await action_handler__get_query_profile(
+        config=server_config, query_id=query_id
+    )
+    assert msg.status == ZMQReplyStatus.SUCCESS
+    profile = msg.payload["profile"]
+    assert profile["query_id"] == query_id
+    assert profile["rows"] > 0
+    assert profile["execution_time"] >= profile["plan_execution_time"] > 0
+    assert "Shared Hit Blocks" in profile["plans"][0]["Plan"]
+
+
+@pytest.mark.asyncio
+async def test_get_query_profile_not_profiled(server_config, real_connections):
+    """
+    Test that get_query_profile replies with an error for queries which weren't profiled.
+    """
+    msg = await action_handler__get_query_profile(
+        config=server_config, query_id="DUMMY_QUERY_ID"
+    )
+    assert msg.status == ZMQReplyStatus.ERROR
+    assert msg.payload["query_state"] == "awol"
+    msg = await action_handler__run_query(
+        config=server_config,
+        query_kind="location_event_counts",
+        start_date="2016-01-01",
+        end_date="2016-01-02",
+        aggregation_unit="admin3",
+        interval="day",
+        direction="both",
+    )
+    query_id = msg["payload"]["query_id"]
+    QueryStateMachine(get_redis(), query_id, get_db().conn_id).wait_until_complete()
+    msg = await action_handler__get_query_profile(
+        config=server_config, query_id=query_id
+    )
+    assert msg.status == ZMQReplyStatus.ERROR
+    assert msg.payload["query_state"] == QueryState.COMPLETED
@@ -0,0 +1,67 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from threading import Thread
+
+import pytest
+import zmq
+
+from flowmachine.core.server.broker import run_broker
+
+
+@pytest.fixture
+def broker():
+    """
+    Runs a broker in a background thread, and yields its zmq context and addresses.
+    """
+    ctx = zmq.Context()
+    frontend_address = "inproc://flowmachine_frontend"
+    worker_address = "inproc://flowmachine_workers"
+    broker_thread = Thread(
+        target=run_broker,
+        kwargs=dict(
+            frontend_address=frontend_address, worker_address=worker_address, ctx=ctx
+        ),
+    )
+    broker_thread.start()
+    yield ctx, frontend_address, worker_address
+    ctx.term()
+    broker_thread.join()
+
+
+def test_broker_shares_messages_between_workers(broker):
+    """
+    Test that messages sent to the broker are shared between workers, and replies are passed back to the sender.
+    """
+    ctx, frontend_address, worker_address = broker
+    workers = []
+    for _ in range(2):
+        worker = ctx.socket(zmq.DEALER)
+        worker.connect(worker_address)
+        workers.append(worker)
+    client = ctx.socket(zmq.REQ)
+    client.connect(frontend_address)
+    # Wait for both workers to be connected before sending anything
+    client.send(b"PING")
+    poller = zmq.Poller()
+    for worker in workers:
+        poller.register(worker, zmq.POLLIN)
+    [(first_worker, _)] = poller.poll(timeout=5000)
+    return_address, empty_delimiter, msg = first_worker.recv_multipart()
+    assert (empty_delimiter, msg) == (b"", b"PING")
+    first_worker.send_multipart([return_address, b"", b"PONG"])
+    assert client.recv() == b"PONG"
+
+    received_by = []
+    for i in range(2):
+        client.send(f"DUMMY_MESSAGE_{i}".encode())
+        [(worker, _)] = poller.poll(timeout=5000)
+        return_address, empty_delimiter, msg = worker.recv_multipart()
+        received_by.append(workers.index(worker))
+        worker.send_multipart([return_address, b"", msg + b"_REPLY"])
+        assert client.recv() == f"DUMMY_MESSAGE_{i}_REPLY".encode()
+    assert sorted(received_by) == [0, 1]
+
+    for sock in workers + [client]:
+        sock.close(linger=0)
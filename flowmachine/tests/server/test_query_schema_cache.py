@@ -0,0 +1,57 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import pytest
+
+from flowmachine.core.server.query_schemas import flowmachine_query
+from flowmachine.core.server.query_schemas.flowmachine_query import (
+    _query_schema_cache_path,
+    get_query_schema,
+)
+
+
+@pytest.fixture
+def schema_cache_dir(tmpdir, monkeypatch):
+    """
+    Points the query schema cache at an empty temporary directory.
+    """
+    monkeypatch.setenv("FLOWMACHINE_QUERY_SCHEMA_CACHE_DIR", str(tmpdir))
+    get_query_schema.cache_clear()
+    yield tmpdir
+    get_query_schema.cache_clear()
+
+
+def test_query_schema_cached_on_disk(schema_cache_dir, monkeypatch):
+    """
+    Test that the query schema is written to disk, and read back rather than regenerated.
+    """
+    schema = get_query_schema()
+    assert "FlowmachineQuerySchema" in schema
+    assert _query_schema_cache_path().exists()
+
+    def fail():
+        raise AssertionError("Schema was regenerated.")
+
+    monkeypatch.setattr(flowmachine_query, "_make_query_schema", fail)
+    get_query_schema.cache_clear()
+    assert get_query_schema() == schema
+
+
+def test_corrupt_query_schema_cache_regenerated(schema_cache_dir):
+    """
+    Test that the query schema is regenerated if the cached copy can't be read.
+    """
+    expected = get_query_schema()
+    _query_schema_cache_path().write_text("NOT JSON")
+    get_query_schema.cache_clear()
+    assert get_query_schema() == expected
+
+
+def test_query_schema_cache_key_depends_on_version(schema_cache_dir, monkeypatch):
+    """
+    Test that the query schema is cached separately for different versions of flowmachine.
+    """
+    path = _query_schema_cache_path()
+    monkeypatch.setattr("flowmachine.__version__", "DUMMY_VERSION")
+    assert _query_schema_cache_path() != path
@@ -39,14 +39,28 @@ def test_get_server_config(monkeypatch):
     monkeypatch.setenv("FLOWMACHINE_CACHE_PRUNING_FREQUENCY", 1)
     monkeypatch.setenv("FLOWMACHINE_CACHE_PRUNING_TIMEOUT", 2)
     monkeypatch.setenv("FLOWMACHINE_SERVER_THREADPOOL_SIZE", 1)
+    monkeypatch.setenv("FLOWMACHINE_CACHE_POLICY", "lru-2")
+    monkeypatch.setenv("FLOWMACHINE_BROKER_ADDRESS", "tcp://DUMMY_BROKER:5556")
+    monkeypatch.setenv("FLOWMACHINE_SERVER_PROFILE_QUERIES", "true")
+    monkeypatch.setenv("FLOWMACHINE_CACHE_WARM_UP_FREQUENCY", 3)
+    monkeypatch.setenv("FLOWMACHINE_CACHE_WARM_UP_BUDGET", 4)
+    monkeypatch.setenv("FLOWMACHINE_CACHE_WARM_UP_HOURS", "22-6")
+    monkeypatch.setenv("FLOWMACHINE_CACHE_WARM_UP_MIN_REQUESTS", 5)
     config = get_server_config()
-    assert len(config) == 6
+    assert len(config) == 13
     assert config.port == 5678
     assert config.debug_mode
     assert not config.store_dependencies
     assert config.cache_pruning_timeout == 2
     assert config.cache_pruning_frequency == 1
     assert config.server_thread_pool._max_workers == 1
+    assert config.cache_policy == "lru-2"
+    assert config.broker_address == "tcp://DUMMY_BROKER:5556"
+    assert config.profile_queries
+    assert config.warm_up_frequency == 3
+    assert config.warm_up_budget == 4
+    assert config.warm_up_hours == (22, 6)
+    assert config.warm_up_min_requests == 5
 
 
 def test_get_server_config_defaults(monkeypatch):
@@ -59,11 +73,25 @@ def test_get_server_config_defaults(monkeypatch):
     monkeypatch.delenv("FLOWMACHINE_CACHE_PRUNING_FREQUENCY", raising=False)
     monkeypatch.delenv("FLOWMACHINE_CACHE_PRUNING_TIMEOUT", raising=False)
     monkeypatch.delenv("FLOWMACHINE_SERVER_THREADPOOL_SIZE", raising=False)
+    monkeypatch.delenv("FLOWMACHINE_CACHE_POLICY", raising=False)
+    monkeypatch.delenv("FLOWMACHINE_BROKER_ADDRESS", raising=False)
+    monkeypatch.delenv("FLOWMACHINE_SERVER_PROFILE_QUERIES", raising=False)
+    monkeypatch.delenv("FLOWMACHINE_CACHE_WARM_UP_FREQUENCY", raising=False)
+    monkeypatch.delenv("FLOWMACHINE_CACHE_WARM_UP_BUDGET", raising=False)
+    monkeypatch.delenv("FLOWMACHINE_CACHE_WARM_UP_HOURS", raising=False)
+    monkeypatch.delenv("FLOWMACHINE_CACHE_WARM_UP_MIN_REQUESTS", raising=False)
     config = get_server_config()
-    assert len(config) == 6
+    assert len(config) == 13
     assert config.port == 5555
     assert not config.debug_mode
     assert config.store_dependencies
     assert config.cache_pruning_timeout == 600
     assert config.cache_pruning_frequency == 86400
     assert config.server_thread_pool._max_workers == min(32, os.cpu_count() + 4)
+    assert config.cache_policy == "score"
+    assert config.broker_address is None
+    assert not config.profile_queries
+    assert config.warm_up_frequency == -1
+    assert config.warm_up_budget == 3600
+    assert config.warm_up_hours is None
+    assert config.warm_up_min_requests == 2
@@ -0,0 +1,145 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+import datetime
+from unittest.mock import MagicMock, Mock
+
+import pytest
+
+from flowmachine.core.server import warm_up
+from flowmachine.core.server.warm_up import (
+    WarmUpCandidate,
+    get_latest_query_date,
+    get_warm_up_candidates,
+    in_warm_up_hours,
+    shift_query_dates,
+    warm_up_cache,
+)
+
+daily_location_spec = {
+    "query_kind": "spatial_aggregate",
+    "locations": {
+        "query_kind": "daily_location",
+        "date": "2016-01-07",
+        "method": "last",
+        "aggregation_unit": "admin3",
+    },
+}
+flows_spec = {
+    "query_kind": "total_network_objects",
+    "start_date": "2016-01-01",
+    "end_date": "2016-01-08T00:00:00",
+    "aggregation_unit": "admin3",
+}
+
+
+def test_shift_query_dates():
+    """
+    Every date in a spec, including in sub-queries, is shifted and keeps its format.
+    """
+    assert shift_query_dates(daily_location_spec, 1) == {
+        "query_kind": "spatial_aggregate",
+        "locations": {
+            "query_kind": "daily_location",
+            "date": "2016-01-08",
+            "method": "last",
+            "aggregation_unit": "admin3",
+        },
+    }
+    assert shift_query_dates(flows_spec, 2) == dict(
+        flows_spec, start_date="2016-01-03", end_date="2016-01-10T00:00:00"
+    )
+
+
+def test_get_latest_query_date():
+    """
+    The latest date in a spec is found, including in sub-queries.
+    """
+    assert get_latest_query_date(daily_location_spec) == datetime.date(2016, 1, 7)
+    assert get_latest_query_date(flows_spec) == datetime.date(2016, 1, 8)
+    assert get_latest_query_date({"query_kind": "dummy_query"}) is None
+
+
+@pytest.mark.parametrize(
+    "hour, hours, expected",
+    [
+        (3, None, True),
+        (3, (1, 5), True),
+        (5, (1, 5), False),
+        (23, (22, 6), True),
+        (2, (22, 6), True),
+        (12, (22, 6), False),
+    ],
+)
+def test_in_warm_up_hours(hour, hours, expected):
+    """
+    Warm-up hours can span midnight.
+    """
+    assert in_warm_up_hours(datetime.datetime(2016, 1, 1, hour), hours) == expected
+
+
+def test_get_warm_up_candidates(monkeypatch):
+    """
+    Queries which aren't stored are recomputed, and rolling windows are moved on to the newest data, most valuable first.
+    """
+    now = datetime.datetime(2016, 1, 10, tzinfo=datetime.timezone.utc)
+    connection = MagicMock()
+    connection.available_dates = {
+        "calls": [datetime.date(2016, 1, day) for day in range(1, 9)]
+    }
+    connection.fetch.return_value = [
+        ("DAILY_LOCATION_ID", daily_location_spec, 10, now, 1000),
+        ("FLOWS_ID", flows_spec, 10, now - datetime.timedelta(days=7), 1000),
+        ("OLD_ID", dict(flows_spec, end_date="2016-01-03"), 2, now, None),
+    ]
+    monkeypatch.setattr(
+        warm_up, "_is_running_or_stored", lambda query_id: query_id != "OLD_ID"
+    )
+    candidates = get_warm_up_candidates(connection, now=now)
+    assert candidates == [
+        WarmUpCandidate(
+            query_params=shift_query_dates(daily_location_spec, 1),
+            score=10.0,
+            compute_time=1.0,
+            reason="next_day",
+        ),
+        WarmUpCandidate(
+            query_params=shift_query_dates(flows_spec, 1),
+            score=5.0,
+            compute_time=1.0,
+            reason="next_day",
+        ),
+        WarmUpCandidate(
+            query_params=dict(flows_spec, end_date="2016-01-03"),
+            score=2.0,
+            compute_time=1.0,
+            reason="recompute",
+        ),
+    ]
+
+
+def test_warm_up_cache_within_budget(monkeypatch):
+    """
+    Queries are set running highest score first, skipping those that would go over the budget.
+    """
+    candidates = [
+        WarmUpCandidate({"query_kind": "a"}, 30.0, 3.0, "recompute"),
+        WarmUpCandidate({"query_kind": "b"}, 20.0, 5.0, "recompute"),
+        WarmUpCandidate({"query_kind": "c"}, 10.0, 1.0, "next_day"),
+    ]
+    monkeypatch.setattr(
+        warm_up, "get_warm_up_candidates", lambda *args, **kwargs: candidates
+    )
+    monkeypatch.setattr(warm_up, "_is_running_or_stored", lambda query_id: False)
+
+    def load(params):
+        query_obj = Mock()
+        query_obj.query_id = f"{params['query_kind']}_id"
+        query_obj.store_async.return_value = query_obj.query_id
+        return query_obj
+
+    schema = Mock()
+    schema.return_value.load.side_effect = load
+    monkeypatch.setattr(warm_up, "FlowmachineQuerySchema", schema)
+    assert warm_up_cache(Mock(), budget=5) == ["a_id", "c_id"]
@@ -0,0 +1,157 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Tests for writing dataframes to FlowDB with COPY.
+"""
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from flowmachine.core.bulk_write import (
+    copy_dataframe,
+    dataframe_to_values_sql,
+    get_column_types,
+    write_dataframe,
+)
+from flowmachine.core.context import get_db
+from flowmachine.core.dataframe_query import DataFrameQuery
+
+
+@pytest.fixture
+def mixed_df():
+    return pd.DataFrame(
+        {
+            "name": ["a", "", None, 'quote", comma'],
+            "value": [1.5, np.nan, 2.0, 3.0],
+            "count": [1, 2, 3, 4],
+            "flag": [True, False, True, False],
+            "time": pd.to_datetime(["2016-01-01", None, "2016-01-02", "2016-01-03"]),
+        }
+    )
+
+
+def test_get_column_types(mixed_df):
+    """
+    Postgres column types are inferred from dtypes, and can be overridden.
+    """
+    assert get_column_types(mixed_df, {"name": "VARCHAR(20)"}) == {
+        "name": "VARCHAR(20)",
+        "value": "DOUBLE PRECISION",
+        "count": "BIGINT",
+        "flag": "BOOLEAN",
+        "time": "TIMESTAMP",
+    }
+
+
+def test_get_column_types_unknown_column_error(mixed_df):
+    """
+    Giving a type for a column which isn't in the dataframe raises an error.
+    """
+    with pytest.raises(ValueError, match="NOT_A_COLUMN"):
+        get_column_types(mixed_df, {"NOT_A_COLUMN": "TEXT"})
+
+
+def test_copy_dataframe_marks_nulls():
+    """
+    Missing values are sent to COPY as a null marker, distinct from empty strings.
+    """
+    cursor = Mock()
+    copy_dataframe(cursor, pd.DataFrame({"a": ["", None], "b": [1.0, np.nan]}), "t")
+    sql, buf = cursor.copy_expert.call_args[0]
+    assert sql == """COPY t ("a", "b") FROM STDIN WITH (FORMAT csv, NULL '\\N')"""
+    assert buf.read() == ",1.0\n\\N,\\N\n"
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_write_dataframe(n_jobs, mixed_df, flowmachine_connect):
+    """
+    Dataframes written with COPY are read back unchanged, including nulls and empty strings.
+    """
+    write_dataframe(
+        mixed_df,
+        f"test_write_dataframe_{n_jobs}",
+        get_db().engine,
+        schema="cache",
+        chunk_size=3,
+        n_jobs=n_jobs,
+    )
+    try:
+        written = pd.read_sql_query(
+            f"SELECT * FROM cache.test_write_dataframe_{n_jobs} ORDER BY count",
+            con=get_db().engine,
+        )
+        assert written.columns.tolist() == mixed_df.columns.tolist()
+        assert written["name"].tolist() == ["a", "", None, 'quote", comma']
+        assert written["value"].isnull().tolist() == [False, True, False, False]
+        assert written["count"].tolist() == [1, 2, 3, 4]
+        assert written["flag"].tolist() == [True, False, True, False]
+        assert written["time"].isnull().tolist() == [False, True, False, False]
+    finally:
+        get_db().engine.execute(f"DROP TABLE cache.test_write_dataframe_{n_jobs}")
+
+
+def test_dataframe_query_query_id():
+    """
+    DataFrameQuery ids depend on the contents of the dataframe, but not the index.
+    """
+    df = pd.DataFrame({"site_id": ["a", "b"], "rate": [0.1, 0.2]})
+    assert (
+        DataFrameQuery(df).query_id == DataFrameQuery(df.set_index([[5, 6]])).query_id
+    )
+    assert (
+        DataFrameQuery(df).query_id
+        != DataFrameQuery(df.assign(rate=[0.1, 0.3])).query_id
+    )
+
+
+def test_dataframe_query(mixed_df, get_dataframe):
+    """
+    DataFrameQuery returns the dataframe's rows without being stored.
+    """
+    query = DataFrameQuery(mixed_df)
+    result = get_dataframe(query)
+    assert not query.is_stored
+    assert result.columns.tolist() == query.column_names
+    assert result["name"].tolist() == ["a", "", None, 'quote", comma']
+    assert result["value"].isnull().tolist() == [False, True, False, False]
+    assert result["count"].tolist() == [1, 2, 3, 4]
+    assert result["time"].isnull().tolist() == [False, True, False, False]
+
+
+def test_stored_dataframe_query(mixed_df, get_dataframe):
+    """
+    Storing a DataFrameQuery writes the dataframe to the cache.
+    """
+    query = DataFrameQuery(mixed_df)
+    query.store().result()
+    assert query.is_stored
+    assert query.get_query() == f"SELECT * FROM {query.fully_qualified_table_name}"
+    assert get_dataframe(query)["count"].tolist() == [1, 2, 3, 4]
+
+
+def test_unpickled_dataframe_query_not_stored_error(mixed_df):
+    """
+    An unstored DataFrameQuery whose dataframe is not available raises an error.
+    """
+    query = DataFrameQuery(mixed_df)
+    del query._data
+    with pytest.raises(ValueError, match="not stored"):
+        query._make_query()
+
+
+def test_dataframe_to_values_sql(mixed_df):
+    """
+    Dataframes are rendered as VALUES lists cast to the column types.
+    """
+    assert dataframe_to_values_sql(mixed_df.iloc[[1]], {"count": "INTEGER"}) == (
+        'SELECT "name", "value", "count", "flag", "time" FROM (VALUES '
+        "(''::TEXT, NULL::DOUBLE PRECISION, '2'::INTEGER, 'False'::BOOLEAN, NULL::TIMESTAMP)"
+        ') AS t("name", "value", "count", "flag", "time")'
+    )
+    assert dataframe_to_values_sql(mixed_df.iloc[:0][["name"]]) == (
+        'SELECT NULL::TEXT AS "name" WHERE FALSE'
+    )
@@ -34,6 +34,10 @@ from flowmachine.core.cache import (
     get_cache_protected_period,
     set_cache_protected_period,
     watch_and_shrink_cache,
+    flush_access_records,
+    get_cache_policy_order,
+    get_recompute_time,
+    record_access,
 )
 from flowmachine.core.context import get_db, get_redis, get_executor
 from flowmachine.core.query_state import QueryState, QueryStateMachine
@@ -141,6 +145,104 @@ def test_touch_cache_record_for_table(flowmachine_connect):
     )
 
 
+def test_accesses_recorded_in_batches(flowmachine_connect):
+    """
+    Accesses to cache records are only written when flushed, in one batch.
+    """
+    table = Table("events.calls_20160101")
+    dl = daily_location("2016-01-01").store().result()
+    flush_access_records(get_db())
+    count_qry = "SELECT access_count, cardinality(access_history) FROM cache.cached WHERE query_id='{}'"
+    initial_count, initial_history = get_db().fetch(count_qry.format(table.query_id))[0]
+    touches = get_db().fetch("SELECT last_value FROM cache.cache_touches")[0][0]
+    for _ in range(3):
+        table.get_query()
+    dl.get_query()
+    assert initial_count == get_db().fetch(count_qry.format(table.query_id))[0][0]
+    assert 2 == flush_access_records(get_db())
+    assert 0 == flush_access_records(get_db())
+    assert (initial_count + 3, min(initial_history + 3, 8)) == tuple(
+        get_db().fetch(count_qry.format(table.query_id))[0]
+    )
+    assert 0 == get_score(get_db(), table.query_id)
+    # Only the access to the query should have touched the cache
+    assert (
+        touches + 1
+        == get_db().fetch("SELECT last_value FROM cache.cache_touches")[0][0]
+    )
+
+
+def test_record_access_ignores_missing_records(flowmachine_connect):
+    """
+    Accesses recorded for cache records which no longer exist are discarded.
+    """
+    record_access(get_db(), "NOT_A_STORED_QUERY")
+    assert 1 == flush_access_records(get_db())
+
+
+def test_recompute_time_includes_dependencies(flowmachine_connect):
+    """
+    Recompute time is the compute time of a query plus those of its cached dependencies.
+    """
+    dl = daily_location("2016-01-01").store().result()
+    dl_agg = dl.aggregate().store().result()
+    assert get_recompute_time(get_db(), dl.query_id) == pytest.approx(
+        get_compute_time(get_db(), dl.query_id)
+    )
+    assert get_recompute_time(get_db(), dl_agg.query_id) == pytest.approx(
+        get_compute_time(get_db(), dl_agg.query_id)
+        + get_compute_time(get_db(), dl.query_id)
+    )
+
+
+@pytest.mark.parametrize("policy", ["lru-0", "lru-9", "NOT_A_POLICY"])
+def test_unknown_cache_policy_raises_error(policy):
+    """
+    Asking for an unknown cache policy raises a ValueError.
+    """
+    with pytest.raises(ValueError, match="Unknown cache policy"):
+        get_cache_policy_order(policy)
+
+
+def test_lru_k_policy_order(flowmachine_connect):
+    """
+    Under LRU-2, queries accessed fewer than twice are removed first.
+    """
+    dl = daily_location("2016-01-01").store().result()
+    dl_agg = dl.aggregate().store().result()
+    dl.get_query()
+    cached_queries = get_cached_query_objects_ordered_by_score(
+        get_db(), protected_period=-1, policy="lru-2"
+    )
+    assert [dl_agg.query_id, dl.query_id] == [q.query_id for q, _ in cached_queries]
+
+
+@pytest.mark.parametrize("policy", ["score", "recompute", "gdsf", "lru-2"])
+def test_shrink_to_size_with_policy(policy, flowmachine_connect):
+    """
+    Test that shrink_below_size removes queries under each of the cache policies.
+    """
+    dl = daily_location("2016-01-01").store().result()
+    dl_agg = dl.aggregate().store().result()
+    removed_queries = shrink_below_size(get_db(), 0, protected_period=-1, policy=policy)
+    assert {dl.query_id, dl_agg.query_id} == {q.query_id for q in removed_queries}
+    assert not dl.is_stored
+
+
+def test_gdsf_shrink_raises_inflation(flowmachine_connect):
+    """
+    Removing a query under GDSF raises the inflation value to the query's priority.
+    """
+    dl = daily_location("2016-01-01").store().result()
+    priority = get_db().fetch(
+        f"SELECT gdsf_score(gdsf_inflation, access_count, recompute_time(query_id), table_size(tablename, schema)) FROM cache.cached WHERE query_id='{dl.query_id}'"
+    )[0][0]
+    shrink_one(get_db(), protected_period=-1, policy="gdsf")
+    assert priority == pytest.approx(
+        get_db().fetch("SELECT cache_gdsf_inflation()")[0][0]
+    )
+
+
 def test_get_compute_time():
     """
     Compute time should take value returned in ms and turn it into seconds.
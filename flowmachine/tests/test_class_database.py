@@ -9,6 +9,7 @@ import datetime
 from unittest.mock import Mock
 import pytest
 
+from flowmachine.core import Connection
 from flowmachine.core.context import get_db
 
 
@@ -93,3 +94,53 @@ def test_location_id(flowmachine_connect):
 def test_location_tables(flowmachine_connect):
     """Test that connection's location_tables attribute is correctly calculated"""
     assert sorted(["calls", "mds", "sms", "topups"]) == sorted(get_db().location_tables)
+
+
+@pytest.fixture
+def replica_connection(flowmachine_connect):
+    """
+    Connection with the test database as its own read replica, and one replica which is unreachable.
+    """
+    url = get_db().engine.url
+    connection = Connection(
+        conn_str=str(url),
+        replica_hosts=["UNREACHABLE_REPLICA_HOST", f"{url.host}:{url.port}"],
+    )
+    yield connection
+    connection.close()
+
+
+def test_read_engine_without_replicas(flowmachine_connect):
+    """
+    Read-only queries use the primary if there are no replicas.
+    """
+    assert get_db().read_engine(required_tables=["events.calls"]) is get_db().engine
+
+
+def test_read_engine_uses_replica(replica_connection):
+    """
+    Read-only queries use a reachable replica which has the tables they need.
+    """
+    assert len(replica_connection.replica_engines) == 2
+    for _ in range(2):
+        assert (
+            replica_connection.read_engine(required_tables=["events.calls"])
+            is replica_connection.replica_engines[1]
+        )
+
+
+def test_read_engine_falls_back_to_primary(replica_connection):
+    """
+    Read-only queries use the primary if no replica has the tables they need.
+    """
+    assert (
+        replica_connection.read_engine(required_tables=["cache.x_not_stored_yet"])
+        is replica_connection.engine
+    )
+
+
+def test_replica_available_dates(replica_connection):
+    """
+    Available dates are read from a replica.
+    """
+    assert datetime.date(2016, 1, 7) in replica_connection.available_dates["calls"]
@@ -10,6 +10,7 @@ import pytz
 
 from datetime import datetime
 
+from flowmachine.core import Connection
 from flowmachine.core.errors import MissingDateError
 from flowmachine.features.utilities.event_table_subset import EventTableSubset
 
@@ -170,3 +171,72 @@ def test_avoids_searching_extra_tables(get_dataframe):
     sd = EventTableSubset(start="2016-01-01", stop="2016-01-02")
     explain_string = sd.explain()
     assert "calls_20160103" not in explain_string
+
+
+def test_scans_only_daily_tables_in_range():
+    """
+    Only the daily child tables overlapping the requested dates are scanned.
+    """
+    sd = EventTableSubset(start="2016-01-03", stop="2016-01-04")
+    sql = sd.get_query()
+    assert "ONLY events.calls" in sql
+    assert "events.calls_20160103" in sql
+    assert "events.calls_20160101" not in sql
+    assert "events.calls_20160107" not in sql
+
+
+def test_daily_tables_chosen_from_child_tables(monkeypatch):
+    """
+    Daily child tables are scanned even if their dates have no ingested ETL record.
+    """
+    sd = EventTableSubset(start="2016-01-03", stop="2016-01-04")
+    monkeypatch.setattr(
+        Connection, "available_dates", property(lambda self: {"calls": []})
+    )
+    assert sd._get_daily_tables() == [
+        "events.calls_20160102",
+        "events.calls_20160103",
+        "events.calls_20160104",
+        "events.calls_20160105",
+    ]
+
+
+def test_parent_table_used_if_child_tables_out_of_date(monkeypatch):
+    """
+    The parent table is scanned if an ingested date in the period has no daily child table.
+    """
+    sd = EventTableSubset(start="2016-01-03", stop="2016-01-04")
+    monkeypatch.setattr(
+        Connection,
+        "child_tables",
+        property(
+            lambda self: {
+                "events.calls": ["events.calls_20160102", "events.calls_20160104"]
+            }
+        ),
+    )
+    assert sd._get_daily_tables() is None
+
+
+@pytest.mark.parametrize(
+    "start, stop, kwargs",
+    [
+        ("2016-01-01", "2016-01-04", {}),
+        ("2016-01-02 13:30:30", "2016-01-05 16:25:00", {"hours": (4, 17)}),
+        ("2016-01-01", "2016-01-08", {"table": "events.sms"}),
+        ("2016-01-01", "2016-01-03", {"subscriber_subset": ["1p4MYbA1Y4bZzBQa"]}),
+    ],
+)
+def test_daily_tables_give_same_result(start, stop, kwargs, get_dataframe, monkeypatch):
+    """
+    Scanning the daily child tables gives the same events as scanning the parent table.
+    """
+    sd = EventTableSubset(start=start, stop=stop, **kwargs)
+    sort_cols = ["id", "datetime"]
+    from_daily_tables = get_dataframe(sd).sort_values(sort_cols)
+    monkeypatch.setattr(EventTableSubset, "_get_daily_tables", lambda self: None)
+    from_parent = get_dataframe(sd).sort_values(sort_cols)
+    assert "ONLY" not in sd.get_query()
+    assert from_daily_tables.reset_index(drop=True).equals(
+        from_parent.reset_index(drop=True)
+    )
@@ -6,9 +6,16 @@
 Tests for flowmachine.feature_collection
 """
 
+import pytest
+
 from flowmachine import feature_collection
 from flowmachine.core import CustomQuery
-from flowmachine.features import RadiusOfGyration, NocturnalEvents, SubscriberDegree
+from flowmachine.features import (
+    FeatureMatrix,
+    RadiusOfGyration,
+    NocturnalEvents,
+    SubscriberDegree,
+)
 from flowmachine.features.utilities.feature_collection import (
     feature_collection_from_list_of_classes,
 )
@@ -82,3 +89,93 @@ def test_dropna(get_length):
     # usully without dropna=False this query would only return
     # a single row. We check that this is not the case.
     assert get_length(fc) > 1
+
+
+def test_feature_matrix_matches_merged_features(get_dataframe):
+    """
+    FeatureMatrix has the same rows as merging the features one at a time.
+    """
+    start, stop = "2016-01-01", "2016-01-03"
+    metrics = [
+        RadiusOfGyration(start, stop),
+        NocturnalEvents(start, stop),
+        SubscriberDegree(start, stop),
+    ]
+    fm = FeatureMatrix(metrics, dropna=False)
+    expected = get_dataframe(metrics[0])
+    for i, metric in enumerate(metrics):
+        df = get_dataframe(metric).rename(
+            columns={"value": f"value_{metric.__class__.__name__.lower()}_{i}"}
+        )
+        expected = df if i == 0 else expected.merge(df, on="subscriber", how="outer")
+    expected = expected.set_index("subscriber").sort_index()
+    result = get_dataframe(fm).set_index("subscriber").sort_index()
+    assert list(result.columns) == list(expected.columns)
+    assert result.index.equals(expected.index)
+    for column in result.columns:
+        assert result[column].values == pytest.approx(
+            expected[column].values, nan_ok=True
+        )
+
+
+def test_feature_matrix_join_columns_must_match():
+    """
+    FeatureMatrix raises a ValueError if the features' first columns differ.
+    """
+    with pytest.raises(ValueError, match="The first column of every feature"):
+        FeatureMatrix(
+            [
+                RadiusOfGyration("2016-01-01", "2016-01-03"),
+                CustomQuery("SELECT 1 AS msisdn", ["msisdn"]),
+            ]
+        )
+
+
+def test_feature_matrix_to_parquet(tmp_path, get_dataframe):
+    """
+    FeatureMatrix can be written to a Parquet file in chunks.
+    """
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    start, stop = "2016-01-01", "2016-01-03"
+    fm = FeatureMatrix(
+        [RadiusOfGyration(start, stop), SubscriberDegree(start, stop)], dropna=False
+    )
+    path = tmp_path / "features.parquet"
+    fm.to_parquet(str(path), chunk_size=100)
+    parquet_file = pyarrow_parquet.ParquetFile(str(path))
+    df = get_dataframe(fm)
+    assert parquet_file.metadata.num_rows == len(df)
+    assert parquet_file.num_row_groups == -(-len(df) // 100)
+    written = parquet_file.read().to_pandas()
+    assert list(written.columns) == fm.column_names
+    assert sorted(written.subscriber) == sorted(df.subscriber)
+
+
+def test_feature_matrix_to_parquet_column_types(tmp_path):
+    """
+    FeatureMatrix writes every chunk to Parquet with the types of the query's columns, even if the first chunk is all null.
+    """
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    fm = FeatureMatrix(
+        [
+            CustomQuery(
+                """
+                SELECT i::text AS subscriber, CASE WHEN i > 100 THEN i::numeric / 3 END AS value,
+                    CASE WHEN i > 100 THEN i END AS count
+                FROM generate_series(1, 200) AS i
+                """,
+                ["subscriber", "value", "count"],
+            )
+        ]
+    )
+    path = tmp_path / "features.parquet"
+    fm.to_parquet(str(path), chunk_size=100)
+    parquet_file = pyarrow_parquet.ParquetFile(str(path))
+    assert parquet_file.num_row_groups == 2
+    schema = parquet_file.schema_arrow
+    assert str(schema.field("value_customquery_0").type) == "double"
+    assert str(schema.field("count_customquery_0").type) == "int32"
+    written = parquet_file.read().to_pandas().set_index("subscriber")
+    assert written.loc["1"].isnull().all()
+    assert written.loc["200", "value_customquery_0"] == pytest.approx(200 / 3)
+    assert written.loc["200", "count_customquery_0"] == 200
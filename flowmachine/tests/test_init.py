@@ -52,6 +52,7 @@ def test_param_priority(mocked_connections, monkeypatch):
     monkeypatch.setenv("FLOWDB_HOST", "DUMMY_ENV_FLOWDB_HOST")
     monkeypatch.setenv("DB_CONNECTION_POOL_SIZE", "7777")
     monkeypatch.setenv("DB_CONNECTION_POOL_OVERFLOW", "7777")
+    monkeypatch.setenv("FLOWDB_REPLICA_HOSTS", "DUMMY_ENV_REPLICA_HOST")
     monkeypatch.setenv("REDIS_HOST", "DUMMY_ENV_REDIS_HOST")
     monkeypatch.setenv("REDIS_PORT", "7777")
     monkeypatch.setenv("REDIS_PASSWORD", "DUMMY_ENV_REDIS_PASSWORD")
@@ -69,6 +70,7 @@ def test_param_priority(mocked_connections, monkeypatch):
         flowdb_host="dummy_db_host",
         flowdb_connection_pool_size=6789,
         flowdb_connection_pool_overflow=1011,
+        flowdb_replica_hosts=["dummy_replica_host"],
         redis_host="dummy_redis_host",
         redis_port=1213,
         redis_password="dummy_redis_password",
@@ -82,6 +84,7 @@ def test_param_priority(mocked_connections, monkeypatch):
         database="flowdb",
         pool_size=6789,
         overflow=1011,
+        replica_hosts=["dummy_replica_host"],
     )
     core_init_StrictRedis_mock.assert_called_with(
         host="dummy_redis_host", port=1213, password="dummy_redis_password"
@@ -101,6 +104,9 @@ def test_env_priority(mocked_connections, monkeypatch):
     monkeypatch.setenv("FLOWDB_HOST", "DUMMY_ENV_FLOWDB_HOST")
     monkeypatch.setenv("DB_CONNECTION_POOL_SIZE", "7777")
     monkeypatch.setenv("DB_CONNECTION_POOL_OVERFLOW", "2020")
+    monkeypatch.setenv(
+        "FLOWDB_REPLICA_HOSTS", "DUMMY_ENV_REPLICA_HOST, DUMMY_ENV_REPLICA_HOST_2:6970"
+    )
     monkeypatch.setenv("REDIS_HOST", "DUMMY_ENV_REDIS_HOST")
     monkeypatch.setenv("REDIS_PORT", "5050")
     monkeypatch.setenv("REDIS_PASSWORD", "DUMMY_ENV_REDIS_PASSWORD")
@@ -122,6 +128,7 @@ def test_env_priority(mocked_connections, monkeypatch):
         database="flowdb",
         pool_size=7777,
         overflow=2020,
+        replica_hosts=["DUMMY_ENV_REPLICA_HOST", "DUMMY_ENV_REPLICA_HOST_2:6970"],
     )
     core_init_StrictRedis_mock.assert_called_with(
         host="DUMMY_ENV_REDIS_HOST", port=5050, password="DUMMY_ENV_REDIS_PASSWORD"
@@ -150,6 +157,7 @@ def test_connect_defaults(mocked_connections, monkeypatch):
         database="flowdb",
         pool_size=5,
         overflow=1,
+        replica_hosts=[],
     )
     core_init_StrictRedis_mock.assert_called_with(
         host="localhost", port=6379, password="fm_redis"
@@ -9,8 +9,17 @@ from datetime import datetime, timezone
 import numpy as np
 
 from flowmachine.features import SubscriberLocations
-from flowmachine.core import JoinToLocation, location_joined_query, make_spatial_unit
+from flowmachine.core import (
+    JoinToLocation,
+    Table,
+    location_joined_query,
+    make_spatial_unit,
+)
+from flowmachine.core.cache import get_cached_query_objects_ordered_by_score
+from flowmachine.core.context import get_db, get_redis
+from flowmachine.core.query_state import QueryStateMachine
 from flowmachine.core.errors import InvalidSpatialUnitError
+from flowmachine.core.spatial_unit_mapping import SpatialUnitMapping
 
 
 def test_join_to_location_column_names(exemplar_spatial_unit_param):
@@ -189,3 +198,81 @@ def test_ocation_joined_query_raises_error():
     )
     with pytest.raises(InvalidSpatialUnitError):
         location_joined_query(table, spatial_unit="foo")
+
+
+@pytest.mark.parametrize(
+    "spatial_unit_type, kwargs",
+    [("admin", {"level": 3}), ("grid", {"size": 50}), ("versioned-cell", {})],
+)
+def test_join_uses_stored_mapping(spatial_unit_type, kwargs, get_dataframe):
+    """
+    Test that JoinToLocation uses the stored spatial unit mapping, and gets
+    the same result as joining to the spatial unit directly.
+    """
+    spatial_unit = make_spatial_unit(spatial_unit_type, **kwargs)
+    ul = SubscriberLocations(
+        "2016-01-05", "2016-01-07", spatial_unit=make_spatial_unit("cell")
+    )
+    joined = JoinToLocation(ul, spatial_unit=spatial_unit)
+    mapping = SpatialUnitMapping(spatial_unit=spatial_unit)
+    sort_cols = ["subscriber", "time", "location_id"]
+    expected = get_dataframe(joined).sort_values(sort_cols).reset_index(drop=True)
+
+    assert not mapping.is_stored  # Getting the SQL mustn't store the mapping
+    mapping.store().result()
+    assert mapping.fully_qualified_table_name not in joined.get_query()
+    joined = JoinToLocation(ul, spatial_unit=spatial_unit)
+    assert mapping.fully_qualified_table_name in joined.get_query()
+    result = get_dataframe(joined).sort_values(sort_cols).reset_index(drop=True)
+    assert expected.equals(result)
+
+
+def test_storing_join_stores_mapping():
+    """
+    Test that the spatial unit mapping is materialised when a join to it is stored.
+    """
+    spatial_unit = make_spatial_unit("admin", level=3)
+    joined = JoinToLocation(
+        Table("events.calls_20160101", columns=["id", "location_id", "datetime"]),
+        spatial_unit=spatial_unit,
+        time_col="datetime",
+    )
+    mapping = SpatialUnitMapping(spatial_unit=spatial_unit)
+    mapping.invalidate_db_cache()
+    joined.get_query()
+    assert not mapping.is_stored
+    joined.store().result()
+    QueryStateMachine(
+        get_redis(), mapping.query_id, get_db().conn_id
+    ).wait_until_complete()
+    assert mapping.is_stored
+
+
+def test_mapping_query_id_depends_on_infrastructure_version():
+    """
+    Test that the spatial unit mapping is keyed on the infrastructure version.
+    """
+    spatial_unit = make_spatial_unit("admin", level=3)
+    mapping = SpatialUnitMapping(spatial_unit=spatial_unit)
+    assert mapping.query_id == SpatialUnitMapping(spatial_unit=spatial_unit).query_id
+    assert (
+        mapping.query_id
+        != SpatialUnitMapping(
+            spatial_unit=spatial_unit, infrastructure_version="SOME_OTHER_VERSION"
+        ).query_id
+    )
+
+
+def test_stored_mapping_can_be_removed_from_cache():
+    """
+    Test that stored spatial unit mappings count towards the cache size, and can be removed when shrinking it.
+    """
+    mapping = SpatialUnitMapping(spatial_unit=make_spatial_unit("admin", level=2))
+    mapping.store().result()
+    cached_ids = [
+        query.query_id
+        for query, _ in get_cached_query_objects_ordered_by_score(
+            get_db(), protected_period=-1
+        )
+    ]
+    assert mapping.query_id in cached_ids
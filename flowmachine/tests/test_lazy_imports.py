@@ -0,0 +1,45 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Tests that importing flowmachine doesn't import its heavy dependencies
+until they are needed.
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+
+def _modules_loaded_by(statement):
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            f"import sys; {statement}; print(' '.join(sys.modules))",
+        ],
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return set(result.stdout.decode().split())
+
+
+@pytest.mark.parametrize("module", ["flowmachine", "flowmachine.core"])
+def test_import_is_lazy(module):
+    """
+    Test that importing flowmachine doesn't import pandas, sqlalchemy or networkx.
+    """
+    loaded = _modules_loaded_by(f"import {module}")
+    assert not {"pandas", "sqlalchemy", "networkx"} & loaded
+
+
+def test_lazy_attributes_are_importable():
+    """
+    Test that attributes of flowmachine and flowmachine.core are imported on access.
+    """
+    loaded = _modules_loaded_by(
+        "import flowmachine; flowmachine.core.Query; flowmachine.connect"
+    )
+    assert {"flowmachine.core.query", "flowmachine.core.init"} <= loaded
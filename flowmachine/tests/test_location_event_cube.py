@@ -0,0 +1,194 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Tests for counting events from the daily location event cubes.
+"""
+import datetime
+from collections import defaultdict
+
+import pytest
+
+from flowmachine.core import make_spatial_unit
+from flowmachine.core.connection import Connection
+from flowmachine.core.context import get_db
+from flowmachine.features import TotalLocationEvents, TotalNetworkObjects
+from flowmachine.features.location.location_event_cube import (
+    LocationEventCube,
+    get_available_location_event_cube,
+)
+
+
+@pytest.fixture
+def calls_cubes(flowmachine_connect):
+    """
+    Build location event cubes of every daily table of calls, the same way
+    FlowETL does, and drop them afterwards.
+    """
+    dates = [
+        datetime.datetime.strptime(table[-8:], "%Y%m%d").date()
+        for table in get_db().child_tables["events.calls"]
+    ]
+    with get_db().engine.begin() as conn:
+        for date in dates:
+            cube = f"cubes.location_events_calls_{date:%Y%m%d}"
+            conn.execute(
+                f"""
+                CREATE TABLE {cube} (CHECK (cdr_type = 'calls')) INHERITS (cubes.location_events);
+                INSERT INTO {cube} (cdr_type, datetime, location_id, outgoing, event_count, subscribers)
+                SELECT 'calls', date_trunc('hour', datetime), location_id, outgoing,
+                    count(*), hll_add_agg(hll_hash_text(msisdn::text), 11, 5, 128, 1)
+                FROM events.calls_{date:%Y%m%d}
+                GROUP BY 1, 2, 3, 4;
+                """
+            )
+    Connection._child_tables.cache.clear()
+    yield
+    with get_db().engine.begin() as conn:
+        for date in dates:
+            conn.execute(f"DROP TABLE cubes.location_events_calls_{date:%Y%m%d}")
+    Connection._child_tables.cache.clear()
+
+
+def test_cube_not_available_without_cubes():
+    """
+    Cubes can't be used if they haven't been built.
+    """
+    assert not LocationEventCube(
+        "2016-01-01", "2016-01-03", tables="events.calls"
+    ).is_available
+
+
+def test_cube_requires_whole_hours():
+    """
+    A LocationEventCube can only be made for a period of whole hours.
+    """
+    with pytest.raises(ValueError, match="whole hours"):
+        LocationEventCube("2016-01-01 10:30", "2016-01-03", tables="events.calls")
+    assert (
+        get_available_location_event_cube(
+            "2016-01-01 10:30", "2016-01-03", tables="events.calls"
+        )
+        is None
+    )
+
+
+def test_cube_not_used_for_subscriber_subset(calls_cubes):
+    """
+    Cubes count every subscriber's events, so aren't used for a subset.
+    """
+    assert (
+        get_available_location_event_cube(
+            "2016-01-01",
+            "2016-01-03",
+            tables="events.calls",
+            subscriber_subset=["038OVABN11Ak4W5P"],
+        )
+        is None
+    )
+
+
+def test_cube_not_available_for_tables_without_cubes(calls_cubes):
+    """
+    Cubes are only available if every table has them.
+    """
+    assert LocationEventCube(
+        "2016-01-01", "2016-01-03", tables="events.calls"
+    ).is_available
+    assert not LocationEventCube(
+        "2016-01-01", "2016-01-03", tables=["events.calls", "events.sms"]
+    ).is_available
+
+
+def test_cube_availability_uses_daily_tables(calls_cubes, monkeypatch):
+    """
+    Cubes are needed for the days of the daily events tables, whether or not they have been ingested.
+    """
+    monkeypatch.setattr(
+        Connection, "available_dates", property(lambda self: defaultdict(list))
+    )
+    assert LocationEventCube(
+        "2016-01-01", "2016-01-03", tables="events.calls"
+    ).is_available
+    child_tables = Connection.child_tables.fget(get_db())
+    monkeypatch.setattr(
+        Connection,
+        "child_tables",
+        property(
+            lambda self: defaultdict(
+                list,
+                {
+                    **child_tables,
+                    "events.calls": [
+                        *child_tables["events.calls"],
+                        "events.calls_20151231",
+                    ],
+                },
+            )
+        ),
+    )
+    assert not LocationEventCube(
+        "2016-01-01", "2016-01-03", tables="events.calls"
+    ).is_available
+
+
+def test_cube_parameters_do_not_change_query_id():
+    """
+    The parameters for finding a cube don't change the query id.
+    """
+    query = TotalLocationEvents("2016-01-01", "2016-01-03", table="events.calls")
+    assert "_cube_kwargs" not in query.__getstate__()
+
+
+@pytest.mark.parametrize("interval", ["hour", "day"])
+@pytest.mark.parametrize(
+    "spatial_unit_params",
+    [{"spatial_unit_type": "cell"}, {"spatial_unit_type": "admin", "level": 3}],
+)
+@pytest.mark.parametrize("direction", ["both", "out"])
+def test_total_location_events_from_cubes(
+    interval, spatial_unit_params, direction, calls_cubes, get_dataframe
+):
+    """
+    TotalLocationEvents counts the same events from the cubes as from the events tables.
+    """
+    query = TotalLocationEvents(
+        "2016-01-01",
+        "2016-01-03",
+        table="events.calls",
+        interval=interval,
+        direction=direction,
+        spatial_unit=make_spatial_unit(**spatial_unit_params),
+    )
+    assert query._get_location_event_cube() is not None
+    from_cubes = get_dataframe(query)
+    assert "cubes.location_events" in query.get_query()
+    del query._cube_kwargs
+    assert query._get_location_event_cube() is None
+    from_events = get_dataframe(query)
+    index = query.column_names[:-1]
+    assert (
+        from_cubes.set_index(index)
+        .sort_index()
+        .equals(from_events.set_index(index).sort_index())
+    )
+
+
+def test_total_network_objects_from_cubes(calls_cubes, get_dataframe):
+    """
+    TotalNetworkObjects finds the same network objects from the cubes as from the events tables.
+    """
+    query = TotalNetworkObjects(
+        "2016-01-01",
+        "2016-01-03",
+        table="calls",
+        total_by="hour",
+        network_object=make_spatial_unit("versioned-site"),
+    )
+    assert query._get_joined_from_cube() is not None
+    from_cubes = get_dataframe(query)
+    del query._cube_kwargs
+    assert query._get_joined_from_cube() is None
+    from_events = get_dataframe(query)
+    assert from_cubes.equals(from_events)
@@ -0,0 +1,101 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Tests for previewing queries from a sample of subscribers.
+"""
+from hashlib import md5
+
+import pytest
+
+from flowmachine.core import CustomQuery, make_spatial_unit
+from flowmachine.core.preview import preview, sample_subscribers
+from flowmachine.features import (
+    RadiusOfGyration,
+    SubscriberDegree,
+    TotalLocationEvents,
+)
+
+
+def in_sample(subscriber, fraction, seed=None):
+    """
+    Whether a subscriber is in a hash sample, calculated in python.
+    """
+    key = subscriber if seed is None else f"{seed}:{subscriber}"
+    return int(md5(key.encode()).hexdigest()[:8], 16) < round(fraction * 2 ** 32)
+
+
+@pytest.mark.parametrize("seed", [None, "panel"])
+def test_sample_subscribers(seed, get_dataframe):
+    """
+    A sampled subscriber-level query has the rows of the full query for the subscribers in the sample.
+    """
+    rog = RadiusOfGyration("2016-01-01", "2016-01-03")
+    sampled = sample_subscribers(rog, 0.3, seed=seed)
+    assert isinstance(sampled, RadiusOfGyration)
+    assert sampled.query_id != rog.query_id
+    full_df = get_dataframe(rog)
+    expected = (
+        full_df[full_df.subscriber.apply(in_sample, fraction=0.3, seed=seed)]
+        .set_index("subscriber")
+        .sort_index()
+    )
+    sampled_df = get_dataframe(sampled).set_index("subscriber").sort_index()
+    assert 0 < len(sampled_df) < len(full_df)
+    assert sampled_df.index.equals(expected.index)
+    assert sampled_df.value.values == pytest.approx(expected.value.values)
+
+
+def test_samples_are_consistent(get_dataframe):
+    """
+    Different queries sampled with the same fraction and seed use the same subscribers.
+    """
+    rog = sample_subscribers(RadiusOfGyration("2016-01-01", "2016-01-03"), 0.3)
+    degree = sample_subscribers(SubscriberDegree("2016-01-01", "2016-01-03"), 0.3)
+    assert set(get_dataframe(rog).subscriber) == set(get_dataframe(degree).subscriber)
+
+
+def test_query_without_events_is_unchanged():
+    """
+    Queries which don't read the events tables are not rebuilt.
+    """
+    query = CustomQuery("SELECT 1 AS value", ["value"])
+    assert sample_subscribers(query, 0.5) is query
+
+
+@pytest.mark.parametrize("fraction", [0, -0.1, 1.5])
+def test_bad_fraction(fraction):
+    """
+    Sampling raises a ValueError if the fraction isn't in (0, 1].
+    """
+    with pytest.raises(ValueError, match="Sample fraction"):
+        sample_subscribers(RadiusOfGyration("2016-01-01", "2016-01-03"), fraction)
+
+
+def test_preview_scales_counts(get_dataframe):
+    """
+    Previews of aggregates have their counts scaled up by the sampling fraction.
+    """
+    query = TotalLocationEvents(
+        "2016-01-01", "2016-01-03", spatial_unit=make_spatial_unit("admin", level=3)
+    )
+    result = preview(query, fraction=0.5, run_exact=False)
+    assert result.is_estimate
+    assert result.exact is None
+    assert result.scaled_columns == ["value"]
+    sampled_df = get_dataframe(result.sampled_query)
+    assert result.estimate.value.sum() == pytest.approx(sampled_df.value.sum() * 2)
+
+
+def test_preview_runs_exact_query(get_dataframe):
+    """
+    Previewing a query stores the exact query in the background.
+    """
+    rog = RadiusOfGyration("2016-01-01", "2016-01-03")
+    result = rog.preview(fraction=0.5)
+    assert result.scaled_columns == []
+    assert result.estimate.subscriber.isin(get_dataframe(rog).subscriber).all()
+    exact_df = result.get_exact_dataframe()
+    assert rog.is_stored
+    assert len(exact_df) == len(get_dataframe(rog))
@@ -102,3 +102,34 @@ def test_pwo_result_cols():
         "probability",
     ]
     assert mr.column_names == cols
+
+
+def test_pwo_departure_rate_row_order():
+    """Test departure rates are kept with their sites, whatever order they are given in."""
+    rates = pd.DataFrame(
+        [{"site_id": "0xqNDj", "rate": 0.9}, {"site_id": "8wPojr", "rate": 0.1}]
+    )
+    pwo = PopulationWeightedOpportunities(
+        "2016-01-01", "2016-01-07", departure_rate=rates
+    )
+    pwo_reversed = PopulationWeightedOpportunities(
+        "2016-01-01", "2016-01-07", departure_rate=rates.iloc[::-1]
+    )
+    assert pwo.departure_rate.query_id == pwo_reversed.departure_rate.query_id
+    assert pwo.departure_rate.column_names == ["rate", "site_id_from"]
+    assert pwo.departure_rate._data.values.tolist() == [
+        [0.9, "0xqNDj"],
+        [0.1, "8wPojr"],
+    ]
+
+
+def test_pwo_stores_departure_rate():
+    """Test departure rates are written to the cache before the model is stored."""
+    rates = pd.DataFrame(
+        [{"site_id": "0xqNDj", "rate": 0.9}, {"site_id": "8wPojr", "rate": 0.1}]
+    )
+    pwo = PopulationWeightedOpportunities(
+        "2016-01-01", "2016-01-07", departure_rate=rates
+    )
+    pwo.store().result()
+    assert pwo.departure_rate.is_stored
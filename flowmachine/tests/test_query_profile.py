@@ -0,0 +1,71 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Tests for profiling query execution.
+"""
+
+from flowmachine.core import make_spatial_unit
+from flowmachine.core.context import get_db, query_profiling
+from flowmachine.core.query_profile import get_query_profile, summarise_plans
+from flowmachine.features import TotalLocationEvents, UniqueSubscriberCounts
+
+
+def test_summarise_plans():
+    """
+    Test that the totals of the top plan nodes are summarised.
+    """
+    plans = [
+        {
+            "Plan": {
+                "Actual Rows": 10,
+                "Shared Hit Blocks": 1,
+                "Shared Read Blocks": 2,
+                "Temp Written Blocks": 3,
+            },
+            "Planning Time": 0.5,
+            "Execution Time": 1.5,
+        },
+        {"Plan": {"Actual Rows": 5}, "Planning Time": 0.5, "Execution Time": 2.5},
+    ]
+    assert summarise_plans(plans, block_size=10) == dict(
+        planning_time=1.0,
+        execution_time=4.0,
+        rows=15,
+        shared_blocks_hit=1,
+        shared_blocks_read=2,
+        temp_blocks_written=3,
+        temp_bytes_written=30,
+    )
+
+
+def test_profile_recorded_when_profiling():
+    """
+    Test that a profile is recorded when a query is stored with profiling enabled.
+    """
+    query = UniqueSubscriberCounts(
+        "2016-01-01", "2016-01-02", spatial_unit=make_spatial_unit("admin", level=3)
+    )
+    with query_profiling():
+        query.store().result()
+    profile = get_query_profile(get_db(), query.query_id)
+    assert profile["query_id"] == query.query_id
+    assert profile["class"] == "UniqueSubscriberCounts"
+    assert profile["rows"] == len(query)
+    assert profile["queued_time"] >= 0
+    assert profile["sql_generation_time"] >= 0
+    assert profile["execution_time"] >= profile["plan_execution_time"] > 0
+    assert profile["temp_bytes_written"] >= 0
+    assert "Shared Hit Blocks" in profile["plans"][0]["Plan"]
+
+
+def test_profile_not_recorded_by_default():
+    """
+    Test that no profile is recorded when profiling is not enabled.
+    """
+    query = TotalLocationEvents(
+        "2016-01-01", "2016-01-02", spatial_unit=make_spatial_unit("admin", level=3)
+    )
+    query.store().result()
+    assert get_query_profile(get_db(), query.query_id) is None
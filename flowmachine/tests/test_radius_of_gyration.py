@@ -64,3 +64,39 @@ def test_can_be_joined(get_dataframe):
     df = get_dataframe(rog_JA)
     assert isinstance(df, pd.DataFrame)
     assert rog_JA.column_names == ["pcod", "value"]
+
+
+def test_bad_method():
+    """
+    RadiusOfGyration() raises a valueerror when given a bad method
+    """
+    with pytest.raises(ValueError):
+        RadiusOfGyration("2016-01-01", "2016-01-02", method="NOT_A_METHOD")
+
+
+def test_unit_vector_method_matches_geodesic(get_dataframe):
+    """
+    RadiusOfGyration() calculated in a single pass is within the documented error bound of the geodesic values.
+    """
+    geodesic = get_dataframe(RadiusOfGyration("2016-01-01", "2016-01-02"))
+    unit_vector = get_dataframe(
+        RadiusOfGyration("2016-01-01", "2016-01-02", method="unit-vector")
+    )
+    compare = geodesic.merge(unit_vector, on="subscriber", suffixes=("_geo", "_uv"))
+    assert len(compare) == len(geodesic)
+    assert (
+        (compare.value_uv - compare.value_geo).abs() <= 0.006 * compare.value_geo + 1e-6
+    ).all()
+
+
+def test_geodesic_method_not_in_state():
+    """
+    The default geodesic method is left out of RadiusOfGyration's state, so its query id is unchanged.
+    """
+    assert "method" not in RadiusOfGyration("2016-01-01", "2016-01-02").__getstate__()
+    assert (
+        RadiusOfGyration(
+            "2016-01-01", "2016-01-02", method="unit-vector"
+        ).__getstate__()["method"]
+        == "unit-vector"
+    )
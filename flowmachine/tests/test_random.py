@@ -296,3 +296,31 @@ def test_pickling():
     for ss in [ss1, ss2]:
         assert ss.get_query() == pickle.loads(pickle.dumps(ss)).get_query()
         assert ss.query_id == pickle.loads(pickle.dumps(ss)).query_id
+
+
+def test_subscriber_hash_sample(get_dataframe):
+    """
+    Subscriber hash sampling reads a consistent sample of subscribers from the events.
+    """
+    subscribers = UniqueSubscribers(start="2016-01-01", stop="2016-01-04")
+    sample = subscribers.random_sample(
+        sampling_method="subscriber_hash", fraction=0.2, seed=0.1
+    )
+    assert isinstance(sample, UniqueSubscribers)
+    assert "md5" in sample.get_query()
+    df = get_dataframe(sample)
+    assert 0 < len(df) < len(get_dataframe(subscribers))
+    other_sample = UniqueSubscribers(
+        start="2016-01-02", stop="2016-01-04"
+    ).random_sample(sampling_method="subscriber_hash", fraction=0.2, seed=0.1)
+    assert set(get_dataframe(other_sample).subscriber).issubset(df.subscriber)
+
+
+def test_subscriber_hash_sample_requires_fraction():
+    """
+    Subscriber hash sampling raises an error if given a size rather than a fraction.
+    """
+    with pytest.raises(ValueError, match="requires a 'fraction'"):
+        UniqueSubscribers(start="2016-01-01", stop="2016-01-04").random_sample(
+            sampling_method="subscriber_hash", size=10
+        )
@@ -8,8 +8,10 @@ Unit tests for the RasterStatistics utilities.
 
 import pytest
 
-from flowmachine.core import Table
-from flowmachine.features.raster import RasterStatistics
+from flowmachine.core import Table, make_spatial_unit
+from flowmachine.core.errors import InvalidSpatialUnitError
+from flowmachine.features.raster import RasterStatistics, ZonalStatistics
+from flowmachine.features.raster.zonal_statistics import get_raster_version
 
 
 def test_computes_expected_clipping_values(get_dataframe):
@@ -65,6 +67,14 @@ def test_raises_valueerror_when_grouping_element_not_provided():
         )
 
 
+def test_raises_valueerror_for_multiple_bands():
+    """
+    RasterStatistics() raises ValueError when given more than one band.
+    """
+    with pytest.raises(ValueError, match="single band"):
+        RasterStatistics("population.small_nepal_raster", band=[1, 2])
+
+
 def test_raster_statistics_column_names_novector(get_dataframe):
     """
     Test that column_names property matches head(0) for RasterStatistics
@@ -86,3 +96,85 @@ def test_raster_statistics_column_names_vector(get_dataframe):
         grouping_element="admin2pcod",
     )
     assert get_dataframe(r).columns.tolist() == r.column_names
+
+
+@pytest.mark.parametrize(
+    "statistic, expected",
+    [("sum", 2500000.0), ("count", 250000), ("mean", 10.0), ("max", 10.0)],
+)
+def test_computes_expected_statistics(statistic, expected, get_dataframe):
+    """
+    RasterStatistics() computes the requested statistic when clipping vector and raster layers.
+    """
+    vector = Table(schema="geography", name="admin2")
+    r = RasterStatistics(
+        raster="population.small_nepal_raster",
+        vector=vector,
+        grouping_element="admin2pcod",
+        statistic=statistic,
+    )
+    result = get_dataframe(r).set_index("admin2pcod")
+    assert expected == pytest.approx(result.loc["524 3 07"].statistic)
+
+
+def test_served_from_stored_zonal_statistics(get_dataframe):
+    """
+    RasterStatistics() reads from the zonal statistics table once it is stored.
+    """
+    vector = Table(schema="geography", name="admin2")
+    zs = ZonalStatistics(
+        raster="population.small_nepal_raster",
+        vector=vector,
+        grouping_element="admin2pcod",
+    )
+    zs.store().result()
+    r = RasterStatistics(
+        raster="population.small_nepal_raster",
+        vector=vector,
+        grouping_element="admin2pcod",
+    )
+    assert zs.fully_qualified_table_name in r.get_query()
+    assert 2500000.0 == get_dataframe(r).set_index("admin2pcod").loc["524 3 07"][0]
+
+
+def test_zonal_statistics_with_spatial_unit(get_dataframe):
+    """
+    ZonalStatistics() groups by the location id columns of a polygon spatial unit.
+    """
+    zs = ZonalStatistics(
+        raster="population.small_nepal_raster",
+        vector=make_spatial_unit("admin", level=2),
+    )
+    result = get_dataframe(zs)
+    assert result.columns.tolist() == zs.column_names
+    assert 2500000.0 == result.set_index("pcod").loc["524 3 07"]["sum"]
+
+
+def test_zonal_statistics_rejects_non_polygon_spatial_unit():
+    """
+    ZonalStatistics() raises an error for spatial units which aren't polygons.
+    """
+    with pytest.raises(InvalidSpatialUnitError):
+        ZonalStatistics(
+            raster="population.small_nepal_raster", vector=make_spatial_unit("lon-lat"),
+        )
+
+
+def test_raster_version_changes_query_id():
+    """
+    RasterStatistics() query id depends on the version of the raster.
+    """
+    vector = Table(schema="geography", name="admin2")
+    r = RasterStatistics(
+        raster="population.small_nepal_raster",
+        vector=vector,
+        grouping_element="admin2pcod",
+    )
+    r_other_version = RasterStatistics(
+        raster="population.small_nepal_raster",
+        vector=vector,
+        grouping_element="admin2pcod",
+        raster_version="SOME_OTHER_VERSION",
+    )
+    assert r.raster_version == get_raster_version("population.small_nepal_raster")
+    assert r.query_id != r_other_version.query_id
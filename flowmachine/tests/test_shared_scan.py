@@ -0,0 +1,110 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Tests for storing batches of queries with shared scans of the events tables.
+"""
+
+from concurrent.futures import wait
+
+import pytest
+
+from flowmachine.core import make_spatial_unit
+from flowmachine.core.context import get_db, get_redis, shared_scans
+from flowmachine.core.query_state import QueryStateMachine
+from flowmachine.core.shared_scan import (
+    group_queries_for_shared_scans,
+    store_with_shared_scans,
+)
+from flowmachine.features import (
+    LocationIntroversion,
+    TotalLocationEvents,
+    UniqueSubscriberCounts,
+)
+from flowmachine.features.utilities import EventTableSubset
+
+
+def test_shared_scans_context():
+    """
+    Queries are read using the given SQL within the shared_scans context.
+    """
+    subset = EventTableSubset(start="2016-01-01", stop="2016-01-02")
+    with shared_scans({subset.query_id: "SELECT DUMMY_SQL"}):
+        assert subset.get_query() == "SELECT DUMMY_SQL"
+    assert subset.get_query() != "SELECT DUMMY_SQL"
+
+
+def test_group_queries_for_shared_scans():
+    """
+    Queries reading the same rows of the events tables are grouped together, whatever columns they need.
+    """
+    tle = TotalLocationEvents(
+        "2016-01-01", "2016-01-02", spatial_unit=make_spatial_unit("admin", level=3)
+    )
+    usc = UniqueSubscriberCounts(
+        "2016-01-01", "2016-01-02", spatial_unit=make_spatial_unit("admin", level=3)
+    )
+    other_dates = UniqueSubscriberCounts(
+        "2016-01-02", "2016-01-03", spatial_unit=make_spatial_unit("admin", level=3)
+    )
+    groups, unshared = group_queries_for_shared_scans([tle, usc, other_dates])
+    assert len(groups) == 1
+    scans, group = groups[0]
+    assert {q.query_id for q in group} == {tle.query_id, usc.query_id}
+    assert len(scans) == len(get_db().subscriber_tables)
+    for scan in scans.values():
+        assert {"location_id", "datetime", "subscriber"}.issubset(scan.column_names)
+    assert [q.query_id for q in unshared] == [other_dates.query_id]
+
+
+def test_store_with_shared_scans(get_dataframe):
+    """
+    Queries stored with shared scans are stored under their own query ids, with the same results.
+    """
+    queries = [
+        TotalLocationEvents(
+            "2016-01-01",
+            "2016-01-02",
+            spatial_unit=make_spatial_unit("admin", level=3),
+            interval="hour",
+        ),
+        UniqueSubscriberCounts(
+            "2016-01-01", "2016-01-02", spatial_unit=make_spatial_unit("admin", level=3)
+        ),
+        LocationIntroversion(
+            "2016-01-01", "2016-01-02", spatial_unit=make_spatial_unit("admin", level=3)
+        ),
+    ]
+    expected = [get_dataframe(q) for q in queries]
+
+    futures = store_with_shared_scans(queries)
+    assert set(futures) == {q.query_id for q in queries}
+    assert len(set(futures.values())) == 1
+    wait(list(futures.values()))
+
+    for query, expected_df in zip(queries, expected):
+        assert query.is_stored
+        assert QueryStateMachine(
+            get_redis(), query.query_id, get_db().conn_id
+        ).is_completed
+        assert query.fully_qualified_table_name in query.get_query()
+        sort_columns = query.column_names
+        stored_df = get_dataframe(query)
+        assert (
+            stored_df.sort_values(sort_columns)
+            .reset_index(drop=True)
+            .equals(expected_df.sort_values(sort_columns).reset_index(drop=True))
+        )
+
+
+def test_store_with_shared_scans_unshared_query():
+    """
+    Queries which can't share a scan are stored normally.
+    """
+    query = UniqueSubscriberCounts(
+        "2016-01-01", "2016-01-02", spatial_unit=make_spatial_unit("admin", level=3)
+    )
+    futures = store_with_shared_scans([query])
+    futures[query.query_id].result()
+    assert query.is_stored
@@ -0,0 +1,163 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Tests for rolling up spatial aggregates from stored cell-level queries.
+"""
+
+import pytest
+
+from flowmachine.core import make_spatial_unit
+from flowmachine.features import TotalLocationEvents, UniqueSubscriberCounts
+
+
+@pytest.mark.parametrize(
+    "spatial_unit_params",
+    [
+        {"spatial_unit_type": "admin", "level": 1},
+        {"spatial_unit_type": "admin", "level": 3},
+        {"spatial_unit_type": "versioned-site"},
+        {"spatial_unit_type": "grid", "size": 5},
+    ],
+)
+@pytest.mark.parametrize("interval", ["day", "hour", "min"])
+def test_total_location_events_rollup(spatial_unit_params, interval, get_dataframe):
+    """
+    TotalLocationEvents rolled up from stored cell-level counts gives the same result as computing from events.
+    """
+    query = TotalLocationEvents(
+        "2016-01-01",
+        "2016-01-02",
+        spatial_unit=make_spatial_unit(**spatial_unit_params),
+        interval=interval,
+        direction="out",
+    )
+    expected = get_dataframe(query)
+    source = query.rollup_source
+    assert source.spatial_unit == make_spatial_unit("cell")
+    assert source.fully_qualified_table_name not in query.get_query()
+
+    source.store().result()
+    # Whether to roll up is only checked the first time a query is used
+    assert source.fully_qualified_table_name not in query.get_query()
+    query = TotalLocationEvents(
+        "2016-01-01",
+        "2016-01-02",
+        spatial_unit=make_spatial_unit(**spatial_unit_params),
+        interval=interval,
+        direction="out",
+    )
+    assert source.fully_qualified_table_name in query.get_query()
+    rolled_up = get_dataframe(query)
+
+    assert rolled_up.columns.tolist() == query.column_names
+    sort_columns = query.column_names[:-1]
+    assert (
+        rolled_up.sort_values(sort_columns)
+        .reset_index(drop=True)
+        .equals(expected.sort_values(sort_columns).reset_index(drop=True))
+    )
+
+
+@pytest.mark.parametrize(
+    "spatial_unit_params",
+    [
+        {"spatial_unit_type": "admin", "level": 2},
+        {"spatial_unit_type": "lon-lat"},
+        {"spatial_unit_type": "grid", "size": 5},
+    ],
+)
+def test_unique_subscriber_counts_rollup(spatial_unit_params, get_dataframe):
+    """
+    UniqueSubscriberCounts rolled up from stored cell-level daily locations gives the same result as computing from events.
+    """
+    query = UniqueSubscriberCounts(
+        "2016-01-01",
+        "2016-01-03",
+        spatial_unit=make_spatial_unit(**spatial_unit_params),
+        hours=(4, 17),
+    )
+    expected = get_dataframe(query)
+
+    source = query.rollup_source
+    source.store().result()
+    query = UniqueSubscriberCounts(
+        "2016-01-01",
+        "2016-01-03",
+        spatial_unit=make_spatial_unit(**spatial_unit_params),
+        hours=(4, 17),
+    )
+    assert source.fully_qualified_table_name in query.get_query()
+    rolled_up = get_dataframe(query)
+
+    sort_columns = query.column_names[:-1]
+    assert (
+        rolled_up.sort_values(sort_columns)
+        .reset_index(drop=True)
+        .equals(expected.sort_values(sort_columns).reset_index(drop=True))
+    )
+
+
+def test_no_rollup_source_at_cell_level():
+    """
+    Queries at cell level have no rollup source.
+    """
+    query = TotalLocationEvents(
+        "2016-01-01", "2016-01-02", spatial_unit=make_spatial_unit("cell")
+    )
+    assert query.rollup_source is None
+
+
+def test_rollup_source_not_part_of_query_id():
+    """
+    Queries which differ only in parameters used by the rollup source have different rollup sources,
+    and the rollup source doesn't change the query id.
+    """
+    query = TotalLocationEvents(
+        "2016-01-01", "2016-01-02", spatial_unit=make_spatial_unit("admin", level=3)
+    )
+    query_with_hours = TotalLocationEvents(
+        "2016-01-01",
+        "2016-01-02",
+        spatial_unit=make_spatial_unit("admin", level=3),
+        hours=(4, 17),
+    )
+    assert query.query_id != query_with_hours.query_id
+    assert query.rollup_source.query_id != query_with_hours.rollup_source.query_id
+    assert "_rollup_source_kwargs" not in query.__getstate__()
+
+
+def test_store_dependencies_stores_rollup_source():
+    """
+    Storing a query with store_dependencies=True stores its rollup source.
+    """
+    query = TotalLocationEvents(
+        "2016-01-01", "2016-01-02", spatial_unit=make_spatial_unit("admin", level=2)
+    )
+    query.store(store_dependencies=True).result()
+    assert query.rollup_source.is_stored
+
+
+def test_store_does_not_store_rollup_source():
+    """
+    Storing a query without its dependencies doesn't store its rollup source.
+    """
+    query = TotalLocationEvents(
+        "2016-01-01", "2016-01-02", spatial_unit=make_spatial_unit("admin", level=2)
+    )
+    query.store().result()
+    assert not query.rollup_source.is_stored
+
+
+def test_rollup_source_is_dependency():
+    """
+    A query rolled up from a stored source records the source as a dependency.
+    """
+    query = TotalLocationEvents(
+        "2016-01-01", "2016-01-02", spatial_unit=make_spatial_unit("admin", level=2)
+    )
+    source = query.rollup_source
+    source.store().result()
+    query.store().result()
+    assert source in query._get_stored_dependencies(exclude_self=True)
@@ -0,0 +1,106 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Tests for the SparseDistanceMatrix() class.
+"""
+
+import pytest
+
+from flowmachine.core import CustomQuery, make_spatial_unit
+from flowmachine.features.spatial import DistanceMatrix, SparseDistanceMatrix
+
+
+@pytest.fixture
+def site_pairs():
+    """
+    A query with a few pairs of site ids, without versions.
+    """
+    return CustomQuery(
+        """
+        SELECT site_id_from, site_id_to FROM (VALUES
+            ('8wPojr', 'GN2k0G'), ('8wPojr', 'DbWg4K'), ('8wPojr', 'GN2k0G'), ('DbWg4K', 'DbWg4K')
+        ) AS pairs (site_id_from, site_id_to)
+        """,
+        ["site_id_from", "site_id_to"],
+    )
+
+
+def test_matches_distance_matrix(site_pairs, get_dataframe):
+    """
+    SparseDistanceMatrix() has the rows of DistanceMatrix() for the pairs, with every version of the sites.
+    """
+    spatial_unit = make_spatial_unit("versioned-site")
+    sparse = get_dataframe(SparseDistanceMatrix(site_pairs, spatial_unit=spatial_unit))
+    full = get_dataframe(DistanceMatrix(spatial_unit=spatial_unit))
+    index = ["site_id_from", "version_from", "site_id_to", "version_to"]
+    expected = (
+        full.merge(
+            sparse[["site_id_from", "site_id_to"]].drop_duplicates(),
+            on=["site_id_from", "site_id_to"],
+        )
+        .set_index(index)
+        .sort_index()
+    )
+    sparse = sparse.set_index(index).sort_index()
+    assert sorted(
+        set(zip(sparse.index.get_level_values(0), sparse.index.get_level_values(2)))
+    ) == [("8wPojr", "DbWg4K"), ("8wPojr", "GN2k0G"), ("DbWg4K", "DbWg4K"),]
+    assert len(sparse) == len(expected)
+    assert sparse.loc[("8wPojr", 1, "GN2k0G", 0)]["value"] == pytest.approx(
+        789.23239740488
+    )
+    assert sparse.value.values == pytest.approx(expected.value.values)
+
+
+def test_numpy_engine_matches_postgis(site_pairs, get_dataframe):
+    """
+    SparseDistanceMatrix() gives the same distances, and has the same query id, using either engine.
+    """
+    spatial_unit = make_spatial_unit("versioned-site")
+    postgis = SparseDistanceMatrix(site_pairs, spatial_unit=spatial_unit)
+    numpy = SparseDistanceMatrix(site_pairs, spatial_unit=spatial_unit, engine="numpy")
+    assert postgis.query_id == numpy.query_id
+    numpy.get_query()
+    assert not numpy.is_stored
+    numpy.store().result()
+    index = ["site_id_from", "version_from", "site_id_to", "version_to"]
+    postgis_df = get_dataframe(postgis).set_index(index).sort_index()
+    numpy_df = get_dataframe(numpy).set_index(index).sort_index()
+    assert postgis_df.index.equals(numpy_df.index)
+    assert numpy_df.value.values == pytest.approx(postgis_df.value.values, abs=1e-6)
+
+
+def test_lon_lat_pairs(get_dataframe):
+    """
+    SparseDistanceMatrix() computes the distances directly when pairs has every location column.
+    """
+    pairs = CustomQuery(
+        "SELECT 85.0 AS lon_from, 28.0 AS lat_from, 85.0 AS lon_to, 29.0 AS lat_to",
+        ["lon_from", "lat_from", "lon_to", "lat_to"],
+    )
+    df = get_dataframe(
+        SparseDistanceMatrix(pairs, spatial_unit=make_spatial_unit("lon-lat"))
+    )
+    assert len(df) == 1
+    assert df.value[0] == pytest.approx(110.8, abs=0.1)
+
+
+def test_bad_engine(site_pairs):
+    """
+    SparseDistanceMatrix() raises a ValueError when given a bad engine.
+    """
+    with pytest.raises(ValueError, match="Unrecognised engine"):
+        SparseDistanceMatrix(site_pairs, engine="NOT_AN_ENGINE")
+
+
+def test_pairs_must_have_location_columns():
+    """
+    SparseDistanceMatrix() raises a ValueError when pairs doesn't have any of the location columns.
+    """
+    with pytest.raises(ValueError, match="pairs must have"):
+        SparseDistanceMatrix(
+            CustomQuery("SELECT 1 AS a_from, 1 AS a_to", ["a_from", "a_to"]),
+            spatial_unit=make_spatial_unit("versioned-site"),
+        )
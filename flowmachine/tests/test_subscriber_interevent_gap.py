@@ -104,6 +104,26 @@ def test_interevent_interval(
     )
 
 
+def test_interevent_period_multiple_statistics(get_dataframe):
+    """
+    IntereventPeriod calculates a list of statistics together, with the same values as calculating each alone.
+    """
+    kwargs = dict(
+        start="2016-01-01",
+        stop="2016-01-08",
+        direction="both",
+        time_resolution="second",
+    )
+    query = IntereventPeriod(statistic=["stddev", "avg"], **kwargs)
+    assert query.column_names == ["subscriber", "value_avg", "value_stddev"]
+    df = get_dataframe(query).set_index("subscriber")
+    for stat in ("avg", "stddev"):
+        single = get_dataframe(IntereventPeriod(statistic=stat, **kwargs))
+        assert df[f"value_{stat}"].to_dict() == pytest.approx(
+            single.set_index("subscriber").value.to_dict(), nan_ok=True
+        )
+
+
 @pytest.mark.parametrize("kwarg", ["direction", "statistic"])
 def test_interevent_period_errors(kwarg):
     """ Test ValueError is raised for non-compliant kwarg in IntereventPeriod. """
@@ -25,6 +25,7 @@ from flowmachine.features import (
     EventScore,
     SubscriberLocations,
 )
+from flowmachine.features.subscriber.hartigan_cluster import hartigan_assign
 
 
 @pytest.mark.usefixtures("skip_datecheck")
@@ -251,6 +252,96 @@ def test_all_options_hartigan():
     )
 
 
+@pytest.mark.parametrize(
+    "buffer, call_threshold", [(0, 0), (2, 0), (0, 2), (2, 2)],
+)
+def test_numpy_engine_matches_plpgsql(buffer, call_threshold):
+    """
+    Test that the numpy engine produces the same clusters as the hartigan aggregate.
+    """
+    cd = CallDays(
+        SubscriberLocations(
+            "2016-01-01", "2016-01-04", spatial_unit=make_spatial_unit("versioned-site")
+        )
+    )
+    sort_cols = ["subscriber", "rank"]
+    plpgsql = (
+        HartiganCluster(
+            calldays=cd, radius=50, buffer=buffer, call_threshold=call_threshold
+        )
+        .to_geopandas()
+        .sort_values(sort_cols)
+        .reset_index(drop=True)
+    )
+    numpy_engine = HartiganCluster(
+        calldays=cd,
+        radius=50,
+        buffer=buffer,
+        call_threshold=call_threshold,
+        engine="numpy",
+        chunk_size=100,
+    )
+    numpy_engine.invalidate_db_cache()
+    numpy_engine.get_query()
+    assert not numpy_engine.is_stored  # Getting the SQL must not store the query
+    numpy_engine.store().result()
+    numpy_clusters = (
+        numpy_engine.to_geopandas().sort_values(sort_cols).reset_index(drop=True)
+    )
+
+    cols = ["subscriber", "rank", "calldays", "site_id", "version"]
+    pd.testing.assert_frame_equal(plpgsql[cols], numpy_clusters[cols])
+    assert plpgsql.geometry.geom_equals_exact(
+        numpy_clusters.geometry, tolerance=1e-9
+    ).all()
+
+
+def test_numpy_engine_shares_query_id():
+    """
+    Test that the choice of engine doesn't change the query id.
+    """
+    cd = CustomQuery("SELECT * FROM foo", ["subscriber", "site_id", "version", "value"])
+    assert (
+        HartiganCluster(calldays=cd, radius=50).query_id
+        == HartiganCluster(calldays=cd, radius=50, engine="numpy").query_id
+    )
+
+
+def test_hartigan_bad_engine_raises_error():
+    """
+    Test that asking for an unknown engine raises an error.
+    """
+    cd = CustomQuery("SELECT * FROM foo", ["subscriber", "site_id", "version", "value"])
+    with pytest.raises(ValueError):
+        HartiganCluster(calldays=cd, radius=50, engine="banana")
+
+
+def test_hartigan_assign():
+    """
+    Test the vectorised Hartigan algorithm clusters each subscriber separately.
+    """
+    call_days = pd.DataFrame(
+        [
+            ("a", "s1", 0, 3, 85.0, 27.0),
+            ("a", "s2", 0, 1, 85.1, 27.0),
+            ("a", "s3", 1, 1, 86.0, 27.0),
+            ("b", "s3", 1, 2, 86.0, 27.0),
+        ],
+        columns=["subscriber", "site_id", "version", "value", "lon", "lat"],
+    )
+    clusters = hartigan_assign(call_days, radius=20)
+    assert clusters.subscriber.tolist() == ["a", "a", "a", "b"]
+    assert clusters["rank"].tolist() == [1, 1, 2, 1]
+    assert clusters.calldays.tolist() == [4, 4, 1, 2]
+    assert clusters.member.tolist() == [0, 1, 0, 0]
+    assert clusters.lon.iloc[0] == pytest.approx(85.025)
+    assert hartigan_assign(call_days, radius=20, call_threshold=2).site_id.tolist() == [
+        "s1",
+        "s2",
+        "s3",
+    ]
+
+
 def test_join_returns_the_same_clusters():
     """
     Test whether joining to another table for which the start and stop time are the same yields the same clusters.
@@ -0,0 +1,140 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+"""
+Tests for HyperLogLog subscriber sketches, and approximate unique subscriber counts.
+"""
+
+import pytest
+
+from flowmachine.core import make_spatial_unit
+from flowmachine.features import UniqueSubscriberCounts
+from flowmachine.features.location.subscriber_sketches import (
+    DailyLocationSubscriberSketches,
+    LocationSubscriberSketches,
+    hll_relative_error,
+    log2m_for_error_bound,
+)
+
+
+@pytest.mark.parametrize(
+    "error_bound, expected", [(0.5, 4), (0.1, 7), (0.02, 12), (0.01, 14)]
+)
+def test_log2m_for_error_bound(error_bound, expected):
+    """
+    The number of registers chosen is the smallest which meets the error bound.
+    """
+    log2m = log2m_for_error_bound(error_bound)
+    assert log2m == expected
+    assert hll_relative_error(log2m) <= error_bound
+    assert log2m == 4 or hll_relative_error(log2m - 1) > error_bound
+
+
+@pytest.mark.parametrize("error_bound", [0, 1, 0.001])
+def test_log2m_for_error_bound_errors(error_bound):
+    """
+    Unsupported error bounds raise an error.
+    """
+    with pytest.raises(ValueError):
+        log2m_for_error_bound(error_bound)
+
+
+def test_sketches_require_whole_days():
+    """
+    LocationSubscriberSketches raises an error if start or stop isn't a date.
+    """
+    with pytest.raises(ValueError):
+        LocationSubscriberSketches("2016-01-01 12:00:00", "2016-01-03")
+    with pytest.raises(ValueError):
+        UniqueSubscriberCounts("2016-01-01", "2016-01-02 12:00:00", error_bound=0.01)
+
+
+def test_daily_sketches_shared():
+    """
+    Sketches for different periods and spatial units depend on the same daily sketches.
+    """
+    first = LocationSubscriberSketches(
+        "2016-01-01", "2016-01-03", spatial_unit=make_spatial_unit("admin", level=3)
+    )
+    second = LocationSubscriberSketches(
+        "2016-01-02", "2016-01-05", spatial_unit=make_spatial_unit("admin", level=1)
+    )
+    assert [daily.date for daily in first.daily_sketches] == [
+        "2016-01-01",
+        "2016-01-02",
+    ]
+    assert first.daily_sketches[1].query_id == second.daily_sketches[0].query_id
+    assert isinstance(second.daily_sketches[0], DailyLocationSubscriberSketches)
+
+
+@pytest.mark.parametrize(
+    "spatial_unit_params",
+    [
+        {"spatial_unit_type": "cell"},
+        {"spatial_unit_type": "admin", "level": 1},
+        {"spatial_unit_type": "admin", "level": 3},
+    ],
+)
+def test_approximate_unique_subscriber_counts(spatial_unit_params, get_dataframe):
+    """
+    Approximate unique subscriber counts are close to the exact counts.
+    """
+    spatial_unit = make_spatial_unit(**spatial_unit_params)
+    exact = get_dataframe(
+        UniqueSubscriberCounts("2016-01-01", "2016-01-04", spatial_unit=spatial_unit)
+    )
+    approx_query = UniqueSubscriberCounts(
+        "2016-01-01", "2016-01-04", spatial_unit=spatial_unit, error_bound=0.02
+    )
+    approx = get_dataframe(approx_query)
+    assert approx.columns.tolist() == approx_query.column_names
+
+    location_columns = spatial_unit.location_id_columns
+    compared = exact.merge(approx, on=location_columns, suffixes=("_exact", "_approx"))
+    assert len(compared) == len(exact) == len(approx)
+    # Small counts are exact
+    small = compared[compared.value_exact <= 128]
+    assert (small.value_exact == small.value_approx).all()
+    # Allow for 4 standard errors
+    relative_error = (
+        compared.value_approx - compared.value_exact
+    ).abs() / compared.value_exact
+    assert (relative_error <= 4 * 0.02).all()
+
+
+def test_approximate_counts_have_no_rollup_source():
+    """
+    Approximate unique subscriber counts don't use a rollup source.
+    """
+    usc = UniqueSubscriberCounts(
+        "2016-01-01",
+        "2016-01-03",
+        spatial_unit=make_spatial_unit("admin", level=3),
+        error_bound=0.01,
+    )
+    assert usc.rollup_source is None
+    assert usc.sketches.log2m == 14
+    assert (
+        usc.query_id
+        != UniqueSubscriberCounts(
+            "2016-01-01", "2016-01-03", spatial_unit=make_spatial_unit("admin", level=3)
+        ).query_id
+    )
+
+
+def test_exact_counts_state_has_no_sketch_parameters():
+    """
+    Exact unique subscriber counts leave the sketch parameters out of their state,
+    so their query ids are unchanged.
+    """
+    usc = UniqueSubscriberCounts("2016-01-01", "2016-01-03")
+    state = usc.__getstate__()
+    assert "error_bound" not in state
+    assert "sketches" not in state
+    assert (
+        "error_bound"
+        in UniqueSubscriberCounts(
+            "2016-01-01", "2016-01-03", error_bound=0.01
+        ).__getstate__()
+    )
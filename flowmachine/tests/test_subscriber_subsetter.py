@@ -94,3 +94,19 @@ def test_subsetting_of_query(get_dataframe):
     assert 499 == len(get_dataframe(dl_1))
     assert 3 == len(get_dataframe(dl_2))
     assert 26 == len(get_dataframe(dl_3))
+
+
+def test_hash_sample_subsetter_has_different_query_ids():
+    """
+    Hash samples with a different fraction, seed or subset have different query ids.
+    """
+    subsetters = [
+        SubscriberSubsetterForHashSample(0.1),
+        SubscriberSubsetterForHashSample(0.2),
+        SubscriberSubsetterForHashSample(0.1, seed=1),
+        SubscriberSubsetterForHashSample(0.1, subset=["<SUBSCRIBER_ID_1>"]),
+    ]
+    assert len({subsetter.query_id for subsetter in subsetters}) == len(subsetters)
+    assert (
+        SubscriberSubsetterForHashSample(0.1, seed=1).query_id == subsetters[2].query_id
+    )
@@ -0,0 +1,78 @@
+# This Source Code Form is subject to the terms of the Mozilla Public
+# License, v. 2.0. If a copy of the MPL was not distributed with this
+# file, You can obtain one at http://mozilla.org/MPL/2.0/.
+
+from flowmachine.core import make_spatial_unit
+from flowmachine.features import LastLocation
+from flowmachine.features.location.consecutive_trips_od_matrix import (
+    ConsecutiveTripsODMatrix,
+)
+from flowmachine.features.utilities import SubscriberLocations, SubscriberTimeline
+
+
+def test_timeline_is_ordered(get_dataframe):
+    """
+    Test that a stored timeline holds the subscriber locations, ordered by subscriber and time.
+    """
+    subscriber_locs = SubscriberLocations(
+        "2016-01-01", "2016-01-02", spatial_unit=make_spatial_unit("admin", level=3)
+    )
+    expected = get_dataframe(subscriber_locs)
+    timeline = subscriber_locs.timeline
+    assert isinstance(timeline, SubscriberTimeline)
+    timeline.store().result()
+    df = get_dataframe(timeline)
+    assert df.columns.tolist() == subscriber_locs.column_names
+    assert df.equals(
+        df.sort_values(["subscriber", "time"], kind="mergesort").reset_index(drop=True)
+    )
+    assert len(df) == len(expected)
+
+
+def test_subscriber_locations_read_from_stored_timeline(get_dataframe):
+    """
+    Test that features read subscriber locations from a stored timeline, with the same results and query ids.
+    """
+    last_location = LastLocation(
+        "2016-01-01", "2016-01-02", spatial_unit=make_spatial_unit("admin", level=3)
+    )
+    trips = ConsecutiveTripsODMatrix(last_location.subscriber_locs)
+    query_ids = (last_location.query_id, trips.query_id)
+    expected_last_location = get_dataframe(last_location).sort_values("subscriber")
+    expected_trips = get_dataframe(trips).sort_values(trips.column_names)
+
+    timeline = last_location.subscriber_locs.timeline
+    timeline.store().result()
+    # Queries which have already checked for a stored timeline keep reading the events
+    assert timeline.fully_qualified_table_name not in last_location.get_query()
+    last_location = LastLocation(
+        "2016-01-01", "2016-01-02", spatial_unit=make_spatial_unit("admin", level=3)
+    )
+    trips = ConsecutiveTripsODMatrix(last_location.subscriber_locs)
+    assert timeline.fully_qualified_table_name in last_location.get_query()
+    assert timeline.fully_qualified_table_name in trips.get_query()
+    assert (last_location.query_id, trips.query_id) == query_ids
+    assert last_location._get_stored_dependencies(exclude_self=True) == {timeline}
+    assert (
+        get_dataframe(last_location)
+        .sort_values("subscriber")
+        .reset_index(drop=True)
+        .equals(expected_last_location.reset_index(drop=True))
+    )
+    assert (
+        get_dataframe(trips)
+        .sort_values(trips.column_names)
+        .reset_index(drop=True)
+        .equals(expected_trips.reset_index(drop=True))
+    )
+
+
+def test_timeline_dependencies_exclude_itself():
+    """
+    Test that a stored timeline isn't recorded as depending on itself.
+    """
+    timeline = SubscriberLocations(
+        "2016-01-01", "2016-01-02", spatial_unit=make_spatial_unit("admin", level=3)
+    ).timeline
+    timeline.store().result()
+    assert timeline not in timeline._get_stored_dependencies(exclude_self=True)
@@ -37,3 +37,42 @@ def test_topup_amount_errors(kwarg):
 
     with pytest.raises(ValueError):
         query = TopUpAmount("2016-01-03", "2016-01-05", **{kwarg: "error"})
+
+
+def test_topup_amount_multiple_statistics(get_dataframe):
+    """
+    TopUpAmount calculates a list of statistics together, with the same values as calculating each alone.
+    """
+    query = TopUpAmount("2016-01-01", "2016-01-08", statistic=["max", "avg", "max"])
+    assert query.column_names == ["subscriber", "value_avg", "value_max"]
+    assert (
+        query.query_id
+        == TopUpAmount("2016-01-01", "2016-01-08", statistic=["avg", "max"]).query_id
+    )
+    df = get_dataframe(query).set_index("subscriber")
+    assert df.value_avg["JZoaw2jzvK2QMKYX"] == pytest.approx(4.556_667)
+    assert df.value_max["DELmRj9Vvl346G50"] == pytest.approx(9.16)
+
+
+def test_topup_amount_read_from_stored_statistics(get_dataframe):
+    """
+    A single statistic TopUpAmount is read from a stored TopUpAmount calculating it among others.
+    """
+    multi = TopUpAmount("2016-01-01", "2016-01-08", statistic=["avg", "median"])
+    single = TopUpAmount("2016-01-01", "2016-01-08", statistic="median")
+    assert single._get_stored_statistics_source() is None
+    multi.store().result()
+    # The stored statistics are only looked up the first time
+    assert single._get_stored_statistics_source() is None
+    single = TopUpAmount("2016-01-01", "2016-01-08", statistic="median")
+    assert single._get_stored_statistics_source().query_id == multi.query_id
+    assert multi.fully_qualified_table_name in single.get_query()
+    assert multi.query_id in {query.query_id for query in single.dependencies}
+    df = get_dataframe(single).set_index("subscriber")
+    assert df.value["KXVqP6JyVDGzQa3b"] == pytest.approx(5.83)
+
+
+def test_topup_amount_empty_statistics_error():
+    """ Test ValueError is raised for an empty list of statistics in TopUpAmount. """
+    with pytest.raises(ValueError, match="At least one statistic"):
+        TopUpAmount("2016-01-03", "2016-01-05", statistic=[])
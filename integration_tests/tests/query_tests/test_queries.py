@@ -45,6 +45,13 @@ import pytest
             aggregation_unit="admin3",
             event_types=["calls", "sms"],
         ),
+        partial(
+            flowclient.unique_subscriber_counts,
+            start_date="2016-01-01",
+            end_date="2016-01-03",
+            aggregation_unit="admin3",
+            error_bound=0.02,
+        ),
         partial(
             flowclient.total_network_objects,
             start_date="2016-01-01",
@@ -103,6 +110,15 @@ import pytest
                 event_types=["calls", "sms"],
             ),
         ),
+        partial(
+            flowclient.joined_spatial_aggregate,
+            locations=flowclient.daily_location_spec(
+                date="2016-01-01", aggregation_unit="admin3", method="last",
+            ),
+            metric=flowclient.radius_of_gyration_spec(
+                start_date="2016-01-01", end_date="2016-01-02", method="unit-vector",
+            ),
+        ),
         partial(
             flowclient.joined_spatial_aggregate,
             locations=flowclient.daily_location_spec(